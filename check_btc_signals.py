@@ -32,6 +32,7 @@ import ccxt
 sys.path.insert(0, str(Path(__file__).parent / 'trading_bots'))
 
 from shared.pattern_recognition_strategy import PatternRecognitionStrategy
+from shared.candle_repository import exchange_repository
 
 
 def generate_sample_btc_data(days=7, start_price=95000):
@@ -202,14 +203,6 @@ def download_btc_data(symbol='BTC/USDT', timeframe='1h', days=7):
     print(f"   Period: Last {days} days")
     
     try:
-        # Initialize Binance
-        # NOTE: Using 'future' market type to match live bot configuration (Binance Futures)
-        # If your bot uses spot trading instead, change 'future' to 'spot' in the line below
-        exchange = ccxt.binance({
-            'enableRateLimit': True,
-            'options': {'defaultType': 'future'}  # Change to 'spot' for spot trading
-        })
-        
         # Calculate time range
         end_time = datetime.now()
         start_time = end_time - timedelta(days=days)
@@ -217,32 +210,13 @@ def download_btc_data(symbol='BTC/USDT', timeframe='1h', days=7):
         print(f"   Start: {start_time.strftime('%Y-%m-%d %H:%M:%S')}")
         print(f"   End: {end_time.strftime('%Y-%m-%d %H:%M:%S')}")
         
-        # Download data
+        # Cached history: only candles not stored locally are downloaded
+        # NOTE: Using 'future' market type to match live bot configuration (Binance Futures)
+        # If your bot uses spot trading instead, change 'future' to 'spot' in the line below
         print("\n🔄 Downloading data...")
-        since = int(start_time.timestamp() * 1000)
-        
-        all_candles = []
-        while True:
-            candles = exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=1000)
-            if not candles:
-                break
-            
-            all_candles.extend(candles)
-            since = candles[-1][0] + 1
-            
-            # Stop if we've reached the end time
-            if candles[-1][0] >= int(end_time.timestamp() * 1000):
-                break
-        
-        # Convert to DataFrame
-        df = pd.DataFrame(all_candles, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-        df.set_index('timestamp', inplace=True)
-        
-        # Filter to exact date range
-        df = df[(df.index >= start_time) & (df.index <= end_time)]
+        df = exchange_repository('binance', 'future').get(symbol, timeframe, start_time.astimezone(), end_time.astimezone())
         
-        print(f"✅ Downloaded {len(df)} candles")
+        print(f"✅ Loaded {len(df)} candles ({df.attrs['fetched']} downloaded)")
         print(f"   First candle: {df.index[0].strftime('%Y-%m-%d %H:%M:%S')}")
         print(f"   Last candle: {df.index[-1].strftime('%Y-%m-%d %H:%M:%S')}")
         print(f"   Price range: ${df['close'].min():.2f} - ${df['close'].max():.2f}")
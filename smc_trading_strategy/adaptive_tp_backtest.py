@@ -7,13 +7,12 @@ import numpy as np
 from datetime import datetime, timedelta
 
 from pattern_recognition_strategy import PatternRecognitionStrategy
+from market_data_store import load_csv_cached
 
 
 def load_mt5_data(file_path='../XAUUSD_1H_MT5_20241227_20251227.csv'):
     """Load MT5 XAUUSD data"""
-    df = pd.read_csv(file_path)
-    df['timestamp'] = pd.to_datetime(df['datetime'])
-    df = df.set_index('timestamp')
+    df = load_csv_cached(file_path)
     df = df[['open', 'high', 'low', 'close', 'volume']]
 
     df['is_london'] = df.index.hour.isin(range(7, 12))
@@ -13,62 +13,39 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from smc_strategy import SMCStrategy
 from backtester import Backtester
 from data_loader import generate_sample_data
+from monte_carlo import run_trade_monte_carlo, backtester_returns, summarize_monte_carlo, print_monte_carlo
 
 
-def run_monte_carlo_simulation(df: pd.DataFrame, n_simulations: int = 100):
+def run_monte_carlo_simulation(df: pd.DataFrame, n_simulations: int = 10000, method: str = 'bootstrap'):
     """
     Run Monte Carlo simulation to test strategy robustness
 
+    The strategy and backtest run once; the trade returns are then resampled
+    (see monte_carlo.run_trade_monte_carlo), so the candle order is kept and
+    tens of thousands of paths take seconds.
+
     Args:
         df: DataFrame with OHLC data
         n_simulations: Number of simulations
+        method: 'bootstrap', 'block' or 'permute'
     """
     print("\n🎲 Running Monte Carlo Simulation...")
-    print(f"  Simulations: {n_simulations}")
-
-    results = []
-
-    for i in range(n_simulations):
-        print(f"  Simulation {i+1}/{n_simulations}", end='\r')
-
-        # Shuffle the data (bootstrap)
-        df_sample = df.sample(frac=1.0, replace=True).sort_index()
-
-        # Run strategy
-        strategy = SMCStrategy(risk_reward_ratio=2.0, swing_length=10)
-        df_result = strategy.run_strategy(df_sample)
-
-        # Run backtest
-        backtester = Backtester(initial_capital=10000)
-        stats = backtester.run(df_result)
+    print(f"  Simulations: {n_simulations} ({method})")
 
-        results.append({
-            'total_return_pct': stats['total_return_pct'],
-            'win_rate': stats['win_rate'],
-            'sharpe_ratio': stats['sharpe_ratio'],
-            'max_drawdown': stats['max_drawdown'],
-            'total_trades': stats['total_trades']
-        })
-
-    df_results = pd.DataFrame(results)
-
-    print("\n")
-    print("\n📊 MONTE CARLO RESULTS")
-    print("="*60)
-    print(f"\nTotal Return %:")
-    print(f"  Mean:        {df_results['total_return_pct'].mean():.2f}%")
-    print(f"  Median:      {df_results['total_return_pct'].median():.2f}%")
-    print(f"  Std Dev:     {df_results['total_return_pct'].std():.2f}%")
-    print(f"  Min:         {df_results['total_return_pct'].min():.2f}%")
-    print(f"  Max:         {df_results['total_return_pct'].max():.2f}%")
+    # Run strategy
+    strategy = SMCStrategy(risk_reward_ratio=2.0, swing_length=10)
+    df_result = strategy.run_strategy(df)
 
-    print(f"\nWin Rate:")
-    print(f"  Mean:        {df_results['win_rate'].mean():.2f}%")
-    print(f"  Median:      {df_results['win_rate'].median():.2f}%")
+    # Run backtest
+    backtester = Backtester(initial_capital=10000)
+    stats = backtester.run(df_result)
+    if stats['total_trades'] == 0:
+        print("  ⚠️  No trades to resample")
+        return None
 
-    print(f"\nSharpe Ratio:")
-    print(f"  Mean:        {df_results['sharpe_ratio'].mean():.2f}")
-    print(f"  Median:      {df_results['sharpe_ratio'].median():.2f}")
+    df_results = run_trade_monte_carlo(backtester_returns(backtester), n_paths=n_simulations,
+                                       method=method)
+    print_monte_carlo(summarize_monte_carlo(df_results))
 
     # Plot distribution
     fig, axes = plt.subplots(2, 2, figsize=(14, 10))
@@ -85,10 +62,10 @@ def run_monte_carlo_simulation(df: pd.DataFrame, n_simulations: int = 100):
     axes[0, 1].set_xlabel('Win Rate %')
     axes[0, 1].legend()
 
-    axes[1, 0].hist(df_results['sharpe_ratio'], bins=30, edgecolor='black', alpha=0.7, color='orange')
-    axes[1, 0].axvline(df_results['sharpe_ratio'].mean(), color='red', linestyle='--', label='Mean')
-    axes[1, 0].set_title('Sharpe Ratio Distribution')
-    axes[1, 0].set_xlabel('Sharpe Ratio')
+    axes[1, 0].hist(df_results['max_losing_streak'], bins=30, edgecolor='black', alpha=0.7, color='orange')
+    axes[1, 0].axvline(df_results['max_losing_streak'].mean(), color='red', linestyle='--', label='Mean')
+    axes[1, 0].set_title('Max Losing Streak Distribution')
+    axes[1, 0].set_xlabel('Losing Trades in a Row')
     axes[1, 0].legend()
 
     axes[1, 1].hist(df_results['max_drawdown'], bins=30, edgecolor='black', alpha=0.7, color='purple')
@@ -254,7 +231,7 @@ def main():
     param_results = compare_parameters(df)
 
     # 2. Monte Carlo simulation
-    monte_carlo_results = run_monte_carlo_simulation(df, n_simulations=20)
+    monte_carlo_results = run_monte_carlo_simulation(df, n_simulations=10000)
 
     # 3. Walk-forward analysis
     walk_forward_results = walk_forward_analysis(df, train_size=200, test_size=50)
@@ -9,8 +9,10 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 import argparse
+import heapq
 
 from pattern_recognition_strategy import PatternRecognitionStrategy
+from exit_simulator import simulate_exits, EXIT_TP, EXIT_TIMEOUT, EXIT_TRAILING
 
 
 class AdaptiveBacktestV3:
@@ -127,6 +129,22 @@ class AdaptiveBacktestV3:
 
         return 'TREND' if is_trend else 'RANGE'
 
+    def market_regimes(self, df_strategy):
+        """
+        Regime of every signal candle as a column for backtest()
+
+        The regime only looks at the 100 candles before the signal, so it can
+        be computed once over the full history and reused by every backtest
+        on a slice of it (walk-forward folds, TP parameter sweeps).
+
+        Returns:
+            Array: 1 = TREND, 0 = RANGE, NaN = no signal
+        """
+        regimes = np.full(len(df_strategy), np.nan)
+        for i in np.flatnonzero(df_strategy['signal'].to_numpy() != 0):
+            regimes[i] = 1.0 if self.detect_market_regime(df_strategy, i) == 'TREND' else 0.0
+        return regimes
+
     def backtest(self, df, strategy, close_pct1=0.5, close_pct2=0.3, close_pct3=0.2):
         """
         Run adaptive backtest
@@ -163,248 +181,112 @@ class AdaptiveBacktestV3:
         # Run strategy
         df_strategy = strategy.run_strategy(df.copy())
 
-        # Track trades and positions
-        trades = []
-        open_positions = []
-
         # Track market regime stats
         trend_signals = 0
         range_signals = 0
 
-        # Process chronologically
-        for i in range(len(df_strategy)):
-            candle = df_strategy.iloc[i]
-            candle_time = df_strategy.index[i]
-            high = candle['high']
-            low = candle['low']
-            close = candle['close']
-            signal = candle.get('signal', 0)
-
-            # Check for new signal
-            if signal != 0:
-                # Detect market regime
+        # Build every signal's position (regime-specific TP / trailing / timeout)
+        close = df_strategy['close'].to_numpy(dtype=float)
+        if 'signal' in df_strategy.columns:
+            signal = df_strategy['signal'].to_numpy()
+        else:
+            signal = np.zeros(len(df_strategy))
+        if 'stop_loss' in df_strategy.columns:
+            signal_sl = df_strategy['stop_loss'].to_numpy(dtype=float)
+        else:
+            signal_sl = close
+
+        entries = np.flatnonzero(signal != 0)
+        # Regimes precomputed over the full history (see market_regimes) are reused
+        if 'market_regime' in df_strategy.columns:
+            precomputed = df_strategy['market_regime'].to_numpy(dtype=float)
+        else:
+            precomputed = None
+        regimes = []
+        params = []
+        for i in entries:
+            # Detect market regime
+            if precomputed is not None and not np.isnan(precomputed[i]):
+                regime = 'TREND' if precomputed[i] == 1 else 'RANGE'
+            else:
                 regime = self.detect_market_regime(df_strategy, i)
 
-                # Choose parameters based on regime
-                if regime == 'TREND':
-                    tp1, tp2, tp3 = self.trend_tp1, self.trend_tp2, self.trend_tp3
-                    trailing = self.trend_trailing
-                    timeout = self.trend_timeout
-                    trend_signals += 1
-                else:  # RANGE
-                    tp1, tp2, tp3 = self.range_tp1, self.range_tp2, self.range_tp3
-                    trailing = self.range_trailing
-                    timeout = self.range_timeout
-                    range_signals += 1
-
-                # Check max positions limit
-                if len(open_positions) >= self.max_positions:
-                    continue  # Skip if at max positions
-
-                # Open position
-                direction = 'LONG' if signal == 1 else 'SHORT'
-                signal_sl = candle.get('stop_loss', close)
-
-                if direction == 'LONG':
-                    entry_price = close + self.spread / 2
-                    sl_distance = close - signal_sl
-                    sl_price = entry_price - sl_distance
-                    tp1_price = entry_price + tp1
-                    tp2_price = entry_price + tp2
-                    tp3_price = entry_price + tp3
-                else:
-                    entry_price = close - self.spread / 2
-                    sl_distance = signal_sl - close
-                    sl_price = entry_price + sl_distance
-                    tp1_price = entry_price - tp1
-                    tp2_price = entry_price - tp2
-                    tp3_price = entry_price - tp3
-
-                new_pos = {
-                    'entry_time': candle_time,
-                    'entry_price': entry_price,
-                    'direction': direction,
-                    'sl_price': sl_price,
-                    'tp1_price': tp1_price,
-                    'tp2_price': tp2_price,
-                    'tp3_price': tp3_price,
-                    'tp1_hit': False,
-                    'tp2_hit': False,
-                    'tp3_hit': False,
-                    'trailing_active': False,
-                    'trailing_distance': trailing,  # Store per-position
-                    'timeout_hours': timeout,        # Store per-position
-                    'regime': regime,                # Track regime
-                    'trailing_high': entry_price if direction == 'LONG' else 0,
-                    'trailing_low': entry_price if direction == 'SHORT' else 999999,
-                    'position_remaining': 1.0,
-                    'total_pnl_pct': 0.0,
-                }
-
-                open_positions.append(new_pos)
-
-            # Update all open positions
-            positions_to_close = []
-
-            for pos_idx, pos in enumerate(open_positions):
-                entry_time = pos['entry_time']
-                entry_price = pos['entry_price']
-                direction = pos['direction']
-                trailing_distance = pos['trailing_distance']
-                timeout_hours = pos['timeout_hours']
-
-                if entry_time == candle_time:
-                    continue
-
-                # Check timeout
-                hours_in_trade = (candle_time - entry_time).total_seconds() / 3600
-
-                if hours_in_trade >= timeout_hours:
-                    # Force close
-                    if direction == 'LONG':
-                        exit_price = close - self.spread / 2
-                    else:
-                        exit_price = close + self.spread / 2
-
-                    pnl_points = self._calculate_pnl_points(
-                        entry_price, exit_price, direction,
-                        pos['position_remaining'], hours_in_trade
-                    )
-
-                    pos['total_pnl_pct'] += (pnl_points / entry_price) * 100
-
-                    trade = self._create_trade_record(pos, exit_price, 'TIMEOUT', candle_time)
-                    trades.append(trade)
-                    positions_to_close.append(pos_idx)
-                    continue
-
-                # Check SL/TP for LONG
-                if direction == 'LONG':
-                    # Update trailing
-                    if high > pos['trailing_high']:
-                        pos['trailing_high'] = high
-
-                    if pos['trailing_active']:
-                        new_sl = pos['trailing_high'] - trailing_distance
-                        if new_sl > pos['sl_price']:
-                            pos['sl_price'] = new_sl
-
-                    # SL
-                    if low <= pos['sl_price']:
-                        exit_price = pos['sl_price']
-                        pnl_points = self._calculate_pnl_points(
-                            entry_price, exit_price, direction,
-                            pos['position_remaining'], hours_in_trade
-                        )
-                        pos['total_pnl_pct'] += (pnl_points / entry_price) * 100
-                        exit_type = 'TRAILING_SL' if pos['trailing_active'] else 'SL'
-                        trade = self._create_trade_record(pos, exit_price, exit_type, candle_time)
-                        trades.append(trade)
-                        positions_to_close.append(pos_idx)
-                        continue
-
-                    # TP1
-                    if high >= pos['tp1_price'] and not pos['tp1_hit']:
-                        exit_price = pos['tp1_price'] - self.spread / 2
-                        pnl_points = self._calculate_pnl_points(
-                            entry_price, exit_price, direction,
-                            close_pct1, hours_in_trade
-                        )
-                        pos['total_pnl_pct'] += (pnl_points / entry_price) * 100
-                        pos['position_remaining'] -= close_pct1
-                        pos['tp1_hit'] = True
-                        pos['trailing_active'] = True
-                        pos['sl_price'] = high - trailing_distance
-
-                    # TP2
-                    if high >= pos['tp2_price'] and not pos['tp2_hit']:
-                        exit_price = pos['tp2_price'] - self.spread / 2
-                        pnl_points = self._calculate_pnl_points(
-                            entry_price, exit_price, direction,
-                            close_pct2, hours_in_trade
-                        )
-                        pos['total_pnl_pct'] += (pnl_points / entry_price) * 100
-                        pos['position_remaining'] -= close_pct2
-                        pos['tp2_hit'] = True
-
-                    # TP3
-                    if high >= pos['tp3_price'] and not pos['tp3_hit']:
-                        exit_price = pos['tp3_price'] - self.spread / 2
-                        pnl_points = self._calculate_pnl_points(
-                            entry_price, exit_price, direction,
-                            close_pct3, hours_in_trade
-                        )
-                        pos['total_pnl_pct'] += (pnl_points / entry_price) * 100
-                        pos['position_remaining'] -= close_pct3
-                        pos['tp3_hit'] = True
-
-                    if pos['position_remaining'] <= 0.01:
-                        trade = self._create_trade_record(pos, pos['tp3_price'], 'TP3', candle_time)
-                        trades.append(trade)
-                        positions_to_close.append(pos_idx)
-
-                else:  # SHORT
-                    if low < pos['trailing_low']:
-                        pos['trailing_low'] = low
-
-                    if pos['trailing_active']:
-                        new_sl = pos['trailing_low'] + trailing_distance
-                        if new_sl < pos['sl_price']:
-                            pos['sl_price'] = new_sl
-
-                    if high >= pos['sl_price']:
-                        exit_price = pos['sl_price']
-                        pnl_points = self._calculate_pnl_points(
-                            entry_price, exit_price, direction,
-                            pos['position_remaining'], hours_in_trade
-                        )
-                        pos['total_pnl_pct'] += (pnl_points / entry_price) * 100
-                        exit_type = 'TRAILING_SL' if pos['trailing_active'] else 'SL'
-                        trade = self._create_trade_record(pos, exit_price, exit_type, candle_time)
-                        trades.append(trade)
-                        positions_to_close.append(pos_idx)
-                        continue
-
-                    if low <= pos['tp1_price'] and not pos['tp1_hit']:
-                        exit_price = pos['tp1_price'] + self.spread / 2
-                        pnl_points = self._calculate_pnl_points(
-                            entry_price, exit_price, direction,
-                            close_pct1, hours_in_trade
-                        )
-                        pos['total_pnl_pct'] += (pnl_points / entry_price) * 100
-                        pos['position_remaining'] -= close_pct1
-                        pos['tp1_hit'] = True
-                        pos['trailing_active'] = True
-                        pos['sl_price'] = low + trailing_distance
-
-                    if low <= pos['tp2_price'] and not pos['tp2_hit']:
-                        exit_price = pos['tp2_price'] + self.spread / 2
-                        pnl_points = self._calculate_pnl_points(
-                            entry_price, exit_price, direction,
-                            close_pct2, hours_in_trade
-                        )
-                        pos['total_pnl_pct'] += (pnl_points / entry_price) * 100
-                        pos['position_remaining'] -= close_pct2
-                        pos['tp2_hit'] = True
-
-                    if low <= pos['tp3_price'] and not pos['tp3_hit']:
-                        exit_price = pos['tp3_price'] + self.spread / 2
-                        pnl_points = self._calculate_pnl_points(
-                            entry_price, exit_price, direction,
-                            close_pct3, hours_in_trade
-                        )
-                        pos['total_pnl_pct'] += (pnl_points / entry_price) * 100
-                        pos['position_remaining'] -= close_pct3
-                        pos['tp3_hit'] = True
-
-                    if pos['position_remaining'] <= 0.01:
-                        trade = self._create_trade_record(pos, pos['tp3_price'], 'TP3', candle_time)
-                        trades.append(trade)
-                        positions_to_close.append(pos_idx)
-
-            # Remove closed
-            for idx in sorted(positions_to_close, reverse=True):
-                del open_positions[idx]
+            # Choose parameters based on regime
+            if regime == 'TREND':
+                params.append((self.trend_tp1, self.trend_tp2, self.trend_tp3,
+                               self.trend_trailing, self.trend_timeout))
+                trend_signals += 1
+            else:  # RANGE
+                params.append((self.range_tp1, self.range_tp2, self.range_tp3,
+                               self.range_trailing, self.range_timeout))
+                range_signals += 1
+            regimes.append(regime)
+
+        params = np.array(params, dtype=float).reshape(-1, 5)
+        tp_points, trailing, timeout = params[:, :3], params[:, 3], params[:, 4]
+
+        direction = np.where(signal[entries] == 1, 1, -1)
+        entry_price = close[entries] + direction * self.spread / 2
+        sl_price = entry_price - (close[entries] - signal_sl[entries])
+        tp_prices = entry_price[:, None] + direction[:, None] * tp_points
+
+        # Trailing starts after TP1: stop moves to high - trailing and follows the high
+        exits = simulate_exits(
+            df_strategy, entries, direction, entry_price, sl_price,
+            take_profits=tp_prices,
+            close_fractions=[close_pct1, close_pct2, close_pct3],
+            trail_trigger=tp_prices[:, 0],
+            trail_distance=trailing,
+            timeout_hours=timeout,
+            exit_spread=self.spread / 2,
+            commission=self.commission,
+            swap_per_day=self.swap_per_day
+        )
+
+        # Take positions in signal order while fewer than max_positions are open
+        taken = []
+        open_exits = []  # exit bars of open positions (heap, -1 = never closes)
+        for k, i in enumerate(entries):
+            while open_exits and open_exits[0] < i:
+                heapq.heappop(open_exits)
+
+            # Check max positions limit
+            if len(open_exits) >= self.max_positions:
+                continue  # Skip if at max positions
+
+            exit_bar = exits['exit_idx'][k]
+            heapq.heappush(open_exits, exit_bar if exit_bar >= 0 else len(df_strategy))
+            if exit_bar >= 0:
+                taken.append(k)
+
+        # Trades in the order they were closed
+        taken = sorted(taken, key=lambda k: exits['exit_idx'][k])
+
+        trades = []
+        for k in taken:
+            pos = {
+                'entry_time': df_strategy.index[entries[k]],
+                'entry_price': entry_price[k],
+                'direction': 'LONG' if direction[k] == 1 else 'SHORT',
+                'regime': regimes[k],
+                'tp1_hit': bool(exits['tp_idx'][k, 0] >= 0),
+                'tp2_hit': bool(exits['tp_idx'][k, 1] >= 0),
+                'tp3_hit': bool(exits['tp_idx'][k, 2] >= 0),
+                'trailing_active': bool(exits['trailing'][k]),
+                'total_pnl_pct': exits['pnl_pct'][k],
+            }
+
+            reason = exits['exit_reason'][k]
+            if reason == EXIT_TP:
+                exit_price, exit_type = tp_prices[k, 2], 'TP3'
+            elif reason == EXIT_TIMEOUT:
+                exit_price, exit_type = exits['exit_price'][k], 'TIMEOUT'
+            else:
+                exit_price = exits['exit_price'][k]
+                exit_type = 'TRAILING_SL' if reason == EXIT_TRAILING else 'SL'
+
+            exit_time = df_strategy.index[exits['exit_idx'][k]]
+            trades.append(self._create_trade_record(pos, exit_price, exit_type, exit_time))
 
         if len(trades) == 0:
             print("❌ No completed trades")
@@ -530,6 +412,8 @@ def main():
     """Main entry point"""
     parser = argparse.ArgumentParser(description='Adaptive Backtest V3')
     parser.add_argument('--file', type=str, required=True, help='CSV file')
+    parser.add_argument('--causal-sr', action='store_true',
+                        help='S/R levels visible only after confirmation (as in live bot)')
     args = parser.parse_args()
 
     # Load data
@@ -545,6 +429,9 @@ def main():
 
     # Create strategy
     strategy = PatternRecognitionStrategy(fib_mode='standard')
+    if args.causal_sr:
+        strategy.gold_filters.causal_sr_levels = True
+        print("⚠️  Causal S/R levels (confirmed after 30 bars)")
 
     # Run adaptive backtest
     backtest = AdaptiveBacktestV3()
@@ -601,6 +601,9 @@ def main():
     parser.add_argument('--timeout', type=float, default=48,
                         help='Position timeout in hours (default: 48)')
 
+    parser.add_argument('--causal-sr', action='store_true',
+                        help='S/R levels visible only after confirmation (as in live bot)')
+
     args = parser.parse_args()
 
     # Load data
@@ -622,6 +625,9 @@ def main():
 
     # Create strategy
     strategy = PatternRecognitionStrategy(fib_mode='standard')
+    if args.causal_sr:
+        strategy.gold_filters.causal_sr_levels = True
+        print("⚠️  Causal S/R levels (confirmed after 30 bars)")
 
     # Run backtest
     backtest = RealisticBacktestV3Fixed(
@@ -25,6 +25,7 @@ class HybridBacktestV3:
         self.spread = spread_points
         self.commission = commission_points
         self.swap_per_day = swap_per_day
+        self.causal_sr_levels = False
 
         # LONG parameters (unchanged from baseline)
         self.long_trend_tp1 = 30
@@ -249,6 +250,7 @@ class HybridBacktestV3:
 
         # Run SMC strategy to get signals
         strategy = PatternRecognitionStrategy()
+        strategy.gold_filters.causal_sr_levels = self.causal_sr_levels
         df = strategy.run_strategy(df)
 
         results = []
@@ -614,6 +616,8 @@ def main():
     """Main entry point"""
     parser = argparse.ArgumentParser(description='Hybrid: SHORT Optimized + Pattern Filtering')
     parser.add_argument('--file', type=str, required=True, help='CSV file with OHLCV data')
+    parser.add_argument('--causal-sr', action='store_true',
+                        help='S/R levels visible only after confirmation (as in live bot)')
     args = parser.parse_args()
 
     # Load data
@@ -636,6 +640,7 @@ def main():
 
     # Run backtest
     backtest = HybridBacktestV3()
+    backtest.causal_sr_levels = args.causal_sr
     results_df, signals_df = backtest.run_backtest(df)
 
     # Print results
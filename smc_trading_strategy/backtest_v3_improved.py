@@ -646,6 +646,8 @@ def main():
     parser.add_argument('--file', type=str, required=True, help='CSV file')
     parser.add_argument('--no-short-filter', action='store_true', help='Disable SHORT filters')
     parser.add_argument('--no-early-sl', action='store_true', help='Disable early SL')
+    parser.add_argument('--causal-sr', action='store_true',
+                        help='S/R levels visible only after confirmation (as in live bot)')
     args = parser.parse_args()
 
     # Load data
@@ -661,6 +663,9 @@ def main():
 
     # Create strategy
     strategy = PatternRecognitionStrategy(fib_mode='standard')
+    if args.causal_sr:
+        strategy.gold_filters.causal_sr_levels = True
+        print("⚠️  Causal S/R levels (confirmed after 30 bars)")
 
     # Run improved backtest
     backtest = ImprovedAdaptiveBacktestV3()
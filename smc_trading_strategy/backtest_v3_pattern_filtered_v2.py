@@ -653,6 +653,8 @@ def main():
     """Main entry point"""
     parser = argparse.ArgumentParser(description='Pattern-Filtered Backtest V2')
     parser.add_argument('--file', type=str, required=True, help='CSV file')
+    parser.add_argument('--causal-sr', action='store_true',
+                        help='S/R levels visible only after confirmation (as in live bot)')
     args = parser.parse_args()
 
     # Load data
@@ -668,6 +670,9 @@ def main():
 
     # Create strategy
     strategy = PatternRecognitionStrategy(fib_mode='standard')
+    if args.causal_sr:
+        strategy.gold_filters.causal_sr_levels = True
+        print("⚠️  Causal S/R levels (confirmed after 30 bars)")
 
     # Run pattern-filtered backtest
     backtest = PatternFilteredBacktestV2()
@@ -9,6 +9,11 @@ from typing import Dict, List, Tuple
 from datetime import datetime
 import json
 
+from exit_simulator import simulate_exits, EXIT_SL, EXIT_TP, EXIT_SIGNAL
+
+# Trade.exit_reason for each simulate_exits exit reason
+EXIT_REASON_NAMES = {EXIT_SL: 'sl', EXIT_TP: 'tp', EXIT_SIGNAL: 'signal'}
+
 
 class Trade:
     """Trade class to track individual trades"""
@@ -167,6 +172,10 @@ class Backtester:
         """
         Run backtest on data with signals
 
+        Exits of every signal bar are resolved up front by simulate_exits
+        (SL, TP, opposite signal), so the loop below only visits the trades
+        that are actually taken: one at a time, sized from the current capital.
+
         Args:
             df: DataFrame with OHLC data and signals
 
@@ -178,70 +187,74 @@ class Backtester:
         self.trades = []
         self.current_trade = None
 
-        for i in range(len(df)):
-            row = df.iloc[i]
-
-            # Check exit conditions for current trade
-            if self.current_trade is not None:
-                should_exit, reason, exit_price = self.check_exit_conditions(row)
-
-                if should_exit:
-                    # Apply costs
-                    exit_price = self.apply_costs(exit_price, -self.current_trade.direction)
-
-                    # Close trade
-                    self.current_trade.close(row.name, exit_price, reason)
-
-                    # Update capital
-                    self.capital += self.current_trade.pnl
-                    # Deduct commission
-                    commission_cost = abs(self.current_trade.pnl) * self.commission
-                    self.capital -= commission_cost
-
-                    # Store trade
-                    self.trades.append(self.current_trade)
-                    self.current_trade = None
-
-            # Check for new entry signal
-            if row['signal'] != 0 and self.current_trade is None:
-                entry_price = row['entry_price']
-                stop_loss = row['stop_loss']
-                take_profit = row['take_profit']
-
-                # Calculate position size
-                position_size = self.calculate_position_size(entry_price, stop_loss)
-
-                if position_size > 0:
-                    # Apply costs
-                    entry_price = self.apply_costs(entry_price, row['signal'])
-
-                    # Open new trade
-                    self.current_trade = Trade(
-                        entry_time=row.name,
-                        entry_price=entry_price,
-                        direction=int(row['signal']),
-                        stop_loss=stop_loss,
-                        take_profit=take_profit,
-                        size=position_size
-                    )
-
-            # Update equity curve
-            current_equity = self.capital
-            if self.current_trade is not None:
-                # Calculate unrealized PnL
-                if self.current_trade.direction == 1:
-                    unrealized_pnl = (row['close'] - self.current_trade.entry_price) * self.current_trade.size
-                else:
-                    unrealized_pnl = (self.current_trade.entry_price - row['close']) * self.current_trade.size
-                current_equity += unrealized_pnl
-
-            self.equity_curve.append(current_equity)
+        n = len(df)
+        signal = df['signal'].to_numpy()
+        close = df['close'].to_numpy(dtype=float)
+        candidates = np.flatnonzero(signal != 0)
+        entry_prices = df['entry_price'].to_numpy(dtype=float)[candidates]
+        stop_losses = df['stop_loss'].to_numpy(dtype=float)[candidates]
+        take_profits = df['take_profit'].to_numpy(dtype=float)[candidates]
+
+        exits = simulate_exits(
+            df, candidates, signal[candidates], entry_prices, stop_losses,
+            take_profits=take_profits, exit_on_signal=True
+        )
+
+        equity = np.empty(n)
+        flat_from = 0  # first bar whose equity is not filled yet
+        next_entry = 0  # first bar where a new trade may open
+
+        for k, i in enumerate(candidates):
+            if i < next_entry:
+                continue
+
+            # Calculate position size
+            position_size = self.calculate_position_size(entry_prices[k], stop_losses[k])
+            if not position_size > 0:
+                continue
+
+            equity[flat_from:i] = self.capital
+
+            # Apply costs and open new trade
+            direction = int(signal[i])
+            self.current_trade = Trade(
+                entry_time=df.index[i],
+                entry_price=self.apply_costs(entry_prices[k], direction),
+                direction=direction,
+                stop_loss=stop_losses[k],
+                take_profit=take_profits[k],
+                size=position_size
+            )
+
+            exit_bar = exits['exit_idx'][k]
+            held_until = n if exit_bar < 0 else exit_bar
+            unrealized = direction * (close[i:held_until] - self.current_trade.entry_price)
+            equity[i:held_until] = self.capital + unrealized * self.current_trade.size
+
+            if exit_bar < 0:
+                break
+
+            reason = EXIT_REASON_NAMES[exits['exit_reason'][k]]
+            exit_price = self.apply_costs(exits['exit_price'][k], -direction)
+            self.current_trade.close(df.index[exit_bar], exit_price, reason)
+
+            # Update capital and deduct commission
+            self.capital += self.current_trade.pnl
+            self.capital -= abs(self.current_trade.pnl) * self.commission
+
+            self.trades.append(self.current_trade)
+            self.current_trade = None
+            flat_from = exit_bar
+            next_entry = exit_bar
+
+        if self.current_trade is None:
+            equity[flat_from:] = self.capital
+        self.equity_curve.extend(equity.tolist())
 
         # Close any remaining open trade at last price
         if self.current_trade is not None:
-            last_row = df.iloc[-1]
-            exit_price = self.apply_costs(last_row['close'], -self.current_trade.direction)
-            self.current_trade.close(last_row.name, exit_price, 'end')
+            exit_price = self.apply_costs(close[-1], -self.current_trade.direction)
+            self.current_trade.close(df.index[-1], exit_price, 'end')
             self.capital += self.current_trade.pnl
             self.trades.append(self.current_trade)
             self.current_trade = None
@@ -0,0 +1,509 @@
+"""
+Exit Simulator
+Общий движок выхода из сделок: SL/TP, частичное закрытие по 3 TP, трейлинг после TP1,
+таймаут, спред/комиссия/своп
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional, Sequence
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# Exit reasons (exit_reason column of simulate_exits)
+EXIT_OPEN = 0       # Data ended before any exit
+EXIT_SL = 1         # Stop loss
+EXIT_TRAILING = 2   # Trailing stop (after activation)
+EXIT_TP = 3         # Last take profit filled the position
+EXIT_TIMEOUT = 4    # max_bars / timeout_hours reached
+EXIT_SIGNAL = 5     # Opposite signal, closed at candle close
+EXIT_REASONS = ('OPEN', 'SL', 'TRAILING', 'TP', 'TIMEOUT', 'SIGNAL')
+
+# Position counts as fully closed below this remaining fraction (as in the V3 backtests)
+MIN_REMAINING = 0.01
+
+NS_PER_SECOND = 1e9
+
+
+def _fill_points(entry: float, fill: float, direction: int, fraction: float, hours: float,
+                 commission: float, swap_per_day: float) -> float:
+    """PnL in price points of closing `fraction` of the position at `fill`"""
+    points = direction * (fill - entry)
+    points *= fraction
+    points -= commission * fraction
+    if hours > 24:
+        points += swap_per_day * (hours / 24) * fraction
+    return points
+
+
+if NUMBA_AVAILABLE:
+    _fill_points = njit(cache=True)(_fill_points)
+
+
+def _trail_level(best: float, entry: float, direction: int, distance: float, pct: float,
+                 giveback: float) -> float:
+    """Trailing stop behind the best price: fixed distance + % of price + share of the profit"""
+    return best - direction * (distance + abs(best) * pct + direction * (best - entry) * giveback)
+
+
+if NUMBA_AVAILABLE:
+    _trail_level = njit(cache=True)(_trail_level)
+
+
+def _fill_take_profits(levels, close_fractions, hit_bars, bar, favorable, direction, entry, hours,
+                       exit_spread, commission, swap_per_day):
+    """
+    Close the fraction of every TP level reached on this bar
+
+    Returns:
+        (points, pct, closed_fraction, last_fill); hit_bars is updated in place
+    """
+    points_total = 0.0
+    pct_total = 0.0
+    closed = 0.0
+    last_fill = np.nan
+    for k in range(levels.shape[0]):
+        level = levels[k]
+        if hit_bars[k] < 0 and level == level and direction * favorable >= direction * level:
+            last_fill = level - direction * exit_spread
+            points = _fill_points(entry, last_fill, direction, close_fractions[k], hours,
+                                  commission, swap_per_day)
+            points_total += points
+            pct_total += (points / entry) * 100
+            closed += close_fractions[k]
+            hit_bars[k] = bar
+    return points_total, pct_total, closed, last_fill
+
+
+if NUMBA_AVAILABLE:
+    _fill_take_profits = njit(cache=True)(_fill_take_profits)
+
+
+def _exit_kernel(high, low, close, times, exit_signal, entry_idx, direction, entry_price, stop_loss,
+                 take_profits, close_fractions, trail_trigger, trail_distance, trail_pct,
+                 trail_giveback, trail_same_bar, trail_breakeven, stop_first, max_bars,
+                 timeout_hours, exit_spread, commission, swap_per_day):
+    """
+    Walk every position bar by bar from entry_idx + 1
+
+    Per bar (long side, short is mirrored):
+      1. timeout_hours reached → close everything at close - exit_spread
+      2. best = highest high since entry (starting from the entry price)
+      3. trail_same_bar: high >= trail_trigger activates trailing before the stop check
+      4. while trailing, stop = max(stop, _trail_level(best)); trail_breakeven lifts it
+         to the entry price on activation
+      5. take profits in order, each closes its fraction at level - exit_spread
+         (before step 6 unless stop_first)
+      6. low <= stop → close the remainder at the stop level
+      7. otherwise trailing activates after the take profits (checked from the next bar)
+      8. remaining <= MIN_REMAINING → position closed by TP
+      9. opposite exit_signal → close at close
+     10. max_bars reached → close at close - exit_spread
+    """
+    n_pos = entry_idx.shape[0]
+    n_tp = take_profits.shape[1]
+    n_bars = high.shape[0]
+
+    exit_idx = np.full(n_pos, -1, dtype=np.int64)
+    exit_price = np.full(n_pos, np.nan)
+    exit_reason = np.zeros(n_pos, dtype=np.int64)
+    tp_idx = np.full((n_pos, n_tp), -1, dtype=np.int64)
+    trailing = np.zeros(n_pos, dtype=np.bool_)
+    remaining_out = np.ones(n_pos)
+    pnl_points = np.zeros(n_pos)
+    pnl_pct = np.zeros(n_pos)
+    bars_held = np.zeros(n_pos, dtype=np.int64)
+    final_stop = np.zeros(n_pos)
+    best_price = np.zeros(n_pos)
+
+    for p in range(n_pos):
+        e = entry_idx[p]
+        d = direction[p]
+        entry = entry_price[p]
+        stop = stop_loss[p]
+        trigger = trail_trigger[p]
+        can_trail = trigger == trigger
+        timeout = timeout_hours[p]
+        best = entry
+        active = False
+        remaining = 1.0
+        points_total = 0.0
+        pct_total = 0.0
+        bars = 0
+
+        for j in range(e + 1, n_bars):
+            bars += 1
+            hours = ((times[j] - times[e]) / NS_PER_SECOND) / 3600
+
+            if timeout == timeout and hours >= timeout:
+                fill = close[j] - d * exit_spread
+                points = _fill_points(entry, fill, d, remaining, hours, commission, swap_per_day)
+                points_total += points
+                pct_total += (points / entry) * 100
+                exit_idx[p] = j
+                exit_price[p] = fill
+                exit_reason[p] = EXIT_TIMEOUT
+                remaining = 0.0
+                break
+
+            if d == 1:
+                favorable = high[j]
+                adverse = low[j]
+            else:
+                favorable = low[j]
+                adverse = high[j]
+
+            if d * favorable > d * best:
+                best = favorable
+
+            if can_trail and not active and trail_same_bar and d * favorable >= d * trigger:
+                active = True
+                if trail_breakeven and d * entry > d * stop:
+                    stop = entry
+            if active:
+                level = _trail_level(best, entry, d, trail_distance[p], trail_pct[p], trail_giveback[p])
+                if d * level > d * stop:
+                    stop = level
+
+            last_fill = np.nan
+            if not stop_first:
+                points, pct, closed, last_fill = _fill_take_profits(
+                    take_profits[p], close_fractions, tp_idx[p], j, favorable, d, entry, hours,
+                    exit_spread, commission, swap_per_day
+                )
+                points_total += points
+                pct_total += pct
+                remaining -= closed
+                if n_tp > 0 and remaining <= MIN_REMAINING:
+                    exit_idx[p] = j
+                    exit_price[p] = last_fill
+                    exit_reason[p] = EXIT_TP
+                    break
+
+            if d * adverse <= d * stop:
+                points = _fill_points(entry, stop, d, remaining, hours, commission, swap_per_day)
+                points_total += points
+                pct_total += (points / entry) * 100
+                exit_idx[p] = j
+                exit_price[p] = stop
+                exit_reason[p] = EXIT_TRAILING if active else EXIT_SL
+                remaining = 0.0
+                break
+
+            if stop_first:
+                points, pct, closed, last_fill = _fill_take_profits(
+                    take_profits[p], close_fractions, tp_idx[p], j, favorable, d, entry, hours,
+                    exit_spread, commission, swap_per_day
+                )
+                points_total += points
+                pct_total += pct
+                remaining -= closed
+
+            if can_trail and not active and not trail_same_bar and d * favorable >= d * trigger:
+                active = True
+                if trail_breakeven and d * entry > d * stop:
+                    stop = entry
+                level = _trail_level(best, entry, d, trail_distance[p], trail_pct[p], trail_giveback[p])
+                if d * level > d * stop:
+                    stop = level
+
+            if n_tp > 0 and remaining <= MIN_REMAINING:
+                exit_idx[p] = j
+                exit_price[p] = last_fill
+                exit_reason[p] = EXIT_TP
+                break
+
+            if exit_signal[j] == -d:
+                points = _fill_points(entry, close[j], d, remaining, hours, commission, swap_per_day)
+                points_total += points
+                pct_total += (points / entry) * 100
+                exit_idx[p] = j
+                exit_price[p] = close[j]
+                exit_reason[p] = EXIT_SIGNAL
+                remaining = 0.0
+                break
+
+            if max_bars[p] > 0 and bars >= max_bars[p]:
+                fill = close[j] - d * exit_spread
+                points = _fill_points(entry, fill, d, remaining, hours, commission, swap_per_day)
+                points_total += points
+                pct_total += (points / entry) * 100
+                exit_idx[p] = j
+                exit_price[p] = fill
+                exit_reason[p] = EXIT_TIMEOUT
+                remaining = 0.0
+                break
+
+        trailing[p] = active
+        remaining_out[p] = remaining
+        pnl_points[p] = points_total
+        pnl_pct[p] = pct_total
+        bars_held[p] = bars
+        final_stop[p] = stop
+        best_price[p] = best
+
+    return (exit_idx, exit_price, exit_reason, tp_idx, trailing, remaining_out, pnl_points, pnl_pct,
+            bars_held, final_stop, best_price)
+
+
+if NUMBA_AVAILABLE:
+    _exit_kernel = njit(cache=True)(_exit_kernel)
+
+
+def _best_prices(high, low, entry_idx, direction, entry_price, bars_held) -> np.ndarray:
+    """Best price from entry over the bars each position was held (entry price if none)"""
+    best = entry_price.copy()
+    held = np.flatnonzero(bars_held > 0)
+    if len(held) == 0:
+        return best
+
+    start = entry_idx[held] + 1
+    bounds = np.column_stack([start, start + bars_held[held]]).ravel()
+    # One padding bar so that a window ending at the last candle is a valid reduceat bound
+    highest = np.fmax.reduceat(np.append(high, np.nan), bounds)[::2]
+    lowest = np.fmin.reduceat(np.append(low, np.nan), bounds)[::2]
+
+    long_side = direction[held] == 1
+    best[held] = np.where(long_side, np.fmax(best[held], highest), np.fmin(best[held], lowest))
+    return best
+
+
+def _first_touch_exits(high, low, close, times, exit_signal, entry_idx, direction, entry_price,
+                       stop_loss, take_profit, max_bars, exit_spread, commission, swap_per_day,
+                       block: int = 64):
+    """
+    Single SL/TP without trailing: first bar where low <= SL / high >= TP, for all positions at once
+
+    Looks ahead in blocks of `block` bars (doubling) over the still-open positions.
+    Same-bar priority and fills are those of _exit_kernel (SL, TP, signal, max_bars).
+    """
+    n_pos = entry_idx.shape[0]
+    n_bars = high.shape[0]
+
+    exit_idx = np.full(n_pos, -1, dtype=np.int64)
+    exit_price = np.full(n_pos, np.nan)
+    exit_reason = np.zeros(n_pos, dtype=np.int64)
+    bars_held = np.maximum(n_bars - 1 - entry_idx, 0)
+    if max_bars is not None:
+        limited = max_bars > 0
+        bars_held = np.where(limited, np.minimum(bars_held, max_bars), bars_held)
+
+    pending = np.flatnonzero(bars_held > 0)
+    offset = 1
+    while len(pending) > 0:
+        e = entry_idx[pending][:, None]
+        d = direction[pending][:, None]
+        steps = offset + np.arange(block)[None, :]
+        in_window = steps <= bars_held[pending][:, None]
+        rows = np.minimum(e + steps, n_bars - 1)
+
+        favorable = np.where(d == 1, high[rows], low[rows])
+        adverse = np.where(d == 1, low[rows], high[rows])
+        sl_hit = in_window & (d * adverse <= d * stop_loss[pending][:, None])
+        tp_hit = in_window & (d * favorable >= d * take_profit[pending][:, None])
+        signal_hit = in_window & (exit_signal[rows] == -d)
+        timeout_hit = np.zeros_like(in_window)
+        if max_bars is not None:
+            timeout_hit = in_window & (steps == max_bars[pending][:, None])
+
+        any_hit = sl_hit | tp_hit | signal_hit | timeout_hit
+        found = any_hit.any(axis=1)
+        first = any_hit.argmax(axis=1)
+
+        resolved = pending[found]
+        first = first[found]
+        bar = rows[found, first]
+        exit_idx[resolved] = bar
+        bars_held[resolved] = steps[0, first]
+        exit_reason[resolved] = np.select(
+            [sl_hit[found, first], tp_hit[found, first], signal_hit[found, first]],
+            [EXIT_SL, EXIT_TP, EXIT_SIGNAL],
+            EXIT_TIMEOUT
+        )
+
+        pending = pending[~found & (offset + block <= bars_held[pending])]
+        offset += block
+        block *= 2
+
+    done = exit_idx >= 0
+    reason = exit_reason[done]
+    d = direction[done]
+    bar = exit_idx[done]
+    exit_price[done] = np.select(
+        [reason == EXIT_SL, reason == EXIT_TP, reason == EXIT_SIGNAL],
+        [stop_loss[done], take_profit[done] - d * exit_spread, close[bar]],
+        close[bar] - d * exit_spread
+    )
+
+    # _fill_points with fraction = 1, element-wise
+    entry = entry_price[done]
+    hours = ((times[bar] - times[entry_idx[done]]) / NS_PER_SECOND) / 3600
+    points = d * (exit_price[done] - entry) - commission
+    points = np.where(hours > 24, points + swap_per_day * (hours / 24), points)
+
+    pnl_points = np.zeros(n_pos)
+    pnl_pct = np.zeros(n_pos)
+    pnl_points[done] = points
+    pnl_pct[done] = (points / entry) * 100
+
+    tp_idx = np.where(exit_reason == EXIT_TP, exit_idx, -1)[:, None]
+    remaining = np.where(done, 0.0, 1.0)
+    trailing = np.zeros(n_pos, dtype=bool)
+    best_price = _best_prices(high, low, entry_idx, direction, entry_price, bars_held)
+
+    return (exit_idx, exit_price, exit_reason, tp_idx, trailing, remaining, pnl_points, pnl_pct,
+            bars_held, stop_loss.copy(), best_price)
+
+
+def _per_position(value, n_pos: int, dtype=float) -> np.ndarray:
+    """Broadcast a scalar or sequence to one value per position"""
+    return np.ascontiguousarray(np.broadcast_to(np.asarray(value, dtype=dtype), (n_pos,)))
+
+
+def bars_within_hours(df: pd.DataFrame, entry_idx: Sequence[int], hours: float) -> np.ndarray:
+    """
+    Number of bars after each entry whose time is at most `hours` after the entry bar
+
+    Used as max_bars to replay "look N hours ahead" windows: the last bar of the
+    window is still checked for SL/TP and the position is closed at its close.
+
+    Args:
+        df: DataFrame with DatetimeIndex
+        entry_idx: Bar position of each entry
+        hours: Window length in hours
+
+    Returns:
+        Array of bar counts (0 = no bar in the window; drop these entries, 0 is no limit for max_bars)
+    """
+    entry_idx = np.asarray(entry_idx, dtype=np.int64)
+    window_end = df.index[entry_idx] + pd.Timedelta(hours=hours)
+    last = df.index.searchsorted(window_end, side='right') - 1
+    return np.maximum(last - entry_idx, 0)
+
+
+def simulate_exits(
+    df: pd.DataFrame,
+    entry_idx: Sequence[int],
+    direction: Sequence[int],
+    entry_price: Sequence[float],
+    stop_loss: Sequence[float],
+    take_profits=None,
+    close_fractions: Optional[Sequence[float]] = None,
+    trail_trigger=None,
+    trail_distance=0.0,
+    trail_pct=0.0,
+    trail_giveback=0.0,
+    trail_same_bar: bool = False,
+    trail_breakeven: bool = False,
+    stop_first: bool = True,
+    max_bars=None,
+    timeout_hours=None,
+    exit_on_signal: bool = False,
+    exit_spread: float = 0.0,
+    commission: float = 0.0,
+    swap_per_day: float = 0.0
+) -> Dict[str, np.ndarray]:
+    """
+    Resolve the exits of many positions over the same OHLC data
+
+    Every position starts at the close of bar entry_idx and is checked from the
+    next bar on. Stops fill at their level, take profits and timeouts pay
+    exit_spread, commission and swap are charged per closed fraction
+    (swap only after 24h). A trailing stop only ever tightens the stop.
+    Plain SL/TP positions use a vectorized first-touch search; partial closes,
+    trailing and timeout_hours go through the bar kernel (compiled with numba
+    when available).
+
+    Args:
+        df: DataFrame with high/low/close (DatetimeIndex needed for timeout_hours and swap)
+        entry_idx: Bar position of each entry
+        direction: 1 = long, -1 = short
+        entry_price: Entry price (spread already applied by the caller)
+        stop_loss: Initial stop loss price
+        take_profits: TP prices, shape (positions,) or (positions, levels); NaN = unused level
+        close_fractions: Fraction closed at each TP level (default: all at the first)
+        trail_trigger: Price that activates trailing (NaN/None = no trailing, -inf/+inf = from entry)
+        trail_distance: Trailing distance from the best price (points)
+        trail_pct: Trailing distance as a fraction of the best price
+        trail_giveback: Fraction of the profit from entry to the best price given back
+        trail_same_bar: Activate trailing before the stop check of the trigger bar
+        trail_breakeven: Move the stop to the entry price when trailing activates
+        stop_first: Check the stop before the take profits of the same bar
+        max_bars: Close at the close of the N-th bar after entry (0/-1/None = no limit)
+        timeout_hours: Close at the first bar at least this many hours after entry (NaN = none)
+        exit_on_signal: Close at the close of a bar whose df['signal'] is opposite
+        exit_spread: Price concession on TP and timeout fills
+        commission: Commission in points per closed fraction
+        swap_per_day: Swap in points per day per closed fraction
+
+    Returns:
+        Dict of arrays (one row per position): exit_idx (-1 = still open),
+        exit_price, exit_reason (EXIT_*), tp_idx (bar of each TP fill, -1 = not hit),
+        trailing, remaining, pnl_points, pnl_pct (sum of fills in % of entry), bars_held,
+        final_stop (stop level at the exit), best_price (best price while held)
+    """
+    entry_idx = np.asarray(entry_idx, dtype=np.int64)
+    n_pos = len(entry_idx)
+
+    high = df['high'].to_numpy(dtype=float)
+    low = df['low'].to_numpy(dtype=float)
+    close = df['close'].to_numpy(dtype=float)
+    if isinstance(df.index, pd.DatetimeIndex):
+        times = np.ascontiguousarray(df.index.as_unit('ns').asi8)
+    else:
+        times = np.zeros(len(df), dtype=np.int64)
+    if exit_on_signal:
+        exit_signal = df['signal'].to_numpy(dtype=np.int64)
+    else:
+        exit_signal = np.zeros(len(df), dtype=np.int64)
+
+    direction = _per_position(direction, n_pos, np.int64)
+    entry_price = _per_position(entry_price, n_pos)
+    stop_loss = _per_position(stop_loss, n_pos)
+
+    if take_profits is None:
+        take_profits = np.empty((n_pos, 0))
+    take_profits = np.asarray(take_profits, dtype=float)
+    if take_profits.ndim == 1:
+        take_profits = take_profits[:, None]
+    take_profits = np.ascontiguousarray(take_profits)
+    n_tp = take_profits.shape[1]
+
+    if close_fractions is None:
+        close_fractions = [1.0] + [0.0] * (n_tp - 1) if n_tp else []
+    close_fractions = np.asarray(close_fractions, dtype=float)
+
+    trailing_used = trail_trigger is not None
+    trail_trigger = _per_position(np.nan if trail_trigger is None else trail_trigger, n_pos)
+    trail_distance = _per_position(trail_distance, n_pos)
+    trail_pct = _per_position(trail_pct, n_pos)
+    trail_giveback = _per_position(trail_giveback, n_pos)
+    max_bars_arr = None if max_bars is None else _per_position(max_bars, n_pos, np.int64)
+
+    first_touch = (n_tp == 0 or (n_tp == 1 and close_fractions[0] == 1.0)) \
+        and not trailing_used and timeout_hours is None and stop_first
+
+    if first_touch:
+        take_profit = take_profits[:, 0] if n_tp else np.full(n_pos, np.nan)
+        results = _first_touch_exits(high, low, close, times, exit_signal, entry_idx, direction,
+                                     entry_price, stop_loss, take_profit, max_bars_arr,
+                                     exit_spread, commission, swap_per_day)
+        tp_idx = results[3][:, :n_tp]
+        results = results[:3] + (tp_idx,) + results[4:]
+    else:
+        results = _exit_kernel(
+            high, low, close, times, exit_signal, entry_idx, direction, entry_price, stop_loss,
+            take_profits, close_fractions, trail_trigger, trail_distance, trail_pct,
+            trail_giveback, trail_same_bar, trail_breakeven, stop_first,
+            np.full(n_pos, -1, dtype=np.int64) if max_bars_arr is None else max_bars_arr,
+            _per_position(np.nan if timeout_hours is None else timeout_hours, n_pos),
+            float(exit_spread), float(commission), float(swap_per_day)
+        )
+
+    keys = ('exit_idx', 'exit_price', 'exit_reason', 'tp_idx', 'trailing', 'remaining',
+            'pnl_points', 'pnl_pct', 'bars_held', 'final_stop', 'best_price')
+    return dict(zip(keys, results))
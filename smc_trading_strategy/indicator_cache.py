@@ -0,0 +1,187 @@
+"""
+Indicator Cache
+LRU-кэш индикаторных колонок, общий для всех слоёв стратегии
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional
+
+import numpy as np
+import pandas as pd
+
+# Raw market data columns that every cached stage is allowed to read
+PRICE_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+
+class IndicatorCache:
+    """
+    Memoizes indicator stages by (data fingerprint, stage name, parameters)
+
+    A stage is a function df -> df that only reads the OHLCV columns and the
+    index (SMC indicators, volume metrics, gold filters, ATR). It is run on
+    those columns alone and the cache stores only the columns it produced, so
+    a hit re-attaches them to the caller's frame instead of recomputing.
+    Parameter sweeps that only touch TP/SL settings hit every upstream stage
+    after the first run. Lookups are locked, so bots analyzing on different
+    threads can share one cache; the stage itself runs outside the lock.
+
+    Usage:
+        cache = get_shared_cache()
+        df = cache.apply(df, 'smc', params_key(smc), smc.apply_all_indicators)
+    """
+
+    def __init__(self, maxsize: int = 32):
+        """
+        Initialize cache
+
+        Args:
+            maxsize: Maximum number of stage results kept (least recently used are evicted)
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def fingerprint(df: pd.DataFrame) -> str:
+        """
+        Hash of the index and OHLCV arrays
+
+        Args:
+            df: DataFrame with OHLCV data
+
+        Returns:
+            Hex digest identifying the market data
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"{len(df)}|{df.index.dtype}".encode())
+
+        if hasattr(df.index, 'asi8'):
+            digest.update(np.ascontiguousarray(df.index.asi8).tobytes())
+        else:
+            digest.update(pd.util.hash_pandas_object(df.index, index=False).to_numpy().tobytes())
+
+        for col in PRICE_COLUMNS:
+            if col in df.columns:
+                digest.update(col.encode())
+                digest.update(np.ascontiguousarray(df[col].to_numpy(dtype=float)).tobytes())
+
+        return digest.hexdigest()
+
+    def apply(self, df: pd.DataFrame, name: str, params: Hashable,
+              func: Callable[[pd.DataFrame], pd.DataFrame], copy: bool = True) -> pd.DataFrame:
+        """
+        Run a stage through the cache
+
+        Args:
+            df: Input DataFrame
+            name: Stage name (part of the key)
+            params: Hashable parameters the stage depends on
+            func: Stage function, must only depend on OHLCV + index + params
+            copy: Copy df first (False = write the stage columns into df in place)
+
+        Returns:
+            DataFrame with the stage columns set (same as func(df))
+        """
+        key = (self.fingerprint(df), name, params)
+        entry = self.get(key)
+
+        if entry is None:
+            # Run on the raw columns only, so the stored output cannot depend on upstream columns
+            raw_columns = [col for col in PRICE_COLUMNS if col in df.columns]
+            computed = func(df[raw_columns].copy())
+            entry = {col: computed[col].array for col in computed.columns if col not in raw_columns}
+            self.put(key, entry)
+
+        result = df.copy() if copy else df
+        for col, values in entry.items():
+            result[col] = values.copy()
+
+        return result
+
+    def get(self, key: tuple) -> Optional[Dict]:
+        """Stored stage columns for a key (None on a miss), counted as a hit or miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: tuple, entry: Dict) -> None:
+        """Store stage columns, evicting the least recently used entry when full"""
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all entries and reset counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict:
+        """
+        Cache statistics
+
+        Returns:
+            Dict with hits, misses, entries and stored bytes
+        """
+        with self._lock:
+            nbytes = sum(values.nbytes for entry in self._entries.values() for values in entry.values())
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'nbytes': nbytes
+            }
+
+
+def params_key(component, *extra) -> tuple:
+    """
+    Hashable key from a component's attributes (lists become tuples)
+
+    Args:
+        component: Indicator object (SMCIndicators, GoldSpecificFilters, ...)
+        *extra: Additional call arguments
+
+    Returns:
+        Tuple usable as the params part of a cache key
+    """
+    items = tuple(
+        (attr, tuple(value) if isinstance(value, list) else value)
+        for attr, value in sorted(vars(component).items())
+    )
+    return (type(component).__name__, items) + extra
+
+
+_shared_cache = IndicatorCache()
+
+
+def get_shared_cache() -> IndicatorCache:
+    """Process-wide cache used by all strategy layers"""
+    return _shared_cache
+
+
+def run_cached(cache: Optional[IndicatorCache], df: pd.DataFrame, name: str, params: Hashable,
+               func: Callable[[pd.DataFrame], pd.DataFrame], copy: bool = True) -> pd.DataFrame:
+    """
+    cache.apply() or a plain func(df) call when caching is disabled (cache=None)
+
+    With copy=False func must write into its input as well, so both paths
+    leave the stage columns in df.
+    """
+    if cache is None:
+        return func(df)
+    return cache.apply(df, name, params, func, copy=copy)
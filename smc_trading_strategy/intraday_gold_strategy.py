@@ -69,11 +69,9 @@ class IntradayGoldStrategy(GoldOptimizedSMCStrategy):
         Apply intraday-specific entry filters
         Less restrictive than daily strategy
         """
-        df = df.copy()
-
         initial_signals = len(df[df['signal'] != 0])
 
-        for i in range(len(df)):
+        for i in range(self._signal_start(df), len(df)):
             if df['signal'].iloc[i] == 0:
                 continue
 
@@ -114,9 +112,7 @@ class IntradayGoldStrategy(GoldOptimizedSMCStrategy):
         Adjust SL/TP for intraday trading
         Tighter stops, faster targets
         """
-        df = df.copy()
-
-        for i in range(len(df)):
+        for i in range(self._signal_start(df), len(df)):
             if df['signal'].iloc[i] == 0:
                 continue
 
@@ -242,12 +238,12 @@ class MultiSignalGoldStrategy(IntradayGoldStrategy):
         self.smc = SMCIndicators()
         print(f"   Mode: MULTI-SIGNAL (OB+FVG+Liquidity+BOS)")
 
-    def run_strategy(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _run_pipeline(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Run strategy with multiple signal types
         """
         # Run base strategy first
-        df = super().run_strategy(df)
+        df = super()._run_pipeline(df)
 
         # Add additional signals from liquidity sweeps
         df = self._add_liquidity_sweep_signals(df)
@@ -262,8 +258,6 @@ class MultiSignalGoldStrategy(IntradayGoldStrategy):
         Add signals based on liquidity sweeps
         When price sweeps liquidity zones and reverses
         """
-        df = df.copy()
-
         liquidity_signals = 0
 
         for i in range(10, len(df)):
@@ -304,8 +298,6 @@ class MultiSignalGoldStrategy(IntradayGoldStrategy):
         """
         Add signals based on Break of Structure (BOS)
         """
-        df = df.copy()
-
         bos_signals = 0
 
         for i in range(20, len(df)):
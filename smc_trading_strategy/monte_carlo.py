@@ -0,0 +1,305 @@
+"""
+Monte Carlo Engine
+Монте-Карло на уровне сделок (бутстрэп, блочный бутстрэп, перестановки) матрицей NumPy
+и блочный бутстрэп свечей в пуле процессов
+"""
+
+import contextlib
+import io
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import sweep
+from sweep import SharedFrame, _init_worker, evaluate
+
+TRADE_METHODS = ('bootstrap', 'block', 'permute')
+
+# Paths simulated per matrix (bounds memory: 10k paths x 1k trades = 80 MB)
+CHUNK_PATHS = 10000
+
+
+def trade_returns(pnl: Sequence[float], initial_capital: float) -> np.ndarray:
+    """
+    Per-trade returns as a fraction of the equity before each trade
+
+    Args:
+        pnl: Realized PnL of each trade in closing order (after costs)
+        initial_capital: Starting capital
+
+    Returns:
+        Array of returns (0.02 = +2% of equity)
+    """
+    pnl = np.asarray(pnl, dtype=float)
+    equity_before = initial_capital + np.concatenate(([0.0], np.cumsum(pnl)[:-1]))
+    return pnl / equity_before
+
+
+def backtester_returns(backtester) -> np.ndarray:
+    """Per-trade returns of a finished Backtester / PortfolioBacktester run (commission included)"""
+    pnl = np.array([t.pnl - abs(t.pnl) * backtester.commission if t.exit_reason != 'end' else t.pnl
+                    for t in backtester.trades], dtype=float)
+    return trade_returns(pnl, backtester.initial_capital)
+
+
+def sample_trade_paths(returns: np.ndarray, n_paths: int, n_trades: Optional[int] = None,
+                       method: str = 'bootstrap', block_size: int = 10,
+                       rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """
+    Resampled trade sequences as one matrix
+
+    Args:
+        returns: Per-trade returns of the backtest
+        n_paths: Number of paths (rows)
+        n_trades: Trades per path (default: as many as in the backtest)
+        method: 'bootstrap' (i.i.d. draws), 'block' (circular blocks of
+            consecutive trades, keeps streaks) or 'permute' (same trades,
+            shuffled order - only the path changes, not the final return)
+        block_size: Trades per block for 'block'
+        rng: Random generator
+
+    Returns:
+        Array (n_paths, n_trades)
+    """
+    rng = rng or np.random.default_rng()
+    returns = np.asarray(returns, dtype=float)
+    n = len(returns)
+    n_trades = n_trades or n
+
+    if method == 'bootstrap':
+        return returns[rng.integers(0, n, size=(n_paths, n_trades))]
+    if method == 'block':
+        n_blocks = -(-n_trades // block_size)
+        starts = rng.integers(0, n, size=(n_paths, n_blocks, 1))
+        idx = (starts + np.arange(block_size)) % n
+        return returns[idx.reshape(n_paths, -1)[:, :n_trades]]
+    if method == 'permute':
+        if n_trades != n:
+            raise ValueError("permute keeps the backtest's trades, n_trades must equal len(returns)")
+        return rng.permuted(np.broadcast_to(returns, (n_paths, n)), axis=1)
+    raise ValueError(f"Unknown method '{method}' (choose from {', '.join(TRADE_METHODS)})")
+
+
+def path_metrics(paths: np.ndarray, compound: bool = True, ruin_drawdown: float = 0.5) -> Dict[str, np.ndarray]:
+    """
+    Per-path statistics of a return matrix
+
+    Args:
+        paths: Array (n_paths, n_trades) of per-trade returns
+        compound: Equity multiplies by (1 + r) per trade; otherwise returns add up
+        ruin_drawdown: Drawdown from the starting equity that counts as ruin (0.5 = -50%)
+
+    Returns:
+        Dict of arrays: total_return_pct, max_drawdown (%, <= 0), win_rate,
+        max_losing_streak, ruined
+    """
+    if compound:
+        equity = np.cumprod(1.0 + paths, axis=1)
+    else:
+        equity = 1.0 + np.cumsum(paths, axis=1)
+    equity = np.concatenate([np.ones((len(paths), 1)), equity], axis=1)
+
+    running_max = np.maximum.accumulate(equity, axis=1)
+    drawdown = (equity - running_max) / running_max * 100
+
+    # Longest run of losing trades: losses since the last win, maxed along the path
+    losing = paths < 0
+    count = np.cumsum(losing, axis=1)
+    last_win_count = np.maximum.accumulate(np.where(losing, 0, count), axis=1)
+
+    return {
+        'total_return_pct': (equity[:, -1] - 1.0) * 100,
+        'max_drawdown': drawdown.min(axis=1),
+        'win_rate': (paths > 0).mean(axis=1) * 100,
+        'max_losing_streak': (count - last_win_count).max(axis=1) if paths.shape[1] else np.zeros(len(paths)),
+        'ruined': equity.min(axis=1) <= 1.0 - ruin_drawdown,
+    }
+
+
+def run_trade_monte_carlo(
+    returns: Sequence[float],
+    n_paths: int = 10000,
+    method: str = 'bootstrap',
+    n_trades: Optional[int] = None,
+    block_size: int = 10,
+    compound: bool = True,
+    ruin_drawdown: float = 0.5,
+    seed: Optional[int] = None
+) -> pd.DataFrame:
+    """
+    Trade-level Monte Carlo
+
+    The backtest runs once; its trade returns are resampled into n_paths
+    sequences that are evaluated together as a matrix (in chunks of
+    CHUNK_PATHS rows).
+
+    Args:
+        returns: Per-trade returns (see trade_returns / backtester_returns)
+        n_paths: Number of simulated paths
+        method: 'bootstrap', 'block' or 'permute' (see sample_trade_paths)
+        n_trades: Trades per path (default: as many as in the backtest)
+        block_size: Trades per block for 'block'
+        compound: Compound the returns (position size follows equity)
+        ruin_drawdown: Drawdown from the starting equity that counts as ruin
+        seed: Random seed
+
+    Returns:
+        DataFrame with one row per path
+    """
+    returns = np.asarray(returns, dtype=float)
+    if len(returns) == 0:
+        raise ValueError("No trades to resample")
+
+    rng = np.random.default_rng(seed)
+    chunks = []
+    for start in range(0, n_paths, CHUNK_PATHS):
+        paths = sample_trade_paths(returns, min(CHUNK_PATHS, n_paths - start), n_trades,
+                                   method, block_size, rng)
+        chunks.append(pd.DataFrame(path_metrics(paths, compound, ruin_drawdown)))
+    return pd.concat(chunks, ignore_index=True)
+
+
+def summarize_monte_carlo(results: pd.DataFrame) -> Dict:
+    """
+    Distribution summary of run_trade_monte_carlo / run_bar_monte_carlo results
+
+    Returns:
+        Dict with mean/median/percentiles of return and drawdown, probability
+        of loss and risk of ruin
+    """
+    summary = {
+        'paths': len(results),
+        'return_mean': results['total_return_pct'].mean(),
+        'return_median': results['total_return_pct'].median(),
+        'return_p5': results['total_return_pct'].quantile(0.05),
+        'return_p95': results['total_return_pct'].quantile(0.95),
+        'prob_loss': (results['total_return_pct'] < 0).mean() * 100,
+        'drawdown_median': results['max_drawdown'].median(),
+        'drawdown_p95': results['max_drawdown'].quantile(0.05),  # 95% of paths do better
+        'drawdown_worst': results['max_drawdown'].min(),
+    }
+    if 'ruined' in results:
+        summary['risk_of_ruin'] = results['ruined'].mean() * 100
+    if 'max_losing_streak' in results:
+        summary['losing_streak_p95'] = results['max_losing_streak'].quantile(0.95)
+    return summary
+
+
+def print_monte_carlo(summary: Dict):
+    """Print summarize_monte_carlo output"""
+    print("\n📊 MONTE CARLO RESULTS")
+    print("="*60)
+    print(f"  Paths:               {summary['paths']}")
+    print(f"\nTotal Return %:")
+    print(f"  Mean:                {summary['return_mean']:.2f}%")
+    print(f"  Median:              {summary['return_median']:.2f}%")
+    print(f"  5th-95th pct:        {summary['return_p5']:.2f}% .. {summary['return_p95']:.2f}%")
+    print(f"  P(loss):             {summary['prob_loss']:.2f}%")
+    print(f"\nMax Drawdown %:")
+    print(f"  Median:              {summary['drawdown_median']:.2f}%")
+    print(f"  95% worst case:      {summary['drawdown_p95']:.2f}%")
+    print(f"  Worst:               {summary['drawdown_worst']:.2f}%")
+    if 'risk_of_ruin' in summary:
+        print(f"\nRisk of ruin:          {summary['risk_of_ruin']:.2f}%")
+    if 'losing_streak_p95' in summary:
+        print(f"Losing streak (95%):   {summary['losing_streak_p95']:.0f} trades")
+
+
+# ------------------------------------------------------------------
+# Bar-level block bootstrap (full strategy + backtest per path)
+# ------------------------------------------------------------------
+
+def block_bootstrap_bars(df: pd.DataFrame, block_size: int, rng: np.random.Generator) -> pd.DataFrame:
+    """
+    Synthetic candles from blocks of consecutive real candles
+
+    Each candle is expressed relative to the previous close; blocks of these
+    relative candles are drawn with replacement and chained from the first
+    close, so price moves inside a block keep their order and the series
+    stays continuous. The original timestamps are kept (session filters
+    still see the same hours).
+
+    Args:
+        df: DataFrame with OHLC(V) data
+        block_size: Candles per block (at most the len(df) - 1 candles that have a previous close)
+        rng: Random generator
+
+    Returns:
+        DataFrame of the same length and index
+    """
+    close = df['close'].to_numpy(dtype=float)
+    prev_close = np.concatenate(([close[0]], close[:-1]))
+    relative = {col: df[col].to_numpy(dtype=float) / prev_close for col in ('open', 'high', 'low', 'close')}
+
+    n = len(df)
+    if n < 2:
+        raise ValueError(f"block bootstrap needs at least 2 candles, got {n}")
+    block_size = max(1, min(block_size, n - 1))
+    n_blocks = -(-(n - 1) // block_size)
+    starts = rng.integers(1, n - block_size + 1, size=(n_blocks, 1))
+    idx = np.concatenate(([0], (starts + np.arange(block_size)).reshape(-1)[:n - 1]))
+
+    new_close = close[0] * np.cumprod(relative['close'][idx])
+    base = np.concatenate(([close[0]], new_close[:-1]))
+
+    out = pd.DataFrame({col: base * relative[col][idx] for col in ('open', 'high', 'low')},
+                       index=df.index)
+    out['close'] = new_close
+    for col in df.columns:
+        if col not in out.columns and col in ('volume', 'tick_volume'):
+            out[col] = df[col].to_numpy()[idx]
+    return out[[c for c in df.columns if c in out.columns]]
+
+
+def _run_bar_path(target: str, params: Dict, block_size: int, seed_seq) -> Dict:
+    """Pool task: strategy + backtest on one block-bootstrapped candle series"""
+    df = block_bootstrap_bars(sweep._worker_df, block_size, np.random.default_rng(seed_seq))
+    with contextlib.redirect_stdout(io.StringIO()):
+        return evaluate(df, target, params)
+
+
+def run_bar_monte_carlo(
+    df: pd.DataFrame,
+    n_simulations: int = 100,
+    target: str = 'portfolio',
+    params: Optional[Dict] = None,
+    block_size: int = 24,
+    workers: Optional[int] = None,
+    seed: Optional[int] = None
+) -> pd.DataFrame:
+    """
+    Bar-level Monte Carlo: the full strategy and backtest on block-bootstrapped candles
+
+    Much slower than run_trade_monte_carlo (every path re-runs the strategy)
+    but it also resamples which signals appear. Paths run in a process pool
+    sharing the candles through shared memory (see sweep.SharedFrame).
+
+    Args:
+        df: DataFrame with OHLC data
+        n_simulations: Number of paths
+        target: Backtest to run (sweep.SWEEP_TARGETS key)
+        params: Sweep parameters ('strategy.<name>' / 'backtest.<name>')
+        block_size: Candles per block (24 = one day of H1)
+        workers: Worker processes (default: CPU count)
+        seed: Random seed
+
+    Returns:
+        DataFrame with the target's metrics, one row per path
+    """
+    seeds = np.random.SeedSequence(seed).spawn(n_simulations)
+    shared = SharedFrame(df[['open', 'high', 'low', 'close'] +
+                            [c for c in ('volume', 'tick_volume') if c in df.columns]])
+    try:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1,
+                                 initializer=_init_worker, initargs=(shared.spec,)) as pool:
+            futures = [pool.submit(_run_bar_path, target, params or {}, block_size, s) for s in seeds]
+            results = [f.result() for f in futures]
+    finally:
+        shared.close()
+    return pd.DataFrame(results)
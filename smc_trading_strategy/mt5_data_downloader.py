@@ -8,6 +8,8 @@ import MetaTrader5 as mt5
 from datetime import datetime, timedelta
 import pytz
 
+from candle_repository import CandleRepository, MT5CandleSource
+
 
 class MT5DataDownloader:
     """Загрузчик данных из MetaTrader 5"""
@@ -23,6 +25,7 @@ class MT5DataDownloader:
         self.symbol = symbol
         self.timeframe = timeframe
         self.connected = False
+        self.repository = CandleRepository(MT5CandleSource(mt5))
 
         print("🔌 Подключение к MetaTrader 5...")
 
@@ -102,28 +105,26 @@ class MT5DataDownloader:
 
             # Загрузка данных
             if from_date and to_date:
-                # Загрузка по диапазону дат
+                # Загрузка по диапазону дат: из MT5 запрашиваются только отсутствующие в кэше свечи
                 utc_from = from_date.replace(tzinfo=pytz.UTC)
                 utc_to = to_date.replace(tzinfo=pytz.UTC)
 
-                rates = mt5.copy_rates_range(self.symbol, self.timeframe, utc_from, utc_to)
-                print(f"   Период: {from_date} - {to_date}")
+                df = self.repository.get(self.symbol, self.repository.source.timeframe_name(self.timeframe),
+                                         utc_from, utc_to)
+                print(f"   Период: {from_date} - {to_date} (из MT5: {df.attrs['fetched']} свечей)")
             else:
                 # Загрузка последних N баров
                 rates = mt5.copy_rates_from_pos(self.symbol, self.timeframe, 0, bars)
                 print(f"   Баров: {bars}")
+                df = pd.DataFrame(rates if rates is not None else [])
+                if len(df):
+                    df['datetime'] = pd.to_datetime(df['time'], unit='s')
+                    df = df.set_index('datetime')
 
-            if rates is None or len(rates) == 0:
+            if len(df) == 0:
                 print(f"❌ Не удалось загрузить данные: {mt5.last_error()}")
                 return None
 
-            # Конвертация в DataFrame
-            df = pd.DataFrame(rates)
-
-            # Конвертация времени
-            df['datetime'] = pd.to_datetime(df['time'], unit='s')
-            df = df.set_index('datetime')
-
             # Переименование колонок
             df = df.rename(columns={
                 'open': 'open',
@@ -7,18 +7,24 @@ import pandas as pd
 import numpy as np
 from typing import Tuple, Dict
 
+from market_data_store import normalize_timeframe
+from resampler import align_to_ltf, htf_timeframe, resample_ohlcv
+
 
 class MultiTimeframeData:
     """Handle multiple timeframe data"""
 
-    def __init__(self, htf_multiplier: int = 4):
+    def __init__(self, htf_multiplier: int = 4, base_timeframe: str = 'H1'):
         """
         Initialize multi-timeframe handler
 
         Args:
             htf_multiplier: Multiplier for higher timeframe (e.g., 4 means 4x the base timeframe)
+            base_timeframe: Timeframe of the LTF data ('H1', 'M15', ...)
         """
         self.htf_multiplier = htf_multiplier
+        self.base_timeframe = normalize_timeframe(base_timeframe)
+        self.htf_timeframe = htf_timeframe(self.base_timeframe, htf_multiplier)
 
     def resample_to_htf(self, df_ltf: pd.DataFrame) -> pd.DataFrame:
         """
@@ -30,23 +36,14 @@ class MultiTimeframeData:
         Returns:
             Higher timeframe DataFrame
         """
-        # Create a resample rule based on multiplier
-        # Assuming the base is hourly data
-        resample_rule = f'{self.htf_multiplier}h'
-
-        df_htf = df_ltf.resample(resample_rule).agg({
-            'open': 'first',
-            'high': 'max',
-            'low': 'min',
-            'close': 'last',
-            'volume': 'sum'
-        }).dropna()
-
-        return df_htf
+        return resample_ohlcv(df_ltf, self.htf_timeframe).drop(columns='bars')
 
     def align_htf_to_ltf(self, df_ltf: pd.DataFrame, df_htf: pd.DataFrame, column: str) -> pd.Series:
         """
-        Align HTF data to LTF by forward filling
+        Align HTF data to LTF without look-ahead
+
+        Each LTF candle gets the last HTF candle that had closed when the LTF
+        candle closed.
 
         Args:
             df_ltf: Lower timeframe DataFrame
@@ -56,9 +53,7 @@ class MultiTimeframeData:
         Returns:
             Series with HTF data aligned to LTF index
         """
-        # Reindex HTF to LTF and forward fill
-        htf_aligned = df_htf[column].reindex(df_ltf.index, method='ffill')
-        return htf_aligned
+        return align_to_ltf(df_ltf.index, df_htf, self.base_timeframe, self.htf_timeframe, [column])[column]
 
     def get_htf_context(self, df_ltf: pd.DataFrame, df_htf: pd.DataFrame) -> pd.DataFrame:
         """
@@ -73,13 +68,14 @@ class MultiTimeframeData:
         """
         df_ltf = df_ltf.copy()
 
-        # Align important HTF columns to LTF
+        # Align important HTF columns to LTF (one searchsorted for all of them)
         htf_columns = ['trend', 'signal', 'bos', 'choch', 'bullish_ob', 'bearish_ob',
                       'bullish_fvg', 'bearish_fvg', 'swing_high', 'swing_low']
+        columns = [col for col in htf_columns if col in df_htf.columns]
 
-        for col in htf_columns:
-            if col in df_htf.columns:
-                df_ltf[f'htf_{col}'] = self.align_htf_to_ltf(df_ltf, df_htf, col)
+        aligned = align_to_ltf(df_ltf.index, df_htf, self.base_timeframe, self.htf_timeframe, columns)
+        for col in columns:
+            df_ltf[f'htf_{col}'] = aligned[col]
 
         return df_ltf
 
@@ -258,3 +254,52 @@ class LTFEntryConfirmation:
         confirmed = score >= 60
 
         return confirmed, details
+
+    def confirm_ltf_entries(self, df: pd.DataFrame, direction: str) -> pd.DataFrame:
+        """
+        confirm_ltf_entry() for every candle at once (for backtests)
+
+        Args:
+            df: LTF DataFrame with OHLC data
+            direction: 'long' or 'short'
+
+        Returns:
+            DataFrame on df.index with confirmation_candle, structure_confirmed,
+            entry_quality and confirmed columns
+        """
+        n = self.confirmation_candles
+        open_, high, low, close = (df[c].to_numpy() for c in ('open', 'high', 'low', 'close'))
+        prev_high = np.r_[np.nan, high[:-1]]
+        prev_low = np.r_[np.nan, low[:-1]]
+
+        body = np.abs(close - open_)
+        candle = high - low
+        strong_body = (candle > 0) & (body > candle * 0.5)
+
+        if direction == 'long':
+            candle_ok = (close > open_) & (close > prev_high) & strong_body
+            with_trend = close > open_
+            pair_ok = low[1:] >= low[:-1] * 0.998  # higher lows
+        elif direction == 'short':
+            candle_ok = (close < open_) & (close < prev_low) & strong_body
+            with_trend = close < open_
+            pair_ok = high[1:] <= high[:-1] * 1.002  # lower highs
+        else:
+            candle_ok = with_trend = np.zeros(len(df), dtype=bool)
+            pair_ok = np.zeros(max(len(df) - 1, 0), dtype=bool)  # nothing confirms
+
+        count = pd.Series(with_trend, dtype=np.float64).rolling(n, min_periods=n).sum().to_numpy()
+        if n > 1:
+            pairs = pd.Series(np.r_[False, pair_ok], dtype=np.float64).rolling(n - 1, min_periods=n - 1).sum()
+            pairs_ok = pairs.to_numpy() == n - 1
+        else:
+            pairs_ok = np.ones(len(df), dtype=bool)
+        structure = (np.arange(len(df)) >= n) & (count >= n * 0.6) & pairs_ok
+
+        quality = np.where(candle_ok, 60, 0) + np.where(structure, 40, 0)
+        return pd.DataFrame({
+            'confirmation_candle': candle_ok,
+            'structure_confirmed': structure,
+            'entry_quality': quality,
+            'confirmed': quality >= 60,
+        }, index=df.index)
@@ -7,13 +7,13 @@ import numpy as np
 from datetime import datetime, timedelta
 
 from pattern_recognition_strategy import PatternRecognitionStrategy
+from exit_simulator import simulate_exits, bars_within_hours, EXIT_SL, EXIT_TP
+from market_data_store import load_csv_cached
 
 
 def load_mt5_data(file_path='../XAUUSD_1H_MT5_20241227_20251227.csv'):
     """Load MT5 XAUUSD data"""
-    df = pd.read_csv(file_path)
-    df['timestamp'] = pd.to_datetime(df['datetime'])
-    df = df.set_index('timestamp')
+    df = load_csv_cached(file_path)
     df = df[['open', 'high', 'low', 'close', 'volume']]
 
     # Add market hours
@@ -114,175 +114,68 @@ def backtest_with_partial_close(df, strategy, tp1, tp2, tp3, close_percents=(0.5
 
     print(f"\n🔍 Найдено сигналов: {len(df_signals)}")
 
-    trades = []
-
-    for i in range(len(df_signals)):
-        signal = df_signals.iloc[i]
-        entry_price = signal['entry_price']
-        stop_loss = signal['stop_loss']
-        direction = signal['signal']
-        entry_time = df_signals.index[i]
+    # Every signal at once: SL first, then TP1-3, close the rest 48 hours later
+    entries = np.flatnonzero(df_strategy['signal'].to_numpy() != 0)
+    window = bars_within_hours(df_strategy, entries, 48)
+    entries = entries[window > 0]
+    window = window[window > 0]
 
-        # Calculate TP levels
-        if direction == 1:  # LONG
-            tp1_price = entry_price + tp1
-            tp2_price = entry_price + tp2
-            tp3_price = entry_price + tp3
-        else:  # SHORT
-            tp1_price = entry_price - tp1
-            tp2_price = entry_price - tp2
-            tp3_price = entry_price - tp3
+    entry_price = df_strategy['entry_price'].to_numpy(dtype=float)[entries]
+    stop_loss = df_strategy['stop_loss'].to_numpy(dtype=float)[entries]
+    direction = df_strategy['signal'].to_numpy()[entries]
+    tp_prices = entry_price[:, None] + direction[:, None] * np.array([tp1, tp2, tp3])
 
-        # Track partial closes
-        position_remaining = 1.0
-        total_pnl_points = 0
-        total_pnl_pct = 0
+    exits = simulate_exits(
+        df_strategy, entries, direction, entry_price, stop_loss,
+        take_profits=tp_prices, close_fractions=close_percents, max_bars=window
+    )
 
-        tp1_hit = False
-        tp2_hit = False
-        tp3_hit = False
-        sl_hit = False
+    trades = []
 
-        exit_time = None
-        exit_type = 'EOD'
+    for k in range(len(entries)):
+        entry_time = df_strategy.index[entries[k]]
+        tp1_hit, tp2_hit, tp3_hit = exits['tp_idx'][k] >= 0
+        sl_hit = exits['exit_reason'][k] == EXIT_SL
 
-        # Look ahead 48 hours
-        search_end = entry_time + timedelta(hours=48)
-        df_future = df_strategy[(df_strategy.index > entry_time) & (df_strategy.index <= search_end)]
+        closed = sl_hit or exits['exit_reason'][k] == EXIT_TP
 
-        if len(df_future) == 0:
-            continue
+        # Determine exit type (an SL after a TP counts as that TP level closing the position)
+        if tp3_hit:
+            exit_type = 'TP3_FULL'
+        elif tp2_hit:
+            exit_type = 'TP2_FULL' if closed else 'TP2_PARTIAL'
+        elif tp1_hit:
+            exit_type = 'TP1_FULL' if closed else 'TP1_PARTIAL'
+        else:
+            exit_type = 'SL' if sl_hit else 'EOD'
 
-        # Check each candle
-        for j in range(len(df_future)):
-            candle_time = df_future.index[j]
-            high = df_future['high'].iloc[j]
-            low = df_future['low'].iloc[j]
-            close = df_future['close'].iloc[j]
-
-            if position_remaining <= 0:
-                break
-
-            # Check SL first (most important)
-            if direction == 1:  # LONG
-                if low <= stop_loss:
-                    # Full SL hit - close remaining position
-                    pnl_points = (stop_loss - entry_price) * position_remaining
-                    total_pnl_points += pnl_points
-                    sl_hit = True
-                    exit_time = candle_time
-                    exit_type = 'SL' if position_remaining == 1.0 else 'SL_PARTIAL'
-                    position_remaining = 0
-                    break
-            else:  # SHORT
-                if high >= stop_loss:
-                    pnl_points = (entry_price - stop_loss) * position_remaining
-                    total_pnl_points += pnl_points
-                    sl_hit = True
-                    exit_time = candle_time
-                    exit_type = 'SL' if position_remaining == 1.0 else 'SL_PARTIAL'
-                    position_remaining = 0
-                    break
-
-            # Check TP levels (in order)
-            if direction == 1:  # LONG
-                if not tp1_hit and high >= tp1_price:
-                    # Close first part
-                    pnl_points = tp1 * close_percents[0]
-                    total_pnl_points += pnl_points
-                    position_remaining -= close_percents[0]
-                    tp1_hit = True
-                    exit_time = candle_time
-
-                if tp1_hit and not tp2_hit and high >= tp2_price:
-                    # Close second part
-                    pnl_points = tp2 * close_percents[1]
-                    total_pnl_points += pnl_points
-                    position_remaining -= close_percents[1]
-                    tp2_hit = True
-                    exit_time = candle_time
-
-                if tp2_hit and not tp3_hit and high >= tp3_price:
-                    # Close third part
-                    pnl_points = tp3 * close_percents[2]
-                    total_pnl_points += pnl_points
-                    position_remaining -= close_percents[2]
-                    tp3_hit = True
-                    exit_time = candle_time
-
-            else:  # SHORT
-                if not tp1_hit and low <= tp1_price:
-                    pnl_points = tp1 * close_percents[0]
-                    total_pnl_points += pnl_points
-                    position_remaining -= close_percents[0]
-                    tp1_hit = True
-                    exit_time = candle_time
-
-                if tp1_hit and not tp2_hit and low <= tp2_price:
-                    pnl_points = tp2 * close_percents[1]
-                    total_pnl_points += pnl_points
-                    position_remaining -= close_percents[1]
-                    tp2_hit = True
-                    exit_time = candle_time
-
-                if tp2_hit and not tp3_hit and low <= tp3_price:
-                    pnl_points = tp3 * close_percents[2]
-                    total_pnl_points += pnl_points
-                    position_remaining -= close_percents[2]
-                    tp3_hit = True
-                    exit_time = candle_time
-
-        # Close any remaining position at end (timeout)
-        if position_remaining > 0:
-            final_price = df_future['close'].iloc[-1]
-            if direction == 1:
-                pnl_points = (final_price - entry_price) * position_remaining
-            else:
-                pnl_points = (entry_price - final_price) * position_remaining
-
-            total_pnl_points += pnl_points
-
-            if exit_time is None:
-                exit_time = df_future.index[-1]
-
-            # Determine exit type
-            if tp3_hit:
-                exit_type = 'TP3_FULL'
-            elif tp2_hit:
-                exit_type = 'TP2_PARTIAL'
-            elif tp1_hit:
-                exit_type = 'TP1_PARTIAL'
-            else:
-                exit_type = 'EOD'
+        # A remainder closed at the end of the window keeps the time of the last TP
+        if tp1_hit and not closed:
+            exit_bar = exits['tp_idx'][k].max()
         else:
-            # All position closed
-            if tp3_hit:
-                exit_type = 'TP3_FULL'
-            elif tp2_hit:
-                exit_type = 'TP2_FULL'
-            elif tp1_hit:
-                exit_type = 'TP1_FULL'
+            exit_bar = exits['exit_idx'][k]
+        exit_time = df_strategy.index[exit_bar]
 
         # Calculate PnL percentage
-        total_pnl_pct = (total_pnl_points / entry_price) * 100
-
+        total_pnl_points = exits['pnl_points'][k]
+        total_pnl_pct = (total_pnl_points / entry_price[k]) * 100
         duration_hours = (exit_time - entry_time).total_seconds() / 3600
 
         trades.append({
             'entry_time': entry_time,
             'exit_time': exit_time,
             'month': entry_time.strftime('%Y-%m'),
-            'direction': 'LONG' if direction == 1 else 'SHORT',
-            'entry_price': entry_price,
-            'stop_loss': stop_loss,
+            'direction': 'LONG' if direction[k] == 1 else 'SHORT',
+            'entry_price': entry_price[k],
+            'stop_loss': stop_loss[k],
             'exit_type': exit_type,
             'pnl_pct': total_pnl_pct,
             'pnl_points': total_pnl_points,
             'duration_hours': duration_hours,
-            'tp1_hit': tp1_hit,
-            'tp2_hit': tp2_hit,
-            'tp3_hit': tp3_hit,
-            'sl_hit': sl_hit,
+            'tp1_hit': bool(tp1_hit),
+            'tp2_hit': bool(tp2_hit),
+            'tp3_hit': bool(tp3_hit),
+            'sl_hit': bool(sl_hit),
         })
 
     return pd.DataFrame(trades)
@@ -12,6 +12,8 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from fibonacci_1618_strategy import Fibonacci1618Strategy
+from smc_indicators import SMCIndicators
+from indicator_cache import params_key, run_cached
 
 
 class PatternRecognitionStrategy(Fibonacci1618Strategy):
@@ -57,12 +59,12 @@ class PatternRecognitionStrategy(Fibonacci1618Strategy):
         print(f"   Pattern Tolerance: {pattern_tolerance*100}% (включая тени)")
         print(f"   Swing Lookback: {swing_lookback}")
 
-    def run_strategy(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _run_pipeline(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Run pattern recognition strategy
         """
         # Run parent strategy first (gets base signals)
-        df = super().run_strategy(df)
+        df = super()._run_pipeline(df)
 
         # Find swing points for pattern recognition
         df = self._find_swing_points(df)
@@ -75,126 +77,115 @@ class PatternRecognitionStrategy(Fibonacci1618Strategy):
     def _find_swing_points(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Find swing highs and lows for pattern recognition
+        (same centered-window rule as SMCIndicators, учитываем тени)
         """
-        df = df.copy()
-
-        df['swing_high'] = False
-        df['swing_low'] = False
-
-        for i in range(self.swing_lookback, len(df) - self.swing_lookback):
-            # Swing high - учитываем тени (high)
-            window_highs = df['high'].iloc[i-self.swing_lookback:i+self.swing_lookback+1]
-            if df['high'].iloc[i] == window_highs.max():
-                df.loc[df.index[i], 'swing_high'] = True
-
-            # Swing low - учитываем тени (low)
-            window_lows = df['low'].iloc[i-self.swing_lookback:i+self.swing_lookback+1]
-            if df['low'].iloc[i] == window_lows.min():
-                df.loc[df.index[i], 'swing_low'] = True
-
-        return df
+        swing_detector = SMCIndicators(swing_length=self.swing_lookback)
+        return run_cached(self.indicator_cache, df, 'swing_points', params_key(swing_detector),
+                          lambda data: swing_detector.detect_swing_points(data, copy=False),
+                          copy=False)
 
     def _detect_patterns(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Detect CONTINUATION chart patterns only
         (Flags, Pennants, Wedges, Triangles)
+
+        All bars are evaluated at once: the last two swings before every bar
+        come from a searchsorted index over swing timestamps, and each pattern's
+        geometry is a mask over those arrays. Patterns are tried in the same
+        order as the _detect_* methods; the first one accepted by the
+        signal filters wins.
         """
-        df = df.copy()
-
-        # Get swing points
-        swing_highs = df[df['swing_high'] == True].copy()
-        swing_lows = df[df['swing_low'] == True].copy()
-
-        patterns_found = 0
-
-        # Detect patterns (sliding window approach)
-        for i in range(len(df)):
-            if df['signal'].iloc[i] != 0:
-                continue  # Already has signal
-
-            # Get recent swings
-            recent_highs = swing_highs[swing_highs.index < df.index[i]].tail(5)
-            recent_lows = swing_lows[swing_lows.index < df.index[i]].tail(5)
-
-            if len(recent_highs) < 2 or len(recent_lows) < 2:
-                continue
-
-            # 1. ASCENDING TRIANGLE (Bullish Continuation)
-            pattern = self._detect_ascending_triangle(df, i, recent_highs, recent_lows)
-            if pattern:
-                df, added = self._add_pattern_signal(df, i, pattern, 'asc_triangle')
-                if added:
-                    patterns_found += 1
-                    continue
-
-            # 2. DESCENDING TRIANGLE (Bearish Continuation)
-            pattern = self._detect_descending_triangle(df, i, recent_highs, recent_lows)
-            if pattern:
-                df, added = self._add_pattern_signal(df, i, pattern, 'desc_triangle')
-                if added:
-                    patterns_found += 1
-                    continue
-
-            # 3. SYMMETRICAL TRIANGLE
-            pattern = self._detect_symmetrical_triangle(df, i, recent_highs, recent_lows)
-            if pattern:
-                df, added = self._add_pattern_signal(df, i, pattern, 'sym_triangle')
-                if added:
-                    patterns_found += 1
-                    continue
-
-            # 4. BULLISH FLAG
-            pattern = self._detect_bull_flag(df, i, recent_highs, recent_lows)
-            if pattern:
-                df, added = self._add_pattern_signal(df, i, pattern, 'bull_flag')
-                if added:
-                    patterns_found += 1
-                    continue
-
-            # 5. BEARISH FLAG
-            pattern = self._detect_bear_flag(df, i, recent_highs, recent_lows)
-            if pattern:
-                df, added = self._add_pattern_signal(df, i, pattern, 'bear_flag')
-                if added:
-                    patterns_found += 1
-                    continue
-
-            # 6. BULLISH PENNANT
-            pattern = self._detect_bull_pennant(df, i, recent_highs, recent_lows)
-            if pattern:
-                df, added = self._add_pattern_signal(df, i, pattern, 'bull_pennant')
-                if added:
-                    patterns_found += 1
-                    continue
-
-            # 7. BEARISH PENNANT
-            pattern = self._detect_bear_pennant(df, i, recent_highs, recent_lows)
-            if pattern:
-                df, added = self._add_pattern_signal(df, i, pattern, 'bear_pennant')
-                if added:
-                    patterns_found += 1
-                    continue
-
-            # 8. FALLING WEDGE (Bullish)
-            pattern = self._detect_falling_wedge(df, i, recent_highs, recent_lows)
-            if pattern:
-                df, added = self._add_pattern_signal(df, i, pattern, 'falling_wedge')
-                if added:
-                    patterns_found += 1
-                    continue
-
-            # 9. RISING WEDGE (Bearish)
-            pattern = self._detect_rising_wedge(df, i, recent_highs, recent_lows)
-            if pattern:
-                df, added = self._add_pattern_signal(df, i, pattern, 'rising_wedge')
-                if added:
-                    patterns_found += 1
-                    continue
+        n = len(df)
+
+        close = df['close'].to_numpy(dtype=float)
+        high1, high2, high_count = self._last_two_swings(df, 'swing_high', 'high')
+        low1, low2, low_count = self._last_two_swings(df, 'swing_low', 'low')
+
+        eligible = (df['signal'].to_numpy() == 0) & (high_count >= 2) & (low_count >= 2)
+        eligible[:self._signal_start(df)] = False
+
+        # Flagpole: close 1 bar ago vs close up to 10 bars ago (needs 5+ bars of history)
+        bars = np.arange(n)
+        prev_close = np.concatenate(([np.nan], close[:-1]))
+        pole_start_close = close[np.maximum(bars - 10, 0)]
+        has_pole = bars >= 5
+        pole_up = has_pole & ~(prev_close <= pole_start_close * 1.01)
+        pole_down = has_pole & ~(prev_close >= pole_start_close * 0.99)
+        has_channel = (high_count >= 3) & (low_count >= 3)
+
+        converging = (high2 < high1) & (low2 > low1)
+        flat_highs = np.abs(high1 - high2) <= high1 * self.pattern_tolerance
+        flat_lows = np.abs(low1 - low2) <= low1 * self.pattern_tolerance
+        channel_top = np.maximum(high1, high2)
+        channel_bottom = np.minimum(low1, low2)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            falling = (high2 < high1) & (low2 < low1) & ((high1 - high2) / high1 > (low1 - low2) / low1)
+            rising = (high2 > high1) & (low2 > low1) & ((low2 - low1) / low1 > (high2 - high1) / high1)
+
+        # (name, mask, direction, resistance, support) in detection order
+        patterns = [
+            ('asc_triangle', flat_highs & (low2 > low1) & (close > channel_top), 1, channel_top, low2),
+            ('desc_triangle', flat_lows & (high2 < high1) & (close < channel_bottom), -1, high2, channel_bottom),
+            ('sym_triangle', converging & ((close > high2) | (close < low2)),
+             np.where(close > high2, 1, -1), high2, low2),
+            ('bull_flag', has_channel & pole_up & (close > channel_top), 1, channel_top, channel_bottom),
+            ('bear_flag', has_channel & pole_down & (close < channel_bottom), -1, channel_top, channel_bottom),
+            ('bull_pennant', pole_up & converging & (close > high2), 1, high2, low2),
+            ('bear_pennant', pole_down & converging & (close < low2), -1, high2, low2),
+            ('falling_wedge', falling & (close > high2), 1, high2, low2),
+            ('rising_wedge', rising & (close < low2), -1, high2, low2),
+        ]
+
+        # Filters from _add_pattern_signal that do not depend on the pattern
+        allowed = eligible & df['is_active_session'].to_numpy(dtype=bool)
+        if self.best_hours_only:
+            allowed &= np.isin(df.index.hour, [8, 9, 10, 13, 14, 15])
+
+        chosen = np.full(n, -1)
+        direction = np.zeros(n, dtype=np.int64)
+        stop_loss = np.full(n, np.nan)
+        take_profit = np.full(n, np.nan)
+
+        for k, (name, mask, pattern_dir, resistance, support) in enumerate(patterns):
+            pattern_dir = np.broadcast_to(pattern_dir, (n,))
+            sl = np.where(pattern_dir == 1, support * 0.999, resistance * 1.001)
+            risk = np.where(pattern_dir == 1, close - sl, sl - close)
+            tp = close + pattern_dir * (risk * self.fib_extension)
+            min_risk_ok = ~(np.abs(close - sl) / close < 0.003)  # Min 0.3% risk
+
+            take = mask & allowed & min_risk_ok & (chosen < 0)
+            chosen[take] = k
+            direction[take] = pattern_dir[take]
+            stop_loss[take] = sl[take]
+            take_profit[take] = tp[take]
+
+        found = chosen >= 0
+        patterns_found = int(found.sum())
+        if patterns_found > 0:
+            names = np.array([f"pattern_{name}" for name, *_ in patterns], dtype=object)
+            df.loc[found, 'signal'] = direction[found]
+            df.loc[found, 'entry_price'] = close[found]
+            df.loc[found, 'stop_loss'] = stop_loss[found]
+            df.loc[found, 'take_profit'] = take_profit[found]
+            df.loc[found, 'signal_type'] = names[chosen[found]]
 
         print(f"   Detected {patterns_found} continuation patterns")
 
         return df
 
+    @staticmethod
+    def _last_two_swings(df: pd.DataFrame, flag_col: str, price_col: str):
+        """
+        Prices of the last two swings strictly before every bar
+
+        Returns:
+            (previous, last, count) arrays; prices are NaN when fewer swings exist
+        """
+        is_swing = df[flag_col].to_numpy(dtype=bool)
+        swing_prices = np.concatenate(([np.nan, np.nan], df[price_col].to_numpy(dtype=float)[is_swing]))
+        count = df.index[is_swing].searchsorted(df.index, side='left')
+        return swing_prices[count], swing_prices[count + 1], count
+
     def _detect_symmetrical_triangle(self, df, idx, recent_highs, recent_lows):
         """
         Detect Symmetrical Triangle (Continuation - direction depends on breakout)
@@ -598,12 +589,12 @@ class MultiSignalPatternStrategy(PatternRecognitionStrategy):
 
         print(f"   Mode: MULTI-SIGNAL + PATTERNS")
 
-    def run_strategy(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _run_pipeline(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Combine pattern recognition with BOS signals
         """
         # Run pattern recognition
-        df = super().run_strategy(df)
+        df = super()._run_pipeline(df)
 
         # Note: BOS signals already added by parent class
 
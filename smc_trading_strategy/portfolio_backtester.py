@@ -0,0 +1,281 @@
+"""
+Portfolio Backtester
+Событийный бэктест с несколькими одновременными позициями: колоночная книга позиций,
+режим 3 позиций с трейлингом после TP1 как в live ботах
+"""
+
+import heapq
+import pandas as pd
+import numpy as np
+from typing import Dict, Optional, Sequence
+
+from backtester import Backtester, Trade, EXIT_REASON_NAMES
+from exit_simulator import simulate_exits, EXIT_TRAILING
+
+# Trade.exit_reason for each simulate_exits exit reason (trailing only occurs for Pos 2 & 3)
+PORTFOLIO_EXIT_REASON_NAMES = {**EXIT_REASON_NAMES, EXIT_TRAILING: 'trailing'}
+
+# Lot split of the live bots' 3-position mode (Pos 1 -> TP1, Pos 2 -> TP2, Pos 3 -> TP3)
+POSITION_SPLIT = (0.33, 0.33, 0.34)
+
+
+class PortfolioBacktester(Backtester):
+    """
+    Event-driven backtester with many concurrent positions
+
+    Open positions live in a columnar book (one numpy array per field: entry,
+    SL, TP, size, group id, ...). A position's exit depends only on its own
+    levels and the candles, so the exits of every candidate position are
+    resolved up front in one simulate_exits call. The event loop then only
+    visits signal bars: it realizes the positions that exited since the last
+    event, applies the admission rules of the live bots (max_positions, no
+    second group in the same direction) and sizes new positions from the
+    realized capital.
+    """
+
+    def __init__(
+        self,
+        initial_capital: float = 10000,
+        commission: float = 0.001,  # 0.1% per trade
+        slippage: float = 0.0005,  # 0.05% slippage
+        risk_per_trade: float = 0.02,  # 2% risk per signal
+        max_positions: int = 9,
+        use_3_position_mode: bool = True,
+        trailing_stop_pct: float = 0.5,
+        tp_distances: Optional[Sequence[float]] = None,
+        skip_same_direction: bool = True,
+        stop_first: bool = False,
+        exit_on_signal: bool = False
+    ):
+        """
+        Initialize PortfolioBacktester
+
+        Args:
+            initial_capital: Starting capital
+            commission: Commission per trade (as fraction)
+            slippage: Slippage per trade (as fraction)
+            risk_per_trade: Risk per signal (as fraction of capital), split across its positions
+            max_positions: Max simultaneous positions
+            use_3_position_mode: Open 3 positions per signal (TP1/TP2/TP3, trailing after TP1)
+            trailing_stop_pct: Share of the profit given back by the Pos 2 & 3 trailing stop
+            tp_distances: TP1/TP2/TP3 distances in points (used when df has no tp1/tp2/tp3 columns)
+            skip_same_direction: Skip a signal while a position in the same direction is open
+            stop_first: Check SL before TP on the same candle (live bots check TP first)
+            exit_on_signal: Close positions on an opposite signal (as Backtester does)
+        """
+        super().__init__(initial_capital, commission, slippage, risk_per_trade)
+        self.max_positions = max_positions
+        self.use_3_position_mode = use_3_position_mode
+        self.trailing_stop_pct = trailing_stop_pct
+        self.tp_distances = tp_distances
+        self.skip_same_direction = skip_same_direction
+        self.stop_first = stop_first
+        self.exit_on_signal = exit_on_signal
+
+        self.book: Dict[str, np.ndarray] = {}
+
+    def _take_profit_levels(self, df: pd.DataFrame, candidates: np.ndarray,
+                            direction: np.ndarray, entry_prices: np.ndarray) -> np.ndarray:
+        """TP price of every position of every candidate signal, shape (signals, positions)"""
+        if not self.use_3_position_mode:
+            return df['take_profit'].to_numpy(dtype=float)[candidates, None]
+
+        if {'tp1', 'tp2', 'tp3'}.issubset(df.columns):
+            return np.column_stack([df[c].to_numpy(dtype=float)[candidates]
+                                    for c in ('tp1', 'tp2', 'tp3')])
+
+        if self.tp_distances is None:
+            raise ValueError("3-position mode needs tp1/tp2/tp3 columns or tp_distances")
+        distances = np.asarray(self.tp_distances, dtype=float)
+        return entry_prices[:, None] + direction[:, None] * distances[None, :]
+
+    def _resolve_exits(self, df: pd.DataFrame, candidates: np.ndarray, direction: np.ndarray,
+                       entry_prices: np.ndarray, stop_losses: np.ndarray,
+                       take_profits: np.ndarray) -> Dict[str, np.ndarray]:
+        """Exits of all candidate positions, flattened signal-major (signal k -> rows k*p .. k*p+p-1)"""
+        n_pos = take_profits.shape[1]
+        entry_idx = np.repeat(candidates, n_pos)
+        position_direction = np.repeat(direction, n_pos)
+        position_entry = np.repeat(entry_prices, n_pos)
+        position_sl = np.repeat(stop_losses, n_pos)
+        position_tp = take_profits.reshape(-1)
+
+        if n_pos == 1:
+            return simulate_exits(
+                df, entry_idx, position_direction, position_entry, position_sl,
+                take_profits=position_tp, stop_first=self.stop_first,
+                exit_on_signal=self.exit_on_signal
+            )
+
+        # Pos 2 & 3 trail behind the group's best price once price reaches TP1
+        tp1 = np.repeat(take_profits[:, 0], n_pos)
+        trailing = np.tile(np.arange(n_pos) > 0, len(candidates))
+        return simulate_exits(
+            df, entry_idx, position_direction, position_entry, position_sl,
+            take_profits=position_tp, trail_trigger=np.where(trailing, tp1, np.nan),
+            trail_giveback=self.trailing_stop_pct, trail_same_bar=True,
+            stop_first=self.stop_first, exit_on_signal=self.exit_on_signal
+        )
+
+    def run(self, df: pd.DataFrame) -> Dict:
+        """
+        Run portfolio backtest on data with signals
+
+        Args:
+            df: DataFrame with OHLC data and signals (tp1/tp2/tp3 columns optional)
+
+        Returns:
+            Dictionary with backtest results
+        """
+        self.capital = self.initial_capital
+        self.equity_curve = [self.initial_capital]
+        self.trades = []
+        self.current_trade = None
+
+        n = len(df)
+        signal = df['signal'].to_numpy()
+        close = df['close'].to_numpy(dtype=float)
+        candidates = np.flatnonzero(signal != 0)
+        direction = signal[candidates].astype(np.int64)
+        entry_prices = df['entry_price'].to_numpy(dtype=float)[candidates]
+        stop_losses = df['stop_loss'].to_numpy(dtype=float)[candidates]
+        take_profits = self._take_profit_levels(df, candidates, direction, entry_prices)
+
+        n_pos = take_profits.shape[1]
+        split = np.asarray(POSITION_SPLIT if n_pos == 3 else (1.0,) * n_pos, dtype=float)
+        exits = self._resolve_exits(df, candidates, direction, entry_prices, stop_losses, take_profits)
+
+        # Positions still open at the end are closed at the last close, after the last candle
+        still_open = exits['exit_idx'] < 0
+        release_bars = np.where(still_open, n, exits['exit_idx'])
+        exit_prices = np.where(still_open, close[-1], exits['exit_price'])
+
+        # Columnar position book: row r of every array is one opened position
+        rows = []
+        sizes = []
+        entry_fills = []
+        exit_fills = []
+        pnls = []
+        open_heap = []  # (exit_bar, row, direction) of the open positions
+        open_by_direction = {1: 0, -1: 0}
+        capital_change = np.zeros(n + 1)  # realized PnL per bar (n = closed at the end)
+
+        def release(until_bar):
+            """Realize every open position that exited on or before until_bar"""
+            while open_heap and open_heap[0][0] <= until_bar:
+                exit_bar, row, pos_direction = heapq.heappop(open_heap)
+                capital_before = self.capital
+                self.capital += pnls[row]
+                if exit_bar < n:  # no commission on the end-of-data close (as in Backtester)
+                    self.capital -= abs(pnls[row]) * self.commission
+                capital_change[exit_bar] += self.capital - capital_before
+                open_by_direction[pos_direction] -= 1
+
+        for k, i in enumerate(candidates):
+            release(i)
+
+            d = int(direction[k])
+            if self.skip_same_direction and open_by_direction[d] > 0:
+                continue
+            if len(open_heap) + n_pos > self.max_positions:
+                continue
+
+            # Total risk of the signal is split across its positions
+            total_size = self.calculate_position_size(entry_prices[k], stop_losses[k])
+            if not total_size > 0:
+                continue
+
+            entry_fill = self.apply_costs(entry_prices[k], d)
+            for p in range(n_pos):
+                candidate_row = k * n_pos + p
+                exit_fill = self.apply_costs(exit_prices[candidate_row], -d)
+                size = total_size * split[p]
+
+                row = len(rows)
+                rows.append(candidate_row)
+                sizes.append(size)
+                entry_fills.append(entry_fill)
+                exit_fills.append(exit_fill)
+                pnls.append(d * (exit_fill - entry_fill) * size)
+                heapq.heappush(open_heap, (release_bars[candidate_row], row, d))
+                open_by_direction[d] += 1
+
+        release(n)  # open positions are closed at the end
+
+        rows = np.asarray(rows, dtype=np.int64)
+        signal_idx = rows // n_pos
+        self.book = {
+            'group_id': signal_idx,
+            'position_num': rows % n_pos + 1,
+            'entry_idx': candidates[signal_idx],
+            'direction': direction[signal_idx],
+            'entry_price': np.asarray(entry_fills, dtype=float),
+            'stop_loss': stop_losses[signal_idx],
+            'take_profit': take_profits.reshape(-1)[rows],
+            'size': np.asarray(sizes, dtype=float),
+            'exit_idx': np.minimum(release_bars[rows], n - 1),
+            'exit_price': np.asarray(exit_fills, dtype=float),
+            'exit_reason': exits['exit_reason'][rows],
+            'still_open': still_open[rows],
+            'final_stop': exits['final_stop'][rows],
+            'pnl': np.asarray(pnls, dtype=float),
+        }
+
+        self.equity_curve.extend(self._equity(close, capital_change).tolist())
+        self.trades = self._book_trades(df)
+
+        stats = self.calculate_statistics(df)
+        stats['max_open_positions'] = self._max_open_positions(n)
+        return stats
+
+    def _equity(self, close: np.ndarray, capital_change: np.ndarray) -> np.ndarray:
+        """
+        Mark-to-market equity per candle
+
+        While a position is open (entry bar up to, not including, its exit bar)
+        it adds direction * size * (close - entry); the sums of direction * size
+        and direction * size * entry over the open positions are built with
+        cumulative sums of their changes at entry and exit bars.
+        """
+        n = len(close)
+        book = self.book
+        weight = book['direction'] * book['size']
+        open_until = np.where(book['still_open'], n, book['exit_idx'])
+
+        exposure = np.zeros(n + 1)
+        cost = np.zeros(n + 1)
+        np.add.at(exposure, book['entry_idx'], weight)
+        np.add.at(exposure, open_until, -weight)
+        np.add.at(cost, book['entry_idx'], weight * book['entry_price'])
+        np.add.at(cost, open_until, -weight * book['entry_price'])
+
+        realized = self.initial_capital + np.cumsum(capital_change[:n])
+        return realized + close * np.cumsum(exposure[:n]) - np.cumsum(cost[:n])
+
+    def _max_open_positions(self, n: int) -> int:
+        """Largest number of positions open on the same candle"""
+        if len(self.book['entry_idx']) == 0:
+            return 0
+        open_until = np.where(self.book['still_open'], n, self.book['exit_idx'])
+        count = np.zeros(n + 1, dtype=np.int64)
+        np.add.at(count, self.book['entry_idx'], 1)
+        np.add.at(count, open_until, -1)
+        return int(np.cumsum(count).max())
+
+    def _book_trades(self, df: pd.DataFrame) -> list:
+        """Trade objects of the book in exit order, for calculate_statistics"""
+        book = self.book
+        trades = []
+        for r in np.lexsort((np.arange(len(book['exit_idx'])), book['exit_idx'])):
+            trade = Trade(
+                entry_time=df.index[book['entry_idx'][r]],
+                entry_price=book['entry_price'][r],
+                direction=int(book['direction'][r]),
+                stop_loss=book['stop_loss'][r],
+                take_profit=book['take_profit'][r],
+                size=book['size'][r]
+            )
+            reason = 'end' if book['still_open'][r] else PORTFOLIO_EXIT_REASON_NAMES[book['exit_reason'][r]]
+            trade.close(df.index[book['exit_idx'][r]], book['exit_price'][r], reason)
+            trades.append(trade)
+        return trades
@@ -0,0 +1,229 @@
+"""
+Resampler
+Построение старших таймфреймов (H4/D1) из одного базового ряда (M15/H1)
+без повторной загрузки и без заглядывания в будущее
+"""
+
+import os
+import sys
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from market_data_store import TIMEFRAMES, infer_timeframe, normalize_timeframe, timeframe_ns, timeframe_origin
+
+# How each base column is combined into a higher timeframe bar
+AGGREGATIONS = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}
+
+
+def htf_timeframe(base_timeframe: str, multiplier: int) -> str:
+    """'H1' x 4 -> 'H4', 'M15' x 4 -> 'H1'"""
+    minutes = timeframe_ns(base_timeframe) // 60_000_000_000 * multiplier
+    return TIMEFRAMES.get(minutes, f'M{minutes}')
+
+
+def bucket_starts(times: np.ndarray, timeframe: str) -> np.ndarray:
+    """Open time (ns) of the higher timeframe bar containing each base bar"""
+    step = timeframe_ns(timeframe)
+    origin = timeframe_origin(timeframe)
+    return origin + (times - origin) // step * step
+
+
+def resample_ohlcv(df: pd.DataFrame, timeframe: str) -> pd.DataFrame:
+    """
+    Aggregate base bars into a higher timeframe
+
+    Same bars as df.resample(...).agg(first/max/min/last/sum).dropna(),
+    computed with reduceat over bucket boundaries.
+
+    Args:
+        df: Base OHLC(V) DataFrame with a sorted DatetimeIndex
+        timeframe: Target timeframe ('H4', '1d', ...)
+
+    Returns:
+        DataFrame indexed by bar open time with the aggregated columns of df
+        that appear in AGGREGATIONS and 'bars' (number of base bars)
+    """
+    timeframe = normalize_timeframe(timeframe)
+    columns = [c for c in AGGREGATIONS if c in df.columns]
+    if len(df) == 0:
+        empty = pd.DataFrame({c: np.array([], dtype=np.float64) for c in columns + ['bars']},
+                             index=pd.DatetimeIndex([], name=df.index.name))
+        return empty
+
+    times = df.index.as_unit('ns').asi8
+    buckets = bucket_starts(times, timeframe)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(df)] - 1
+
+    data = {}
+    for col in columns:
+        values = df[col].to_numpy()
+        how = AGGREGATIONS[col]
+        if how == 'first':
+            data[col] = values[starts]
+        elif how == 'last':
+            data[col] = values[ends]
+        elif how == 'max':
+            data[col] = np.maximum.reduceat(values, starts)
+        elif how == 'min':
+            data[col] = np.minimum.reduceat(values, starts)
+        else:
+            data[col] = np.add.reduceat(values, starts)
+    data['bars'] = ends - starts + 1
+
+    index = pd.DatetimeIndex(buckets[starts].view('datetime64[ns]'), name=df.index.name)
+    return pd.DataFrame(data, index=index)
+
+
+def align_to_ltf(ltf_index: pd.DatetimeIndex, df_htf: pd.DataFrame,
+                 ltf_timeframe: Optional[str] = None, htf_timeframe: Optional[str] = None,
+                 columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """
+    Higher timeframe values known at each base bar
+
+    A base bar sees the last higher timeframe bar that has closed by the
+    time the base bar closes (HTF open + HTF length <= LTF open + LTF length),
+    so an HTF bar never leaks into the base bars it is built from.
+
+    Args:
+        ltf_index: Base DatetimeIndex (bar open times)
+        df_htf: Higher timeframe DataFrame indexed by bar open time
+        ltf_timeframe: Base timeframe (default: inferred from ltf_index)
+        htf_timeframe: Higher timeframe (default: inferred from df_htf)
+        columns: HTF columns to align (default: all)
+
+    Returns:
+        DataFrame on ltf_index (NaN before the first closed HTF bar)
+    """
+    ltf_timeframe = ltf_timeframe or infer_timeframe(ltf_index)
+    htf_timeframe = htf_timeframe or infer_timeframe(df_htf.index)
+    df_htf = df_htf if columns is None else df_htf[list(columns)]
+
+    ltf_close = ltf_index.as_unit('ns').asi8 + timeframe_ns(ltf_timeframe)
+    htf_close = df_htf.index.as_unit('ns').asi8 + timeframe_ns(htf_timeframe)
+    pos = np.searchsorted(htf_close, ltf_close, side='right') - 1
+
+    aligned = df_htf.iloc[np.maximum(pos, 0)].set_axis(ltf_index, axis=0)
+    if (pos < 0).any():
+        aligned = aligned.where(pd.Series(pos >= 0, index=ltf_index), axis=0)
+    return aligned
+
+
+def forming_htf(df: pd.DataFrame, timeframe: str) -> pd.DataFrame:
+    """
+    The still-forming higher timeframe bar as of each base bar
+
+    Row i holds the HTF bar built from the base bars of its bucket up to and
+    including bar i - what a live bot sees right after bar i closes.
+
+    Args:
+        df: Base OHLC(V) DataFrame
+        timeframe: Higher timeframe
+
+    Returns:
+        DataFrame on df.index with the AGGREGATIONS columns of df
+    """
+    buckets = bucket_starts(df.index.as_unit('ns').asi8, normalize_timeframe(timeframe))
+    groups = df.groupby(buckets, sort=False)
+    result = {}
+    for col in (c for c in AGGREGATIONS if c in df.columns):
+        how = AGGREGATIONS[col]
+        if how == 'first':
+            result[col] = groups[col].transform('first')
+        elif how == 'last':
+            result[col] = df[col]
+        elif how == 'max':
+            result[col] = groups[col].cummax()
+        elif how == 'min':
+            result[col] = groups[col].cummin()
+        else:
+            result[col] = groups[col].cumsum()
+    return pd.DataFrame(result, index=df.index)
+
+
+class ResamplingEngine:
+    """
+    Higher timeframe bars maintained from a stream of closed base bars
+
+    update() takes the newly closed base bars and returns the HTF bars they
+    completed. Only the base bars of each open HTF bucket are kept, so one
+    update costs O(new bars + bars per bucket), not O(history).
+
+    Usage:
+        engine = ResamplingEngine('H1', ['H4', 'D1'])
+        engine.update(history_df)
+        completed = engine.update(new_bar)    # {'H4': DataFrame, 'D1': DataFrame}
+        engine.bars('H4')                     # all closed H4 bars
+        engine.forming('D1')                  # today's partial D1 bar
+    """
+
+    def __init__(self, base_timeframe: str, timeframes: Iterable[str], max_bars: Optional[int] = None):
+        """
+        Initialize engine
+
+        Args:
+            base_timeframe: Timeframe of the incoming bars
+            timeframes: Higher timeframes to maintain
+            max_bars: Closed HTF bars kept per timeframe (default: all)
+        """
+        self.base_timeframe = normalize_timeframe(base_timeframe)
+        self.timeframes: List[str] = [normalize_timeframe(tf) for tf in timeframes]
+        self.max_bars = max_bars
+        self._base_step = timeframe_ns(self.base_timeframe)
+        for tf in self.timeframes:
+            if timeframe_ns(tf) % self._base_step:
+                raise ValueError(f"{tf} is not a multiple of {self.base_timeframe}")
+        self._closed: Dict[str, Optional[pd.DataFrame]] = {tf: None for tf in self.timeframes}
+        self._open: Dict[str, Optional[pd.DataFrame]] = {tf: None for tf in self.timeframes}
+
+    def update(self, bars: Union[pd.DataFrame, pd.Series]) -> Dict[str, pd.DataFrame]:
+        """
+        Add closed base bars
+
+        Args:
+            bars: DataFrame of new base bars, or one bar as a Series named by its time
+
+        Returns:
+            {timeframe: HTF bars completed by these base bars}
+        """
+        if isinstance(bars, pd.Series):
+            bars = bars.to_frame().T
+        if not len(bars):
+            # Nothing new: open buckets stay as they are
+            return {tf: resample_ohlcv(pd.DataFrame(columns=list(AGGREGATIONS)), tf) for tf in self.timeframes}
+        bars = bars[[c for c in AGGREGATIONS if c in bars.columns]].astype(np.float64)
+        bars.index = pd.DatetimeIndex(bars.index, name='datetime').as_unit('ns')
+        last_close = bars.index[-1].value + self._base_step
+
+        completed = {}
+        for tf in self.timeframes:
+            chunk = bars if self._open[tf] is None else pd.concat([self._open[tf], bars])
+            htf = resample_ohlcv(chunk, tf)
+            done = len(htf)
+            if done and htf.index[-1].value + timeframe_ns(tf) > last_close:
+                done -= 1  # last bucket still forming
+                self._open[tf] = chunk.iloc[len(chunk) - int(htf['bars'].iloc[-1]):]
+            else:
+                self._open[tf] = None
+
+            completed[tf] = htf.iloc[:done]
+            if done:
+                closed = completed[tf] if self._closed[tf] is None else pd.concat([self._closed[tf], completed[tf]])
+                self._closed[tf] = closed if self.max_bars is None else closed.iloc[-self.max_bars:]
+        return completed
+
+    def bars(self, timeframe: str) -> pd.DataFrame:
+        """Closed bars of a maintained timeframe"""
+        closed = self._closed[normalize_timeframe(timeframe)]
+        return closed if closed is not None else resample_ohlcv(pd.DataFrame(columns=list(AGGREGATIONS)), timeframe)
+
+    def forming(self, timeframe: str) -> Optional[pd.Series]:
+        """The open (partial) bar of a maintained timeframe, None right after a bucket closed"""
+        pending = self._open[normalize_timeframe(timeframe)]
+        if pending is None:
+            return None
+        return resample_ohlcv(pending, timeframe).iloc[-1]
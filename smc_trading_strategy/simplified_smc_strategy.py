@@ -12,6 +12,7 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from smc_indicators import SMCIndicators
 from volume_analysis import VolumeAnalyzer
+from indicator_cache import get_shared_cache, params_key, run_cached
 from typing import Dict
 
 
@@ -50,27 +51,42 @@ class SimplifiedSMCStrategy:
         self.volume_lookback = volume_lookback
         self.min_candle_quality = min_candle_quality
 
+        # Score only the last N candles (None = whole frame), set by streaming engines
+        self.eval_last_n = None
+
+        # Indicator stages are memoized by (OHLCV fingerprint, parameters); None disables
+        self.indicator_cache = get_shared_cache()
+
+        # True = run_strategy() writes its columns into the caller's frame instead of a copy
+        self.copy_free = False
+
         # Initialize components
         self.smc = SMCIndicators(swing_length=swing_length)
         self.volume_analyzer = VolumeAnalyzer(volume_ma_period=20)
 
-    def generate_signals(self, df: pd.DataFrame) -> pd.DataFrame:
+    def generate_signals(self, df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
         """
         Generate trading signals based on pure SMC + Volume
 
         Args:
             df: DataFrame with OHLCV data
+            copy: Copy df first (False = write columns into df in place)
 
         Returns:
             DataFrame with signals
         """
-        df = df.copy()
+        if copy:
+            df = df.copy()
 
         # Apply SMC indicators
-        df = self.smc.apply_all_indicators(df)
+        df = run_cached(self.indicator_cache, df, 'smc', params_key(self.smc),
+                        lambda data: self.smc.apply_all_indicators(data, copy=False),
+                        copy=False)
 
         # Apply volume metrics
-        df = self.volume_analyzer.calculate_volume_metrics(df)
+        df = run_cached(self.indicator_cache, df, 'volume', params_key(self.volume_analyzer),
+                        lambda data: self.volume_analyzer.calculate_volume_metrics(data, copy=False),
+                        copy=False)
 
         # Initialize signal columns
         df['signal'] = 0
@@ -81,7 +97,7 @@ class SimplifiedSMCStrategy:
         df['signal_reason'] = ''
 
         # Generate signals
-        for i in range(self.swing_length + 20, len(df)):
+        for i in range(self._signal_start(df, self.swing_length + 20), len(df)):
             # Get current trend from market structure
             current_trend = df['trend'].iloc[i]
 
@@ -122,6 +138,24 @@ class SimplifiedSMCStrategy:
 
         return df
 
+    def _signal_start(self, df: pd.DataFrame, default_start: int = 0) -> int:
+        """
+        First bar scored by the signal loops
+
+        Signal rules only look back a bounded number of candles, so scoring just
+        the last eval_last_n candles gives the same result for them as a full pass.
+
+        Args:
+            df: DataFrame being scored
+            default_start: First bar the loop would use on a full pass
+
+        Returns:
+            Start index for the loop
+        """
+        if self.eval_last_n is None:
+            return default_start
+        return max(default_start, len(df) - self.eval_last_n)
+
     def _check_long_entry(self, df: pd.DataFrame, idx: int) -> tuple:
         """
         Check for long entry conditions
@@ -278,10 +312,25 @@ class SimplifiedSMCStrategy:
         """
         Run complete simplified SMC strategy
 
+        The input is copied once (not at all with copy_free=True) and every
+        layer's _run_pipeline() adds its columns to that single frame.
+
         Args:
             df: DataFrame with OHLCV data
 
         Returns:
             DataFrame with signals
         """
-        return self.generate_signals(df)
+        if not self.copy_free:
+            df = df.copy()
+
+        return self._run_pipeline(df)
+
+    def _run_pipeline(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Strategy stages on the working frame (modified in place)
+
+        Subclasses extend this instead of run_strategy() so the whole chain
+        shares one frame.
+        """
+        return self.generate_signals(df, copy=False)
@@ -0,0 +1,690 @@
+"""
+Parameter Sweep
+Параллельный перебор параметров стратегии и бэктеста: сетка, случайный поиск или
+байесовский (optuna), OHLCV в общей памяти, результаты в SQLite с возобновлением
+"""
+
+import argparse
+import contextlib
+import hashlib
+import inspect
+import io
+import itertools
+import json
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+from multiprocessing import shared_memory
+from typing import Dict, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from indicator_cache import IndicatorCache
+from market_data_store import load_csv_cached
+
+try:
+    import optuna
+    OPTUNA_AVAILABLE = True
+except ImportError:
+    OPTUNA_AVAILABLE = False
+
+SEARCH_MODES = ('grid', 'random', 'bayes')
+
+# TP1/TP2/TP3 of the live bots' RANGE mode (portfolio target default)
+DEFAULT_TP_DISTANCES = (20, 35, 50)
+
+# status column of the results table
+STATUS_OK = 'ok'
+STATUS_ERROR = 'error'
+
+
+# ------------------------------------------------------------------
+# OHLCV in shared memory
+# ------------------------------------------------------------------
+
+class SharedFrame:
+    """
+    DataFrame columns published in one shared memory block
+
+    The parent copies the index and every numeric column into the block once;
+    workers attach by name and get read-only numpy views, so the candles are
+    neither pickled per task nor duplicated per process.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        """
+        Publish a DataFrame
+
+        Args:
+            df: DataFrame with DatetimeIndex and numeric/bool columns
+        """
+        arrays = [('__index__', np.ascontiguousarray(df.index.as_unit('ns').asi8))]
+        arrays += [(col, np.ascontiguousarray(df[col].to_numpy())) for col in df.columns
+                   if df[col].dtype.kind in 'biuf']
+
+        layout = []
+        offset = 0
+        for name, values in arrays:
+            layout.append((name, values.dtype.str, offset))
+            offset += -(-values.nbytes // 8) * 8  # keep every column 8-byte aligned
+
+        self.shm = shared_memory.SharedMemory(create=True, size=max(offset, 8))
+        for (name, dtype, start), (_, values) in zip(layout, arrays):
+            np.ndarray(values.shape, dtype=dtype, buffer=self.shm.buf, offset=start)[:] = values
+
+        self.spec = {'name': self.shm.name, 'rows': len(df), 'layout': layout, 'unit': df.index.unit}
+
+    @staticmethod
+    def attach(spec: Dict):
+        """
+        Rebuild the DataFrame from a spec (in a worker)
+
+        Returns:
+            (DataFrame, SharedMemory) - keep the SharedMemory alive as long as the frame
+        """
+        shm = shared_memory.SharedMemory(name=spec['name'])
+        columns = {}
+        index = None
+        for name, dtype, start in spec['layout']:
+            values = np.ndarray(spec['rows'], dtype=dtype, buffer=shm.buf, offset=start)
+            values.flags.writeable = False
+            if name == '__index__':
+                index = pd.DatetimeIndex(values.view('datetime64[ns]'), name='datetime').as_unit(spec['unit'])
+            else:
+                columns[name] = values
+        return pd.DataFrame(columns, index=index, copy=False), shm
+
+    def close(self):
+        """Release and remove the block (parent only)"""
+        self.shm.close()
+        self.shm.unlink()
+
+
+# ------------------------------------------------------------------
+# Sweep targets: (df, strategy, backtest params) -> metrics
+# ------------------------------------------------------------------
+
+def _build(cls, params: Dict):
+    """
+    Instantiate cls from sweep parameters
+
+    Constructor arguments are passed as keywords; any other name is set as an
+    existing attribute afterwards (dotted names walk into sub-objects, e.g.
+    gold_filters.causal_sr_levels).
+    """
+    accepted = inspect.signature(cls.__init__).parameters
+    obj = cls(**{k: v for k, v in params.items() if k in accepted})
+
+    for name, value in params.items():
+        if name in accepted:
+            continue
+        *path, attr = name.split('.')
+        owner = obj
+        for part in path:
+            owner = getattr(owner, part)
+        if not hasattr(owner, attr):
+            raise AttributeError(f"{cls.__name__} has no parameter '{name}'")
+        setattr(owner, attr, value)
+    return obj
+
+
+def build_strategy(params: Dict):
+    """PatternRecognitionStrategy from 'strategy.*' sweep parameters (prefix stripped)"""
+    from pattern_recognition_strategy import PatternRecognitionStrategy
+    return _build(PatternRecognitionStrategy, params)
+
+
+def run_v3_target(df: pd.DataFrame, strategy, backtest_params: Dict, with_equity: bool = False):
+    """AdaptiveBacktestV3 (regime TP/trailing/timeout, points-based PnL)"""
+    from backtest_v3_adaptive import AdaptiveBacktestV3
+
+    backtest = _build(AdaptiveBacktestV3, backtest_params)
+    trades = backtest.backtest(df, strategy)
+    if trades is None:
+        metrics = {'total_trades': 0, 'total_return_pct': 0.0, 'win_rate': 0.0,
+                   'profit_factor': 0.0, 'max_drawdown': 0.0}
+        return (metrics, pd.Series(1.0, index=df.index[:1])) if with_equity else metrics
+
+    pnl = trades['pnl_pct']
+    losses = pnl[pnl < 0].sum()
+    cumulative = pnl.cumsum()
+    metrics = {
+        'total_trades': len(trades),
+        'total_return_pct': float(pnl.sum()),
+        'win_rate': float((pnl > 0).mean() * 100),
+        'profit_factor': float(abs(pnl[pnl > 0].sum() / losses)) if losses != 0 else 0.0,
+        'max_drawdown': float((cumulative - cumulative.cummax()).min()),
+    }
+    if not with_equity:
+        return metrics
+    # Trade PnL in % adds up (no compounding), marked at the exit times
+    equity = pd.Series(1.0 + cumulative.to_numpy() / 100, index=pd.DatetimeIndex(trades['exit_time']))
+    return metrics, pd.concat([pd.Series(1.0, index=df.index[:1]), equity])
+
+
+def _stats_metrics(stats: Dict) -> Dict:
+    """Summary metrics of a Backtester statistics dict"""
+    keys = ('total_trades', 'total_return_pct', 'win_rate', 'profit_factor', 'max_drawdown',
+            'sharpe_ratio')
+    return {k: float(stats.get(k, 0.0)) for k in keys}
+
+
+def _backtester_equity(backtester, df: pd.DataFrame) -> pd.Series:
+    """Equity curve per candle relative to the initial capital"""
+    return pd.Series(np.asarray(backtester.equity_curve[1:]) / backtester.initial_capital, index=df.index)
+
+
+def run_portfolio_target(df: pd.DataFrame, strategy, backtest_params: Dict, with_equity: bool = False):
+    """PortfolioBacktester (live bot 3-position mode by default)"""
+    from portfolio_backtester import PortfolioBacktester
+
+    backtest_params = {'tp_distances': DEFAULT_TP_DISTANCES, **backtest_params}
+    backtester = _build(PortfolioBacktester, backtest_params)
+    stats = backtester.run(strategy.run_strategy(df))
+    metrics = _stats_metrics(stats)
+    metrics['max_open_positions'] = float(stats.get('max_open_positions', 0))
+    return (metrics, _backtester_equity(backtester, df)) if with_equity else metrics
+
+
+def run_backtester_target(df: pd.DataFrame, strategy, backtest_params: Dict, with_equity: bool = False):
+    """Backtester (one position at a time)"""
+    from backtester import Backtester
+
+    backtester = _build(Backtester, backtest_params)
+    metrics = _stats_metrics(backtester.run(strategy.run_strategy(df)))
+    return (metrics, _backtester_equity(backtester, df)) if with_equity else metrics
+
+
+SWEEP_TARGETS = {
+    'v3': run_v3_target,
+    'portfolio': run_portfolio_target,
+    'backtester': run_backtester_target,
+}
+
+
+def split_params(params: Dict):
+    """{'strategy.x': 1, 'backtest.y': 2} -> ({'x': 1}, {'y': 2})"""
+    strategy_params, backtest_params = {}, {}
+    for name, value in params.items():
+        scope, _, key = name.partition('.')
+        if scope == 'strategy':
+            strategy_params[key] = value
+        elif scope == 'backtest':
+            backtest_params[key] = value
+        else:
+            raise ValueError(f"Parameter '{name}' must start with 'strategy.' or 'backtest.'")
+    return strategy_params, backtest_params
+
+
+def evaluate(df: pd.DataFrame, target: str, params: Dict, strategy=None, with_equity: bool = False):
+    """
+    Run one configuration
+
+    Args:
+        df: OHLCV DataFrame
+        target: Backtest to run (key of SWEEP_TARGETS)
+        params: 'strategy.*' / 'backtest.*' parameters
+        strategy: Object with run_strategy(df) used instead of building one from
+            the strategy.* parameters (e.g. precomputed signals)
+        with_equity: Also return the equity curve (relative to the start)
+
+    Returns:
+        Metrics dict, or (metrics, equity Series) with with_equity
+        (output of the target's prints is discarded)
+    """
+    strategy_params, backtest_params = split_params(params)
+    with contextlib.redirect_stdout(io.StringIO()):
+        if strategy is None:
+            strategy = build_strategy(strategy_params)
+        return SWEEP_TARGETS[target](df, strategy, backtest_params, with_equity)
+
+
+_worker_df = None
+_worker_shm = None
+
+
+def _init_worker(spec: Dict):
+    """Pool initializer: attach the shared candles once per process"""
+    global _worker_df, _worker_shm
+    _worker_df, _worker_shm = SharedFrame.attach(spec)
+
+
+def _run_config(target: str, params: Dict) -> Dict:
+    """Pool task: evaluate one configuration, errors are returned instead of raised"""
+    start = time.perf_counter()
+    try:
+        metrics, error = evaluate(_worker_df, target, params), None
+    except Exception as e:
+        metrics, error = {}, f"{type(e).__name__}: {e}"
+    return {'metrics': metrics, 'error': error, 'elapsed': time.perf_counter() - start}
+
+
+# ------------------------------------------------------------------
+# Search spaces
+# ------------------------------------------------------------------
+
+def grid_configs(space: Dict) -> Iterator[Dict]:
+    """
+    Every combination of the space
+
+    Args:
+        space: {name: [values]} or {name: {'low', 'high', 'step'}} (range, both ends included)
+    """
+    names = list(space)
+    axes = []
+    for name in names:
+        values = space[name]
+        if isinstance(values, dict):
+            if 'step' not in values:
+                raise ValueError(f"Grid search needs a step for range parameter '{name}'")
+            values = np.arange(values['low'], values['high'] + values['step'] / 2, values['step'])
+            values = [v.item() for v in values]
+        axes.append(values)
+    for combo in itertools.product(*axes):
+        yield dict(zip(names, combo))
+
+
+def _sample(rng: np.random.Generator, values):
+    """One random value of a parameter (list = choice, dict = uniform/log-uniform range)"""
+    if not isinstance(values, dict):
+        return values[rng.integers(len(values))]
+    low, high = values['low'], values['high']
+    if values.get('step'):
+        steps = int(round((high - low) / values['step']))
+        return low + values['step'] * int(rng.integers(steps + 1))
+    if values.get('log'):
+        value = float(np.exp(rng.uniform(np.log(low), np.log(high))))
+    else:
+        value = float(rng.uniform(low, high))
+    return int(round(value)) if isinstance(low, int) and isinstance(high, int) else value
+
+
+def random_configs(space: Dict, trials: int, seed: int = 0) -> Iterator[Dict]:
+    """`trials` random configurations, reproducible for a given seed"""
+    rng = np.random.default_rng(seed)
+    for _ in range(trials):
+        yield {name: _sample(rng, values) for name, values in space.items()}
+
+
+def _distribution(values):
+    """Optuna distribution of one parameter"""
+    if not isinstance(values, dict):
+        return optuna.distributions.CategoricalDistribution(values)
+    low, high = values['low'], values['high']
+    if isinstance(low, int) and isinstance(high, int) and not values.get('log'):
+        return optuna.distributions.IntDistribution(low, high, step=int(values.get('step') or 1))
+    return optuna.distributions.FloatDistribution(low, high, step=values.get('step'),
+                                                  log=bool(values.get('log')))
+
+
+def parse_value(text: str):
+    """'20' -> 20, '0.5' -> 0.5, 'true' -> True, anything else stays a string"""
+    lowered = text.strip().lower()
+    if lowered in ('true', 'false'):
+        return lowered == 'true'
+    for cast in (int, float):
+        try:
+            return cast(text)
+        except ValueError:
+            pass
+    return text.strip()
+
+
+def parse_param(spec: str):
+    """
+    Parse a --param option
+
+    Formats:
+        name=a,b,c           values
+        name=low:high:step   range with step (grid and random)
+        name=low~high        continuous range (random and bayes)
+    """
+    name, _, values = spec.partition('=')
+    if not values:
+        raise ValueError(f"Bad --param '{spec}' (expected name=values)")
+    if '~' in values:
+        low, high = values.split('~')
+        return name, {'low': parse_value(low), 'high': parse_value(high)}
+    if values.count(':') == 2:
+        low, high, step = (parse_value(v) for v in values.split(':'))
+        return name, {'low': low, 'high': high, 'step': step}
+    return name, [parse_value(v) for v in values.split(',')]
+
+
+# ------------------------------------------------------------------
+# Results table
+# ------------------------------------------------------------------
+
+class SweepResults:
+    """
+    SQLite table of finished configurations
+
+    One row per (target, data, params) with its status; configurations that
+    finished without an error are skipped when a sweep is started again on the
+    same file and data, failed ones are run again.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS sweep_results (
+                config_id TEXT PRIMARY KEY,
+                target TEXT NOT NULL,
+                data_id TEXT NOT NULL,
+                params TEXT NOT NULL,
+                metrics TEXT,
+                score REAL,
+                error TEXT,
+                elapsed REAL,
+                created_at TEXT,
+                status TEXT
+            )
+        """)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(sweep_results)")}
+        if 'status' not in columns:
+            # Files written before the status column: a stored error means the run failed
+            self.conn.execute("ALTER TABLE sweep_results ADD COLUMN status TEXT")
+            self.conn.execute("UPDATE sweep_results SET status = CASE WHEN error IS NULL THEN ? ELSE ? END",
+                              (STATUS_OK, STATUS_ERROR))
+        self.conn.commit()
+
+    @staticmethod
+    def config_id(target: str, data_id: str, params: Dict) -> str:
+        """Stable id of a configuration"""
+        key = json.dumps({'target': target, 'data': data_id, 'params': params}, sort_keys=True)
+        return hashlib.sha1(key.encode()).hexdigest()
+
+    def done(self, target: str, data_id: str) -> Dict[str, Dict]:
+        """{config_id: row} of the configurations that finished without an error"""
+        rows = self.conn.execute(
+            "SELECT config_id, params, metrics, error FROM sweep_results "
+            "WHERE target = ? AND data_id = ? AND status = ?",
+            (target, data_id, STATUS_OK)
+        )
+        return {cid: {'params': json.loads(params), 'metrics': json.loads(metrics or '{}'), 'error': error}
+                for cid, params, metrics, error in rows}
+
+    def add(self, config_id: str, target: str, data_id: str, params: Dict, result: Dict,
+            score: Optional[float]):
+        """Store one finished configuration (committed immediately, replaces an earlier failed run)"""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO sweep_results (config_id, target, data_id, params, metrics, score, "
+            "error, elapsed, created_at, status) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (config_id, target, data_id, json.dumps(params, sort_keys=True),
+             json.dumps(result['metrics']), score, result['error'], result['elapsed'],
+             datetime.now().isoformat(timespec='seconds'), STATUS_ERROR if result['error'] else STATUS_OK)
+        )
+        self.conn.commit()
+
+    def to_frame(self, target: Optional[str] = None) -> pd.DataFrame:
+        """One row per configuration with params and metrics expanded into columns"""
+        query = "SELECT * FROM sweep_results"
+        args = ()
+        if target:
+            query += " WHERE target = ?"
+            args = (target,)
+        rows = pd.read_sql_query(query, self.conn, params=args)
+        if len(rows) == 0:
+            return rows
+        params = pd.json_normalize([json.loads(p) for p in rows['params']], max_level=0)
+        metrics = pd.json_normalize([json.loads(m or '{}') for m in rows['metrics']], max_level=0)
+        return pd.concat([rows.drop(columns=['params', 'metrics']), params, metrics], axis=1)
+
+    def export(self, path: str, target: Optional[str] = None):
+        """Write the table to .parquet (needs pyarrow) or .csv"""
+        frame = self.to_frame(target)
+        if path.endswith('.parquet'):
+            frame.to_parquet(path, index=False)
+        else:
+            frame.to_csv(path, index=False)
+
+    def close(self):
+        self.conn.close()
+
+
+# ------------------------------------------------------------------
+# Sweep runner
+# ------------------------------------------------------------------
+
+def load_data(path: str) -> pd.DataFrame:
+    """OHLCV CSV (parsed once, then read from the local market data store)"""
+    df = load_csv_cached(path)
+
+    if 'is_active' not in df.columns:
+        df['is_london'] = df.index.hour.isin(range(7, 12))
+        df['is_ny'] = df.index.hour.isin(range(13, 20))
+        df['is_active'] = df['is_london'] | df['is_ny']
+    return df
+
+
+def _score(metrics: Dict, metric: str, error: Optional[str]) -> Optional[float]:
+    if error or metric not in metrics:
+        return None
+    return float(metrics[metric])
+
+
+def run_sweep(
+    df: pd.DataFrame,
+    space: Dict,
+    target: str = 'v3',
+    search: str = 'grid',
+    trials: int = 50,
+    workers: Optional[int] = None,
+    results_path: str = 'sweep_results.db',
+    metric: str = 'total_return_pct',
+    minimize: bool = False,
+    seed: int = 0
+) -> pd.DataFrame:
+    """
+    Run a parameter sweep over a process pool
+
+    Args:
+        df: OHLCV DataFrame (published once in shared memory)
+        space: {'strategy.<name>' | 'backtest.<name>': values or range dict}
+        target: Backtest to run (key of SWEEP_TARGETS)
+        search: 'grid', 'random' or 'bayes' (needs optuna)
+        trials: Number of configurations for random/bayes search
+        workers: Worker processes (default: CPU count)
+        results_path: SQLite results file; configurations that finished without an
+            error are skipped, failed ones are run again
+        metric: Metric to optimize (bayes) and sort by
+        minimize: Lower metric is better
+        seed: Random seed for random/bayes search
+
+    Returns:
+        DataFrame of all results of this target and data, best first
+    """
+    if target not in SWEEP_TARGETS:
+        raise ValueError(f"Unknown target '{target}' (choose from {', '.join(SWEEP_TARGETS)})")
+    if search not in SEARCH_MODES:
+        raise ValueError(f"Unknown search '{search}' (choose from {', '.join(SEARCH_MODES)})")
+    if search == 'bayes' and not OPTUNA_AVAILABLE:
+        raise ImportError("Bayesian search needs optuna (pip install optuna)")
+    for name in space:
+        split_params({name: None})
+
+    workers = workers or os.cpu_count() or 1
+    data_id = IndicatorCache.fingerprint(df)
+    results = SweepResults(results_path)
+    done = results.done(target, data_id)
+
+    if search == 'grid':
+        configs = grid_configs(space)
+    elif search == 'random':
+        configs = random_configs(space, trials, seed)
+    else:
+        configs = None
+
+    print(f"\n🔬 Sweep: {target}, {search} search, {workers} workers")
+    print(f"   Data: {len(df)} candles ({data_id[:8]}), results: {results_path}")
+    if done:
+        print(f"   Resuming: {len(done)} configurations already finished")
+
+    shared = SharedFrame(df)
+    finished = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(shared.spec,)) as pool:
+            if configs is not None:
+                finished = _run_configs(pool, configs, workers, target, data_id, done, results,
+                                        metric)
+            else:
+                finished = _run_bayes(pool, space, trials, workers, target, data_id, done,
+                                      results, metric, minimize, seed)
+    finally:
+        shared.close()
+
+    frame = results.to_frame(target)
+    results.close()
+    if len(frame):
+        frame = frame[frame['data_id'] == data_id]
+        frame = frame.sort_values('score', ascending=minimize, na_position='last')
+    print(f"\n✅ Sweep finished: {finished} new configurations, {len(frame)} in total")
+    return frame.reset_index(drop=True)
+
+
+def _run_configs(pool, configs, workers, target, data_id, done, results, metric) -> int:
+    """Stream grid/random configurations through the pool, at most 2 per worker in flight"""
+    pending = {}
+    finished = 0
+    configs = iter(configs)
+    seen = set()
+
+    def submit_next():
+        for params in configs:
+            config_id = SweepResults.config_id(target, data_id, params)
+            if config_id in done or config_id in seen:
+                continue
+            seen.add(config_id)
+            pending[pool.submit(_run_config, target, params)] = (config_id, params)
+            return True
+        return False
+
+    while len(pending) < workers * 2 and submit_next():
+        pass
+    while pending:
+        completed, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in completed:
+            config_id, params = pending.pop(future)
+            result = future.result()
+            results.add(config_id, target, data_id, params, result,
+                        _score(result['metrics'], metric, result['error']))
+            finished += 1
+            _print_progress(finished, params, result, metric)
+            submit_next()
+    return finished
+
+
+def _run_bayes(pool, space, trials, workers, target, data_id, done, results, metric,
+               minimize, seed) -> int:
+    """Optuna ask/tell loop with up to `workers` trials evaluated at once"""
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    study = optuna.create_study(direction='minimize' if minimize else 'maximize',
+                                sampler=optuna.samplers.TPESampler(seed=seed))
+
+    # Warm-start from the finished configurations of earlier runs
+    distributions = {name: _distribution(values) for name, values in space.items()}
+    for row in done.values():
+        score = _score(row['metrics'], metric, row['error'])
+        if score is None or set(row['params']) != set(distributions):
+            continue
+        try:
+            study.add_trial(optuna.trial.create_trial(params=row['params'], distributions=distributions,
+                                                      value=score))
+        except ValueError:
+            continue  # outside the current space
+
+    pending = {}
+    finished = 0
+    asked = 0
+    while asked < trials or pending:
+        while asked < trials and len(pending) < workers:
+            trial = study.ask(distributions)
+            params = dict(trial.params)
+            pending[pool.submit(_run_config, target, params)] = (trial, params)
+            asked += 1
+
+        completed, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in completed:
+            trial, params = pending.pop(future)
+            result = future.result()
+            score = _score(result['metrics'], metric, result['error'])
+            results.add(SweepResults.config_id(target, data_id, params), target, data_id, params,
+                        result, score)
+            if score is None:
+                study.tell(trial, state=optuna.trial.TrialState.FAIL)
+            else:
+                study.tell(trial, score)
+            finished += 1
+            _print_progress(finished, params, result, metric)
+    return finished
+
+
+def _print_progress(finished: int, params: Dict, result: Dict, metric: str):
+    if result['error']:
+        print(f"   #{finished} ❌ {params} -> {result['error']}")
+    else:
+        value = result['metrics'].get(metric, float('nan'))
+        print(f"   #{finished} {params} -> {metric}={value:.2f} ({result['elapsed']:.1f}s)")
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description='Parallel parameter sweep')
+    parser.add_argument('--file', type=str, help='CSV file with OHLCV data')
+    parser.add_argument('--target', choices=list(SWEEP_TARGETS), default='v3', help='Backtest to run')
+    parser.add_argument('--search', choices=SEARCH_MODES, default='grid', help='Search mode')
+    parser.add_argument('--param', action='append', default=[],
+                        help="strategy.<name>=a,b,c | backtest.<name>=low:high:step | name=low~high")
+    parser.add_argument('--space', type=str, help='JSON file {name: [values] or {low, high, step, log}}')
+    parser.add_argument('--trials', type=int, default=50, help='Configurations for random/bayes search')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--results', type=str, default='sweep_results.db', help='SQLite results file')
+    parser.add_argument('--metric', type=str, default='total_return_pct', help='Metric to optimize')
+    parser.add_argument('--minimize', action='store_true', help='Lower metric is better')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    parser.add_argument('--top', type=int, default=10, help='Best configurations to print')
+    parser.add_argument('--export', type=str, help='Also write the results to .parquet or .csv')
+    args = parser.parse_args()
+
+    space = {}
+    if args.space:
+        with open(args.space) as f:
+            space.update(json.load(f))
+    space.update(parse_param(p) for p in args.param)
+
+    if space:
+        if not args.file:
+            parser.error('--file is required to run a sweep')
+        print(f"\n📂 Loading data from {args.file}...")
+        frame = run_sweep(load_data(args.file), space, target=args.target, search=args.search,
+                          trials=args.trials, workers=args.workers, results_path=args.results,
+                          metric=args.metric, minimize=args.minimize, seed=args.seed)
+    else:
+        # No space: show the stored results
+        results = SweepResults(args.results)
+        frame = results.to_frame(args.target)
+        results.close()
+        if len(frame):
+            frame = frame.sort_values('score', ascending=args.minimize, na_position='last')
+
+    if len(frame):
+        print(f"\n🏆 Top {args.top} by {args.metric}:")
+        print(frame.drop(columns=['config_id', 'data_id', 'created_at']).head(args.top).to_string(index=False))
+
+    if args.export:
+        results = SweepResults(args.results)
+        results.export(args.export, args.target)
+        results.close()
+        print(f"\n💾 Results exported to {args.export}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Tests for the candle repository
+Проверяет кэширование свечей: повторный запрос не идет в сеть, пропуски дозагружаются
+"""
+
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from candle_repository import CandleRepository, CcxtCandleSource, MT5CandleSource
+from market_data_store import MarketDataStore
+
+HOUR_MS = 3_600_000
+
+
+class FakeExchange:
+    """Offline stand-in for ccxt.binance: deterministic 1h candles, optional outage"""
+
+    id = 'fake'
+
+    def __init__(self, now, outage=None):
+        self.now = now
+        self.outage = outage  # (start, end) with no candles
+        self.requests = []
+
+    def candle(self, ts):
+        price = 100.0 + np.sin(ts / HOUR_MS / 10.0) * 5
+        return [ts, price, price + 1, price - 1, price + 0.5, 10.0 + ts % 7]
+
+    def fetch_ohlcv(self, symbol, timeframe, since=None, limit=1000):
+        assert timeframe == '1h'
+        self.requests.append(since)
+        now_ms = self.now().value // 1_000_000
+        ts = -(-since // HOUR_MS) * HOUR_MS
+        candles = []
+        while ts <= now_ms and len(candles) < limit:
+            in_outage = self.outage and self.outage[0].value // 1_000_000 <= ts <= self.outage[1].value // 1_000_000
+            if not in_outage:
+                candles.append(self.candle(ts))
+            ts += HOUR_MS
+        return candles
+
+
+class FakeMT5:
+    """Offline stand-in for the MetaTrader5 module: bars in server time (UTC+3), optional failure"""
+
+    TIMEFRAME_H1 = 16385
+    OFFSET = 3 * 3600
+
+    def __init__(self, now):
+        self.now = now
+        self.fail = False
+        self.available_until = None  # Terminal history not synced past this (server time)
+        self.requests = []
+
+    def server_seconds(self):
+        return self.now().value // 1_000_000_000 + self.OFFSET
+
+    def symbol_info_tick(self, symbol):
+        return type('Tick', (), {'time': self.server_seconds() - 2})()
+
+    def last_error(self):
+        return (-10004, 'No IPC connection')
+
+    def copy_rates_range(self, symbol, timeframe, date_from, date_to):
+        self.requests.append((date_from, date_to))
+        if self.fail:
+            return None
+        last = min(int(date_to.timestamp()), self.server_seconds())
+        if self.available_until is not None:
+            last = min(last, int(self.available_until.timestamp()))
+        times = np.arange(-(-int(date_from.timestamp()) // 3600) * 3600, last + 1, 3600)
+        rates = np.zeros(len(times), dtype=[('time', 'i8'), ('open', 'f8'), ('high', 'f8'), ('low', 'f8'),
+                                            ('close', 'f8'), ('tick_volume', 'i8')])
+        rates['time'] = times
+        for col in ('open', 'high', 'low', 'close'):
+            rates[col] = 2000.0 + times % 100
+        rates['tick_volume'] = 5
+        return rates
+
+
+def make_repository(root, now, outage=None):
+    clock = lambda: now[0]
+    exchange = FakeExchange(clock, outage)
+    repo = CandleRepository(CcxtCandleSource(exchange), MarketDataStore(root), clock=clock)
+    return repo, exchange
+
+
+def test_only_missing_candles_are_fetched():
+    """A repeated 365-day request only downloads the candles that closed since"""
+    now = [pd.Timestamp('2025-06-01 12:30')]
+    with tempfile.TemporaryDirectory() as root:
+        repo, exchange = make_repository(root, now)
+        start = now[0] - pd.Timedelta(days=365)
+
+        first = repo.get('BTC/USDT', '1h', start)
+        assert len(first) == 365 * 24 and first.attrs['fetched'] == len(first)
+        assert len(exchange.requests) == 9
+        assert first.index[-1] == pd.Timestamp('2025-06-01 12:00')  # forming candle returned
+        assert repo.store.info('FAKE_BTCUSDT', 'H1')['last'] == '2025-06-01 11:00:00'  # ... not stored
+        expected = [exchange.candle(ts.value // 1_000_000)[4] for ts in first.index]
+        np.testing.assert_array_equal(first['close'].to_numpy(), expected)
+
+        exchange.requests.clear()
+        again = repo.get('BTC/USDT', '1h', start)
+        assert again.attrs['requests'] == len(exchange.requests) == 1  # just the forming candle
+        pd.testing.assert_frame_equal(again, first, check_freq=False)
+
+        now[0] += pd.Timedelta(hours=5)
+        exchange.requests.clear()
+        later = repo.get('BTC/USDT', '1h', start)
+        assert len(exchange.requests) == 1 and later.attrs['fetched'] == 6
+        assert later.index[-1] == pd.Timestamp('2025-06-01 17:00')
+        assert repo.find_gaps('BTC/USDT', '1h', start, now[0] - pd.Timedelta(hours=1)).empty
+    print("  ✅ cached history: second 365-day request = 1 request for the forming candle")
+
+
+def test_gaps_are_filled():
+    """Holes in stored history are detected and fetched; source outages are remembered"""
+    now = [pd.Timestamp('2025-05-31 23:30')]
+    outage = (pd.Timestamp('2025-05-10 00:00'), pd.Timestamp('2025-05-10 05:00'))
+    with tempfile.TemporaryDirectory() as root:
+        repo, exchange = make_repository(root, now, outage)
+        full = repo.get('ETH/USDT', '1h', '2025-05-01')
+        assert len(full) == 31 * 24 - 6
+
+        # Drop a day from the store (e.g. an interrupted download)
+        stored = repo.store.load('FAKE_ETHUSDT', 'H1', copy=True)
+        holed = stored.drop(stored.loc['2025-05-20'].index)
+        repo.store.write('FAKE_ETHUSDT', 'H1', holed, replace=True,
+                         source=repo.store.info('FAKE_ETHUSDT', 'H1')['source'])
+
+        gaps = repo.find_gaps('ETH/USDT', '1h', '2025-05-01', '2025-05-31 22:00')
+        assert len(gaps) == 1 and gaps['bars'].iloc[0] == 24  # the outage is not a gap
+        assert gaps['start'].iloc[0] == pd.Timestamp('2025-05-20')
+
+        exchange.requests.clear()
+        repaired = repo.get('ETH/USDT', '1h', '2025-05-01')
+        assert len(exchange.requests) == 1  # the hole and the forming candle share one page
+        assert exchange.requests[0] == pd.Timestamp('2025-05-20').value // 1_000_000
+        pd.testing.assert_frame_equal(repaired, full, check_freq=False)
+        assert repo.find_gaps('ETH/USDT', '1h', '2025-05-01', '2025-05-31 22:00').empty
+    print("  ✅ gaps: missing day refetched, exchange outage not requested again")
+
+
+def test_mt5_failures_and_server_time():
+    """A failed or short MT5 response marks nothing absent; bars and the clock use server time"""
+    now = [pd.Timestamp('2025-05-31 20:30')]
+    clock = lambda: now[0]
+    with tempfile.TemporaryDirectory() as root:
+        mt5 = FakeMT5(clock)
+        repo = CandleRepository(MT5CandleSource(mt5), MarketDataStore(root), clock=clock)
+        assert repo.source.server_offset('XAUUSD', now[0]) == pd.Timedelta(hours=3)
+
+        mt5.fail = True
+        try:
+            repo.get('XAUUSD', 'H1', '2025-05-30')
+            assert False, "failed copy_rates_range accepted"
+        except ConnectionError as e:
+            assert 'No IPC connection' in str(e)
+        assert repo.store.info('XAUUSD', 'H1') is None
+
+        # History synced only up to noon: the rest is asked for again, not remembered as absent
+        mt5.fail = False
+        mt5.available_until = pd.Timestamp('2025-05-31 12:00', tz='UTC')
+        partial = repo.get('XAUUSD', 'H1', '2025-05-30')
+        assert partial.index[0] == pd.Timestamp('2025-05-30 03:00') and partial.index[-1] == pd.Timestamp('2025-05-31 12:00')
+        assert repo.store.info('XAUUSD', 'H1')['source']['empty'] == []
+
+        mt5.available_until = None
+        full = repo.get('XAUUSD', 'H1', '2025-05-30')
+        assert full.index[-1] == pd.Timestamp('2025-05-31 23:00')  # forming bar in server time
+        assert repo.store.info('XAUUSD', 'H1')['last'] == '2025-05-31 22:00:00'
+        assert len(full) == 45 and full.attrs['fetched'] == 11
+
+        # Timezone-aware range arguments (the GUI passes local time) are converted as well
+        aware = repo.get('XAUUSD', 'H1', pd.Timestamp('2025-05-31 02:00', tz='Europe/Berlin'))
+        assert aware.index[0] == pd.Timestamp('2025-05-31 03:00')
+    print("  ✅ MT5: failed request raises and records nothing, short history refetched, server time kept")
+
+
+def benchmark():
+    """Cold vs warm 365-day H1 request"""
+    now = [pd.Timestamp('2025-06-01 12:30')]
+    with tempfile.TemporaryDirectory() as root:
+        repo, exchange = make_repository(root, now)
+        start = now[0] - pd.Timedelta(days=365)
+        t0 = time.perf_counter()
+        repo.get('BTC/USDT', '1h', start)
+        cold = time.perf_counter() - t0
+        cold_requests = len(exchange.requests)
+        exchange.requests.clear()
+        t0 = time.perf_counter()
+        repo.get('BTC/USDT', '1h', start)
+        warm = time.perf_counter() - t0
+    print(f"\n⏱️  365d H1: cold {cold * 1000:.0f} ms / {cold_requests} requests, "
+          f"warm {warm * 1000:.1f} ms / {len(exchange.requests)} request")
+
+
+if __name__ == "__main__":
+    print("\n" + "="*80)
+    print("🔍 CANDLE REPOSITORY TEST")
+    print("="*80)
+
+    test_only_missing_candles_are_fetched()
+    test_gaps_are_filled()
+    test_mt5_failures_and_server_time()
+    benchmark()
@@ -0,0 +1,114 @@
+"""
+Tests and memory benchmark for the copy-free strategy pipeline
+Стадии стратегии пишут колонки в один рабочий DataFrame
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from indicator_cache import IndicatorCache
+from pattern_recognition_strategy import PatternRecognitionStrategy
+from smc_indicators import SMCIndicators
+from gold_specific_filters import GoldSpecificFilters
+
+DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'XAUUSD_MT5_20240425_20260102.csv')
+
+
+def load_gold_data(n=1500):
+    df = pd.read_csv(DATA_FILE, nrows=n)
+    df['datetime'] = pd.to_datetime(df['datetime'])
+    return df.set_index('datetime')
+
+
+def make_strategy(copy_free, cache=None):
+    strategy = PatternRecognitionStrategy(fib_mode='standard')
+    strategy.copy_free = copy_free
+    strategy.indicator_cache = cache
+    return strategy
+
+
+def test_default_run_leaves_input_untouched():
+    """run_strategy() copies the caller's frame once and never writes into it"""
+    df = load_gold_data()
+    original = df.copy()
+
+    result = make_strategy(copy_free=False).run_strategy(df)
+
+    assert result is not df
+    pd.testing.assert_frame_equal(df, original)
+    print(f"  ✅ input unchanged, {len(result.columns)} columns in result")
+
+
+def test_copy_free_matches_default():
+    """copy_free=True gives the same frame and returns the caller's object"""
+    df = load_gold_data()
+    expected = make_strategy(copy_free=False).run_strategy(df)
+
+    for cache in (None, IndicatorCache()):
+        working = df.copy()
+        result = make_strategy(copy_free=True, cache=cache).run_strategy(working)
+
+        assert result is working
+        pd.testing.assert_frame_equal(result, expected)
+
+    print(f"  ✅ copy-free run identical (with and without indicator cache)")
+
+
+def test_stage_copy_flag():
+    """copy=False stages add the same columns to the frame they were given"""
+    df = load_gold_data(600)
+
+    for stage in (SMCIndicators(swing_length=5).apply_all_indicators,
+                  GoldSpecificFilters().apply_all_gold_filters):
+        expected = stage(df)
+        working = df.copy()
+        result = stage(working, copy=False)
+
+        assert result is working
+        pd.testing.assert_frame_equal(result, expected)
+
+    print(f"  ✅ copy=False stages write in place")
+
+
+def measure(copy_free, df):
+    """Peak traced memory (MB) and wall time (s) of one run_strategy() call"""
+    strategy = make_strategy(copy_free)
+
+    start = time.perf_counter()
+    strategy.run_strategy(df.copy())
+    elapsed = time.perf_counter() - start
+
+    working = df.copy()
+    tracemalloc.start()
+    strategy.run_strategy(working)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return peak / 1e6, elapsed
+
+
+def benchmark():
+    """Peak memory of a full run_strategy() on the whole data file"""
+    df = load_gold_data(None)
+
+    for copy_free in (False, True):
+        peak, elapsed = measure(copy_free, df)
+        print(f"  copy_free={copy_free}: peak {peak:.1f} MB, {elapsed:.2f}s on {len(df)} bars")
+
+
+if __name__ == "__main__":
+    print("\n" + "="*80)
+    print("🔍 COPY-FREE PIPELINE TEST")
+    print("="*80)
+
+    test_default_run_leaves_input_untouched()
+    test_copy_free_matches_default()
+    test_stage_copy_flag()
+
+    print(f"\n⏱️  Memory benchmark:")
+    benchmark()
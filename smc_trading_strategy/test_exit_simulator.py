@@ -0,0 +1,305 @@
+"""
+Equivalence tests for the shared exit simulator
+Сравнивает simulate_exits и перенесённые бэктесты с исходными циклами по свечам
+"""
+
+import contextlib
+import io
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from exit_simulator import simulate_exits, bars_within_hours, EXIT_REASONS
+from backtester import Backtester
+from trailing_stop_backtest import backtest_trailing_stop
+
+DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'XAUUSD_MT5_20240425_20260102.csv')
+
+
+def load_signal_data(n=3000, seed=3, signal_rate=0.08):
+    """Real XAUUSD H1 candles with random signals, SL 5-20 and TP 10-40 points away"""
+    df = pd.read_csv(DATA_FILE, nrows=n)
+    df['datetime'] = pd.to_datetime(df['datetime'])
+    df = df.set_index('datetime')
+
+    rng = np.random.default_rng(seed)
+    signal = np.where(rng.random(n) < signal_rate, rng.choice([-1, 1], n), 0)
+    df['signal'] = signal
+    df['entry_price'] = np.where(signal != 0, df['close'], np.nan)
+    df['stop_loss'] = np.where(signal != 0, df['close'] - signal * rng.uniform(5, 20, n), np.nan)
+    df['take_profit'] = np.where(signal != 0, df['close'] + signal * rng.uniform(10, 40, n), np.nan)
+    return df
+
+
+class PrecomputedStrategy:
+    """Strategy stub returning the signals already in the frame"""
+
+    def run_strategy(self, df):
+        return df.copy()
+
+
+# ------------------------------------------------------------------
+# Reference implementations (the original per-candle loops)
+# ------------------------------------------------------------------
+
+def reference_sl_tp_exit(df, i, direction, stop_loss, take_profit):
+    """Backtester.check_exit_conditions walked forward from the entry bar"""
+    for j in range(i + 1, len(df)):
+        row = df.iloc[j]
+        if direction == 1:
+            if row['low'] <= stop_loss:
+                return j, 'SL', stop_loss
+            if row['high'] >= take_profit:
+                return j, 'TP', take_profit
+        else:
+            if row['high'] >= stop_loss:
+                return j, 'SL', stop_loss
+            if row['low'] <= take_profit:
+                return j, 'TP', take_profit
+        if row['signal'] != 0 and row['signal'] != direction:
+            return j, 'SIGNAL', row['close']
+    return -1, 'OPEN', np.nan
+
+
+def reference_v3_position(df, i, direction, entry, sl, tps, fractions, trailing_distance,
+                          timeout_hours, spread, commission, swap_per_day):
+    """One position of AdaptiveBacktestV3.backtest: 3 TPs, trailing after TP1, timeout, costs"""
+    def pnl(fill, fraction, hours):
+        points = (fill - entry if direction == 1 else entry - fill) * fraction - commission * fraction
+        if hours > 24:
+            points += swap_per_day * (hours / 24) * fraction
+        return points / entry * 100
+
+    best = entry
+    trailing = False
+    remaining = 1.0
+    total = 0.0
+    hit = [False, False, False]
+    for j in range(i + 1, len(df)):
+        high, low, close = df['high'].iloc[j], df['low'].iloc[j], df['close'].iloc[j]
+        hours = (df.index[j] - df.index[i]).total_seconds() / 3600
+
+        if hours >= timeout_hours:
+            fill = close - direction * spread
+            return j, 'TIMEOUT', fill, total + pnl(fill, remaining, hours), hit, trailing
+
+        if direction == 1:
+            best = max(best, high)
+            if trailing:
+                sl = max(sl, best - trailing_distance)
+            if low <= sl:
+                return j, 'TRAILING' if trailing else 'SL', sl, total + pnl(sl, remaining, hours), hit, trailing
+        else:
+            best = min(best, low)
+            if trailing:
+                sl = min(sl, best + trailing_distance)
+            if high >= sl:
+                return j, 'TRAILING' if trailing else 'SL', sl, total + pnl(sl, remaining, hours), hit, trailing
+
+        favorable = high if direction == 1 else low
+        for k in range(3):
+            if not hit[k] and direction * favorable >= direction * tps[k]:
+                total += pnl(tps[k] - direction * spread, fractions[k], hours)
+                remaining -= fractions[k]
+                hit[k] = True
+                if k == 0:
+                    trailing = True
+                    sl = favorable - direction * trailing_distance
+
+        if remaining <= 0.01:
+            return j, 'TP', tps[2] - direction * spread, total, hit, trailing
+
+    return -1, 'OPEN', np.nan, total, hit, trailing
+
+
+def reference_trailing_stop(df, i, direction, entry, sl, distance, window_end, tp=None):
+    """One position of backtest_trailing_stop('fixed'): TP checked before the trailing stop"""
+    best = entry
+    for j in range(i + 1, window_end + 1):
+        high, low = df['high'].iloc[j], df['low'].iloc[j]
+        if direction == 1:
+            best = max(best, high)
+            sl = max(sl, best - distance)
+            if tp and high >= tp:
+                return j, tp, sl
+            if low <= sl:
+                return j, sl, sl
+        else:
+            best = min(best, low)
+            sl = min(sl, best + distance)
+            if tp and low <= tp:
+                return j, tp, sl
+            if high >= sl:
+                return j, sl, sl
+    return window_end, df['close'].iloc[window_end], sl
+
+
+# ------------------------------------------------------------------
+# Tests
+# ------------------------------------------------------------------
+
+def signal_entries(df):
+    entries = np.flatnonzero(df['signal'].to_numpy() != 0)
+    columns = [df[c].to_numpy()[entries] for c in ('signal', 'entry_price', 'stop_loss', 'take_profit')]
+    return (entries, *columns)
+
+
+def test_first_touch_matches_reference():
+    """Vectorized SL/TP/opposite-signal search gives the same exits as the candle loop"""
+    df = load_signal_data(n=1500)
+    entries, direction, entry_price, stop_loss, take_profit = signal_entries(df)
+
+    exits = simulate_exits(df, entries, direction, entry_price, stop_loss,
+                           take_profits=take_profit, exit_on_signal=True)
+
+    for k, i in enumerate(entries):
+        bar, reason, price = reference_sl_tp_exit(df, i, direction[k], stop_loss[k], take_profit[k])
+        assert exits['exit_idx'][k] == bar
+        assert EXIT_REASONS[exits['exit_reason'][k]] == reason
+        np.testing.assert_equal(exits['exit_price'][k], price)
+    print(f"  ✅ first-touch exits identical for {len(entries)} signals")
+
+
+def test_first_touch_matches_kernel():
+    """The block search and the bar kernel agree on plain SL/TP positions"""
+    df = load_signal_data()
+    entries, direction, entry_price, stop_loss, take_profit = signal_entries(df)
+    kwargs = dict(take_profits=take_profit, max_bars=40, exit_on_signal=True,
+                  exit_spread=0.5, commission=0.3, swap_per_day=-0.3)
+
+    vectorized = simulate_exits(df, entries, direction, entry_price, stop_loss, **kwargs)
+    # An infinite timeout forces the kernel without changing any exit
+    kernel = simulate_exits(df, entries, direction, entry_price, stop_loss, timeout_hours=np.inf, **kwargs)
+
+    for key in vectorized:
+        np.testing.assert_allclose(vectorized[key], kernel[key], err_msg=key)
+    print(f"  ✅ first-touch search == kernel for {len(entries)} signals")
+
+
+def test_max_bars_zero_means_no_limit():
+    """max_bars 0 (and -1) is no limit in both the block search and the kernel"""
+    df = load_signal_data()
+    entries, direction, entry_price, stop_loss, take_profit = signal_entries(df)
+    max_bars = np.resize([0, -1, 3, 40], len(entries))
+    kwargs = dict(take_profits=take_profit, exit_spread=0.5, commission=0.3)
+
+    vectorized = simulate_exits(df, entries, direction, entry_price, stop_loss, max_bars=max_bars, **kwargs)
+    kernel = simulate_exits(df, entries, direction, entry_price, stop_loss, max_bars=max_bars,
+                            timeout_hours=np.inf, **kwargs)
+    unlimited = simulate_exits(df, entries, direction, entry_price, stop_loss, **kwargs)
+
+    for key in vectorized:
+        np.testing.assert_allclose(vectorized[key], kernel[key], err_msg=key)
+    no_limit = max_bars <= 0
+    np.testing.assert_array_equal(vectorized['exit_idx'][no_limit], unlimited['exit_idx'][no_limit])
+    assert (vectorized['bars_held'][max_bars == 3] <= 3).all()
+    print(f"  ✅ max_bars 0/-1 = no limit in both paths ({no_limit.sum()} of {len(entries)} signals)")
+
+
+def test_partial_close_matches_reference():
+    """3 TPs with partial closes, trailing after TP1, timeout and costs match the V3 loop"""
+    df = load_signal_data(n=2000)
+    entries, direction, entry_price, stop_loss, _ = signal_entries(df)
+    tps = entry_price[:, None] + direction[:, None] * np.array([20.0, 35.0, 50.0])
+    trailing_distance = np.where(direction == 1, 15.0, 18.0)
+    timeout = np.where(direction == 1, 48.0, 60.0)
+    fractions = [0.5, 0.3, 0.2]
+
+    exits = simulate_exits(
+        df, entries, direction, entry_price, stop_loss,
+        take_profits=tps, close_fractions=fractions, trail_trigger=tps[:, 0],
+        trail_distance=trailing_distance, timeout_hours=timeout,
+        exit_spread=1.0, commission=0.5, swap_per_day=-0.3
+    )
+
+    for k, i in enumerate(entries):
+        bar, reason, price, pnl_pct, hit, trailing = reference_v3_position(
+            df, i, direction[k], entry_price[k], stop_loss[k], tps[k], fractions,
+            trailing_distance[k], timeout[k], 1.0, 0.5, -0.3
+        )
+        assert exits['exit_idx'][k] == bar
+        assert EXIT_REASONS[exits['exit_reason'][k]] == reason
+        np.testing.assert_allclose(exits['exit_price'][k], price)
+        np.testing.assert_allclose(exits['pnl_pct'][k], pnl_pct, atol=1e-12)
+        assert list(exits['tp_idx'][k] >= 0) == hit
+        assert exits['trailing'][k] == trailing
+    print(f"  ✅ partial close + trailing identical for {len(entries)} signals")
+
+
+def test_trailing_stop_backtest_matches_reference():
+    """backtest_trailing_stop (fixed trailing, optional TP, 48h window) matches the candle loop"""
+    df = load_signal_data(n=1500)
+    entries, direction, entry_price, stop_loss, _ = signal_entries(df)
+    window = bars_within_hours(df, entries, 48)
+
+    for tp_points in (None, 25):
+        with contextlib.redirect_stdout(io.StringIO()):
+            trades = backtest_trailing_stop(df, PrecomputedStrategy(), trailing_type='fixed',
+                                            trailing_distance=15, tp_points=tp_points)
+
+        k = 0
+        for n, i in enumerate(entries):
+            if window[n] == 0:
+                continue
+            tp = entry_price[n] + direction[n] * tp_points if tp_points else None
+            bar, price, final_sl = reference_trailing_stop(df, i, direction[n], entry_price[n],
+                                                           stop_loss[n], 15, i + window[n], tp)
+            trade = trades.iloc[k]
+            assert trade['exit_time'] == df.index[bar]
+            assert trade['exit_price'] == price
+            assert trade['final_sl'] == final_sl
+            k += 1
+        assert k == len(trades)
+    print(f"  ✅ trailing stop backtest identical for {len(trades)} trades")
+
+
+def test_backtester_equity_curve():
+    """Backtester.run keeps one equity point per candle and closes trades in order"""
+    df = load_signal_data(n=1500)
+    backtester = Backtester()
+    backtester.run(df)
+
+    assert len(backtester.equity_curve) == len(df) + 1
+    exit_times = [t.exit_time for t in backtester.trades]
+    entry_times = [t.entry_time for t in backtester.trades]
+    assert all(entry_times[n + 1] >= exit_times[n] for n in range(len(exit_times) - 1))
+    assert not np.isnan(backtester.equity_curve).any()
+    print(f"  ✅ backtester: {len(backtester.trades)} trades, final equity {backtester.capital:.2f}")
+
+
+def benchmark():
+    """Time simulate_exits on thousands of signals"""
+    df = load_signal_data(n=10000, signal_rate=0.5)
+    entries, direction, entry_price, stop_loss, take_profit = signal_entries(df)
+    tps = entry_price[:, None] + direction[:, None] * np.array([20.0, 35.0, 50.0])
+
+    for name, kwargs in [
+        ('single SL/TP', dict(take_profits=take_profit, max_bars=100)),
+        ('3 TP + trailing + timeout', dict(take_profits=tps, close_fractions=[0.5, 0.3, 0.2],
+                                           trail_trigger=tps[:, 0], trail_distance=15.0,
+                                           timeout_hours=48.0, exit_spread=1.0, commission=0.5,
+                                           swap_per_day=-0.3)),
+    ]:
+        simulate_exits(df, entries, direction, entry_price, stop_loss, **kwargs)  # numba compile
+        start = time.perf_counter()
+        simulate_exits(df, entries, direction, entry_price, stop_loss, **kwargs)
+        elapsed = time.perf_counter() - start
+        print(f"\n⏱️  {name}: {len(entries)} signals in {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    print("\n" + "="*80)
+    print("🔍 EXIT SIMULATOR EQUIVALENCE TEST")
+    print("="*80)
+
+    test_first_touch_matches_reference()
+    test_first_touch_matches_kernel()
+    test_max_bars_zero_means_no_limit()
+    test_partial_close_matches_reference()
+    test_trailing_stop_backtest_matches_reference()
+    test_backtester_equity_curve()
+    benchmark()
@@ -0,0 +1,131 @@
+"""
+Tests for the shared indicator cache
+Кэшированный прогон стратегии должен совпадать с прогоном без кэша
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from indicator_cache import IndicatorCache
+from pattern_recognition_strategy import PatternRecognitionStrategy
+from smc_indicators import SMCIndicators
+
+DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'XAUUSD_MT5_20240425_20260102.csv')
+
+
+def load_gold_data(n=1500):
+    df = pd.read_csv(DATA_FILE, nrows=n)
+    df['datetime'] = pd.to_datetime(df['datetime'])
+    return df.set_index('datetime')
+
+
+def make_strategy(cache, fib_mode='standard'):
+    strategy = PatternRecognitionStrategy(fib_mode=fib_mode)
+    strategy.indicator_cache = cache
+    return strategy
+
+
+def test_cached_run_matches_uncached():
+    """Hits and misses give exactly the same frame as running without a cache"""
+    df = load_gold_data()
+    cache = IndicatorCache()
+
+    expected = make_strategy(None).run_strategy(df)
+    first = make_strategy(cache).run_strategy(df)
+    second = make_strategy(cache).run_strategy(df)
+
+    pd.testing.assert_frame_equal(first, expected)
+    pd.testing.assert_frame_equal(second, expected)
+    assert cache.misses == 5 and cache.hits == 5
+    print(f"  ✅ cached run identical, {cache.stats()}")
+
+
+def test_tp_change_reuses_upstream_columns():
+    """Changing only the TP mode reuses every indicator stage"""
+    df = load_gold_data()
+    cache = IndicatorCache()
+
+    make_strategy(cache).run_strategy(df)
+    misses = cache.misses
+    result = make_strategy(cache, fib_mode='aggressive').run_strategy(df)
+
+    assert cache.misses == misses
+    pd.testing.assert_frame_equal(result, make_strategy(None, fib_mode='aggressive').run_strategy(df))
+    print(f"  ✅ aggressive TP run served from cache ({cache.hits} hits)")
+
+
+def test_fingerprint_and_eviction():
+    """Any price change is a new key; least recently used entries are evicted"""
+    df = load_gold_data(300)
+    changed = df.copy()
+    changed.iloc[150, changed.columns.get_loc('close')] += 0.01
+
+    assert IndicatorCache.fingerprint(df) == IndicatorCache.fingerprint(df.copy())
+    assert IndicatorCache.fingerprint(df) != IndicatorCache.fingerprint(changed)
+    assert IndicatorCache.fingerprint(df) != IndicatorCache.fingerprint(df.iloc[1:])
+
+    cache = IndicatorCache(maxsize=2)
+    for length in (5, 10, 5, 20, 10):
+        smc = SMCIndicators(swing_length=length)
+        result = cache.apply(df, 'swing_points', length, smc.detect_swing_points)
+        pd.testing.assert_frame_equal(result, smc.detect_swing_points(df))
+
+    # 5 miss, 10 miss, 5 hit, 20 miss (evicts 10), 10 miss
+    assert (cache.hits, cache.misses, len(cache)) == (1, 4, 2)
+    print(f"  ✅ fingerprint and LRU eviction")
+
+
+def test_concurrent_access():
+    """Threads hitting and evicting the same small cache neither raise nor lose counts"""
+    df = load_gold_data(300)
+    cache = IndicatorCache(maxsize=3)
+
+    def run(k):
+        length = 3 + k % 6
+        smc = SMCIndicators(swing_length=length)
+        return cache.apply(df, 'swing_points', length, smc.detect_swing_points)['swing_high'].sum()
+
+    with ThreadPoolExecutor(8) as executor:
+        results = list(executor.map(run, range(400)))
+
+    expected = [SMCIndicators(swing_length=3 + k % 6).detect_swing_points(df)['swing_high'].sum()
+                for k in range(6)]
+    assert results == [expected[k % 6] for k in range(400)]
+    assert cache.hits + cache.misses == 400 and len(cache) <= 3
+    print(f"  ✅ 400 lookups from 8 threads on a 3-entry cache, {cache.misses} misses")
+
+
+def benchmark():
+    """Time a repeated run with and without the cache"""
+    df = load_gold_data(5000)
+    cache = IndicatorCache()
+
+    start = time.perf_counter()
+    make_strategy(None).run_strategy(df)
+    uncached = time.perf_counter() - start
+
+    make_strategy(cache).run_strategy(df)
+    start = time.perf_counter()
+    make_strategy(cache, fib_mode='aggressive').run_strategy(df)
+    cached = time.perf_counter() - start
+
+    print(f"\n⏱️  run_strategy on {len(df)} bars: uncached {uncached:.2f}s, "
+          f"upstream from cache {cached:.2f}s ({uncached / cached:.1f}x)")
+
+
+if __name__ == "__main__":
+    print("\n" + "="*80)
+    print("🔍 INDICATOR CACHE TEST")
+    print("="*80)
+
+    test_cached_run_matches_uncached()
+    test_tp_change_reuses_upstream_columns()
+    test_fingerprint_and_eviction()
+    test_concurrent_access()
+    benchmark()
@@ -0,0 +1,134 @@
+"""
+Tests for the market data store
+Проверяет импорт CSV форматов MT5, слияние данных и чтение диапазонов без копирования
+"""
+
+import mmap
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from market_data_store import (MarketDataStore, read_mt5_csv, load_csv_cached,
+                               normalize_timeframe, infer_timeframe)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CSV_ISO = os.path.join(HERE, 'XAUUSD_MT5_20240425_20260102.csv')          # UTF-8, header, ISO stamps
+CSV_UTF16 = os.path.join(HERE, 'XAUUSD_1H_MT5.csv')                       # UTF-16, no header
+CSV_SHORT_HEADER = os.path.join(HERE, '..', 'XAUUSD_1H_MT5_20241227_20251227.csv')  # 6 names, 7 fields
+
+
+def is_memory_mapped(values):
+    """True if the array is a view of a memory-mapped file"""
+    base = values
+    while base is not None:
+        if isinstance(base, mmap.mmap):
+            return True
+        base = getattr(base, 'base', None) if not isinstance(base, memoryview) else base.obj
+    return False
+
+
+def test_csv_formats():
+    """All CSV formats in the repo parse to the same layout as the backtest loaders"""
+    iso = read_mt5_csv(CSV_ISO)
+    reference = pd.read_csv(CSV_ISO)
+    reference = reference.set_index(pd.to_datetime(reference['datetime']))
+    np.testing.assert_array_equal(iso.index.asi8, reference.index.as_unit('ns').asi8)
+    for col in ('open', 'high', 'low', 'close', 'volume'):
+        np.testing.assert_array_equal(iso[col].to_numpy(), reference[col].to_numpy())
+
+    utf16 = read_mt5_csv(CSV_UTF16)
+    short_header = read_mt5_csv(CSV_SHORT_HEADER)
+    pd.testing.assert_frame_equal(utf16, short_header)
+    assert list(utf16.columns) == ['open', 'high', 'low', 'close', 'volume', 'real_volume']
+    assert utf16.index.is_monotonic_increasing and utf16.index.is_unique
+
+    assert infer_timeframe(iso.index) == 'H1'
+    assert normalize_timeframe('1h') == normalize_timeframe('60') == normalize_timeframe('h1') == 'H1'
+    assert normalize_timeframe('4h') == 'H4' and normalize_timeframe('M15') == 'M15'
+    print(f"  ✅ CSV formats: ISO {len(iso)} bars, MT5 UTF-16 / short header {len(utf16)} bars")
+
+
+def test_merge_and_range_load():
+    """Overlapping writes merge (new bars win) and range reads are memory-mapped slices"""
+    df = read_mt5_csv(CSV_ISO)
+    with tempfile.TemporaryDirectory() as root:
+        store = MarketDataStore(root)
+        store.write('XAUUSD', 'H1', df.iloc[:6000])
+        update = df.iloc[5000:].copy()
+        update.loc[update.index[0], 'close'] += 1.0
+        meta = store.write('xauusd', '1h', update)
+
+        assert meta['rows'] == len(df) and meta['version'] == 2
+        assert sum(meta['months'].values()) == len(df)
+        assert sorted(os.listdir(os.path.join(root, 'XAUUSD', 'H1'))) == ['meta.json', 'v2']
+
+        full = store.load('XAUUSD', 'H1')
+        expected = df.copy()
+        expected.loc[expected.index[5000], 'close'] += 1.0
+        pd.testing.assert_frame_equal(full, expected, check_freq=False)
+
+        start, end = '2025-03-01', '2025-05-31 23:00'
+        part = store.load('XAUUSD', 'H1', start, end, columns=['high', 'low', 'close'])
+        pd.testing.assert_frame_equal(part, expected.loc[start:end, ['high', 'low', 'close']], check_freq=False)
+
+        # Zero-copy: columns and index are views of the memory-mapped files
+        for values in (part['close'].to_numpy(), part.index.asi8):
+            assert is_memory_mapped(values)
+        part.loc[part.index[0], 'close'] = 0.0  # copy-on-write mapping: the file is unchanged
+        assert store.load('XAUUSD', 'H1', start, end)['close'].iloc[0] == expected.loc[start:, 'close'].iloc[0]
+        assert not is_memory_mapped(store.load('XAUUSD', 'H1', start, end, copy=True)['close'].to_numpy())
+
+        assert store.datasets()[0]['rows'] == len(df)
+    print(f"  ✅ merge + range load: {len(full)} bars, {len(part)} bars in range, zero-copy")
+
+
+def test_csv_cache_invalidation():
+    """Cached CSVs are re-imported when the file changes"""
+    with tempfile.TemporaryDirectory() as root:
+        store = MarketDataStore(root)
+        path = os.path.join(root, 'bars.csv')
+        df = read_mt5_csv(CSV_ISO).iloc[:500]
+        df.to_csv(path)
+
+        first = load_csv_cached(path, store)
+        assert len(first) == 500
+        df.iloc[:300].to_csv(path)
+        os.utime(path, (time.time() + 10, time.time() + 10))
+        second = load_csv_cached(path, store)
+        assert len(second) == 300
+        np.testing.assert_array_equal(second['close'].to_numpy(), df['close'].to_numpy()[:300])
+    print("  ✅ CSV cache re-imports changed files")
+
+
+def benchmark():
+    """CSV parse vs memory-mapped load"""
+    with tempfile.TemporaryDirectory() as root:
+        store = MarketDataStore(root)
+        start = time.perf_counter()
+        for _ in range(5):
+            pd.read_csv(CSV_ISO, parse_dates=['datetime'], index_col='datetime')
+        csv_time = (time.perf_counter() - start) / 5
+
+        store.import_csv(CSV_ISO)
+        start = time.perf_counter()
+        for _ in range(100):
+            store.load('XAUUSD', 'H1', '2025-01-01', '2025-06-30')
+        load_time = (time.perf_counter() - start) / 100
+    print(f"\n⏱️  read_csv {csv_time * 1000:.1f} ms vs store range load {load_time * 1000:.2f} ms "
+          f"({csv_time / load_time:.0f}x)")
+
+
+if __name__ == "__main__":
+    print("\n" + "="*80)
+    print("🔍 MARKET DATA STORE TEST")
+    print("="*80)
+
+    test_csv_formats()
+    test_merge_and_range_load()
+    test_csv_cache_invalidation()
+    benchmark()
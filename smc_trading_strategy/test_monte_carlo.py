@@ -0,0 +1,135 @@
+"""
+Tests for the Monte Carlo engine
+Сверяет матричные метрики путей с простым циклом и проверяет режимы выборки
+"""
+
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from monte_carlo import (block_bootstrap_bars, path_metrics, run_bar_monte_carlo,
+                         run_trade_monte_carlo, sample_trade_paths, summarize_monte_carlo,
+                         trade_returns)
+from sweep import load_data
+
+DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'XAUUSD_MT5_20240425_20260102.csv')
+
+
+def sample_returns(n=120, seed=5):
+    """Trade returns of a 55% win rate strategy risking 2% per trade"""
+    rng = np.random.default_rng(seed)
+    return np.where(rng.random(n) < 0.55, 0.02 * rng.uniform(1, 2.5, n), -0.02)
+
+
+def reference_metrics(path, ruin_drawdown):
+    """One path, trade by trade"""
+    equity, peak, worst_dd, streak, longest = 1.0, 1.0, 0.0, 0, 0
+    ruined = False
+    for r in path:
+        equity *= 1 + r
+        peak = max(peak, equity)
+        worst_dd = min(worst_dd, (equity - peak) / peak * 100)
+        streak = streak + 1 if r < 0 else 0
+        longest = max(longest, streak)
+        ruined = ruined or equity <= 1 - ruin_drawdown
+    return (equity - 1) * 100, worst_dd, longest, ruined
+
+
+def test_trade_returns_rebuild_equity():
+    """Compounding trade_returns gives back the realized equity"""
+    pnl = np.array([100.0, -50.0, 200.0, -120.0])
+    returns = trade_returns(pnl, 10000)
+    np.testing.assert_allclose(10000 * np.prod(1 + returns), 10000 + pnl.sum())
+
+
+def test_path_metrics_match_loop():
+    """Matrix drawdown / streak / ruin equal the per-path loop"""
+    paths = sample_trade_paths(sample_returns(), 200, rng=np.random.default_rng(1))
+    metrics = path_metrics(paths, ruin_drawdown=0.2)
+    for k, path in enumerate(paths):
+        total, dd, streak, ruined = reference_metrics(path, 0.2)
+        np.testing.assert_allclose(metrics['total_return_pct'][k], total)
+        np.testing.assert_allclose(metrics['max_drawdown'][k], dd, atol=1e-12)
+        assert metrics['max_losing_streak'][k] == streak
+        assert metrics['ruined'][k] == ruined
+    print("  ✅ path metrics == loop")
+
+
+def test_sampling_methods():
+    """permute keeps the trades, block keeps runs of consecutive trades"""
+    returns = sample_returns()
+    rng = np.random.default_rng(2)
+
+    permuted = sample_trade_paths(returns, 50, method='permute', rng=rng)
+    np.testing.assert_allclose(np.sort(permuted, axis=1), np.broadcast_to(np.sort(returns), permuted.shape))
+    final = path_metrics(permuted)['total_return_pct']
+    np.testing.assert_allclose(final, (np.prod(1 + returns) - 1) * 100)
+
+    idx = np.arange(len(returns), dtype=float)
+    blocks = sample_trade_paths(idx, 20, n_trades=100, method='block', block_size=10, rng=rng)
+    assert blocks.shape == (20, 100)
+    steps = np.diff(blocks.reshape(20, 10, 10), axis=2)
+    assert np.all((steps == 1) | (steps == 1 - len(returns)))
+
+    results = run_trade_monte_carlo(returns, n_paths=25000, seed=3)
+    assert len(results) == 25000
+    summary = summarize_monte_carlo(results)
+    assert 0 <= summary['risk_of_ruin'] <= 100
+    assert summary['drawdown_p95'] <= summary['drawdown_median'] <= 0
+    print("  ✅ sampling methods")
+
+
+def test_block_bootstrap_bars():
+    """Synthetic candles are valid OHLC built from blocks of real relative candles"""
+    df = load_data(DATA_FILE).iloc[:500]
+    out = block_bootstrap_bars(df, 24, np.random.default_rng(4))
+
+    assert out.index.equals(df.index)
+    assert list(out.columns) == ['open', 'high', 'low', 'close', 'volume']
+    assert (out['high'] >= out[['open', 'close']].max(axis=1) - 1e-9).all()
+    assert (out['low'] <= out[['open', 'close']].min(axis=1) + 1e-9).all()
+
+    ratio = (out['close'] / out['close'].shift()).to_numpy()[1:]
+    original = (df['close'] / df['close'].shift()).to_numpy()[1:]
+    assert np.isin(np.round(ratio, 10), np.round(original, 10)).all()
+
+    # Blocks longer than the series are clamped to it
+    short = block_bootstrap_bars(df.iloc[:10], 24, np.random.default_rng(4))
+    assert short.index.equals(df.index[:10]) and short['close'].iloc[0] == df['close'].iloc[0]
+
+
+def test_bar_monte_carlo_pool():
+    """Bar-level paths run in the pool and are reproducible for a seed"""
+    df = load_data(DATA_FILE).iloc[:600]
+    first = run_bar_monte_carlo(df, n_simulations=3, target='backtester', workers=2, seed=7)
+    second = run_bar_monte_carlo(df, n_simulations=3, target='backtester', workers=2, seed=7)
+    assert len(first) == 3
+    np.testing.assert_allclose(first['total_return_pct'], second['total_return_pct'])
+    print("  ✅ bar-level Monte Carlo")
+
+
+def benchmark():
+    """100k trade-level paths"""
+    returns = sample_returns(n=300)
+    for method in ('bootstrap', 'block', 'permute'):
+        start = time.perf_counter()
+        results = run_trade_monte_carlo(returns, n_paths=100000, method=method, seed=0)
+        elapsed = time.perf_counter() - start
+        print(f"\n⏱️  {method}: 100k paths x 300 trades in {elapsed:.2f} s, "
+              f"risk of ruin {results['ruined'].mean() * 100:.2f}%")
+
+
+if __name__ == "__main__":
+    print("\n" + "="*80)
+    print("🔍 MONTE CARLO ENGINE TEST")
+    print("="*80)
+
+    test_trade_returns_rebuild_equity()
+    test_path_metrics_match_loop()
+    test_sampling_methods()
+    test_block_bootstrap_bars()
+    test_bar_monte_carlo_pool()
+    benchmark()
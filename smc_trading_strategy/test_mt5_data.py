@@ -11,6 +11,7 @@ import matplotlib.pyplot as plt
 from intraday_gold_strategy import MultiSignalGoldStrategy
 from fibonacci_1618_strategy import Fibonacci1618Strategy
 from pattern_recognition_strategy import PatternRecognitionStrategy
+from market_data_store import load_csv_cached
 
 
 def load_mt5_data(file_path='../XAUUSD_1H_MT5_20241227_20251227.csv'):
@@ -19,17 +20,12 @@ def load_mt5_data(file_path='../XAUUSD_1H_MT5_20241227_20251227.csv'):
     print("LOADING MT5 XAUUSD DATA")
     print("=" * 70)
 
-    df = pd.read_csv(file_path)
+    # Parsed once, then memory-mapped from the local store
+    df = load_csv_cached(file_path)
 
     print(f"\n📊 Raw data loaded: {len(df)} rows")
     print(f"   Columns: {list(df.columns)}")
 
-    # Parse datetime
-    df['timestamp'] = pd.to_datetime(df['datetime'])
-
-    # Set timestamp as index
-    df = df.set_index('timestamp')
-
     # Keep OHLCV columns
     df = df[['open', 'high', 'low', 'close', 'volume']]
 
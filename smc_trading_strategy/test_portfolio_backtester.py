@@ -0,0 +1,150 @@
+"""
+Tests for the portfolio backtester
+Сравнивает PortfolioBacktester с простым циклом по свечам, повторяющим логику live бота
+"""
+
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backtester import Backtester
+from portfolio_backtester import PortfolioBacktester, POSITION_SPLIT
+from test_exit_simulator import load_signal_data
+
+
+# ------------------------------------------------------------------
+# Reference implementation (live bot 3-position logic, candle by candle)
+# ------------------------------------------------------------------
+
+def reference_portfolio(df, bt, tp_distances):
+    """Per-candle loop: TP before SL, Pos 2 & 3 trail after TP1, bot admission rules"""
+    capital = bt.initial_capital
+    equity = [capital]
+    opened = []  # every opened position, in opening order
+    open_positions = []
+    high, low, close = df['high'].to_numpy(), df['low'].to_numpy(), df['close'].to_numpy()
+
+    for j in range(len(df)):
+        still_open = []
+        for pos in open_positions:
+            d = pos['direction']
+            pos['best'] = max(pos['best'], high[j]) if d == 1 else min(pos['best'], low[j])
+            favorable, adverse = (high[j], low[j]) if d == 1 else (low[j], high[j])
+            if pos['num'] > 1 and d * favorable >= d * pos['tp1']:
+                pos['trailing'] = True
+            if pos['trailing']:
+                level = pos['best'] - (pos['best'] - pos['signal_entry']) * bt.trailing_stop_pct
+                pos['sl'] = max(pos['sl'], level) if d == 1 else min(pos['sl'], level)
+
+            if d * favorable >= d * pos['tp']:
+                exit_price, reason = pos['tp'], 'tp'
+            elif d * adverse <= d * pos['sl']:
+                exit_price, reason = pos['sl'], 'trailing' if pos['trailing'] else 'sl'
+            else:
+                still_open.append(pos)
+                continue
+
+            fill = bt.apply_costs(exit_price, -d)
+            pnl = d * (fill - pos['entry']) * pos['size']
+            capital += pnl - abs(pnl) * bt.commission
+            pos.update(exit_idx=j, exit_price=fill, reason=reason)
+        open_positions = still_open
+
+        d = int(df['signal'].iloc[j])
+        same_direction = any(p['direction'] == d for p in open_positions)
+        if d != 0 and not same_direction and len(open_positions) + 3 <= bt.max_positions:
+            signal_entry, sl = df['entry_price'].iloc[j], df['stop_loss'].iloc[j]
+            total_size = capital * bt.risk_per_trade / abs(signal_entry - sl)
+            entry = bt.apply_costs(signal_entry, d)
+            for num in range(3):
+                pos = dict(num=num + 1, direction=d, entry_idx=j, signal_entry=signal_entry,
+                           entry=entry, sl=sl, tp=signal_entry + d * tp_distances[num],
+                           tp1=signal_entry + d * tp_distances[0], size=total_size * POSITION_SPLIT[num],
+                           best=signal_entry, trailing=False)
+                open_positions.append(pos)
+                opened.append(pos)
+
+        equity.append(capital + sum(p['direction'] * (close[j] - p['entry']) * p['size']
+                                    for p in open_positions))
+
+    for pos in open_positions:
+        fill = bt.apply_costs(close[-1], -pos['direction'])
+        capital += pos['direction'] * (fill - pos['entry']) * pos['size']
+        pos.update(exit_idx=len(df) - 1, exit_price=fill, reason='end')
+
+    return opened, equity, capital
+
+
+# ------------------------------------------------------------------
+# Tests
+# ------------------------------------------------------------------
+
+def test_3_position_mode_matches_reference():
+    """Book, equity curve and final capital match the candle-by-candle live bot logic"""
+    df = load_signal_data(n=2000, signal_rate=0.15)
+    tp_distances = (20.0, 35.0, 50.0)
+    bt = PortfolioBacktester(max_positions=9, tp_distances=tp_distances)
+    stats = bt.run(df)
+
+    opened, equity, capital = reference_portfolio(df, bt, tp_distances)
+    book = bt.book
+
+    assert len(book['entry_idx']) == len(opened) == stats['total_trades']
+    for r, pos in enumerate(opened):
+        assert book['entry_idx'][r] == pos['entry_idx']
+        assert book['position_num'][r] == pos['num']
+        assert book['exit_idx'][r] == pos['exit_idx']
+        np.testing.assert_allclose(book['size'][r], pos['size'])
+        np.testing.assert_allclose(book['exit_price'][r], pos['exit_price'])
+
+    reasons = {}
+    for pos in opened:
+        reasons[pos['reason']] = reasons.get(pos['reason'], 0) + 1
+    assert stats['exit_reasons'] == reasons
+    assert reasons.get('trailing', 0) > 0
+    np.testing.assert_allclose(bt.capital, capital)
+    np.testing.assert_allclose(bt.equity_curve, equity)
+    assert stats['max_open_positions'] <= 9
+    print(f"  ✅ 3-position portfolio identical: {len(opened)} positions, final capital {bt.capital:.2f}")
+
+
+def test_single_position_matches_backtester():
+    """With one position at a time and Backtester's exit rules the results are the same"""
+    df = load_signal_data(n=1500)
+    single = Backtester()
+    single_stats = single.run(df)
+
+    portfolio = PortfolioBacktester(max_positions=1, use_3_position_mode=False,
+                                    stop_first=True, exit_on_signal=True)
+    portfolio_stats = portfolio.run(df)
+
+    assert [t.to_dict() for t in single.trades] == [t.to_dict() for t in portfolio.trades]
+    assert single_stats['exit_reasons'] == portfolio_stats['exit_reasons']
+    np.testing.assert_allclose(portfolio.equity_curve, single.equity_curve)
+    print(f"  ✅ single-position mode == Backtester ({len(single.trades)} trades)")
+
+
+def benchmark():
+    """Hundreds of simultaneous positions over 10k candles"""
+    df = load_signal_data(n=10000, signal_rate=0.5)
+    bt = PortfolioBacktester(max_positions=100000, tp_distances=(200.0, 350.0, 500.0),
+                             skip_same_direction=False)
+    bt.run(df.iloc[:100])  # numba compile
+    start = time.perf_counter()
+    stats = bt.run(df)
+    elapsed = time.perf_counter() - start
+    print(f"\n⏱️  {stats['total_trades']} positions (max {stats['max_open_positions']} open) "
+          f"on {len(df)} candles in {elapsed:.2f} s")
+
+
+if __name__ == "__main__":
+    print("\n" + "="*80)
+    print("🔍 PORTFOLIO BACKTESTER TEST")
+    print("="*80)
+
+    test_3_position_mode_matches_reference()
+    test_single_position_matches_backtester()
+    benchmark()
@@ -0,0 +1,140 @@
+"""
+Tests for the resampler
+Сравнивает построение старших таймфреймов с pandas.resample и проверяет отсутствие заглядывания в будущее
+"""
+
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from market_data_store import read_mt5_csv
+from multi_timeframe import LTFEntryConfirmation, MultiTimeframeData
+from resampler import ResamplingEngine, align_to_ltf, forming_htf, resample_ohlcv
+
+CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'XAUUSD_MT5_20240425_20260102.csv')
+OHLCV = ['open', 'high', 'low', 'close', 'volume']
+
+
+def load_h1():
+    return read_mt5_csv(CSV_PATH)[OHLCV].astype(np.float64)
+
+
+def test_resample_matches_pandas():
+    """H4 / D1 bars equal pandas resample (gold has session and weekend gaps)"""
+    df = load_h1()
+    for tf, rule in (('H4', '4h'), ('D1', '1D')):
+        expected = df.resample(rule).agg({'open': 'first', 'high': 'max', 'low': 'min',
+                                          'close': 'last', 'volume': 'sum'}).dropna()
+        result = resample_ohlcv(df, tf)
+        pd.testing.assert_frame_equal(result[OHLCV], expected, check_freq=False)
+        assert result['bars'].sum() == len(df)
+    print(f"  ✅ resample_ohlcv == pandas resample for H4 and D1 ({len(df)} H1 bars)")
+
+
+def test_alignment_has_no_lookahead():
+    """Every H1 bar sees only H4 bars that closed by its own close"""
+    df = load_h1().iloc[:3000]
+    htf = resample_ohlcv(df, 'H4')
+    aligned = align_to_ltf(df.index, htf, 'H1', 'H4')
+
+    four_hours = pd.Timedelta(hours=4)
+    for k in range(0, len(df), 7):
+        t = df.index[k]
+        visible = htf[htf.index + four_hours <= t + pd.Timedelta(hours=1)]
+        if len(visible) == 0:
+            assert aligned.iloc[k].isna().all()
+        else:
+            pd.testing.assert_series_equal(aligned.iloc[k], visible.iloc[-1], check_names=False)
+            # The aligned HTF bar is built only from bars up to and including bar k
+            assert df.loc[visible.index[-1]:visible.index[-1] + four_hours - pd.Timedelta(1)].index[-1] <= t
+
+    mtf = MultiTimeframeData(htf_multiplier=4)
+    context = mtf.get_htf_context(df, htf.assign(trend=np.sign(htf['close'] - htf['open'])))
+    np.testing.assert_array_equal(context['htf_trend'].to_numpy(),
+                                  np.sign(aligned['close'] - aligned['open']).to_numpy())
+    print("  ✅ align_to_ltf: no look-ahead, MultiTimeframeData uses it")
+
+
+def test_incremental_engine_matches_batch():
+    """Bars streamed one at a time give the same H4/D1 bars as batch resampling"""
+    df = load_h1().iloc[:1500]
+    engine = ResamplingEngine('H1', ['H4', 'D1'])
+    engine.update(df.iloc[:500])
+
+    completed_d1 = 0
+    for k in range(500, len(df)):
+        completed_d1 += len(engine.update(df.iloc[k])['D1'])
+        if k == 600:
+            # An empty update while buckets are open completes nothing
+            assert all(len(bars) == 0 for bars in engine.update(df.iloc[:0]).values())
+        forming = engine.forming('D1')
+        if forming is not None:
+            expected = forming_htf(df.iloc[:k + 1], 'D1').iloc[-1]
+            np.testing.assert_allclose(forming[OHLCV].to_numpy(float), expected[OHLCV].to_numpy(float))
+
+    for tf in ('H4', 'D1'):
+        batch = resample_ohlcv(df, tf)
+        streamed = engine.bars(tf)
+        pending = 0 if engine.forming(tf) is None else 1
+        pd.testing.assert_frame_equal(streamed, batch.iloc[:len(batch) - pending], check_freq=False)
+    assert completed_d1 > 0
+    print(f"  ✅ ResamplingEngine: {len(engine.bars('H4'))} H4 / {len(engine.bars('D1'))} D1 bars match batch")
+
+
+def test_vectorized_confirmation():
+    """confirm_ltf_entries equals confirm_ltf_entry candle by candle"""
+    df = load_h1().iloc[:800]
+    for n in (1, 3, 5):
+        confirmation = LTFEntryConfirmation(confirmation_candles=n)
+        for direction in ('long', 'short'):
+            fast = confirmation.confirm_ltf_entries(df, direction)
+            for idx in range(len(df)):
+                confirmed, details = confirmation.confirm_ltf_entry(df, idx, direction)
+                row = fast.iloc[idx]
+                assert bool(row['confirmed']) == confirmed
+                assert bool(row['confirmation_candle']) == bool(details['confirmation_candle'])
+                assert bool(row['structure_confirmed']) == bool(details['structure_confirmed'])
+                assert row['entry_quality'] == details['entry_quality']
+    print("  ✅ confirm_ltf_entries == confirm_ltf_entry for every candle")
+
+
+def benchmark():
+    """Batch resample + alignment vs pandas resample + reindex"""
+    df = load_h1()
+    start = time.perf_counter()
+    for _ in range(20):
+        htf = df.resample('4h').agg({'open': 'first', 'high': 'max', 'low': 'min',
+                                     'close': 'last', 'volume': 'sum'}).dropna()
+        htf['close'].reindex(df.index, method='ffill')
+    pandas_time = (time.perf_counter() - start) / 20
+
+    start = time.perf_counter()
+    for _ in range(20):
+        htf = resample_ohlcv(df, 'H4')
+        align_to_ltf(df.index, htf, 'H1', 'H4', ['close'])
+    numpy_time = (time.perf_counter() - start) / 20
+
+    engine = ResamplingEngine('H1', ['H4', 'D1'])
+    engine.update(df.iloc[:-500])
+    start = time.perf_counter()
+    for k in range(len(df) - 500, len(df)):
+        engine.update(df.iloc[k])
+    per_bar = (time.perf_counter() - start) / 500
+    print(f"\n⏱️  H4 resample+align: pandas {pandas_time * 1000:.1f} ms, numpy {numpy_time * 1000:.1f} ms; "
+          f"streaming update {per_bar * 1000:.2f} ms/bar")
+
+
+if __name__ == "__main__":
+    print("\n" + "="*80)
+    print("🔍 RESAMPLER TEST")
+    print("="*80)
+
+    test_resample_matches_pandas()
+    test_alignment_has_no_lookahead()
+    test_incremental_engine_matches_batch()
+    test_vectorized_confirmation()
+    benchmark()
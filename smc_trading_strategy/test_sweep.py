@@ -0,0 +1,122 @@
+"""
+Tests for the parallel parameter sweep
+Проверяет общую память, пространства поиска и возобновление по таблице результатов
+"""
+
+import contextlib
+import io
+import os
+import sqlite3
+import sys
+import tempfile
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sweep import (SharedFrame, SweepResults, evaluate, grid_configs, load_data, parse_param,
+                   random_configs, run_sweep)
+
+DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'XAUUSD_MT5_20240425_20260102.csv')
+
+
+def test_shared_frame_roundtrip():
+    """Workers see the same candles, read-only"""
+    df = load_data(DATA_FILE).iloc[:500]
+    shared = SharedFrame(df)
+    try:
+        attached, shm = SharedFrame.attach(shared.spec)
+        pd.testing.assert_frame_equal(attached, df, check_freq=False)
+        assert not attached['close'].to_numpy().flags.writeable
+        del attached
+        shm.close()
+    finally:
+        shared.close()
+    print("  ✅ shared frame roundtrip")
+
+
+def test_search_spaces():
+    """--param parsing, grid product and reproducible random sampling"""
+    assert parse_param('strategy.fib_mode=standard,aggressive') == \
+        ('strategy.fib_mode', ['standard', 'aggressive'])
+    assert parse_param('backtest.trend_tp1=20:40:10') == \
+        ('backtest.trend_tp1', {'low': 20, 'high': 40, 'step': 10})
+    assert parse_param('backtest.risk_per_trade=0.01~0.03') == \
+        ('backtest.risk_per_trade', {'low': 0.01, 'high': 0.03})
+
+    space = dict([parse_param('backtest.trend_tp1=20:40:10'), parse_param('strategy.fib_mode=a,b')])
+    grid = list(grid_configs(space))
+    assert len(grid) == 6
+    assert grid[0] == {'backtest.trend_tp1': 20, 'strategy.fib_mode': 'a'}
+
+    space['backtest.risk_per_trade'] = {'low': 0.01, 'high': 0.03}
+    first = list(random_configs(space, 20, seed=1))
+    assert first == list(random_configs(space, 20, seed=1))
+    assert all(c['backtest.trend_tp1'] in (20, 30, 40) for c in first)
+    assert all(0.01 <= c['backtest.risk_per_trade'] <= 0.03 for c in first)
+    print("  ✅ search spaces")
+
+
+def test_sweep_matches_sequential_and_resumes():
+    """Pool results equal in-process runs; a second run only adds the new configurations"""
+    df = load_data(DATA_FILE).iloc[:800]
+    space = {'backtest.risk_per_trade': [0.01, 0.02]}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'sweep.db')
+        with contextlib.redirect_stdout(io.StringIO()):
+            first = run_sweep(df, space, target='backtester', workers=2, results_path=path)
+            space['backtest.risk_per_trade'].append(0.03)
+            second = run_sweep(df, space, target='backtester', workers=2, results_path=path)
+
+        assert first['error'].isna().all()
+        assert len(first) == 2 and len(second) == 3
+        assert set(first['config_id']) < set(second['config_id'])
+
+        for _, row in second.iterrows():
+            expected = evaluate(df, 'backtester', {'backtest.risk_per_trade': row['backtest.risk_per_trade']})
+            np.testing.assert_allclose(row['total_return_pct'], expected['total_return_pct'])
+            assert row['score'] == row['total_return_pct']
+        assert list(second['score']) == sorted(second['score'], reverse=True)
+    print("  ✅ parallel sweep == sequential, resumed")
+
+
+def test_failed_configurations_are_retried():
+    """A configuration that raised is stored with status 'error' and run again on resume"""
+    df = load_data(DATA_FILE).iloc[:300]
+    space = {'backtest.risk_per_trade': [0.01], 'backtest.no_such_option': [1]}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'sweep.db')
+        for _ in range(2):
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                frame = run_sweep(df, space, target='backtester', workers=1, results_path=path)
+            assert 'Sweep finished: 1 new configurations' in output.getvalue()
+            assert 'Resuming' not in output.getvalue()
+            assert list(frame['status']) == ['error'] and 'AttributeError' in frame['error'][0]
+
+        # Results files from before the status column: rows with an error are not done
+        conn = sqlite3.connect(path)
+        conn.execute("ALTER TABLE sweep_results DROP COLUMN status")
+        conn.execute("INSERT INTO sweep_results (config_id, target, data_id, params, metrics, error) "
+                     "SELECT 'ok-config', target, data_id, '{}', '{}', NULL FROM sweep_results")
+        conn.commit()
+        conn.close()
+        results = SweepResults(path)
+        data_id = frame['data_id'][0]
+        assert list(results.done('backtester', data_id)) == ['ok-config']
+        assert sorted(results.to_frame()['status']) == ['error', 'ok']
+        results.close()
+    print("  ✅ failed configuration stored as error and retried; old results files migrated")
+
+
+if __name__ == "__main__":
+    print("\n" + "="*80)
+    print("🔍 PARAMETER SWEEP TEST")
+    print("="*80)
+
+    test_shared_frame_roundtrip()
+    test_search_spaces()
+    test_sweep_matches_sequential_and_resumes()
+    test_failed_configurations_are_retried()
@@ -0,0 +1,587 @@
+"""
+Equivalence tests for the vectorized SMC indicators
+Сравнивает векторные реализации с исходными циклами по барам
+"""
+
+import pandas as pd
+import numpy as np
+import time
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from smc_indicators import SMCIndicators
+from pattern_recognition_strategy import PatternRecognitionStrategy
+from gold_specific_filters import GoldSpecificFilters
+
+DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'XAUUSD_MT5_20240425_20260102.csv')
+
+
+def load_gold_data():
+    """Load 10k bars of real XAUUSD H1 data"""
+    df = pd.read_csv(DATA_FILE)
+    df['datetime'] = pd.to_datetime(df['datetime'])
+    return df.set_index('datetime')
+
+
+def make_tied_data(n=3000, seed=7):
+    """Random walk rounded to whole dollars so that equal highs/lows (ties) are common"""
+    rng = np.random.default_rng(seed)
+    close = np.round(2000 + np.cumsum(rng.normal(0, 3, n)))
+    open_ = np.roll(close, 1)
+    open_[0] = close[0]
+    high = np.maximum(open_, close) + np.round(rng.uniform(0, 3, n))
+    low = np.minimum(open_, close) - np.round(rng.uniform(0, 3, n))
+    index = pd.date_range('2024-01-01', periods=n, freq='h')
+    return pd.DataFrame({'open': open_, 'high': high, 'low': low, 'close': close,
+                         'volume': rng.integers(100, 1000, n)}, index=index)
+
+
+# ------------------------------------------------------------------
+# Reference implementations (the original per-bar loops)
+# ------------------------------------------------------------------
+
+def reference_swing_points(df, swing_length):
+    df = df.copy()
+    df['swing_high'] = False
+    df['swing_low'] = False
+
+    for i in range(swing_length, len(df) - swing_length):
+        if df['high'].iloc[i] == df['high'].iloc[i-swing_length:i+swing_length+1].max():
+            df.loc[df.index[i], 'swing_high'] = True
+        if df['low'].iloc[i] == df['low'].iloc[i-swing_length:i+swing_length+1].min():
+            df.loc[df.index[i], 'swing_low'] = True
+
+    return df
+
+
+def reference_market_structure(df):
+    df = df.copy()
+    df['trend'] = 0
+    df['bos'] = False
+    df['choch'] = False
+
+    if df['swing_high'].sum() < 2 or df['swing_low'].sum() < 2:
+        return df
+
+    current_trend = 0
+    last_high = None
+    last_low = None
+
+    for i in range(len(df)):
+        current_high = df['high'].iloc[i]
+        current_low = df['low'].iloc[i]
+
+        if df['swing_high'].iloc[i]:
+            if last_high is not None:
+                if current_high > last_high:
+                    if current_trend == 1:
+                        df.loc[df.index[i], 'bos'] = True
+                    else:
+                        df.loc[df.index[i], 'choch'] = True
+                        current_trend = 1
+                else:
+                    if current_trend == 1:
+                        df.loc[df.index[i], 'choch'] = True
+                        current_trend = -1
+            last_high = current_high
+
+        if df['swing_low'].iloc[i]:
+            if last_low is not None:
+                if current_low < last_low:
+                    if current_trend == -1:
+                        df.loc[df.index[i], 'bos'] = True
+                    else:
+                        df.loc[df.index[i], 'choch'] = True
+                        current_trend = -1
+                else:
+                    if current_trend == -1:
+                        df.loc[df.index[i], 'choch'] = True
+                        current_trend = 1
+            last_low = current_low
+
+        df.loc[df.index[i], 'trend'] = current_trend
+
+    return df
+
+
+def reference_order_blocks(df, threshold=0.002):
+    df = df.copy()
+    df['bullish_ob'] = False
+    df['bearish_ob'] = False
+    df['ob_top'] = np.nan
+    df['ob_bottom'] = np.nan
+
+    for i in range(1, len(df) - 1):
+        if df['close'].iloc[i] < df['open'].iloc[i]:
+            next_move = (df['close'].iloc[i+1] - df['open'].iloc[i+1]) / df['open'].iloc[i+1]
+            if next_move > threshold:
+                df.loc[df.index[i], 'bullish_ob'] = True
+                df.loc[df.index[i], 'ob_top'] = df['high'].iloc[i]
+                df.loc[df.index[i], 'ob_bottom'] = df['low'].iloc[i]
+
+        if df['close'].iloc[i] > df['open'].iloc[i]:
+            next_move = (df['close'].iloc[i+1] - df['open'].iloc[i+1]) / df['open'].iloc[i+1]
+            if next_move < -threshold:
+                df.loc[df.index[i], 'bearish_ob'] = True
+                df.loc[df.index[i], 'ob_top'] = df['high'].iloc[i]
+                df.loc[df.index[i], 'ob_bottom'] = df['low'].iloc[i]
+
+    return df
+
+
+def reference_fair_value_gaps(df):
+    df = df.copy()
+    df['bullish_fvg'] = False
+    df['bearish_fvg'] = False
+    df['fvg_top'] = np.nan
+    df['fvg_bottom'] = np.nan
+
+    for i in range(2, len(df)):
+        if df['low'].iloc[i] > df['high'].iloc[i-2]:
+            gap_size = df['low'].iloc[i] - df['high'].iloc[i-2]
+            if gap_size > 0:
+                df.loc[df.index[i], 'bullish_fvg'] = True
+                df.loc[df.index[i], 'fvg_top'] = df['low'].iloc[i]
+                df.loc[df.index[i], 'fvg_bottom'] = df['high'].iloc[i-2]
+
+        if df['high'].iloc[i] < df['low'].iloc[i-2]:
+            gap_size = df['low'].iloc[i-2] - df['high'].iloc[i]
+            if gap_size > 0:
+                df.loc[df.index[i], 'bearish_fvg'] = True
+                df.loc[df.index[i], 'fvg_top'] = df['low'].iloc[i-2]
+                df.loc[df.index[i], 'fvg_bottom'] = df['high'].iloc[i]
+
+    return df
+
+
+def reference_liquidity_zones(df, tolerance=0.001, causal=False):
+    df = df.copy()
+    df['buy_side_liquidity'] = False
+    df['sell_side_liquidity'] = False
+
+    for flag, price, out in (('swing_high', 'high', 'buy_side_liquidity'),
+                             ('swing_low', 'low', 'sell_side_liquidity')):
+        positions = np.flatnonzero(df[flag].values)
+        levels = df[price].values[positions]
+        for k, i in enumerate(positions):
+            candidates = levels[:k + 1] if causal else levels
+            equal = np.abs(candidates - levels[k]) / levels[k] < tolerance
+            if np.sum(equal) >= 2:
+                df.loc[df.index[i], out] = True
+
+    return df
+
+
+def reference_detect_patterns(strategy, df):
+    """Original per-bar pattern loop built on the scalar _detect_* methods"""
+    df = df.copy()
+    swing_highs = df[df['swing_high'] == True].copy()
+    swing_lows = df[df['swing_low'] == True].copy()
+    detectors = [
+        ('asc_triangle', strategy._detect_ascending_triangle),
+        ('desc_triangle', strategy._detect_descending_triangle),
+        ('sym_triangle', strategy._detect_symmetrical_triangle),
+        ('bull_flag', strategy._detect_bull_flag),
+        ('bear_flag', strategy._detect_bear_flag),
+        ('bull_pennant', strategy._detect_bull_pennant),
+        ('bear_pennant', strategy._detect_bear_pennant),
+        ('falling_wedge', strategy._detect_falling_wedge),
+        ('rising_wedge', strategy._detect_rising_wedge),
+    ]
+
+    for i in range(len(df)):
+        if df['signal'].iloc[i] != 0:
+            continue
+        recent_highs = swing_highs[swing_highs.index < df.index[i]].tail(5)
+        recent_lows = swing_lows[swing_lows.index < df.index[i]].tail(5)
+        if len(recent_highs) < 2 or len(recent_lows) < 2:
+            continue
+        for name, detector in detectors:
+            pattern = detector(df, i, recent_highs, recent_lows)
+            if pattern:
+                df, added = strategy._add_pattern_signal(df, i, pattern, name)
+                if added:
+                    break
+
+    return df
+
+
+def reference_range_detection(df, lookback=20):
+    """Original per-bar range detection built on detect_range_market (np.polyfit)"""
+    filters = GoldSpecificFilters()
+    df = df.copy()
+    df['market_type'] = 'unknown'
+    df['in_range'] = False
+    df['range_quality'] = 0.0
+    df['position_in_range'] = 0.5
+
+    for i in range(lookback, len(df)):
+        analysis = filters.detect_range_market(df, i, lookback)
+        df.loc[df.index[i], 'market_type'] = analysis['market_type']
+        df.loc[df.index[i], 'in_range'] = analysis['market_type'] in ['range', 'tight_range']
+        df.loc[df.index[i], 'range_quality'] = analysis['range_quality']
+        df.loc[df.index[i], 'position_in_range'] = analysis['position_in_range']
+
+    return df
+
+
+def reference_support_resistance(df, window=50):
+    """Original ±window scan with .iloc[...].max() for every bar"""
+    df = df.copy()
+    df['is_resistance'] = False
+    df['is_support'] = False
+    df['resistance_level'] = np.nan
+    df['support_level'] = np.nan
+
+    for i in range(window, len(df) - window):
+        local_window = df['high'].iloc[i-window:i+window+1]
+        if df['high'].iloc[i] == local_window.max():
+            df.loc[df.index[i], 'is_resistance'] = True
+            df.loc[df.index[i], 'resistance_level'] = df['high'].iloc[i]
+
+        local_window = df['low'].iloc[i-window:i+window+1]
+        if df['low'].iloc[i] == local_window.min():
+            df.loc[df.index[i], 'is_support'] = True
+            df.loc[df.index[i], 'support_level'] = df['low'].iloc[i]
+
+    df['recent_resistance'] = df['resistance_level'].ffill()
+    df['recent_support'] = df['support_level'].ffill()
+
+    return df
+
+
+def make_pattern_frame(df, seed=3):
+    """OHLC frame with the columns the pattern stage expects from the parent strategy"""
+    rng = np.random.default_rng(seed)
+    df = df[['open', 'high', 'low', 'close', 'volume']].copy()
+    df['signal'] = np.where(rng.random(len(df)) < 0.02, 1, 0)
+    df['entry_price'] = np.where(df['signal'] != 0, df['close'], np.nan)
+    df['stop_loss'] = np.nan
+    df['take_profit'] = np.nan
+    df['is_active_session'] = df.index.hour.isin(range(7, 20))
+    return df
+
+
+# ------------------------------------------------------------------
+# Tests
+# ------------------------------------------------------------------
+
+def test_swing_points_match_reference():
+    """Vectorized swing detection gives identical flags on real and tied data"""
+    datasets = [('gold', load_gold_data().iloc[:3000]), ('tied', make_tied_data())]
+
+    for name, df in datasets:
+        for swing_length in (1, 5, 10, 20):
+            expected = reference_swing_points(df, swing_length)
+            result = SMCIndicators(swing_length=swing_length).detect_swing_points(df)
+
+            assert result['swing_high'].dtype == bool
+            assert result['swing_low'].dtype == bool
+            pd.testing.assert_series_equal(result['swing_high'], expected['swing_high'])
+            pd.testing.assert_series_equal(result['swing_low'], expected['swing_low'])
+
+        print(f"  ✅ {name}: swing points identical")
+
+
+def test_swing_points_short_frame():
+    """Frames shorter than the window produce no swings"""
+    df = make_tied_data(n=15)
+    result = SMCIndicators(swing_length=10).detect_swing_points(df)
+    assert not result['swing_high'].any()
+    assert not result['swing_low'].any()
+
+
+def test_market_structure_matches_reference():
+    """Single-pass structure kernel gives identical trend/bos/choch columns"""
+    datasets = [('gold', load_gold_data().iloc[:3000]), ('tied', make_tied_data())]
+
+    for name, df in datasets:
+        for swing_length in (2, 10):
+            swings = SMCIndicators(swing_length=swing_length).detect_swing_points(df)
+            expected = reference_market_structure(swings)
+            result = SMCIndicators(swing_length=swing_length).detect_market_structure(swings)
+
+            for col in ('trend', 'bos', 'choch'):
+                pd.testing.assert_series_equal(result[col], expected[col])
+
+        print(f"  ✅ {name}: market structure identical")
+
+
+def test_market_structure_too_few_swings():
+    """Fewer than two swing highs/lows leaves a neutral frame"""
+    df = make_tied_data(n=30)
+    swings = SMCIndicators(swing_length=10).detect_swing_points(df)
+    result = SMCIndicators(swing_length=10).detect_market_structure(swings)
+    assert (result['trend'] == 0).all()
+    assert not result['bos'].any()
+    assert not result['choch'].any()
+
+
+def test_order_blocks_match_reference():
+    """Mask-based Order Blocks give identical columns for several thresholds"""
+    datasets = [('gold', load_gold_data().iloc[:3000]), ('tied', make_tied_data())]
+
+    for name, df in datasets:
+        for threshold in (0.0, 0.001, 0.002):
+            expected = reference_order_blocks(df, threshold)
+            result = SMCIndicators(ob_threshold=threshold).detect_order_blocks(df)
+
+            for col in ('bullish_ob', 'bearish_ob', 'ob_top', 'ob_bottom'):
+                pd.testing.assert_series_equal(result[col], expected[col])
+
+        print(f"  ✅ {name}: order blocks identical")
+
+
+def test_fair_value_gaps_match_reference():
+    """Mask-based FVGs give identical columns with the default threshold"""
+    datasets = [('gold', load_gold_data().iloc[:3000]), ('tied', make_tied_data())]
+
+    for name, df in datasets:
+        expected = reference_fair_value_gaps(df)
+        result = SMCIndicators().detect_fair_value_gaps(df)
+
+        for col in ('bullish_fvg', 'bearish_fvg', 'fvg_top', 'fvg_bottom'):
+            pd.testing.assert_series_equal(result[col], expected[col])
+
+        print(f"  ✅ {name}: fair value gaps identical")
+
+
+def test_fair_value_gap_threshold():
+    """A positive FVG threshold only keeps gaps larger than that fraction of price"""
+    df = load_gold_data().iloc[:3000]
+    base = SMCIndicators().detect_fair_value_gaps(df)
+    strict = SMCIndicators(fvg_threshold=0.001).detect_fair_value_gaps(df)
+
+    assert strict['bullish_fvg'].sum() < base['bullish_fvg'].sum()
+    assert not (strict['bullish_fvg'] & ~base['bullish_fvg']).any()
+    gaps = (strict['fvg_top'] - strict['fvg_bottom'])[strict['bullish_fvg'] | strict['bearish_fvg']]
+    closes = df['close'][strict['bullish_fvg'] | strict['bearish_fvg']]
+    assert (gaps > 0.001 * closes).all()
+
+
+def test_liquidity_zones_match_reference():
+    """Sort-based equal highs/lows match the pairwise scan, with and without look-ahead"""
+    datasets = [('gold', load_gold_data().iloc[:3000]), ('tied', make_tied_data())]
+
+    for name, df in datasets:
+        for swing_length in (3, 10):
+            swings = SMCIndicators(swing_length=swing_length).detect_swing_points(df)
+            for tolerance in (0.0005, 0.001, 0.003):
+                for causal in (False, True):
+                    smc = SMCIndicators(swing_length=swing_length, liquidity_tolerance=tolerance,
+                                        causal_liquidity=causal)
+                    expected = reference_liquidity_zones(swings, tolerance, causal)
+                    result = smc.detect_liquidity_zones(swings)
+
+                    for col in ('buy_side_liquidity', 'sell_side_liquidity'):
+                        pd.testing.assert_series_equal(result[col], expected[col])
+
+        print(f"  ✅ {name}: liquidity zones identical (full and causal)")
+
+
+def test_causal_liquidity_is_stable():
+    """Causal liquidity flags on old bars do not change when new bars arrive"""
+    df = make_tied_data()
+    smc = SMCIndicators(swing_length=3, causal_liquidity=True)
+
+    full = smc.detect_liquidity_zones(smc.detect_swing_points(df))
+    partial = smc.detect_liquidity_zones(smc.detect_swing_points(df.iloc[:2000]))
+
+    # Swings need swing_length bars on the right to be confirmed
+    stable = partial.index[:-3]
+    pd.testing.assert_series_equal(partial.loc[stable, 'buy_side_liquidity'],
+                                   full.loc[stable, 'buy_side_liquidity'])
+
+
+def test_pattern_detection_matches_reference():
+    """Vectorized pattern stage gives the same signals as the per-bar loop"""
+    datasets = [('gold', load_gold_data().iloc[:2500]), ('tied', make_tied_data(n=2000))]
+
+    for name, df in datasets:
+        for best_hours_only in (True, False):
+            strategy = PatternRecognitionStrategy(swing_lookback=5, best_hours_only=best_hours_only)
+            frame = strategy._find_swing_points(make_pattern_frame(df))
+
+            expected = reference_detect_patterns(strategy, frame)
+            result = strategy._detect_patterns(frame.copy())  # pipeline stage, works in place
+
+            assert (result['signal'] != frame['signal']).sum() > 0, "No patterns in test data"
+            for col in ('signal', 'entry_price', 'stop_loss', 'take_profit'):
+                pd.testing.assert_series_equal(result[col], expected[col])
+            pd.testing.assert_series_equal(result['signal_type'].astype(object),
+                                           expected['signal_type'].astype(object))
+
+        print(f"  ✅ {name}: pattern signals identical")
+
+
+def test_range_detection_matches_reference():
+    """Rolling-window range detection gives the same classification as polyfit per bar"""
+    rng = np.random.default_rng(11)
+    trending = make_tied_data(n=1500)
+    trending[['open', 'high', 'low', 'close']] += np.cumsum(rng.normal(1.5, 1.0, 1500))[:, None]
+    datasets = [('gold', load_gold_data().iloc[:3000]), ('tied', make_tied_data()), ('trending', trending)]
+
+    for name, df in datasets:
+        for lookback in (5, 20):
+            expected = reference_range_detection(df, lookback)
+            result = GoldSpecificFilters().add_range_detection(df, lookback)
+
+            for col in ('market_type', 'in_range', 'range_quality', 'position_in_range'):
+                pd.testing.assert_series_equal(result[col], expected[col])
+
+        print(f"  ✅ {name}: range detection identical "
+              f"({result['market_type'].value_counts().to_dict()})")
+
+
+def test_support_resistance_matches_reference():
+    """Rolling-extrema S/R levels are identical to the ±window scan"""
+    sr_columns = ['is_resistance', 'is_support', 'resistance_level', 'support_level',
+                  'recent_resistance', 'recent_support']
+    datasets = [('gold', load_gold_data().iloc[:3000]), ('tied', make_tied_data()),
+                ('short', make_tied_data(n=40))]
+
+    for name, df in datasets:
+        for window in (5, 30):
+            expected = reference_support_resistance(df, window)
+            result = GoldSpecificFilters().detect_support_resistance(df, window)
+
+            for col in sr_columns:
+                pd.testing.assert_series_equal(result[col], expected[col])
+
+        print(f"  ✅ {name}: {int(result['is_resistance'].sum())} resistance / "
+              f"{int(result['is_support'].sum())} support levels identical")
+
+
+def test_support_resistance_causal():
+    """Causal levels at bar t only use candles up to t"""
+    df = load_gold_data().iloc[:1500]
+    window = 30
+    full = GoldSpecificFilters().detect_support_resistance(df, window, causal=True)
+
+    for end in (200, 731, 1100):
+        partial = GoldSpecificFilters().detect_support_resistance(df.iloc[:end], window, causal=True)
+        for col in ('recent_resistance', 'recent_support'):
+            pd.testing.assert_series_equal(partial[col], full[col].iloc[:end])
+
+    # Same levels as the centered mode, shifted by the confirmation delay
+    centered = GoldSpecificFilters().detect_support_resistance(df, window)
+    np.testing.assert_array_equal(full['recent_support'].to_numpy()[window:],
+                                  centered['support_level'].shift(window).ffill().to_numpy()[window:])
+    print(f"  ✅ causal S/R levels stable when future candles are removed")
+
+
+def benchmark():
+    """Print speedup of the vectorized indicators over the reference loops"""
+    df = load_gold_data()
+    smc = SMCIndicators(swing_length=10)
+
+    start = time.perf_counter()
+    reference_swing_points(df, 10)
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    smc.detect_swing_points(df)
+    vector_time = time.perf_counter() - start
+
+    print(f"  detect_swing_points: loop {loop_time:.3f}s, vectorized {vector_time:.4f}s "
+          f"({loop_time / vector_time:.0f}x)")
+
+    swings = smc.detect_swing_points(df)
+
+    start = time.perf_counter()
+    reference_market_structure(swings)
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    smc.detect_market_structure(swings)
+    vector_time = time.perf_counter() - start
+
+    print(f"  detect_market_structure: loop {loop_time:.3f}s, vectorized {vector_time:.4f}s "
+          f"({loop_time / vector_time:.0f}x)")
+
+    for name, reference, method in (
+        ('detect_order_blocks', reference_order_blocks, smc.detect_order_blocks),
+        ('detect_fair_value_gaps', reference_fair_value_gaps, smc.detect_fair_value_gaps),
+    ):
+        start = time.perf_counter()
+        reference(df)
+        loop_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        method(df)
+        vector_time = time.perf_counter() - start
+
+        print(f"  {name}: loop {loop_time:.3f}s, vectorized {vector_time:.4f}s "
+              f"({loop_time / vector_time:.0f}x)")
+
+    start = time.perf_counter()
+    reference_liquidity_zones(swings)
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    smc.detect_liquidity_zones(swings)
+    vector_time = time.perf_counter() - start
+
+    print(f"  detect_liquidity_zones: loop {loop_time:.3f}s, vectorized {vector_time:.4f}s "
+          f"({loop_time / vector_time:.0f}x)")
+
+    start = time.perf_counter()
+    reference_range_detection(df)
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    GoldSpecificFilters().add_range_detection(df)
+    vector_time = time.perf_counter() - start
+
+    print(f"  add_range_detection: loop {loop_time:.3f}s, vectorized {vector_time:.4f}s "
+          f"({loop_time / vector_time:.0f}x)")
+
+    start = time.perf_counter()
+    reference_support_resistance(df, window=30)
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    GoldSpecificFilters().detect_support_resistance(df, window=30)
+    vector_time = time.perf_counter() - start
+
+    print(f"  detect_support_resistance: loop {loop_time:.3f}s, vectorized {vector_time:.4f}s "
+          f"({loop_time / vector_time:.0f}x)")
+
+    strategy = PatternRecognitionStrategy()
+    frame = strategy._find_swing_points(make_pattern_frame(df))
+
+    start = time.perf_counter()
+    reference_detect_patterns(strategy, frame)
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    strategy._detect_patterns(frame)
+    vector_time = time.perf_counter() - start
+
+    print(f"  _detect_patterns: loop {loop_time:.3f}s, vectorized {vector_time:.4f}s "
+          f"({loop_time / vector_time:.0f}x)")
+
+
+if __name__ == "__main__":
+    print("\n" + "="*80)
+    print("🔍 VECTORIZED INDICATORS EQUIVALENCE TEST")
+    print("="*80)
+
+    test_swing_points_match_reference()
+    test_swing_points_short_frame()
+    test_market_structure_matches_reference()
+    test_market_structure_too_few_swings()
+    test_order_blocks_match_reference()
+    test_fair_value_gaps_match_reference()
+    test_fair_value_gap_threshold()
+    test_liquidity_zones_match_reference()
+    test_causal_liquidity_is_stable()
+    test_pattern_detection_matches_reference()
+    test_range_detection_matches_reference()
+    test_support_resistance_matches_reference()
+    test_support_resistance_causal()
+
+    print("\n📊 Benchmark (10k bars):")
+    benchmark()
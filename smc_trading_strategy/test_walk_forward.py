@@ -0,0 +1,101 @@
+"""
+Tests for the walk-forward optimizer
+Проверяет окна, предрасчитанные сигналы и параллельные фолды против последовательного расчёта
+"""
+
+import contextlib
+import io
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backtest_v3_adaptive import AdaptiveBacktestV3
+from pattern_recognition_strategy import PatternRecognitionStrategy
+from sweep import evaluate, load_data
+from walk_forward import PrecomputedSignals, make_folds, stitch_equity, walk_forward
+
+DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'XAUUSD_MT5_20240425_20260102.csv')
+
+
+def signal_frame(df):
+    with contextlib.redirect_stdout(io.StringIO()):
+        frame = PatternRecognitionStrategy().run_strategy(df)
+        frame['market_regime'] = AdaptiveBacktestV3().market_regimes(frame)
+    return frame
+
+
+def test_make_folds():
+    """Rolling and anchored windows tile the out-of-sample periods"""
+    assert make_folds(1000, 400, 200) == [(0, 400, 400, 600), (200, 600, 600, 800), (400, 800, 800, 1000)]
+    assert make_folds(1000, 400, 200, anchored=True)[-1] == (0, 800, 800, 1000)
+    assert make_folds(500, 400, 200) == []
+
+
+def test_stitch_equity():
+    """V3 fold gains add up, capital-based curves compound"""
+    index = pd.date_range('2025-01-01', periods=4, freq='h')
+    curves = [pd.Series([1.0, 1.1], index=index[:2]), pd.Series([1.0, 1.1], index=index[2:])]
+    np.testing.assert_allclose(stitch_equity(curves).to_numpy(), [1.0, 1.1, 1.1, 1.21])
+    np.testing.assert_allclose(stitch_equity(curves, compound=False).to_numpy(), [1.0, 1.1, 1.1, 1.2])
+    print("  ✅ stitched equity: additive for V3, compounded otherwise")
+
+
+def test_precomputed_regimes_match_v3():
+    """V3 on precomputed signals and regimes gives the same trades as running the strategy"""
+    df = load_data(DATA_FILE).iloc[:1500]
+    params = {'backtest.trend_tp1': 25}
+
+    direct = evaluate(df, 'v3', params)
+    cached = evaluate(df, 'v3', params, strategy=PrecomputedSignals(signal_frame(df)))
+    assert direct == cached
+    print(f"  ✅ precomputed V3 == direct ({direct['total_trades']} trades)")
+
+
+def test_walk_forward_matches_sequential():
+    """Parallel folds pick the same winners and OOS results as a sequential loop on truncated history"""
+    df = load_data(DATA_FILE).iloc[:2400]
+    space = {'backtest.trend_tp1': [20, 40], 'backtest.range_tp1': [15, 25]}
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        folds_df, equity = walk_forward(df, space, target='v3', train_bars=1000, test_bars=400,
+                                        workers=2, warmup_bars=300)
+
+    # Each window sees only the strategy run on the candles before its end, from 300 warm-up
+    # candles before the earliest window ending there (a test window ends where the next train window does)
+    folds = make_folds(len(df), 1000, 400)
+    train_ends = {b for _, b, _, _ in folds}
+
+    def signals(end):
+        first = (end - 1000 if end in train_ends else end - 400) - 300
+        return PrecomputedSignals(signal_frame(df.iloc[max(0, first):end]))
+
+    configs = [{'backtest.trend_tp1': a, 'backtest.range_tp1': b} for a in (20, 40) for b in (15, 25)]
+    curves = []
+    for row, (a, b, c, d) in zip(folds_df.itertuples(), folds):
+        in_sample = signals(b)
+        scores = [evaluate(df.iloc[a:b], 'v3', p, strategy=in_sample)['total_return_pct'] for p in configs]
+        assert row.params == configs[int(np.argmax(scores))]
+        np.testing.assert_allclose(getattr(row, 'is_total_return_pct'), max(scores))
+        out_of_sample = signals(d)
+        metrics, curve = evaluate(df.iloc[c:d], 'v3', row.params, strategy=out_of_sample, with_equity=True)
+        np.testing.assert_allclose(row.oos_total_return_pct, metrics['total_return_pct'])
+        curves.append(curve)
+
+    pd.testing.assert_series_equal(equity, stitch_equity(curves, compound=False))
+    np.testing.assert_allclose((equity.iloc[-1] - 1) * 100, folds_df['oos_total_return_pct'].sum())
+    assert len(folds_df) == 3 and equity.iloc[0] == 1.0
+    print(f"  ✅ walk-forward: {len(folds_df)} folds, OOS {(equity.iloc[-1] - 1) * 100:+.2f}%")
+
+
+if __name__ == "__main__":
+    print("\n" + "="*80)
+    print("🔍 WALK-FORWARD TEST")
+    print("="*80)
+
+    test_make_folds()
+    test_stitch_equity()
+    test_precomputed_regimes_match_v3()
+    test_walk_forward_matches_sequential()
@@ -7,13 +7,13 @@ import numpy as np
 from datetime import datetime, timedelta
 
 from pattern_recognition_strategy import PatternRecognitionStrategy
+from exit_simulator import simulate_exits, bars_within_hours, EXIT_TP, EXIT_TIMEOUT
+from market_data_store import load_csv_cached
 
 
 def load_mt5_data(file_path='../XAUUSD_1H_MT5_20241227_20251227.csv'):
     """Load MT5 XAUUSD data"""
-    df = pd.read_csv(file_path)
-    df['timestamp'] = pd.to_datetime(df['datetime'])
-    df = df.set_index('timestamp')
+    df = load_csv_cached(file_path)
     df = df[['open', 'high', 'low', 'close', 'volume']]
 
     # Add market hours
@@ -66,165 +66,69 @@ def backtest_trailing_stop(df, strategy, trailing_type='fixed', trailing_distanc
 
     print(f"\n🔍 Найдено сигналов: {len(df_signals)}")
 
+    # Every signal at once: trailing stop, optional TP (checked first), close 48 hours later
+    entries = np.flatnonzero(df_strategy['signal'].to_numpy() != 0)
+    window = bars_within_hours(df_strategy, entries, 48)
+    entries = entries[window > 0]
+    window = window[window > 0]
+
+    entry_price = df_strategy['entry_price'].to_numpy(dtype=float)[entries]
+    initial_stop_loss = df_strategy['stop_loss'].to_numpy(dtype=float)[entries]
+    direction = df_strategy['signal'].to_numpy()[entries]
+
+    take_profit = None
+    if tp_points:
+        take_profit = entry_price + direction * tp_points
+
+    if trailing_type == 'fixed':
+        trailing = dict(trail_trigger=-direction * np.inf, trail_distance=trailing_distance)
+    elif trailing_type == 'percent':
+        trailing = dict(trail_trigger=-direction * np.inf, trail_pct=trailing_distance / 100)
+    elif trailing_type == 'breakeven_then_trail':
+        trailing = dict(trail_trigger=entry_price + direction * breakeven_points,
+                        trail_distance=trailing_distance, trail_breakeven=True)
+    else:
+        trailing = {}
+
+    exits = simulate_exits(
+        df_strategy, entries, direction, entry_price, initial_stop_loss,
+        take_profits=take_profit, trail_same_bar=True, stop_first=False, max_bars=window,
+        **trailing
+    )
+
     trades = []
 
-    for i in range(len(df_signals)):
-        signal = df_signals.iloc[i]
-        entry_price = signal['entry_price']
-        initial_stop_loss = signal['stop_loss']
-        direction = signal['signal']
-        entry_time = df_signals.index[i]
-
-        # Current trailing stop
-        current_stop_loss = initial_stop_loss
-
-        # Track best price
-        best_price = entry_price
-
-        # Track if we moved to breakeven
-        moved_to_breakeven = False
-
-        # TP price if set
-        take_profit = None
-        if tp_points:
-            if direction == 1:
-                take_profit = entry_price + tp_points
-            else:
-                take_profit = entry_price - tp_points
-
-        exit_price = None
-        exit_type = 'EOD'
-        exit_time = None
-        max_profit_points = 0
-
-        # Look ahead 48 hours
-        search_end = entry_time + timedelta(hours=48)
-        df_future = df_strategy[(df_strategy.index > entry_time) & (df_strategy.index <= search_end)]
-
-        if len(df_future) == 0:
-            continue
-
-        # Check each candle
-        for j in range(len(df_future)):
-            candle_time = df_future.index[j]
-            high = df_future['high'].iloc[j]
-            low = df_future['low'].iloc[j]
-            close = df_future['close'].iloc[j]
-
-            if direction == 1:  # LONG
-                # Update best price
-                if high > best_price:
-                    best_price = high
-                    max_profit_points = best_price - entry_price
-
-                # Update trailing stop
-                if trailing_type == 'fixed':
-                    # Keep stop at trailing_distance below best price
-                    new_stop = best_price - trailing_distance
-                    if new_stop > current_stop_loss:
-                        current_stop_loss = new_stop
-
-                elif trailing_type == 'percent':
-                    # Keep stop at trailing_distance% below best price
-                    new_stop = best_price * (1 - trailing_distance / 100)
-                    if new_stop > current_stop_loss:
-                        current_stop_loss = new_stop
-
-                elif trailing_type == 'breakeven_then_trail':
-                    # Move to breakeven first
-                    if not moved_to_breakeven and (best_price - entry_price) >= breakeven_points:
-                        current_stop_loss = entry_price
-                        moved_to_breakeven = True
-
-                    # Then trail
-                    if moved_to_breakeven:
-                        new_stop = best_price - trailing_distance
-                        if new_stop > current_stop_loss:
-                            current_stop_loss = new_stop
-
-                # Check TP first
-                if take_profit and high >= take_profit:
-                    exit_price = take_profit
-                    exit_type = 'TP'
-                    exit_time = candle_time
-                    break
-
-                # Check trailing stop
-                if low <= current_stop_loss:
-                    exit_price = current_stop_loss
-                    if current_stop_loss >= entry_price:
-                        exit_type = 'TS_BE' if current_stop_loss == entry_price else 'TS_PROFIT'
-                    else:
-                        exit_type = 'TS_LOSS'
-                    exit_time = candle_time
-                    break
-
-            else:  # SHORT
-                # Update best price (lowest for short)
-                if low < best_price:
-                    best_price = low
-                    max_profit_points = entry_price - best_price
-
-                # Update trailing stop
-                if trailing_type == 'fixed':
-                    new_stop = best_price + trailing_distance
-                    if new_stop < current_stop_loss:
-                        current_stop_loss = new_stop
-
-                elif trailing_type == 'percent':
-                    new_stop = best_price * (1 + trailing_distance / 100)
-                    if new_stop < current_stop_loss:
-                        current_stop_loss = new_stop
-
-                elif trailing_type == 'breakeven_then_trail':
-                    if not moved_to_breakeven and (entry_price - best_price) >= breakeven_points:
-                        current_stop_loss = entry_price
-                        moved_to_breakeven = True
-
-                    if moved_to_breakeven:
-                        new_stop = best_price + trailing_distance
-                        if new_stop < current_stop_loss:
-                            current_stop_loss = new_stop
-
-                # Check TP first
-                if take_profit and low <= take_profit:
-                    exit_price = take_profit
-                    exit_type = 'TP'
-                    exit_time = candle_time
-                    break
-
-                # Check trailing stop
-                if high >= current_stop_loss:
-                    exit_price = current_stop_loss
-                    if current_stop_loss <= entry_price:
-                        exit_type = 'TS_BE' if current_stop_loss == entry_price else 'TS_PROFIT'
-                    else:
-                        exit_type = 'TS_LOSS'
-                    exit_time = candle_time
-                    break
-
-        # Close at timeout if still open
-        if exit_price is None:
-            exit_price = df_future['close'].iloc[-1]
-            exit_type = 'EOD'
-            exit_time = df_future.index[-1]
+    for k in range(len(entries)):
+        entry_time = df_strategy.index[entries[k]]
+        exit_time = df_strategy.index[exits['exit_idx'][k]]
+        exit_price = exits['exit_price'][k]
+        current_stop_loss = exits['final_stop'][k]
+        reason = exits['exit_reason'][k]
 
-        # Calculate PnL
-        if direction == 1:
-            pnl_points = exit_price - entry_price
+        if reason == EXIT_TP:
+            exit_type = 'TP'
+        elif reason == EXIT_TIMEOUT:
+            exit_type = 'EOD'
+        elif exit_price == entry_price[k]:
+            exit_type = 'TS_BE'
+        elif direction[k] * (exit_price - entry_price[k]) > 0:
+            exit_type = 'TS_PROFIT'
         else:
-            pnl_points = entry_price - exit_price
+            exit_type = 'TS_LOSS'
 
-        pnl_pct = (pnl_points / entry_price) * 100
+        # Calculate PnL
+        pnl_points = direction[k] * (exit_price - entry_price[k])
+        pnl_pct = (pnl_points / entry_price[k]) * 100
+        max_profit_points = direction[k] * (exits['best_price'][k] - entry_price[k])
         duration_hours = (exit_time - entry_time).total_seconds() / 3600
 
         trades.append({
             'entry_time': entry_time,
             'exit_time': exit_time,
             'month': entry_time.strftime('%Y-%m'),
-            'direction': 'LONG' if direction == 1 else 'SHORT',
-            'entry_price': entry_price,
-            'initial_sl': initial_stop_loss,
+            'direction': 'LONG' if direction[k] == 1 else 'SHORT',
+            'entry_price': entry_price[k],
+            'initial_sl': initial_stop_loss[k],
             'final_sl': current_stop_loss,
             'exit_price': exit_price,
             'exit_type': exit_type,
@@ -232,7 +136,7 @@ def backtest_trailing_stop(df, strategy, trailing_type='fixed', trailing_distanc
             'pnl_points': pnl_points,
             'max_profit_points': max_profit_points,
             'duration_hours': duration_hours,
-            'moved_to_breakeven': moved_to_breakeven,
+            'moved_to_breakeven': trailing_type == 'breakeven_then_trail' and bool(exits['trailing'][k]),
         })
 
     return pd.DataFrame(trades)
@@ -0,0 +1,360 @@
+"""
+Walk-Forward Optimizer
+Оптимизация параметров на каждом обучающем окне и проверка победителя вне выборки;
+сигналы окна считаются только по свечам до его конца, фолды считаются параллельно
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sweep import (SEARCH_MODES, SWEEP_TARGETS, SharedFrame, build_strategy, evaluate, grid_configs,
+                   load_data, parse_param, random_configs, split_params)
+
+
+class PrecomputedSignals:
+    """
+    Strategy stand-in returning slices of a precomputed signal frame
+
+    walk_forward() runs the strategy once per strategy configuration and
+    window end, on the candles before that end only (swing points, liquidity
+    levels and order blocks look ahead within the frame they are given), so
+    every configuration backtested on the window reuses it. Signals near a
+    window start also see warm-up bars before it, as a live bot with history
+    would.
+    """
+
+    def __init__(self, frame: pd.DataFrame):
+        self.frame = frame
+
+    def run_strategy(self, df: pd.DataFrame) -> pd.DataFrame:
+        start = self.frame.index.get_loc(df.index[0])
+        return self.frame.iloc[start:start + len(df)].copy()
+
+
+def make_folds(n: int, train_bars: int, test_bars: int, step: Optional[int] = None,
+               anchored: bool = False) -> List[Tuple[int, int, int, int]]:
+    """
+    Walk-forward windows over n candles
+
+    Args:
+        n: Number of candles
+        train_bars: In-sample candles per fold
+        test_bars: Out-of-sample candles per fold
+        step: Shift between folds (default: test_bars, so test windows tile the data)
+        anchored: In-sample windows all start at the first candle (expanding)
+
+    Returns:
+        List of (train_start, train_end, test_start, test_end) positions, ends exclusive
+    """
+    step = step or test_bars
+    folds = []
+    start = 0
+    while start + train_bars + test_bars <= n:
+        train_end = start + train_bars
+        folds.append((0 if anchored else start, train_end, train_end, train_end + test_bars))
+        start += step
+    return folds
+
+
+def _strategy_key(params: Dict) -> str:
+    strategy_params, _ = split_params(params)
+    return json.dumps(strategy_params, sort_keys=True)
+
+
+def _signal_windows(folds: List[Tuple[int, int, int, int]]) -> Dict[int, int]:
+    """Window end -> first window start ending there (train and test windows of all folds)"""
+    windows = {}
+    for train_start, train_end, test_start, test_end in folds:
+        for start, end in ((train_start, train_end), (test_start, test_end)):
+            windows[end] = min(start, windows.get(end, start))
+    return windows
+
+
+_worker_df = None
+_worker_signals = {}
+_worker_shms = []
+
+
+def _init_worker(ohlcv_spec: Dict, signal_specs: Dict):
+    """Pool initializer: attach the shared candles and signal frames once per process"""
+    global _worker_df, _worker_signals, _worker_shms
+    _worker_df, shm = SharedFrame.attach(ohlcv_spec)
+    _worker_shms = [shm]
+    _worker_signals = {}
+    for key, spec in signal_specs.items():
+        _worker_signals[key], shm = SharedFrame.attach(spec)
+        _worker_shms.append(shm)
+
+
+def _compute_signals(strategy_keys: List[str], target: str, start: int, end: int,
+                     warmup: int) -> List[pd.DataFrame]:
+    """
+    Pool task: every strategy configuration on candles [start - warmup, end), rows [start, end) kept
+
+    One task per window end, so configurations sharing indicator stages hit
+    the worker's IndicatorCache on the same candles.
+    """
+    first = max(0, start - warmup)
+    frames = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for strategy_key in strategy_keys:
+            strategy = build_strategy(json.loads(strategy_key))
+            frame = strategy.run_strategy(_worker_df.iloc[first:end])
+            if target == 'v3':
+                from backtest_v3_adaptive import AdaptiveBacktestV3
+                frame['market_regime'] = AdaptiveBacktestV3().market_regimes(frame)
+            frames.append(frame.iloc[start - first:][[c for c in frame.columns if frame[c].dtype.kind in 'biuf']])
+    return frames
+
+
+def _run_window(target: str, params: Dict, start: int, end: int, with_equity: bool):
+    """Pool task: one configuration on candles [start, end)"""
+    strategy = PrecomputedSignals(_worker_signals[(_strategy_key(params), end)])
+    try:
+        return evaluate(_worker_df.iloc[start:end], target, params, strategy=strategy,
+                        with_equity=with_equity)
+    except Exception as e:
+        return {'error': f"{type(e).__name__}: {e}"}
+
+
+def stitch_equity(curves: List[pd.Series], compound: bool = True) -> pd.Series:
+    """
+    Chain per-fold equity curves (each relative to its fold start) into one curve
+
+    Args:
+        curves: Out-of-sample equity curves in fold order
+        compound: Scale each fold by the level reached (capital-based targets);
+            False adds each fold's gains, as V3 PnL adds up within a fold
+    """
+    level = 1.0
+    parts = []
+    for curve in curves:
+        parts.append(curve * level if compound else curve - 1.0 + level)
+        level = parts[-1].iloc[-1]
+    if not parts:
+        return pd.Series(dtype=float)
+    return pd.concat(parts)
+
+
+def walk_forward(
+    df: pd.DataFrame,
+    space: Dict,
+    target: str = 'v3',
+    train_bars: int = 2000,
+    test_bars: int = 500,
+    step: Optional[int] = None,
+    anchored: bool = False,
+    search: str = 'grid',
+    trials: int = 50,
+    metric: str = 'total_return_pct',
+    minimize: bool = False,
+    workers: Optional[int] = None,
+    seed: int = 0,
+    warmup_bars: int = 500
+) -> Tuple[pd.DataFrame, pd.Series]:
+    """
+    Walk-forward optimization
+
+    1. For every strategy configuration in the space and every window end,
+       the strategy (plus V3 market regimes) runs on the candles before that
+       end, in parallel: no window sees signals built from later candles.
+       The frame starts warmup_bars before the earliest window ending there,
+       so the cost per window does not grow with the history, and the test
+       window of one fold shares its frame with the next fold's train window.
+    2. Every (fold, configuration) in-sample run is a pool task on a slice
+       of those precomputed signals.
+    3. The best configuration of each fold is run on its out-of-sample window
+       and the out-of-sample equity curves are chained (V3 PnL adds up,
+       capital-based targets compound).
+
+    Args:
+        df: OHLCV DataFrame
+        space: Sweep space ('strategy.<name>' / 'backtest.<name>', see sweep.run_sweep)
+        target: Backtest to run (sweep.SWEEP_TARGETS key)
+        train_bars: In-sample candles per fold
+        test_bars: Out-of-sample candles per fold
+        step: Shift between folds (default: test_bars)
+        anchored: Expanding in-sample window
+        search: 'grid' or 'random'
+        trials: Configurations for random search
+        metric: Metric to select the in-sample winner
+        minimize: Lower metric is better
+        workers: Worker processes (default: CPU count)
+        seed: Random seed for random search
+        warmup_bars: Candles before a window its signals are computed from
+
+    Returns:
+        (folds DataFrame, stitched out-of-sample equity Series starting at 1.0)
+    """
+    if target not in SWEEP_TARGETS:
+        raise ValueError(f"Unknown target '{target}' (choose from {', '.join(SWEEP_TARGETS)})")
+    if search not in ('grid', 'random'):
+        raise ValueError("Walk-forward supports grid and random search")
+
+    folds = make_folds(len(df), train_bars, test_bars, step, anchored)
+    if not folds:
+        raise ValueError(f"Not enough data for one fold ({len(df)} < {train_bars + test_bars} candles)")
+    configs = list(grid_configs(space) if search == 'grid' else random_configs(space, trials, seed))
+    strategy_keys = sorted({_strategy_key(c) for c in configs})
+    workers = workers or os.cpu_count() or 1
+
+    print(f"\n🚶 Walk-forward: {target}, {len(folds)} folds x {len(configs)} configurations, "
+          f"{workers} workers")
+    print(f"   Train: {train_bars} candles{' (anchored)' if anchored else ''}, test: {test_bars} candles")
+
+    start_time = time.perf_counter()
+    ohlcv = SharedFrame(df)
+    signal_frames = []
+    try:
+        # 1. Signals per strategy configuration and window end, from the candles before it
+        windows = _signal_windows(folds)
+        ends = sorted(windows)
+        with ProcessPoolExecutor(max_workers=min(workers, len(ends)), initializer=_init_worker,
+                                 initargs=(ohlcv.spec, {})) as pool:
+            frames = list(pool.map(_compute_signals, [strategy_keys] * len(ends), [target] * len(ends),
+                                   [windows[end] for end in ends], ends, [warmup_bars] * len(ends)))
+        signal_tasks = [(key, end) for end, end_frames in zip(ends, frames) for key in strategy_keys]
+        signal_frames = [SharedFrame(frame) for end_frames in frames for frame in end_frames]
+        del frames
+        signal_specs = {task: shared.spec for task, shared in zip(signal_tasks, signal_frames)}
+        print(f"   Signals computed for {len(strategy_keys)} strategy configurations x {len(windows)} window ends "
+              f"({time.perf_counter() - start_time:.1f}s)")
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(ohlcv.spec, signal_specs)) as pool:
+            # 2. In-sample search: every fold x configuration
+            tasks = [(f, c) for f in range(len(folds)) for c in range(len(configs))]
+            in_sample = pool.map(
+                _run_window,
+                [target] * len(tasks), [configs[c] for _, c in tasks],
+                [folds[f][0] for f, _ in tasks], [folds[f][1] for f, _ in tasks],
+                [False] * len(tasks), chunksize=max(1, len(tasks) // (workers * 4))
+            )
+            scores = np.full((len(folds), len(configs)), np.nan)
+            for (f, c), metrics in zip(tasks, in_sample):
+                if metric in metrics:
+                    scores[f, c] = metrics[metric]
+
+            # 3. Out-of-sample run of every fold's winner
+            ranked = np.where(np.isnan(scores), np.inf if minimize else -np.inf, scores)
+            best = ranked.argmin(axis=1) if minimize else ranked.argmax(axis=1)
+            out_of_sample = list(pool.map(
+                _run_window,
+                [target] * len(folds), [configs[b] for b in best],
+                [fold[2] for fold in folds], [fold[3] for fold in folds], [True] * len(folds)
+            ))
+    finally:
+        ohlcv.close()
+        for shared in signal_frames:
+            shared.close()
+
+    rows = []
+    curves = []
+    for f, (fold, b, result) in enumerate(zip(folds, best, out_of_sample)):
+        row = {
+            'fold': f + 1,
+            'train_start': df.index[fold[0]],
+            'train_end': df.index[fold[1] - 1],
+            'test_start': df.index[fold[2]],
+            'test_end': df.index[fold[3] - 1],
+            'params': configs[b],
+            f'is_{metric}': scores[f, b],
+        }
+        if isinstance(result, tuple):
+            metrics, curve = result
+            curves.append(curve)
+            row.update({f'oos_{k}': v for k, v in metrics.items()})
+        else:
+            row['oos_error'] = result.get('error')
+        rows.append(row)
+
+    folds_df = pd.DataFrame(rows)
+    equity = stitch_equity(curves, compound=target != 'v3')
+    print(f"\n✅ Walk-forward finished in {time.perf_counter() - start_time:.1f}s")
+    return folds_df, equity
+
+
+def print_walk_forward(folds_df: pd.DataFrame, equity: pd.Series, metric: str = 'total_return_pct'):
+    """Print fold winners and the out-of-sample summary"""
+    print("\n📊 WALK-FORWARD OPTIMIZATION RESULTS")
+    print("="*60)
+    for _, row in folds_df.iterrows():
+        params = ', '.join(f"{k.split('.', 1)[1]}={v}" for k, v in row['params'].items())
+        oos = row.get(f'oos_{metric}', np.nan)
+        print(f"  Fold {row['fold']:>2}: {row['test_start']:%Y-%m-%d} → {row['test_end']:%Y-%m-%d}  "
+              f"IS {row[f'is_{metric}']:+.2f}  OOS {oos:+.2f}  [{params}]")
+
+    if len(equity):
+        running_max = equity.cummax()
+        max_drawdown = ((equity - running_max) / running_max * 100).min()
+        print(f"\n  OOS return (stitched): {(equity.iloc[-1] - 1) * 100:+.2f}%")
+        print(f"  OOS max drawdown:      {max_drawdown:.2f}%")
+    if f'oos_{metric}' in folds_df:
+        is_mean = folds_df[f'is_{metric}'].mean()
+        oos_mean = folds_df[f'oos_{metric}'].mean()
+        print(f"  Positive OOS folds:    {(folds_df[f'oos_{metric}'] > 0).sum()}/{len(folds_df)}")
+        if is_mean:
+            print(f"  WF efficiency:         {oos_mean / is_mean:.2f} (mean OOS / mean IS {metric})")
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description='Walk-forward optimization')
+    parser.add_argument('--file', type=str, required=True, help='CSV file with OHLCV data')
+    parser.add_argument('--target', choices=list(SWEEP_TARGETS), default='v3', help='Backtest to run')
+    parser.add_argument('--search', choices=[m for m in SEARCH_MODES if m != 'bayes'], default='grid')
+    parser.add_argument('--param', action='append', default=[],
+                        help="strategy.<name>=a,b,c | backtest.<name>=low:high:step | name=low~high")
+    parser.add_argument('--space', type=str, help='JSON file {name: [values] or {low, high, step, log}}')
+    parser.add_argument('--trials', type=int, default=50, help='Configurations for random search')
+    parser.add_argument('--train-bars', type=int, default=2000, help='In-sample candles per fold')
+    parser.add_argument('--test-bars', type=int, default=500, help='Out-of-sample candles per fold')
+    parser.add_argument('--step', type=int, default=None, help='Shift between folds (default: test bars)')
+    parser.add_argument('--anchored', action='store_true', help='Expanding in-sample window')
+    parser.add_argument('--warmup-bars', type=int, default=500,
+                        help='Candles before each window its signals are computed from')
+    parser.add_argument('--metric', type=str, default='total_return_pct', help='Selection metric')
+    parser.add_argument('--minimize', action='store_true', help='Lower metric is better')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    parser.add_argument('--output', type=str, default='walk_forward',
+                        help='Prefix of the <prefix>_folds.csv / <prefix>_oos_equity.csv outputs')
+    args = parser.parse_args()
+
+    space = {}
+    if args.space:
+        with open(args.space) as f:
+            space.update(json.load(f))
+    space.update(parse_param(p) for p in args.param)
+    if not space:
+        parser.error('Give the search space with --param or --space')
+
+    print(f"\n📂 Loading data from {args.file}...")
+    df = load_data(args.file)
+    folds_df, equity = walk_forward(
+        df, space, target=args.target, train_bars=args.train_bars, test_bars=args.test_bars,
+        step=args.step, anchored=args.anchored, search=args.search, trials=args.trials,
+        metric=args.metric, minimize=args.minimize, workers=args.workers, seed=args.seed,
+        warmup_bars=args.warmup_bars
+    )
+    print_walk_forward(folds_df, equity, args.metric)
+
+    folds_df.assign(params=folds_df['params'].map(json.dumps)).to_csv(f'{args.output}_folds.csv', index=False)
+    equity.rename('equity').to_csv(f'{args.output}_oos_equity.csv')
+    print(f"\n💾 Saved {args.output}_folds.csv and {args.output}_oos_equity.csv")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+"""
+Test for the async bot runner used by the GUI
+Боты на одном символе делят одну подписку на свечи, цикл для 50 символов стоит как для одного
+"""
+
+import asyncio
+import threading
+import time
+import numpy as np
+import pandas as pd
+from trading_bots.shared.async_runner import AsyncBotRunner, FeedKey
+
+HOUR = 3600
+LATENCY = 0.05  # Simulated exchange round trip
+
+
+def candles(symbol, now, limit):
+    """Last `limit` 1h candles up to the forming one at `now`"""
+    last = int(now // HOUR) * HOUR
+    times = np.arange(last - (limit - 1) * HOUR, last + HOUR, HOUR)
+    price = 100.0 + (hash(symbol) % 50) + np.sin(times / HOUR / 10.0)
+    df = pd.DataFrame({'open': price, 'high': price + 1, 'low': price - 1, 'close': price + 0.5,
+                       'volume': 10.0}, index=pd.DatetimeIndex(pd.to_datetime(times, unit='s'), name='datetime'))
+    return df
+
+
+class AsyncSource:
+    """Offline stand-in for the ccxt async client"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.requests = []
+
+    def fetcher(self, symbol, timeframe):
+        async def fetch(limit):
+            self.requests.append((symbol, limit))
+            await asyncio.sleep(LATENCY)
+            return candles(symbol, self.clock(), limit)
+        return fetch
+
+    async def close(self):
+        pass
+
+
+class BlockingSource(AsyncSource):
+    """Offline stand-in for MT5: blocking calls, records overlapping calls"""
+
+    def __init__(self, clock):
+        super().__init__(clock)
+        self.active = 0
+        self.max_active = 0
+        self.threads = set()
+        self.lock = threading.Lock()
+
+    def enter(self):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        self.threads.add(threading.current_thread().name)
+
+    def leave(self):
+        with self.lock:
+            self.active -= 1
+
+    def fetcher(self, symbol, timeframe):
+        def fetch(limit):
+            self.requests.append((symbol, limit))
+            self.enter()
+            try:
+                time.sleep(LATENCY / 5)
+                return candles(symbol, self.clock(), limit)
+            finally:
+                self.leave()
+        return fetch
+
+
+class FakeBot:
+    """Bot handle recording what the runner called"""
+
+    history_bars = 200
+
+    def __init__(self, source=None):
+        self.source = source
+        self.frames = []
+        self.monitors = 0
+        self.disconnected = False
+
+    def _call(self):
+        if self.source is not None:
+            self.source.enter()
+            time.sleep(0.001)
+            self.source.leave()
+
+    def connect(self):
+        self._call()
+        return True
+
+    def analyze(self, frame):
+        self._call()
+        self.frames.append(frame)
+
+    def monitor(self):
+        self.monitors += 1
+
+    def disconnect(self):
+        self.disconnected = True
+
+    def on_error(self, message):
+        raise AssertionError(message)
+
+
+def make_runner(now, **kwargs):
+    clock = lambda: now[0]
+    sources = {'binance': AsyncSource(clock), 'mt5': BlockingSource(clock)}
+    return AsyncBotRunner(sources, clock=clock, **kwargs), sources
+
+
+def test_bots_share_candle_feeds():
+    """20 bots on 4 symbols: one request per symbol, incremental refresh after the bar close"""
+    now = [1_750_000_000.0]
+    runner, sources = make_runner(now)
+    symbols = ['BTC/USDT', 'ETH/USDT', 'SOL/USDT', 'BNB/USDT']
+    bots = {f'bot{i}': FakeBot() for i in range(20)}
+
+    async def scenario():
+        added = await asyncio.gather(*(runner.add(bot_id, bot, FeedKey('binance', symbols[i % 4], '1h'))
+                                       for i, (bot_id, bot) in enumerate(bots.items())))
+        assert all(added)
+        assert sorted(sources['binance'].requests) == sorted((s, 200) for s in symbols)
+
+        now[0] += HOUR
+        sources['binance'].requests.clear()
+        await runner.run_feeds(list(runner.feeds.values()))
+        assert sorted(sources['binance'].requests) == sorted((s, 10) for s in symbols)
+
+    asyncio.run(scenario())
+    for bot in bots.values():
+        assert len(bot.frames) == 2
+        first, second = bot.frames
+        assert len(second) == 200 and second.index[-1] == first.index[-1] + pd.Timedelta(hours=1)
+        pd.testing.assert_frame_equal(second.iloc[:-2], first.iloc[1:-1])
+    assert all(subscribers == 5 for _, subscribers, _ in runner.feed_stats())
+    print("  ✅ 20 bots / 4 symbols: 4 requests per cycle, merged incremental candles")
+
+
+def test_cycle_time_does_not_grow_with_symbols():
+    """Feeds are refreshed concurrently: 50 symbols take about as long as one"""
+    now = [1_750_000_000.0]
+    timings = {}
+    for count in (1, 50):
+        runner, sources = make_runner(now)
+
+        async def scenario():
+            await asyncio.gather(*(runner.add(f'bot{i}', FakeBot(), FeedKey('binance', f'S{i}/USDT', '1h'))
+                                   for i in range(count)))
+            now[0] += HOUR
+            start = time.perf_counter()
+            await runner.run_feeds(list(runner.feeds.values()))
+            return time.perf_counter() - start
+
+        timings[count] = asyncio.run(scenario())
+        now[0] -= HOUR
+    assert timings[50] < 50 * LATENCY / 4  # sequential requests would take 50 * LATENCY
+    print(f"  ✅ cycle: 1 symbol {timings[1] * 1000:.0f} ms, 50 symbols {timings[50] * 1000:.0f} ms")
+
+
+def test_mt5_calls_are_serialized():
+    """Blocking MT5 data and bot calls never overlap and all run on the MT5 thread"""
+    now = [1_750_000_000.0]
+    runner, sources = make_runner(now)
+    mt5 = sources['mt5']
+    bots = [FakeBot(mt5) for _ in range(6)]
+
+    async def scenario():
+        await asyncio.gather(*(runner.add(f'mt5_{i}', bot, FeedKey('mt5', ['XAUUSD', 'EURUSD'][i % 2], 'H1'))
+                               for i, bot in enumerate(bots)))
+        now[0] += HOUR
+        await runner.run_feeds(list(runner.feeds.values()))
+
+    asyncio.run(scenario())
+    assert mt5.max_active == 1
+    assert all(name.startswith('mt5') for name in mt5.threads)
+    assert all(len(bot.frames) == 2 for bot in bots)
+    print(f"  ✅ MT5: {len(mt5.requests)} data requests + bot calls on one thread, never concurrent")
+
+
+def test_bot_calls_do_not_overlap():
+    """monitor() is not started while the same bot's analyze() runs on another pool thread"""
+    now = [1_750_000_000.0]
+    runner, _ = make_runner(now, monitor_interval=0.005)
+    overlaps = BlockingSource(lambda: now[0])
+
+    class SlowBot(FakeBot):
+        def analyze(self, frame):
+            self._call()
+            time.sleep(LATENCY)
+            self.frames.append(frame)
+
+        def monitor(self):
+            self._call()
+            self.monitors += 1
+
+    bot = SlowBot(overlaps)
+
+    async def scenario():
+        await runner.add('btc', bot, FeedKey('binance', 'BTC/USDT', '1h'))
+        monitor = asyncio.create_task(runner._monitor())
+        for _ in range(3):
+            now[0] += HOUR
+            await runner.run_feeds(list(runner.feeds.values()))
+        await asyncio.sleep(0.02)
+        monitor.cancel()
+
+    asyncio.run(scenario())
+    assert overlaps.max_active == 1 and len(bot.frames) == 4 and bot.monitors >= 3
+    print(f"  ✅ {len(bot.frames)} slow analyses and {bot.monitors} monitor calls of one bot, never concurrent")
+
+
+def test_scheduler_wakes_for_new_feeds():
+    """A feed added while the scheduler sleeps until a daily close is still analyzed after its own close"""
+    t0 = time.time()
+    clock = lambda: 1_750_000_020 - 0.3 + time.time() - t0  # 0.3 s before a minute close
+    runner = AsyncBotRunner({'binance': AsyncSource(clock)}, clock=clock, analysis_delay=0)
+    daily, minute = FakeBot(), FakeBot()
+
+    async def scenario():
+        await runner._startup()
+        await runner.add('daily', daily, FeedKey('binance', 'BTC/USDT', '1d'))
+        await asyncio.sleep(0.01)  # scheduler now sleeps until the daily close
+        await runner.add('minute', minute, FeedKey('binance', 'ETH/USDT', '1m'))
+        await asyncio.sleep(0.6)
+        await runner._shutdown()
+
+    asyncio.run(scenario())
+    assert len(minute.frames) == 2 and len(daily.frames) == 1
+    assert all(task.done() for task in runner._tasks)
+    print("  ✅ scheduler woken by a new feed: 1m bot analyzed after its close, tasks finished on shutdown")
+
+
+def test_background_thread_lifecycle():
+    """Thread-safe add/remove from the GUI thread, periodic monitor()"""
+    runner, _ = make_runner([time.time()], monitor_interval=0.02)
+    runner.sources['binance'].clock = time.time
+    runner.start()
+    bot = FakeBot()
+    assert runner.add_bot('btc', bot, FeedKey('binance', 'BTC/USDT', '1h')).result(5)
+    time.sleep(0.15)
+    assert len(bot.frames) == 1 and bot.monitors >= 2
+
+    assert runner.remove_bot('btc').result(5)
+    assert bot.disconnected and not runner.feeds
+    runner.shutdown()
+    print(f"  ✅ background runner: first analysis on add, {bot.monitors} monitor calls, clean shutdown")
+
+
+def benchmark():
+    """Bar-close cycle for 1..200 symbols with a 50 ms exchange"""
+    now = [1_750_000_000.0]
+    print()
+    for count in (1, 10, 50, 200):
+        runner, _ = make_runner(now)
+
+        async def scenario():
+            await asyncio.gather(*(runner.add(f'bot{i}', FakeBot(), FeedKey('binance', f'S{i}/USDT', '1h'))
+                                   for i in range(count)))
+            now[0] += HOUR
+            start = time.perf_counter()
+            await runner.run_feeds(list(runner.feeds.values()))
+            return time.perf_counter() - start
+
+        elapsed = asyncio.run(scenario())
+        now[0] -= HOUR
+        print(f"⏱️  {count:>3} symbols: {elapsed * 1000:.0f} ms per bar close "
+              f"(sequential ~{count * LATENCY * 1000:.0f} ms)")
+
+
+if __name__ == "__main__":
+    print("\n" + "="*80)
+    print("🔍 ASYNC BOT RUNNER TEST")
+    print("="*80)
+
+    test_bots_share_candle_feeds()
+    test_cycle_time_does_not_grow_with_symbols()
+    test_mt5_calls_are_serialized()
+    test_bot_calls_do_not_overlap()
+    test_scheduler_wakes_for_new_feeds()
+    test_background_thread_lifecycle()
+    benchmark()
@@ -0,0 +1,237 @@
+"""
+Test for the shared exchange client pool and MT5 terminal session
+Один клиент на аккаунт: рынки загружаются один раз, запросы из потоков не пересекаются, MT5 инициализируется один раз
+"""
+
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'trading_bots'))
+
+from shared.exchange_pool import ExchangePool, MT5Terminal, exchange_config
+
+MARKETS_LATENCY = 0.05  # Simulated load_markets round trip
+REQUEST_LATENCY = 0.005  # Simulated ticker round trip
+
+
+class FakeExchange:
+    """Offline stand-in for a ccxt client that notices overlapping requests"""
+
+    created = 0
+
+    def __init__(self, *key):
+        FakeExchange.created += 1
+        self.key = key
+        self.market_loads = 0
+        self.requests = 0
+        self.overlaps = 0
+        self._busy = False
+
+    def _request(self, latency):
+        if self._busy:
+            self.overlaps += 1
+        self._busy = True
+        time.sleep(latency)
+        self._busy = False
+
+    def load_markets(self):
+        self._request(MARKETS_LATENCY)
+        self.market_loads += 1
+
+    def fetch_ticker(self, symbol):
+        self._request(REQUEST_LATENCY)
+        self.requests += 1
+        return {'symbol': symbol, 'last': 100.0}
+
+
+class FakeMT5:
+    """Offline stand-in for the MetaTrader5 module"""
+
+    ORDER_TYPE_BUY = 0
+
+    def __init__(self, available=True):
+        self.available = available
+        self.initialized = False
+        self.initialize_calls = 0
+
+    def initialize(self):
+        self.initialize_calls += 1
+        time.sleep(MARKETS_LATENCY)
+        self.initialized = self.available
+        return self.available
+
+    def shutdown(self):
+        self.initialized = False
+
+    def terminal_info(self):
+        return {'connected': True} if self.initialized else None
+
+    def last_error(self):
+        return (-10003, 'IPC initialize failed')
+
+    def symbol_info_tick(self, symbol):
+        return {'symbol': symbol, 'bid': 2000.0} if self.initialized else None
+
+    def positions_get(self, symbol=None):
+        return ()
+
+
+def test_one_client_per_account():
+    """Threads share one client per account; markets load once and requests do not overlap"""
+    pool = ExchangePool(factory=FakeExchange)
+
+    def poll(_):
+        client = pool.get('binance', 'future')
+        with client as exchange:
+            return exchange.fetch_ticker('BTC/USDT')['last']
+
+    with ThreadPoolExecutor(8) as executor:
+        prices = list(executor.map(poll, range(64)))
+    public = pool.get('binance', 'future').exchange
+    assert prices == [100.0] * 64
+    assert public.market_loads == 1 and public.requests == 64 and public.overlaps == 0
+
+    account = pool.get('binance', 'future', testnet=True, api_key='key', api_secret='secret')
+    assert account is pool.get('binance', 'future', testnet=True, api_key='key', api_secret='secret')
+    assert account is not pool.get('binance', 'future', api_key='key', api_secret='secret')
+    assert account is not pool.get('binance', 'future', testnet=True, api_key='key', api_secret='new')
+    assert account.exchange.key == ('binance', 'future', True, 'key', 'secret')
+
+    config = exchange_config('future', testnet=True, api_key='key', api_secret='secret')
+    assert config['apiKey'] == 'key' and config['options']['adjustForTimeDifference']
+    assert config['urls']['api']['private'].startswith('https://testnet.binancefuture.com')
+    assert 'apiKey' not in exchange_config() and 'urls' not in exchange_config()
+    print(f"  ✅ 64 polls from 8 threads: 1 client, 1 load_markets, 0 overlapping requests; "
+          f"accounts and networks get separate clients")
+
+
+def test_failed_markets_load_is_retried():
+    """A failed load_markets releases the client and is retried on the next use"""
+    class Flaky(FakeExchange):
+        def load_markets(self):
+            if self.market_loads == 0 and not getattr(self, 'failed', False):
+                self.failed = True
+                raise ConnectionError("network down")
+            super().load_markets()
+
+    client = ExchangePool(factory=Flaky).get()
+    try:
+        with client:
+            assert False, "markets should have failed"
+    except ConnectionError:
+        pass
+    with client as exchange:
+        exchange.fetch_ticker('ETH/USDT')
+    assert client.exchange.market_loads == 1 and client.lock.acquire(blocking=False)
+    client.lock.release()
+    print("  ✅ failed load_markets does not keep the lock and is retried")
+
+
+def test_mt5_session_kept_and_restored():
+    """initialize() once for many polls; a lost terminal is re-initialized; failure raises"""
+    mt5 = FakeMT5()
+    terminal = MT5Terminal(mt5)
+
+    def poll(_):
+        with terminal as module:
+            return module.symbol_info_tick('XAUUSD')['bid']
+
+    with ThreadPoolExecutor(4) as executor:
+        assert list(executor.map(poll, range(40))) == [2000.0] * 40
+    assert mt5.initialize_calls == 1 and terminal.initializations == 1
+
+    mt5.shutdown()  # e.g. terminal restarted
+    assert poll(0) == 2000.0 and terminal.initializations == 2
+
+    terminal.shutdown()
+    assert not mt5.initialized and not terminal.connected
+
+    offline = MT5Terminal(FakeMT5(available=False))
+    try:
+        with offline:
+            assert False, "terminal should not connect"
+    except ConnectionError as e:
+        assert 'IPC initialize failed' in str(e)
+    assert offline.lock.acquire(blocking=False)
+    offline.lock.release()
+    print("  ✅ 40 MT5 polls, 1 initialize(); lost session restored; failed initialize raises and unlocks")
+
+
+def test_bot_calls_share_the_terminal_lock():
+    """Bot calls through terminal.api wait for a GUI `with terminal:` block; one pool per process"""
+    terminal = MT5Terminal(FakeMT5())
+    api = terminal.api
+    assert api.ORDER_TYPE_BUY == 0
+    order = []
+
+    def bot():
+        api.positions_get(symbol='XAUUSD')
+        order.append('bot')
+
+    with terminal as mt5:
+        thread = threading.Thread(target=bot)
+        thread.start()
+        thread.join(0.05)
+        mt5.symbol_info_tick('XAUUSD')
+        order.append('gui')
+    thread.join()
+    assert order == ['gui', 'bot']
+
+    # The shared modules import the pool by the same name as the GUI
+    import shared.exchange_pool as pool
+    from shared import async_runner, candle_repository
+    assert async_runner.mt5_terminal is pool.mt5_terminal
+    assert candle_repository.exchange_client is pool.exchange_client
+    assert 'exchange_pool' not in sys.modules
+    print("  ✅ bot MT5 calls wait for the GUI's terminal block; shared modules use the GUI's pool")
+
+
+def benchmark():
+    """Price poll: new client each time (as before) vs the pooled client"""
+    n = 20
+
+    start = time.perf_counter()
+    for _ in range(n):
+        exchange = FakeExchange()
+        exchange.load_markets()
+        exchange.fetch_ticker('BTC/USDT')
+    fresh_time = time.perf_counter() - start
+
+    client = ExchangePool(factory=FakeExchange).get()
+    start = time.perf_counter()
+    for _ in range(n):
+        with client as exchange:
+            exchange.fetch_ticker('BTC/USDT')
+    pooled_time = time.perf_counter() - start
+
+    mt5 = FakeMT5()
+    start = time.perf_counter()
+    for _ in range(n):
+        mt5.initialize()
+        mt5.symbol_info_tick('XAUUSD')
+        mt5.shutdown()
+    mt5_fresh = time.perf_counter() - start
+    terminal = MT5Terminal(FakeMT5())
+    start = time.perf_counter()
+    for _ in range(n):
+        with terminal as module:
+            module.symbol_info_tick('XAUUSD')
+    mt5_pooled = time.perf_counter() - start
+    print(f"\n⏱️  {n} polls (simulated {MARKETS_LATENCY * 1000:.0f} ms setup, {REQUEST_LATENCY * 1000:.0f} ms request): "
+          f"new ccxt client {fresh_time * 1000 / n:.1f} ms/poll, pooled {pooled_time * 1000 / n:.1f} ms/poll; "
+          f"MT5 init/shutdown {mt5_fresh * 1000 / n:.1f} ms/poll, shared session {mt5_pooled * 1000 / n:.2f} ms/poll")
+
+
+if __name__ == "__main__":
+    print("\n" + "="*80)
+    print("🔍 EXCHANGE POOL TEST")
+    print("="*80)
+
+    test_one_client_per_account()
+    test_failed_markets_load_is_retried()
+    test_mt5_session_kept_and_restored()
+    test_bot_calls_share_the_terminal_lock()
+    benchmark()
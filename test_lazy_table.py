@@ -0,0 +1,197 @@
+"""
+Test for the paged row sources behind the lazy history tables
+Таблицы читают строки страницами: сортировка и фильтр выполняются в SQLite / pandas, память ограничена
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'trading_app'))
+
+from database import DatabaseManager
+from models import TradeRecord
+from utils.row_sources import FrameRowSource, PageCache
+
+START = datetime(2025, 1, 1)
+
+
+def fill(db, bot_id, n, seed=1):
+    """n trades an hour apart, a third of them dry-run, with random profit"""
+    rng = random.Random(seed)
+    trades = []
+    for k in range(n):
+        trade = TradeRecord(trade_id=0, bot_id=bot_id, order_id=f"{'DRY-' if k % 3 == 0 else ''}{bot_id}-{k}",
+                            symbol='BTC/USDT', open_time=START + timedelta(hours=k), trade_type='BUY',
+                            amount=0.01, entry_price=100.0, profit=round(rng.uniform(-5, 5), 1), status='TP')
+        db.add_trade(trade)
+        trades.append(trade)
+    db.flush()
+    return trades
+
+
+def read_all(source, page_size):
+    cache = PageCache(source, page_size)
+    return [cache.row(i) for i in range(source.count())]
+
+
+def test_sql_pages_sort_and_filter():
+    """Pages of the trade history never overlap; ORDER BY / WHERE match sorting the full list"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, 'app.db'))
+        try:
+            trades = fill(db, 'btc', 1000)
+            fill(db, 'eth', 50)
+
+            source = db.trade_rows('btc')
+            assert source.count() == 1000
+            rows = read_all(source, 64)
+            assert [t.order_id for t in rows] == [t.order_id for t in reversed(trades)]
+
+            # Many equal profits: id breaks the ties, so pages still cover every row once
+            source.sort('profit', descending=False)
+            rows = read_all(source, 37)
+            assert len({t.order_id for t in rows}) == 1000
+            assert [t.profit for t in rows] == sorted(t.profit for t in trades)
+
+            dry = db.trade_rows('btc', dry_run=True, since=date(2025, 1, 21))
+            want = [t.order_id for t in reversed(trades)
+                    if t.order_id.startswith('DRY-') and t.open_time.date() >= date(2025, 1, 21)]
+            assert [t.order_id for t in read_all(dry, 50)] == want
+
+            try:
+                source.sort('profit; DROP TABLE trades')
+                assert False, "unknown column accepted"
+            except ValueError:
+                pass
+        finally:
+            db.close()
+    print(f"  ✅ 1000 trades in pages of 64/37: no gaps or repeats; sort and dry-run/since filter in SQL "
+          f"({len(want)} rows)")
+
+
+def test_sql_pages_continue_from_previous_row():
+    """Pages after the first start at the (sort key, id) of the row before them, NULL keys included"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, 'app.db'))
+        try:
+            trades = fill(db, 'btc', 500)
+            rng = random.Random(3)
+            for trade in trades:
+                if rng.random() < 0.6:  # the rest are still open (close_time NULL)
+                    trade.close_time = trade.open_time + timedelta(hours=rng.choice([1, 2, 5]))
+                    db.update_trade(trade)
+            db.flush()
+
+            source = db.trade_rows('btc')
+            statements = []
+            for key in ('close_time', 'profit', 'open_time'):
+                for descending in (False, True):
+                    source.sort(key, descending)
+                    source.count()
+                    want = [row['order_id'] for row in db._read().execute(
+                        f"SELECT order_id FROM trades WHERE bot_id = 'btc' ORDER BY {key} "
+                        f"{'DESC' if descending else 'ASC'}, id {'DESC' if descending else 'ASC'}")]
+
+                    db._read().connection.set_trace_callback(statements.append)
+                    assert [t.order_id for t in read_all(source, 45)] == want, (key, descending)
+                    db._read().connection.set_trace_callback(None)
+
+                    # A jump reads by OFFSET once; the page after it continues from its last row
+                    source.count()
+                    assert [t.order_id for t in source.rows(300, 45)] == want[300:345]
+                    assert [t.order_id for t in source.rows(345, 45)] == want[345:390]
+                    assert [t.order_id for t in source.rows(90, 10)] == want[90:100]
+
+            # Scrolling down never asks SQLite to step over earlier rows
+            pages = [sql for sql in statements if sql.startswith('SELECT * FROM trades')]
+            assert pages and all(sql.endswith('OFFSET 0') for sql in pages), pages[:3]
+        finally:
+            db.close()
+    print(f"  ✅ {len(pages)} pages by close_time (NULLs)/profit/open_time both ways continue from the previous row")
+
+
+def test_frame_source_and_bounded_cache():
+    """DataFrame rows are sorted/filtered by pandas; the page cache keeps at most max_pages pages"""
+    index = pd.date_range('2025-01-01', periods=5000, freq='h')
+    frame = pd.DataFrame({'profit_pct': [(k * 7919) % 101 - 50 for k in range(5000)],
+                          'outcome': ['Win' if k % 3 else 'Loss' for k in range(5000)]}, index=index)
+    source = FrameRowSource(frame, index_name='timestamp')
+    source.set_filter(lambda df: df['outcome'] == 'Win')
+    source.sort('profit_pct', descending=True)
+    rows = read_all(source, 100)
+    want = frame[frame['outcome'] == 'Win'].sort_values('profit_pct', ascending=False, kind='stable')
+    assert [r['timestamp'] for r in rows] == list(want.index)
+    assert rows[0]['profit_pct'] == 50
+
+    source.sort('timestamp', descending=True)
+    assert source.rows(0, 1)[0]['timestamp'] == want.index.max()
+    source.set_frame(frame.iloc[:30])  # new data keeps filter and sort
+    assert source.count() == 20 and source.rows(0, 1)[0]['timestamp'] == index[29]
+
+    cache = PageCache(FrameRowSource(frame), page_size=100, max_pages=5)
+    for i in range(5000):
+        cache.row(i)
+    assert len(cache) == 500 and cache.fetches == 50
+    cache.row(4999)
+    cache.row(0)  # evicted, read again
+    assert cache.fetches == 51
+    print("  ✅ pandas sort/filter over 5000 rows, cache holds 5 of 50 pages after a full scroll")
+
+
+def benchmark():
+    """Opening a 100k-trade history: first page vs loading and formatting every trade"""
+    n = 100_000
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, 'app.db'))
+        fill(db, 'big', n)
+
+        start = time.perf_counter()
+        trades = db.get_trades('big', limit=n)
+        [f"{t.profit:+.2f}" for t in trades]
+        full_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        source = db.trade_rows('big')
+        cache = PageCache(source, 200)
+        source.count()
+        [f"{cache.row(i).profit:+.2f}" for i in range(40)]
+        page_time = time.perf_counter() - start
+
+        source.sort('profit', descending=True)
+        cache.clear()
+        start = time.perf_counter()
+        source.count()
+        [cache.row(i) for i in range(40)]
+        sorted_time = time.perf_counter() - start
+
+        # Last page: skipping 99.8k rows with OFFSET vs continuing from the page before it
+        source.sort('open_time', descending=True)
+        source.count()
+        start = time.perf_counter()
+        source.rows(n - 200, 200)
+        offset_time = time.perf_counter() - start
+        source.rows(n - 400, 200)
+        start = time.perf_counter()
+        source.rows(n - 200, 200)
+        keyset_time = time.perf_counter() - start
+        db.close()
+    print(f"\n⏱️  {n} trades: load + format all {full_time * 1000:.0f} ms; first page "
+          f"{page_time * 1000:.1f} ms; first page sorted by profit {sorted_time * 1000:.0f} ms; "
+          f"last page {offset_time * 1000:.1f} ms by OFFSET, {keyset_time * 1000:.1f} ms after the previous page")
+
+
+if __name__ == "__main__":
+    print("\n" + "="*80)
+    print("🔍 LAZY TABLE TEST")
+    print("="*80)
+
+    test_sql_pages_sort_and_filter()
+    test_sql_pages_continue_from_previous_row()
+    test_frame_source_and_bounded_cache()
+    benchmark()
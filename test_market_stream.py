@@ -0,0 +1,242 @@
+"""
+Test for the Binance WebSocket market stream
+Проверяет доставку тиков и свечей, переподключение и дозагрузку пропущенных свечей на локальной замене Binance
+"""
+
+import asyncio
+import json
+import time
+import pandas as pd
+from trading_bots.shared.market_stream import BinanceMarketStream
+
+HOUR_MS = 3_600_000
+DROP = object()
+
+
+class LocalConnection:
+    """One client connection to LocalBinance"""
+
+    def __init__(self, server):
+        self.server = server
+        self.queue = asyncio.Queue()
+
+    async def recv(self):
+        message = await self.queue.get()
+        if message is DROP:
+            raise ConnectionResetError("connection dropped")
+        return message
+
+    async def send(self, message):
+        self.server.sent.append(json.loads(message))
+
+    async def close(self):
+        self.queue.put_nowait(DROP)
+
+
+class LocalBinance:
+    """In-process stand-in for the Binance combined stream endpoint"""
+
+    def __init__(self):
+        self.urls = []
+        self.sent = []
+        self.connections = []
+        self.stream = None
+
+    async def connect(self, url):
+        self.urls.append(url)
+        self.connections.append(LocalConnection(self))
+        return self.connections[-1]
+
+    def push(self, stream, data):
+        raw = json.dumps({'stream': stream, 'data': data})
+        self.stream.loop.call_soon_threadsafe(self.connections[-1].queue.put_nowait, raw)
+
+    def drop(self):
+        self.stream.loop.call_soon_threadsafe(self.connections[-1].queue.put_nowait, DROP)
+
+    def book(self, name, bid, ask):
+        self.push(f'{name}@bookTicker', {'e': 'bookTicker', 's': name.upper(), 'b': str(bid), 'a': str(ask),
+                                         'T': int(time.time() * 1000)})
+
+    def mini_ticker(self, name, last):
+        self.push(f'{name}@miniTicker', {'e': '24hrMiniTicker', 's': name.upper(), 'c': str(last),
+                                         'o': '90', 'h': '110', 'l': '80', 'v': '1000', 'q': '100000'})
+
+    def kline(self, name, open_time, close, closed):
+        ms = open_time.value // 1_000_000
+        self.push(f'{name}@kline_1h', {'e': 'kline', 's': name.upper(), 'k': {
+            't': ms, 'T': ms + HOUR_MS - 1, 'i': '1h', 'o': str(close - 1), 'h': str(close + 2),
+            'l': str(close - 2), 'c': str(close), 'v': '10', 'x': closed}})
+
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.002)
+    raise AssertionError("condition not reached")
+
+
+def make_stream(server, **kwargs):
+    kwargs.setdefault('reconnect_delay', 0.01)
+    stream = BinanceMarketStream(connect=server.connect, **kwargs)
+    server.stream = stream
+    return stream
+
+
+def test_ticks_and_bars_reach_subscribers():
+    """bookTicker -> on_tick, forming kline -> bar(), closed kline -> on_bar exactly once"""
+    server = LocalBinance()
+    stream = make_stream(server)
+    ticks, bars, eth_ticks = [], [], []
+    stream.subscribe('BTC/USDT', '1h', on_tick=ticks.append, on_bar=bars.append)
+    stream.subscribe('ETH/USDT:USDT', on_tick=eth_ticks.append)
+    stream.start()
+    try:
+        wait_until(lambda: stream.connected)
+        assert server.urls[0].endswith('?streams=btcusdt@bookTicker/btcusdt@kline_1h/ethusdt@bookTicker')
+
+        server.book('btcusdt', 100.0, 100.5)
+        server.book('ethusdt', 10.0, 10.1)
+        wait_until(lambda: ticks and eth_ticks)
+        assert ticks[0].symbol == 'BTC/USDT' and ticks[0].mid == 100.25
+        assert eth_ticks[0].symbol == 'ETH/USDT:USDT' and stream.tick('ETH/USDT').bid == 10.0
+
+        t = pd.Timestamp('2025-06-01 10:00')
+        server.kline('btcusdt', t, 101.0, closed=False)
+        wait_until(lambda: stream.bar('BTC/USDT', '1h') is not None)
+        assert stream.bar('BTC/USDT', '1h').high == 103.0 and not bars
+
+        server.kline('btcusdt', t, 102.0, closed=True)
+        server.kline('btcusdt', t, 102.0, closed=True)  # repeated final update
+        server.book('btcusdt', 102.0, 102.5)
+        wait_until(lambda: len(ticks) == 2)
+        assert len(bars) == 1 and bars[0].time == t and bars[0].close == 102.0 and bars[0].symbol == 'BTC/USDT'
+    finally:
+        stream.stop()
+    print("  ✅ ticks and klines dispatched per symbol, closed bar delivered once")
+
+
+def test_reconnect_backfills_missed_bars():
+    """Bars closed while disconnected arrive in order after reconnect, live duplicates are dropped"""
+    server = LocalBinance()
+    now = [pd.Timestamp('2025-06-01 13:30').timestamp()]
+    requests = []
+
+    def backfill(symbol, timeframe, start):
+        requests.append((symbol, timeframe, start))
+        index = pd.date_range(start, '2025-06-01 13:00', freq='1h', name='datetime')
+        return pd.DataFrame({'open': 1.0, 'high': 2.0, 'low': 0.5, 'close': 1.5, 'volume': 3.0}, index=index)
+
+    stream = make_stream(server, backfill=backfill, clock=lambda: now[0])
+    bars = []
+    stream.subscribe('BTC/USDT', '1h', on_bar=bars.append)
+    stream.start()
+    try:
+        wait_until(lambda: stream.connected)
+        server.kline('btcusdt', pd.Timestamp('2025-06-01 10:00'), 100.0, closed=True)
+        wait_until(lambda: len(bars) == 1)
+
+        server.drop()
+        wait_until(lambda: stream.connects == 2 and len(bars) == 3)
+        assert requests == [('BTC/USDT', '1h', pd.Timestamp('2025-06-01 11:00'))]
+        assert [b.time.hour for b in bars] == [10, 11, 12] and stream.backfilled == 2
+
+        server.kline('btcusdt', pd.Timestamp('2025-06-01 12:00'), 100.0, closed=True)  # already backfilled
+        server.kline('btcusdt', pd.Timestamp('2025-06-01 13:00'), 100.0, closed=True)
+        wait_until(lambda: len(bars) == 4)
+        assert [b.time.hour for b in bars] == [10, 11, 12, 13]
+    finally:
+        stream.stop()
+    print("  ✅ reconnect: 2 missed bars backfilled in order, no duplicates")
+
+
+def test_subscriptions_and_stale_connections():
+    """New symbols are subscribed on the live connection; a silent connection is replaced"""
+    server = LocalBinance()
+    stream = make_stream(server, stale_after=0.2)
+    stream.subscribe('BTC/USDT')
+    stream.start()
+    try:
+        wait_until(lambda: stream.connected)
+        stream.subscribe('SOL/USDT', '1h')
+        wait_until(lambda: server.sent)
+        assert server.sent[0]['method'] == 'SUBSCRIBE'
+        assert server.sent[0]['params'] == ['solusdt@bookTicker', 'solusdt@kline_1h']
+
+        wait_until(lambda: stream.connects >= 2, timeout=3)  # no messages for stale_after
+        assert 'solusdt@kline_1h' in server.urls[-1]
+    finally:
+        stream.stop()
+    print("  ✅ live SUBSCRIBE for new symbols, reconnect after a silent connection")
+
+
+def test_last_trade_price():
+    """price() is the last trade price (as the REST ticker 'last'), not the bid/ask mid"""
+    server = LocalBinance()
+    stream = make_stream(server)
+    ticks = []
+    stream.subscribe('BTC/USDT', on_tick=ticks.append, last_price=True)
+    stream.subscribe('ETH/USDT')
+    stream.start()
+    try:
+        wait_until(lambda: stream.connected)
+        assert server.urls[0].endswith('?streams=btcusdt@bookTicker/btcusdt@miniTicker/ethusdt@bookTicker')
+
+        server.book('btcusdt', 100.0, 100.5)
+        wait_until(lambda: ticks)
+        assert ticks[0].last is None and stream.price('BTC/USDT') is None
+
+        server.mini_ticker('btcusdt', 100.4)
+        wait_until(lambda: stream.price('BTC/USDT') is not None)
+        assert stream.price('BTC/USDT') == 100.4 and stream.tick('BTC/USDT').last == 100.4
+        server.book('btcusdt', 100.1, 100.6)
+        wait_until(lambda: len(ticks) == 2)
+        assert ticks[1].last == 100.4 and ticks[1].mid == 100.35
+
+        # First price() of a symbol opens its miniTicker stream
+        assert stream.price('ETH/USDT') is None
+        wait_until(lambda: server.sent)
+        assert server.sent[0]['params'] == ['ethusdt@miniTicker']
+        server.book('ethusdt', 10.0, 10.2)
+        server.mini_ticker('ethusdt', 10.05)
+        wait_until(lambda: stream.price('ETH/USDT') is not None)
+        assert stream.price('ETH/USDT') == 10.05 and stream.tick('ETH/USDT').mid == 10.1
+    finally:
+        stream.stop()
+    print("  ✅ last trade price from miniTicker, carried on ticks, stream opened by price()")
+
+
+def benchmark():
+    """Tick-to-callback latency vs the 10 s REST polling it replaces"""
+    server = LocalBinance()
+    stream = make_stream(server)
+    received = []
+    stream.subscribe('BTC/USDT', on_tick=lambda tick: received.append(time.perf_counter()))
+    stream.start()
+    try:
+        wait_until(lambda: stream.connected)
+        latencies = []
+        for k in range(200):
+            sent = time.perf_counter()
+            server.book('btcusdt', 100.0 + k, 100.5 + k)
+            wait_until(lambda: len(received) == k + 1)
+            latencies.append(received[-1] - sent)
+    finally:
+        stream.stop()
+    latencies.sort()
+    print(f"\n⏱️  tick -> callback: median {latencies[100] * 1e6:.0f} µs, "
+          f"p99 {latencies[197] * 1e6:.0f} µs (REST polling: up to 10 s)")
+
+
+if __name__ == "__main__":
+    print("\n" + "="*80)
+    print("🔍 MARKET STREAM TEST")
+    print("="*80)
+
+    test_ticks_and_bars_reach_subscribers()
+    test_reconnect_backfills_missed_bars()
+    test_subscriptions_and_stale_connections()
+    test_last_trade_price()
+    benchmark()
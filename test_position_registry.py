@@ -0,0 +1,167 @@
+"""
+Test for the in-memory position registry of the trading app
+Открытые позиции хранятся в памяти, изменения рассылаются подписчикам, БД не опрашивается
+"""
+
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'trading_app'))
+
+from database import DatabaseManager
+from models import TradeRecord
+
+
+def make_trade(bot_id, k, status='OPEN'):
+    return TradeRecord(trade_id=0, bot_id=bot_id, order_id=f'{bot_id}-{k}', symbol='BTC/USDT',
+                       open_time=datetime(2025, 1, 1) + timedelta(hours=k), trade_type='BUY',
+                       amount=0.01, entry_price=100.0 + k, stop_loss=95.0, take_profit=110.0, status=status)
+
+
+def closed(trade, status='TP'):
+    trade.status = status
+    trade.close_time = trade.open_time + timedelta(hours=2)
+    trade.close_price = 110.0
+    trade.profit = 0.1
+    return trade
+
+
+def count_queries(db):
+    """Count statements run on the calling thread's read connection"""
+    statements = []
+    db.pool.get().set_trace_callback(statements.append)
+    return statements
+
+
+def test_open_trades_served_from_memory():
+    """After startup, reading open trades runs no SQL; writes keep the registry in step with the table"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, 'app.db'))
+        try:
+            for k in range(5):
+                db.add_trade(make_trade('btc', k))
+            db.update_trade(closed(make_trade('btc', 1)))
+            queries = count_queries(db)
+            loads = db.positions.loads
+            for _ in range(1000):
+                trades = db.get_open_trades('btc')
+            assert not queries and db.positions.loads == loads
+            assert [t.order_id for t in trades] == ['btc-4', 'btc-3', 'btc-2', 'btc-0']
+
+            db.flush()
+            assert [t.trade_id for t in db.get_open_trades('btc')] == [5, 4, 3, 1]
+            cursor = db._read()
+            rows = cursor.execute("SELECT order_id FROM trades WHERE bot_id = 'btc' AND status = 'OPEN' "
+                                  "ORDER BY open_time DESC").fetchall()
+            assert [row['order_id'] for row in rows] == [t.order_id for t in trades]
+
+            trades[0].stop_loss = 1.0  # Callers get copies
+            assert db.get_open_trades('btc')[0].stop_loss == 95.0
+        finally:
+            db.close()
+    print("  ✅ 1000 get_open_trades() calls, 0 SQL statements; registry matches the trades table")
+
+
+def test_events_and_shared_registry():
+    """Managers of one file share the registry; listeners and asyncio queues get opened/updated/closed"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'app.db')
+        gui_db = DatabaseManager(path)
+        bot_db = DatabaseManager(path)
+        assert gui_db.positions is bot_db.positions
+        events = []
+        gui_db.positions.subscribe(lambda event: events.append((event.kind, event.trade.order_id)))
+
+        async def consumer():
+            queue = bot_db.positions.subscribe_queue()
+            writer = threading.Thread(target=lambda: (
+                bot_db.add_trade(make_trade('eth', 0)),
+                bot_db.update_trade(make_trade('eth', 0)),
+                gui_db.update_trade(closed(make_trade('eth', 0), status='CLOSED'))))
+            writer.start()
+            received = [await asyncio.wait_for(queue.get(), 2) for _ in range(3)]
+            writer.join()
+            bot_db.positions.unsubscribe_queue(queue)
+            return [(event.kind, event.trade.status) for event in received]
+
+        try:
+            assert asyncio.run(consumer()) == [('opened', 'OPEN'), ('updated', 'OPEN'), ('closed', 'CLOSED')]
+            assert events == [('opened', 'eth-0'), ('updated', 'eth-0'), ('closed', 'eth-0')]
+            assert gui_db.get_open_trades('eth') == [] and gui_db.positions.count() == 0
+        finally:
+            bot_db.close()
+            gui_db.close()
+    print("  ✅ one registry per file, events on listeners and asyncio queues in order")
+
+
+def test_reload_picks_up_other_processes():
+    """Rows written by another process appear on reload() as opened/closed deltas"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'app.db')
+        db = DatabaseManager(path)
+        try:
+            db.add_trade(make_trade('sol', 0))
+            db.add_trade(make_trade('sol', 1))
+            db.flush()
+
+            other = sqlite3.connect(path)  # Standalone bot process
+            with other:
+                other.execute("UPDATE trades SET status = 'SL' WHERE order_id = 'sol-0'")
+                other.execute("INSERT INTO trades (bot_id, order_id, open_time, trade_type, amount, entry_price) "
+                              "VALUES ('sol', 'sol-9', ?, 'SELL', 1.0, 50.0)", (datetime(2025, 2, 1),))
+            other.close()
+            assert len(db.get_open_trades('sol')) == 2  # not seen until reload
+
+            changes = sorted((e.kind, e.trade.order_id) for e in db.positions.reload())
+            assert changes == [('closed', 'sol-0'), ('opened', 'sol-9')]
+            assert [t.order_id for t in db.get_open_trades('sol')] == ['sol-9', 'sol-1']
+
+            # Reopening a closed trade brings back the full row from the database
+            db.update_trade(make_trade('sol', 0))
+            reopened = [t for t in db.get_open_trades('sol') if t.order_id == 'sol-0']
+            assert len(reopened) == 1 and reopened[0].entry_price == 100.0 and reopened[0].trade_id == 1
+        finally:
+            db.close()
+    print("  ✅ reload(): external close and insert published as deltas, reopen restores the row")
+
+
+def benchmark():
+    """get_open_trades(): indexed query per call vs the in-memory registry"""
+    n = 2000
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, 'app.db'))
+        for bot in range(10):
+            for k in range(300):
+                trade = make_trade(f'bot{bot}', k, status='OPEN' if k % 100 == 0 else 'TP')
+                db.add_trade(trade)
+        db.flush()
+        cursor = db._read()
+        start = time.perf_counter()
+        for _ in range(n):
+            cursor.execute("SELECT * FROM trades WHERE bot_id = ? AND status = 'OPEN' ORDER BY open_time DESC",
+                           ('bot3',)).fetchall()
+        query_time = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(n):
+            db.get_open_trades('bot3')
+        memory_time = time.perf_counter() - start
+        db.close()
+    print(f"\n⏱️  {n} open-position reads: SQLite {query_time * 1e6 / n:.0f} µs/call, "
+          f"registry {memory_time * 1e6 / n:.0f} µs/call")
+
+
+if __name__ == "__main__":
+    print("\n" + "="*80)
+    print("🔍 POSITION REGISTRY TEST")
+    print("="*80)
+
+    test_open_trades_served_from_memory()
+    test_events_and_shared_registry()
+    test_reload_picks_up_other_processes()
+    benchmark()
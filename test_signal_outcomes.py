@@ -0,0 +1,279 @@
+"""
+Test for the signal outcomes of the Signal Analysis dialog
+Векторный расчёт исходов (один TP / 3 позиции) совпадает с прежним циклом по свечам на случайных OHLC
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'trading_app'))
+
+from utils.signal_outcomes import OUTCOME_MAX_BARS, calculate_single_tp_outcomes, calculate_3_position_outcomes
+
+
+def random_candles(n, seed=1):
+    """Hourly random walk; every 7th candle is wide enough to touch TP and SL at once"""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.004, n)))
+    open_ = np.concatenate([[100.0], close[:-1]])
+    spread = np.abs(rng.normal(0, 0.003, n)) * close
+    spread[::7] *= 8
+    return pd.DataFrame({
+        'open': open_, 'close': close,
+        'high': np.maximum(open_, close) + spread, 'low': np.minimum(open_, close) - spread
+    }, index=pd.date_range('2025-01-01', periods=n, freq='1h'))
+
+
+def random_signals(df, n, seed=2):
+    """n signals at the close of random candles, some with wide stops (timeout) or near the end (open)"""
+    rng = np.random.default_rng(seed)
+    positions = np.concatenate([rng.integers(0, len(df) - 1, n - 5), np.arange(len(df) - 6, len(df) - 1)])
+    signals = []
+    for pos in positions:
+        signal_type = int(rng.choice([1, -1]))
+        entry = df['close'].iloc[pos]
+        risk = entry * rng.uniform(0.004, 0.012) * rng.choice([1, 6])
+        tps = [entry + signal_type * risk * m for m in (1.0, 1.8, 3.0)]
+        signals.append((int(pos), signal_type, entry, entry - signal_type * risk, *tps))
+    return signals
+
+
+def baseline_single_tp(signal_type, entry_price, stop_loss, take_profit, future, use_trailing, trailing_pct):
+    """Per-candle loop the dialog used before the exit simulator (future = high, low, close rows)"""
+    outcome = 'Open'
+    profit_pct = 0.0
+    bars = 0
+    trailing_active = False
+    trailing_stop = stop_loss
+    max_profit_price = entry_price
+
+    for high, low, close in future:
+        bars += 1
+
+        if signal_type == 1:
+            if use_trailing and high >= take_profit:
+                trailing_active = True
+                if high > max_profit_price:
+                    max_profit_price = high
+                    trailing_stop = entry_price + (max_profit_price - entry_price) * trailing_pct
+
+            active_stop = trailing_stop if trailing_active else stop_loss
+            if low <= active_stop:
+                outcome = 'Loss ❌' if not trailing_active else 'Trailing Win ✅'
+                profit_pct = ((active_stop - entry_price) / entry_price) * 100
+                break
+            elif not trailing_active and high >= take_profit:
+                outcome = 'Win ✅'
+                profit_pct = ((take_profit - entry_price) / entry_price) * 100
+                break
+        else:
+            if use_trailing and low <= take_profit:
+                trailing_active = True
+                if low < max_profit_price or max_profit_price == entry_price:
+                    max_profit_price = low
+                    trailing_stop = entry_price - (entry_price - max_profit_price) * trailing_pct
+
+            active_stop = trailing_stop if trailing_active else stop_loss
+            if high >= active_stop:
+                outcome = 'Loss ❌' if not trailing_active else 'Trailing Win ✅'
+                profit_pct = ((entry_price - active_stop) / entry_price) * 100
+                break
+            elif not trailing_active and low <= take_profit:
+                outcome = 'Win ✅'
+                profit_pct = ((entry_price - take_profit) / entry_price) * 100
+                break
+
+        if bars >= 100:
+            outcome = 'Timeout'
+            profit_pct = signal_type * (close - entry_price) / entry_price * 100
+            break
+
+    return {'outcome': outcome, 'profit_pct': profit_pct, 'bars': bars}
+
+
+def baseline_3_positions(signal_type, entry_price, stop_loss, tp1, tp2, tp3, future, trailing_pct):
+    """Per-candle loop for the 3 positions (TP1 / TP2 + trailing / TP3 + trailing) used before"""
+    tp1_hit = False
+    positions = [
+        {'position_num': num, 'target_tp': tp, 'use_trailing': num > 1, 'active': True, 'outcome': 'Timeout',
+         'profit_pct': 0.0, 'bars': 0, 'tp_level_hit': 'None', 'close_reason': 'Timeout'}
+        for num, tp in ((1, tp1), (2, tp2), (3, tp3))
+    ]
+    best_since_tp1 = entry_price
+
+    bars = 0
+    for high, low, close in future:
+        bars += 1
+        if not any(p['active'] for p in positions):
+            break
+
+        favorable, adverse = (high, low) if signal_type == 1 else (low, high)
+        if not tp1_hit and signal_type * (favorable - tp1) >= 0:
+            tp1_hit = True
+            best_since_tp1 = favorable
+        if tp1_hit:
+            best_since_tp1 = max(best_since_tp1, high) if signal_type == 1 else min(best_since_tp1, low)
+            trailing_stop = best_since_tp1 - (best_since_tp1 - entry_price) * trailing_pct
+        else:
+            trailing_stop = stop_loss
+
+        for pos in positions:
+            if not pos['active']:
+                continue
+            active_stop = trailing_stop if pos['use_trailing'] and tp1_hit else stop_loss
+
+            if signal_type * (adverse - active_stop) <= 0:
+                pnl = signal_type * (active_stop - entry_price) / entry_price * 100
+                pos.update(profit_pct=pnl, bars=bars, active=False)
+                if pnl < 0:
+                    pos.update(outcome='Loss ❌', tp_level_hit='SL', close_reason='SL')
+                else:
+                    pos.update(outcome='Win ✅', tp_level_hit='Trailing', close_reason='Trailing Stop')
+                continue
+
+            if signal_type * (favorable - pos['target_tp']) >= 0:
+                pnl = signal_type * (pos['target_tp'] - entry_price) / entry_price * 100
+                level = f"TP{pos['position_num']}"
+                pos.update(profit_pct=pnl, bars=bars, active=False, outcome='Win ✅',
+                           tp_level_hit=level, close_reason=level)
+
+        if bars >= 100:
+            for pos in positions:
+                if pos['active']:
+                    pnl = signal_type * (close - entry_price) / entry_price * 100
+                    pos.update(profit_pct=pnl, bars=bars, active=False, outcome='Timeout', close_reason='Timeout')
+            break
+
+    for pos in positions:
+        del pos['active']
+    return positions
+
+
+def future_rows(df, entry_pos):
+    return df[['high', 'low', 'close']].to_numpy()[entry_pos + 1:]
+
+
+def assert_same(result, expected, context):
+    assert result['outcome'] == expected['outcome'], (context, result, expected)
+    assert result['bars'] == expected['bars'], (context, result, expected)
+    assert np.isclose(result['profit_pct'], expected['profit_pct'], rtol=1e-9, atol=1e-9), (context, result, expected)
+
+
+def test_single_tp_matches_candle_loop():
+    """SL/TP and trailing (trailing_pct = share of profit kept) match the old loop for BUY and SELL"""
+    df = random_candles(3000)
+    signals = random_signals(df, 400)
+    entries = [(pos, side, entry, sl, tp1) for pos, side, entry, sl, tp1, _, _ in signals]
+
+    seen = set()
+    for use_trailing, trailing_pct in ((False, 0.5), (True, 0.5), (True, 0.25), (True, 0.8)):
+        results = calculate_single_tp_outcomes(df, entries, use_trailing, trailing_pct)
+        assert len(results) == len(entries)
+        for (pos, side, entry, sl, tp), result in zip(entries, results):
+            expected = baseline_single_tp(side, entry, sl, tp, future_rows(df, pos), use_trailing, trailing_pct)
+            assert_same(result, expected, (pos, side, use_trailing, trailing_pct))
+            seen.add(expected['outcome'])
+
+    # Every branch of the old loop was exercised, including the 100-bar timeout
+    assert seen == {'Loss ❌', 'Win ✅', 'Trailing Win ✅', 'Timeout', 'Open'}, seen
+    print(f"  ✅ Single TP: {4 * len(entries)} outcomes match the candle loop ({', '.join(sorted(seen))})")
+
+
+def test_three_positions_match_candle_loop():
+    """TP1 / TP2 / TP3 positions, trailing after TP1 (trailing_pct = share of profit given back)"""
+    df = random_candles(3000, seed=3)
+    signals = random_signals(df, 400, seed=4)
+
+    seen = set()
+    for trailing_pct in (0.5, 0.25, 0.9):
+        results = calculate_3_position_outcomes(df, signals, trailing_pct)
+        assert len(results) == len(signals)
+        for (pos, side, entry, sl, tp1, tp2, tp3), positions in zip(signals, results):
+            expected = baseline_3_positions(side, entry, sl, tp1, tp2, tp3, future_rows(df, pos), trailing_pct)
+            for result, want in zip(positions, expected):
+                context = (pos, side, trailing_pct, want['position_num'])
+                assert_same(result, want, context)
+                for key in ('position_num', 'use_trailing', 'tp_level_hit', 'close_reason'):
+                    assert result[key] == want[key], (context, key, result, want)
+                assert result['target_tp'] == want['target_tp']
+                seen.add(want['close_reason'])
+
+    assert {'SL', 'Trailing Stop', 'TP1', 'TP2', 'Timeout'} <= seen, seen
+    print(f"  ✅ 3 positions: {9 * len(signals)} positions match the candle loop ({', '.join(sorted(seen))})")
+
+
+def test_same_bar_and_timeout_edges():
+    """A candle touching both TP and SL closes at the stop; the 100th candle closes at its close"""
+    index = pd.date_range('2025-01-01', periods=OUTCOME_MAX_BARS + 5, freq='1h')
+    df = pd.DataFrame({'open': 100.0, 'high': 100.5, 'low': 99.5, 'close': 100.2}, index=index)
+    df.iloc[1, df.columns.get_loc('high')] = 103.0
+    df.iloc[1, df.columns.get_loc('low')] = 98.0
+
+    wide = [(0, 1, 100.0, 99.0, 102.0), (0, -1, 100.0, 101.0, 98.0)]
+    for result in calculate_single_tp_outcomes(df, wide, False, 0.5):
+        assert result['outcome'] == 'Loss ❌' and result['bars'] == 1, result
+
+    # With trailing the trigger bar moves the stop first and its own low / high hits it
+    for (pos, side, entry, sl, tp), result in zip(wide, calculate_single_tp_outcomes(df, wide, True, 0.5)):
+        assert result['outcome'] == 'Trailing Win ✅' and result['bars'] == 1, result
+        assert_same(result, baseline_single_tp(side, entry, sl, tp, future_rows(df, pos), True, 0.5), side)
+    for position in calculate_3_position_outcomes(df, [(0, 1, 100.0, 99.0, 102.0, 102.5, 104.0)], 0.5)[0]:
+        assert position['close_reason'] == ('SL' if position['position_num'] == 1 else 'Trailing Stop'), position
+
+    # A steady trend fills all three targets on both sides
+    trend = df.copy()
+    steps = np.arange(len(trend)) * 0.1
+    for side in (1, -1):
+        trend['close'] = 100 + side * steps
+        trend['high'] = trend['close'] + 0.15
+        trend['low'] = trend['close'] - 0.15
+        signal = (0, side, 100.0, 100 - side, 100 + side, 100 + 2 * side, 100 + 3 * side)
+        positions, = calculate_3_position_outcomes(trend, [signal], 0.5)
+        expected = baseline_3_positions(*signal[1:], future_rows(trend, 0), 0.5)
+        assert [p['close_reason'] for p in positions] == ['TP1', 'TP2', 'TP3'], positions
+        for result, want in zip(positions, expected):
+            assert_same(result, want, ('trend', side))
+
+    calm = [(1, 1, 100.2, 90.0, 110.0)]
+    result, = calculate_single_tp_outcomes(df, calm, False, 0.5)
+    assert result['outcome'] == 'Timeout' and result['bars'] == OUTCOME_MAX_BARS
+    assert np.isclose(result['profit_pct'], 0.0)
+    for position in calculate_3_position_outcomes(df, [(1, 1, 100.2, 90.0, 110.0, 111.0, 112.0)], 0.5)[0]:
+        assert position['outcome'] == 'Timeout' and position['bars'] == OUTCOME_MAX_BARS
+    print("  ✅ Same-bar TP/SL closes at the stop (SL or trailing), trend fills TP1-TP3, timeout after 100 candles")
+
+
+def benchmark():
+    """2000 signals on 50k candles: exit simulator vs the per-candle loop"""
+    df = random_candles(50_000, seed=5)
+    signals = random_signals(df, 2000, seed=6)
+    entries = [(pos, side, entry, sl, tp1) for pos, side, entry, sl, tp1, _, _ in signals]
+
+    start = time.perf_counter()
+    calculate_single_tp_outcomes(df, entries, True, 0.5)
+    calculate_3_position_outcomes(df, signals, 0.5)
+    vector_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for pos, side, entry, sl, tp1, tp2, tp3 in signals:
+        future = future_rows(df, pos)
+        baseline_single_tp(side, entry, sl, tp1, future, True, 0.5)
+        baseline_3_positions(side, entry, sl, tp1, tp2, tp3, future, 0.5)
+    loop_time = time.perf_counter() - start
+    print(f"\n⏱️  {len(signals)} signals: exit simulator {vector_time * 1000:.0f} ms, "
+          f"candle loop {loop_time * 1000:.0f} ms (numpy rows, the dialog iterated DataFrame rows)")
+
+
+if __name__ == "__main__":
+    print("\n" + "="*80)
+    print("🔍 SIGNAL OUTCOMES TEST")
+    print("="*80)
+
+    test_single_tp_matches_candle_loop()
+    test_three_positions_match_candle_loop()
+    test_same_bar_and_timeout_edges()
+    benchmark()
@@ -0,0 +1,224 @@
+"""
+Test for the pre-aggregated trade statistics
+Агрегаты, которые ведут триггеры, совпадают с прямым расчётом по всем сделкам; просадка считается оконным запросом
+"""
+
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'trading_app'))
+
+from database import DatabaseManager, trade_stats
+from models import TradeRecord
+
+START = datetime(2025, 1, 1)
+
+
+def random_trades(bot_id, n, seed=1):
+    """n trades, about 80% closed with random profit, some dry-run, two regimes"""
+    rng = random.Random(seed)
+    trades = []
+    for k in range(n):
+        open_time = START + timedelta(hours=3 * k + rng.random())
+        dry = rng.random() < 0.3
+        trade = TradeRecord(trade_id=0, bot_id=bot_id, order_id=f"{'DRY-' if dry and k % 2 else ''}{bot_id}-{k}",
+                            symbol='BTC/USDT', open_time=open_time, trade_type=rng.choice(['BUY', 'SELL']),
+                            amount=0.01, entry_price=100.0, market_regime=rng.choice(['TREND', 'RANGE', None]),
+                            comment='DRY RUN' if dry and not k % 2 else 'signal')
+        trades.append(trade)
+    return trades
+
+
+def without_order_id(bot_id, rng):
+    """A closed trade whose exchange order had no id (order_id NULL)"""
+    trade = TradeRecord(trade_id=0, bot_id=bot_id, order_id=None, symbol='BTC/USDT', open_time=START,
+                        trade_type='BUY', amount=0.01, entry_price=100.0, comment=None)
+    close(trade, rng)
+    trade.status = 'TP'
+    return trade
+
+
+def close(trade, rng):
+    trade.status = rng.choice(['TP', 'SL', 'CLOSED', 'TP1'])
+    trade.close_time = trade.open_time + timedelta(hours=rng.uniform(0.5, 40))
+    trade.profit = round(rng.uniform(-50, 60), 2)
+    trade.duration_hours = (trade.close_time - trade.open_time).total_seconds() / 3600
+
+
+def expected(trades, dry_run=None, since=None):
+    """The statistics computed directly in Python"""
+    def is_dry(t):
+        return (t.order_id or '').startswith('DRY-') or 'DRY RUN' in (t.comment or '').upper()
+    trades = [t for t in trades if dry_run is None or is_dry(t) == dry_run]
+    opened = [t for t in trades if since is None or t.open_time.date() >= since]
+    closed = [t for t in trades if t.status in ('TP', 'SL', 'CLOSED') and t.profit is not None
+              and (since is None or t.close_time.date() >= since)]
+    closed.sort(key=lambda t: t.close_time)
+    equity = peak = drawdown = 0.0
+    for t in closed:
+        equity += t.profit
+        peak = max(peak, equity)
+        drawdown = max(drawdown, peak - equity)
+    return {
+        'total_trades': len(opened), 'closed_trades': len(closed),
+        'wins': sum(t.profit > 0 for t in closed), 'losses': sum(t.profit < 0 for t in closed),
+        'total_profit': sum(t.profit for t in closed),
+        'avg_duration': (sum((t.close_time - t.open_time).total_seconds() / 3600 for t in closed) / len(closed)
+                         if closed else 0.0),
+        'max_drawdown': drawdown,
+    }
+
+
+def check(db, trades, bot_id, **filters):
+    stats = db.get_trade_stats(bot_id, **filters)
+    want = expected(trades, **filters)
+    for key, value in want.items():
+        assert abs(getattr(stats, key) - value) < 1e-6, (filters, key, getattr(stats, key), value)
+    return stats
+
+
+def test_aggregates_follow_inserts_and_closes():
+    """Triggers keep the aggregates exact through inserts, closes, reopen and delete"""
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, 'app.db'))
+        try:
+            trades = random_trades('btc', 600)
+            for trade in trades:
+                db.add_trade(trade)
+            for trade in trades:
+                if rng.random() < 0.8:
+                    close(trade, rng)
+                    db.update_trade(trade)
+            db.update_trade(trades[5])  # same values again
+            trades[10].status, trades[10].profit = 'OPEN', None  # reopened
+            db.update_trade(trades[10])
+            trades.append(without_order_id('btc', rng))
+            db.add_trade(trades[-1])
+            db.flush()
+
+            for filters in ({}, {'dry_run': True}, {'dry_run': False}, {'since': date(2025, 2, 1)},
+                            {'dry_run': False, 'since': date(2025, 3, 1)}):
+                check(db, trades, 'btc', **filters)
+            assert check(db, trades, 'btc').closed_trades > 300
+
+            cursor = db._read()
+            cursor.execute("DELETE FROM trades WHERE order_id = ?", (trades[20].order_id,))
+            cursor.connection.commit()
+            check(db, trades[:20] + trades[21:], 'btc')
+            regimes = {r: db.get_trade_stats('btc', regime=r).closed_trades for r in ('TREND', 'RANGE', '')}
+            assert sum(regimes.values()) == db.get_trade_stats('btc').closed_trades
+        finally:
+            db.close()
+    print(f"  ✅ 600 trades (+1 without order id): totals, win/loss, duration and drawdown exact for all filters; "
+          f"per-regime closes {regimes}")
+
+
+def test_existing_database_is_backfilled():
+    """A database created before the aggregates existed gets them filled on open"""
+    rng = random.Random(3)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'app.db')
+        db = DatabaseManager(path)
+        db.close()
+        conn = sqlite3.connect(path)
+        for name in ('trades_stats_insert', 'trades_stats_update', 'trades_stats_delete'):
+            conn.execute(f"DROP TRIGGER {name}")
+        conn.execute("DROP TABLE trade_stats_daily")
+        trades = random_trades('eth', 200, seed=5) + [without_order_id('eth', rng)]
+        for trade in trades:
+            if trade.order_id and rng.random() < 0.7:
+                close(trade, rng)
+            conn.execute("INSERT INTO trades (bot_id, order_id, open_time, close_time, trade_type, amount, "
+                         "entry_price, profit, status, market_regime, comment) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                         (trade.bot_id, trade.order_id, trade.open_time, trade.close_time, trade.trade_type,
+                          trade.amount, trade.entry_price, trade.profit, trade.status, trade.market_regime,
+                          trade.comment))
+        conn.commit()
+        conn.close()
+
+        db = DatabaseManager(path)
+        try:
+            check(db, trades, 'eth')
+            check(db, trades, 'eth', dry_run=True)
+            db.rebuild_trade_stats()
+            check(db, trades, 'eth', dry_run=False)
+        finally:
+            db.close()
+    print("  ✅ aggregates rebuilt from existing trades (one without order id) on first open")
+
+
+def test_equity_curve_and_full_export():
+    """Window-query equity curve matches a running sum; iter_trades streams every row"""
+    rng = random.Random(11)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, 'app.db'))
+        try:
+            trades = random_trades('sol', 1500, seed=9)
+            for trade in trades:
+                close(trade, rng)
+                db.add_trade(trade)
+            curve = db.get_equity_curve('sol')
+            closed = sorted((t for t in trades if t.status != 'TP1'), key=lambda t: t.close_time)
+            equity = peak = 0.0
+            assert len(curve) == len(closed)
+            for (t, value, drawdown), trade in zip(curve, closed):
+                equity += trade.profit
+                peak = max(peak, equity)
+                assert t == trade.close_time and abs(value - equity) < 1e-6 and abs(drawdown - (peak - equity)) < 1e-6
+
+            exported = list(db.iter_trades('sol', batch_size=100))
+            assert len(exported) == 1500 and exported[0].order_id == trades[-1].order_id
+        finally:
+            db.close()
+    print("  ✅ equity/drawdown curve from window query, export streams all 1500 trades")
+
+
+def benchmark():
+    """Statistics for a bot with 100k trades: aggregates vs loading trades into Python"""
+    n = 100_000
+    rng = random.Random(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, 'app.db'))
+        trades = random_trades('big', n)
+        for trade in trades:
+            close(trade, rng)
+            db.add_trade(trade)
+        db.flush()
+
+        start = time.perf_counter()
+        loaded = db.get_trades('big', limit=n)
+        closed = [t for t in loaded if t.status in ('TP', 'SL', 'CLOSED') and t.profit is not None]
+        sum(t.profit for t in closed), [t for t in closed if t.profit > 0]
+        python_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        stats = db.get_trade_stats('big', dry_run=False)
+        stats_time = time.perf_counter() - start
+        cursor = db._read()
+        start = time.perf_counter()
+        trade_stats.max_drawdown(cursor, 'big', dry_run=False)
+        drawdown_time = time.perf_counter() - start
+        start = time.perf_counter()
+        db.get_trade_stats('big', since=(trades[-1].open_time - timedelta(days=90)).date())
+        recent_time = time.perf_counter() - start
+        db.close()
+    print(f"\n⏱️  {n} trades: load + Python {python_time * 1000:.0f} ms; get_trade_stats "
+          f"{stats_time * 1000:.0f} ms ({stats.closed_trades} closed live, drawdown window "
+          f"{drawdown_time * 1000:.0f} ms of it); last 90 days {recent_time * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    print("\n" + "="*80)
+    print("🔍 TRADE STATISTICS TEST")
+    print("="*80)
+
+    test_aggregates_follow_inserts_and_closes()
+    test_existing_database_is_backfilled()
+    test_equity_curve_and_full_export()
+    benchmark()
@@ -0,0 +1,166 @@
+"""
+Test for the SQLite trade store of the trading app
+Проверяет WAL, индексы, пакетную запись и то, что чтение не ждёт чужих записей
+"""
+
+import os
+import sys
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'trading_app'))
+
+from database import DatabaseManager
+from models import BotStatus, TradeRecord
+
+
+def make_trade(bot_id, k, status='OPEN', group=None):
+    return TradeRecord(trade_id=0, bot_id=bot_id, order_id=f'{bot_id}-{k}', symbol='BTC/USDT',
+                       open_time=datetime(2025, 1, 1) + timedelta(hours=k), trade_type='BUY',
+                       amount=0.01, entry_price=100.0 + k, stop_loss=95.0, take_profit=110.0,
+                       status=status, position_group_id=group, position_num=k % 3)
+
+
+def test_wal_and_indexes():
+    """WAL journal, composite indexes, and the polled queries use them"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, 'app.db'))
+        try:
+            cursor = db._read()
+            assert cursor.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+            names = [row['name'] for row in cursor.execute("PRAGMA index_list(trades)").fetchall()]
+            indexes = {name: [c['name'] for c in cursor.execute(f"PRAGMA index_info({name})").fetchall()]
+                       for name in names}
+            assert indexes['idx_trades_bot_status'] == ['bot_id', 'status']
+            assert indexes['idx_trades_bot_open_time'] == ['bot_id', 'open_time']
+            assert indexes['idx_trades_group'] == ['position_group_id']
+
+            plans = {
+                'open': "SELECT * FROM trades WHERE bot_id = ? AND status = 'OPEN' ORDER BY open_time DESC",
+                'history': "SELECT * FROM trades WHERE bot_id = ? ORDER BY open_time DESC LIMIT 100",
+                'group': "SELECT * FROM trades WHERE position_group_id = ?",
+            }
+            for name, query in plans.items():
+                plan = ' '.join(row['detail'] for row in cursor.execute(f"EXPLAIN QUERY PLAN {query}", ('x',)))
+                assert 'USING INDEX idx_trades' in plan, (name, plan)
+        finally:
+            db.close()
+    print("  ✅ WAL mode, (bot_id, status) / (bot_id, open_time) / position_group_id indexes used")
+
+
+def test_batched_writes_from_many_threads():
+    """8 bots writing concurrently: all rows committed in fewer transactions, own writes visible at once"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, 'app.db'))
+        errors = []
+
+        def bot(n):
+            bot_id = f'bot{n}'
+            try:
+                for k in range(100):
+                    db.add_trade(make_trade(bot_id, k, group=f'g{n}-{k // 3}'))
+                    # Read-your-writes: the trade is visible to this thread immediately
+                    assert len(db.get_open_trades(bot_id)) == k + 1
+                    db.update_status(BotStatus(bot_id=bot_id, status='running', open_positions=k + 1))
+                for k in range(0, 100, 2):
+                    closed = make_trade(bot_id, k, status='TP')
+                    closed.close_price = 110.0
+                    db.update_trade(closed)
+                assert len(db.get_open_trades(bot_id)) == 50
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=bot, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert not errors, errors
+
+        db.flush()
+        assert db.writer.statements == 8 * (100 * 2 + 50)
+        assert db.writer.batches < db.writer.statements
+        assert len(db.get_trades('bot3', limit=1000)) == 100
+        assert db.get_status('bot5').open_positions == 100
+        path = db.db_path
+        db.close()
+
+        reopened = DatabaseManager(path)
+        assert len(reopened.get_open_trades('bot7')) == 50
+        reopened.close()
+    print(f"  ✅ 2000 writes from 8 threads, own writes visible; "
+          f"{db.writer.statements} statements in {db.writer.batches} transactions")
+
+
+def test_bad_statement_does_not_drop_batch():
+    """A failing write is reported, the rest of its batch is still committed"""
+    db = DatabaseManager(':memory:')
+    try:
+        broken = make_trade('bot', 1)
+        broken.entry_price = None  # NOT NULL
+        db.add_trade(make_trade('bot', 0))
+        db.add_trade(broken)
+        db.add_trade(make_trade('bot', 2))
+        assert [t.order_id for t in db.get_open_trades('bot')] == ['bot-2', 'bot-0']
+    finally:
+        db.close()
+    print("  ✅ failing INSERT skipped, neighbours in the same batch committed")
+
+
+def benchmark():
+    """Per-write commit on one shared connection vs WAL + batched writer, with a polling reader"""
+    n = 1000
+    with tempfile.TemporaryDirectory() as tmp:
+        # Old behaviour: one shared connection, commit per write (rollback journal)
+        conn = sqlite3.connect(os.path.join(tmp, 'old.db'), check_same_thread=False)
+        conn.execute("CREATE TABLE trades (id INTEGER PRIMARY KEY, bot_id TEXT, order_id TEXT, "
+                     "status TEXT, open_time TIMESTAMP)")
+        lock = threading.Lock()
+        start = time.perf_counter()
+        for k in range(n):
+            with lock:
+                conn.execute("INSERT INTO trades (bot_id, order_id, status, open_time) VALUES (?, ?, 'OPEN', ?)",
+                             ('bot', str(k), datetime.now()))
+                conn.commit()
+        old_time = time.perf_counter() - start
+        conn.close()
+
+        db = DatabaseManager(os.path.join(tmp, 'new.db'))
+        stop = threading.Event()
+        reads = []
+
+        def poll():
+            while not stop.is_set():
+                t0 = time.perf_counter()
+                db.get_open_trades('reader')
+                reads.append(time.perf_counter() - t0)
+
+        reader = threading.Thread(target=poll)
+        reader.start()
+        start = time.perf_counter()
+        for k in range(n):
+            db.add_trade(make_trade('bot', k))
+        db.flush()
+        new_time = time.perf_counter() - start
+        stop.set()
+        reader.join()
+        batches = db.writer.batches
+        db.close()
+    reads.sort()
+    print(f"\n⏱️  {n} trade writes: commit-per-write {old_time * 1000:.0f} ms, "
+          f"batched {new_time * 1000:.0f} ms ({batches} commits); "
+          f"concurrent poll p50 {reads[len(reads) // 2] * 1e6:.0f} µs")
+
+
+if __name__ == "__main__":
+    print("\n" + "="*80)
+    print("🔍 TRADE STORE TEST")
+    print("="*80)
+
+    test_wal_and_indexes()
+    test_batched_writes_from_many_threads()
+    test_bad_statement_does_not_drop_batch()
+    benchmark()
@@ -2,6 +2,6 @@
 Core package
 """
 from .bot_manager import BotManager
-from .bot_thread import BotThread
+from .bot_session import BotSession
 
-__all__ = ['BotManager', 'BotThread']
+__all__ = ['BotManager', 'BotSession']
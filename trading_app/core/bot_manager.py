@@ -5,11 +5,17 @@ from typing import Dict, Optional
 from PySide6.QtCore import QObject, Signal
 from models import BotConfig, BotStatus
 from database import DatabaseManager
-from core.bot_thread import BotThread
+from core.bot_session import BotSession
+from shared.async_runner import AsyncBotRunner
 
 
 class BotManager(QObject):
-    """Manages all trading bots"""
+    """
+    Manages all trading bots
+
+    All bots run in one AsyncBotRunner event loop: bots on the same symbol
+    share a candle feed and every bot is analyzed right after the bar close.
+    """
 
     # Signals
     bot_started = Signal(str)  # bot_id
@@ -21,8 +27,9 @@ class BotManager(QObject):
     def __init__(self, db: DatabaseManager):
         super().__init__()
         self.db = db
-        self.bots: Dict[str, BotThread] = {}  # bot_id -> BotThread
+        self.bots: Dict[str, BotSession] = {}  # bot_id -> BotSession
         self.configs: Dict[str, BotConfig] = {}  # bot_id -> BotConfig
+        self.runner = AsyncBotRunner()  # Started with the first bot
 
         # Load configs from database
         self._load_configs()
@@ -76,18 +83,19 @@ class BotManager(QObject):
                 self.bot_error.emit(bot_id, "Binance API keys not configured")
                 return False
 
-        # Create bot thread
-        bot_thread = BotThread(config, self.db)
+        # Create bot session
+        session = BotSession(config, self.db)
 
         # Connect signals
-        bot_thread.log_signal.connect(lambda msg: self.bot_log.emit(bot_id, msg))
-        bot_thread.status_signal.connect(lambda status: self._handle_status_update(bot_id, status))
-        bot_thread.error_signal.connect(lambda error: self.bot_error.emit(bot_id, error))
-        bot_thread.finished.connect(lambda: self._handle_bot_finished(bot_id))
+        session.log_signal.connect(lambda msg: self.bot_log.emit(bot_id, msg))
+        session.status_signal.connect(lambda status: self._handle_status_update(bot_id, status))
+        session.error_signal.connect(lambda error: self.bot_error.emit(bot_id, error))
+        session.finished.connect(lambda: self._handle_bot_finished(bot_id))
 
-        # Start thread
-        self.bots[bot_id] = bot_thread
-        bot_thread.start()
+        # Schedule on the shared runner
+        self.runner.start()
+        self.bots[bot_id] = session
+        session.start(self.runner)
 
         self.bot_started.emit(bot_id)
         self.bot_log.emit(bot_id, "Bot starting...")
@@ -99,20 +107,13 @@ class BotManager(QObject):
         if bot_id not in self.bots:
             return False
 
-        bot_thread = self.bots[bot_id]
-        if not bot_thread.isRunning():
+        session = self.bots[bot_id]
+        if not session.isRunning():
             return False
 
-        # Request stop
-        bot_thread.stop()
-
-        # Wait for thread to finish (max 10 seconds)
-        bot_thread.wait(10000)
-
-        if bot_thread.isRunning():
-            # Force terminate if still running
-            bot_thread.terminate()
-            bot_thread.wait()
+        # Request stop and wait for disconnect (max 10 seconds)
+        session.stop(self.runner)
+        session.wait(10000)
 
         return True
 
@@ -152,3 +153,4 @@ class BotManager(QObject):
         for bot_id in list(self.bots.keys()):
             if self.is_bot_running(bot_id):
                 self.stop_bot(bot_id)
+        self.runner.shutdown()
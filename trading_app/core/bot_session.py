@@ -1,10 +1,12 @@
 """
-Bot Thread - runs trading bot in separate thread
+Bot Session - one trading bot scheduled on the shared AsyncBotRunner
 """
 import sys
 import os
+import time
+import threading
 from pathlib import Path
-from PySide6.QtCore import QThread, Signal
+from PySide6.QtCore import QObject, Signal
 from typing import Optional
 import traceback
 
@@ -12,15 +14,28 @@ import traceback
 sys.path.insert(0, str(Path(__file__).parent.parent.parent / 'trading_bots'))
 
 from models import BotConfig, BotStatus, TradeRecord
+from shared.async_runner import FeedKey
+from shared.exchange_pool import mt5_terminal
 
 
-class BotThread(QThread):
-    """Thread for running a trading bot"""
+class BotSession(QObject):
+    """
+    A trading bot run by AsyncBotRunner
+
+    The runner calls connect() once, analyze(candles) after every bar close
+    with candles shared by all bots on the same symbol, monitor() every few
+    seconds and disconnect() when the bot is removed. Signals are emitted from
+    runner threads and delivered to the GUI thread by Qt.
+    """
 
     # Signals for GUI updates
     log_signal = Signal(str)  # Log message
     status_signal = Signal(BotStatus)  # Status update
     error_signal = Signal(str)  # Error message
+    finished = Signal()  # Bot stopped (disconnected or failed to start)
+
+    # Seconds between trailing stop updates
+    TRAILING_INTERVAL = 60
 
     def __init__(self, config: BotConfig, db=None):
         super().__init__()
@@ -28,56 +43,107 @@ class BotThread(QThread):
         self.db = db
         self.running = False
         self.bot = None
-        self._stop_requested = False
-
-    def run(self):
-        """Main bot loop"""
+        self.history_bars = 501
+        self._stopped = threading.Event()
+        self._stopped.set()
+        self._last_trailing = 0.0
+
+    @property
+    def feed(self) -> FeedKey:
+        """Market data subscription of this bot"""
+        if self.config.exchange == 'MT5':
+            source = 'mt5'
+        else:
+            source = 'binance-testnet' if self.config.testnet else 'binance'
+        return FeedKey(source, self.config.symbol, self.config.timeframe)
+
+    def start(self, runner):
+        """Schedule the bot on the runner"""
         self.running = True
-        self._stop_requested = False
+        self._stopped.clear()
+        self.log_signal.emit(f"[{self.config.bot_id}] Starting bot...")
+        future = runner.add_bot(self.config.bot_id, self, self.feed)
+        future.add_done_callback(self._started)
 
-        try:
-            self.log_signal.emit(f"[{self.config.bot_id}] Starting bot...")
+    def _started(self, future):
+        if future.exception() is not None or not future.result():
+            self._finish()
 
+    def connect(self) -> bool:
+        """Create the bot and connect to the exchange (runner thread)"""
+        try:
             # Initialize bot based on exchange
             if self.config.exchange == 'MT5':
                 self._init_mt5_bot()
+                connected = self.bot.connect_mt5()
             elif self.config.exchange == 'Binance':
                 self._init_binance_bot()
+                connected = self.bot.connect_exchange()
             else:
                 raise ValueError(f"Unknown exchange: {self.config.exchange}")
-
-            # Connect to exchange (different method names for different exchanges)
+        except Exception as e:
+            self.on_error(f"Bot error: {str(e)}\n{traceback.format_exc()}")
+            return False
+
+        if not connected:
+            self.error_signal.emit(f"Failed to connect to {self.config.exchange}")
+            return False
+
+        self.history_bars = self.bot.signal_engine.window + 1
+        self.log_signal.emit(f"[{self.config.bot_id}] Connected to {self.config.exchange}")
+        return True
+
+    def analyze(self, candles):
+        """Analyze the new bar and trade the signal (runner thread)"""
+        signal = self.bot.analyze_market(candles)
+
+        # Update status
+        self.status_signal.emit(self._get_bot_status())
+
+        # Check if should trade
+        if signal and self.running:
+            # Open position
+            success = self.bot.open_position(signal)
+            if success:
+                self.log_signal.emit(f"[{self.config.bot_id}] Position opened")
+
+                # Save DRY RUN trade to database
+                if self.config.dry_run and self.db:
+                    self._save_dry_run_trade(signal)
+
+    def monitor(self):
+        """Status update for real-time monitoring, trailing stops every minute (runner thread)"""
+        self.status_signal.emit(self._get_bot_status())
+
+        # Update trailing stops for crypto bots
+        now = time.monotonic()
+        if hasattr(self.bot, 'update_trailing_stops') and now - self._last_trailing >= self.TRAILING_INTERVAL:
+            self._last_trailing = now
+            self.bot.update_trailing_stops()
+
+    def disconnect(self):
+        """Disconnect from the exchange (runner thread)"""
+        try:
+            # Call appropriate disconnect method based on exchange
             if self.config.exchange == 'MT5':
-                if not self.bot.connect_mt5():
-                    self.error_signal.emit("Failed to connect to MT5")
-                    return
+                self.bot.disconnect_mt5()
             else:  # Binance
-                if not self.bot.connect_exchange():
-                    self.error_signal.emit("Failed to connect to Binance")
-                    return
-
-            self.log_signal.emit(f"[{self.config.bot_id}] Connected to {self.config.exchange}")
-
-            # Run bot (this will block)
-            self._run_bot_loop()
+                self.bot.disconnect_exchange()
+        except Exception:
+            pass
+        finally:
+            self._finish()
 
-        except Exception as e:
-            error_msg = f"Bot error: {str(e)}\n{traceback.format_exc()}"
-            self.error_signal.emit(error_msg)
-            self.log_signal.emit(f"[{self.config.bot_id}] ERROR: {str(e)}")
+    def on_error(self, message: str):
+        """Error reported by the runner"""
+        self.error_signal.emit(message)
+        self.log_signal.emit(f"[{self.config.bot_id}] ERROR: {message.splitlines()[0]}")
 
-        finally:
-            self.running = False
-            if self.bot:
-                try:
-                    # Call appropriate disconnect method based on exchange
-                    if self.config.exchange == 'MT5':
-                        self.bot.disconnect_mt5()
-                    else:  # Binance
-                        self.bot.disconnect_exchange()
-                except:
-                    pass
-            self.log_signal.emit(f"[{self.config.bot_id}] Bot stopped")
+    def _finish(self):
+        self.running = False
+        self._stopped.set()
+        self.log_signal.emit(f"[{self.config.bot_id}] Bot stopped")
+        self.finished.emit()
 
     def _init_mt5_bot(self):
         """Initialize MT5 bot"""
@@ -126,60 +192,12 @@ class BotThread(QThread):
         self.bot.range_tp2_pct = self.config.range_tp2
         self.bot.range_tp3_pct = self.config.range_tp3
 
-    def _run_bot_loop(self):
-        """Run bot loop with periodic status updates"""
-        import time
-
-        # Custom run loop to allow stopping
-        iteration = 0
-
-        while not self._stop_requested:
-            iteration += 1
-
-            try:
-                # Get market data and analyze
-                signal = self.bot.analyze_market()
-
-                # Update status
-                status = self._get_bot_status()
-                self.status_signal.emit(status)
-
-                # Check if should trade
-                if signal and not self._stop_requested:
-                    # Open position
-                    success = self.bot.open_position(signal)
-                    if success:
-                        self.log_signal.emit(f"[{self.config.bot_id}] Position opened")
-                        
-                        # Save DRY RUN trade to database
-                        if self.config.dry_run and self.db:
-                            self._save_dry_run_trade(signal)
-
-                # Wait until next check (1 hour or until stopped)
-                wait_time = 3600  # 1 hour
-                elapsed = 0
-                while elapsed < wait_time and not self._stop_requested:
-                    time.sleep(10)  # Check every 10 seconds
-                    elapsed += 10
-
-                    # Update status every 10 seconds for real-time monitoring
-                    status = self._get_bot_status()
-                    self.status_signal.emit(status)
-
-                    # Update trailing stops for crypto bots
-                    if hasattr(self.bot, 'update_trailing_stops') and elapsed % 60 == 0:
-                        self.bot.update_trailing_stops()
-
-            except Exception as e:
-                self.log_signal.emit(f"[{self.config.bot_id}] Error in loop: {str(e)}")
-                time.sleep(60)  # Wait before retrying
-
     def _get_bot_status(self) -> BotStatus:
         """Get current bot status"""
         try:
             # Get account info from bot
             if self.config.exchange == 'MT5':
-                import MetaTrader5 as mt5
+                mt5 = mt5_terminal().api
                 account_info = mt5.account_info()
                 if account_info:
                     balance = account_info.balance
@@ -289,7 +307,16 @@ class BotThread(QThread):
             self.log_signal.emit(f"[{self.config.bot_id}] Warning: Could not save DRY RUN trade: {str(e)}")
             print(f"⚠️  Could not save DRY RUN trade: {e}")
 
-    def stop(self):
+    def stop(self, runner):
         """Request bot to stop"""
-        self._stop_requested = True
+        self.running = False
         self.log_signal.emit(f"[{self.config.bot_id}] Stop requested...")
+        runner.remove_bot(self.config.bot_id)
+
+    def isRunning(self) -> bool:
+        """True from start() until the bot is disconnected"""
+        return not self._stopped.is_set()
+
+    def wait(self, timeout_ms: Optional[int] = None) -> bool:
+        """Block until the bot is disconnected"""
+        return self._stopped.wait(None if timeout_ms is None else timeout_ms / 1000)
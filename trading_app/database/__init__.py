@@ -2,5 +2,6 @@
 Database package
 """
 from .db_manager import DatabaseManager
+from .position_registry import PositionEvent, PositionRegistry
 
-__all__ = ['DatabaseManager']
+__all__ = ['DatabaseManager', 'PositionEvent', 'PositionRegistry']
@@ -3,17 +3,36 @@ Database Manager for SQLite
 """
 import sqlite3
 import os
-from typing import List, Optional
-from datetime import datetime
-from models import BotConfig, BotStatus, TradeRecord
+from typing import Iterator, List, Optional, Tuple
+from datetime import date, datetime
+from models import BotConfig, BotStatus, TradeRecord, TradeStats
+from database.sqlite_pool import ConnectionPool, WriteQueue, connect
+from database.position_registry import position_registry
+from database import trade_stats
+from utils.row_sources import SqlRowSource
 
 
 class DatabaseManager:
-    """Manage SQLite database for bot configs and trade history"""
+    """
+    Manage SQLite database for bot configs and trade history
+
+    The database runs in WAL mode: every thread reads through its own
+    connection while a single writer thread commits queued writes in
+    batches, so the bots' 10-second polling and trade writes do not
+    serialize behind one connection. Reads wait for the calling thread's
+    own pending writes, so add_trade() followed by get_open_trades() in one
+    thread sees the new trade.
+
+    Open trades are served from the process-wide PositionRegistry
+    (self.positions), which add_trade() and update_trade() write through to.
+    """
 
     def __init__(self, db_path: str = "trading_app.db"):
         self.db_path = db_path
         self.conn = None
+        self.pool = None
+        self.writer = None
+        self.positions = None
         self.init_database()
 
     @staticmethod
@@ -42,8 +61,13 @@ class DatabaseManager:
 
     def init_database(self):
         """Initialize database with tables"""
-        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
-        self.conn.row_factory = sqlite3.Row
+        # In-memory databases are shared between the per-thread connections
+        uri = self.db_path == ':memory:'
+        path = f"file:trading_app_{id(self)}?mode=memory&cache=shared" if uri else self.db_path
+
+        self.conn = connect(path, uri)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")  # WAL: no fsync per commit, safe against app crashes
         cursor = self.conn.cursor()
 
         # Bot configurations table
@@ -196,13 +220,76 @@ class DatabaseManager:
         except Exception as e:
             print(f"⚠️  Phase 2 config migration warning: {e}")
 
+        # Indexes for the polled queries (open trades per bot, history per bot, 3-position groups)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_trades_bot_status ON trades(bot_id, status)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_trades_bot_open_time ON trades(bot_id, open_time)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_trades_group ON trades(position_group_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_trades_bot_order ON trades(bot_id, order_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_trades_bot_close_time ON trades(bot_id, close_time)")
+
+        # Daily per-bot/mode/regime aggregates, kept current by triggers on trades
+        trade_stats.create(cursor)
+
         self.conn.commit()
 
+        self.pool = ConnectionPool(path, uri)
+        self.writer = WriteQueue(self.conn)
+
+        # Registry loads through its own connection: it outlives this manager
+        self.positions = position_registry(path, lambda: self._load_open_trades(path, uri))
+        self.positions.attach(self.writer)
+        self.positions.load()
+
+    @classmethod
+    def _load_open_trades(cls, path: str, uri: bool) -> List[TradeRecord]:
+        """All open trades of all bots (used by the position registry)"""
+        conn = connect(path, uri)
+        try:
+            rows = conn.execute("SELECT * FROM trades WHERE status = 'OPEN'").fetchall()
+            return [cls._row_to_trade(row) for row in rows]
+        finally:
+            conn.close()
+
+    @classmethod
+    def _row_to_trade(cls, row: sqlite3.Row) -> TradeRecord:
+        """Build a TradeRecord from a trades row"""
+        columns = row.keys()
+        return TradeRecord(
+            trade_id=row['id'],
+            bot_id=row['bot_id'],
+            symbol=row['symbol'] if 'symbol' in columns else None,
+            order_id=row['order_id'],
+            open_time=cls._parse_datetime(row['open_time']),
+            close_time=cls._parse_datetime(row['close_time']),
+            duration_hours=row['duration_hours'],
+            trade_type=row['trade_type'],
+            amount=row['amount'],
+            entry_price=row['entry_price'],
+            close_price=row['close_price'],
+            stop_loss=row['stop_loss'],
+            take_profit=row['take_profit'],
+            profit=row['profit'],
+            profit_percent=row['profit_percent'],
+            status=row['status'],
+            market_regime=row['market_regime'],
+            comment=row['comment'],
+            position_group_id=row['position_group_id'] if 'position_group_id' in columns else None,
+            position_num=row['position_num'] if 'position_num' in columns else 0
+        )
+
+    def _read(self) -> sqlite3.Cursor:
+        """Cursor on the calling thread's connection, after its own pending writes"""
+        self.writer.wait_own()
+        return self.pool.get().cursor()
+
+    def flush(self):
+        """Block until all queued writes are committed"""
+        if self.writer:
+            self.writer.flush()
+
     def save_config(self, config: BotConfig):
         """Save or update bot configuration"""
-        cursor = self.conn.cursor()
-
-        cursor.execute("""
+        self.writer.submit("""
             INSERT OR REPLACE INTO bot_configs (
                 bot_id, name, symbol, exchange, api_key, api_secret,
                 risk_percent, max_positions, timeframe, strategy,
@@ -227,13 +314,11 @@ class DatabaseManager:
             1 if config.dry_run else 0,
             1 if config.testnet else 0,
             datetime.now()
-        ))
-
-        self.conn.commit()
+        ), 'config save')
 
     def load_config(self, bot_id: str) -> Optional[BotConfig]:
         """Load bot configuration"""
-        cursor = self.conn.cursor()
+        cursor = self._read()
         cursor.execute("SELECT * FROM bot_configs WHERE bot_id = ?", (bot_id,))
         row = cursor.fetchone()
 
@@ -272,7 +357,7 @@ class DatabaseManager:
 
     def load_all_configs(self) -> List[BotConfig]:
         """Load all bot configurations"""
-        cursor = self.conn.cursor()
+        cursor = self._read()
         cursor.execute("SELECT bot_id FROM bot_configs")
         bot_ids = [row['bot_id'] for row in cursor.fetchall()]
         return [self.load_config(bot_id) for bot_id in bot_ids]
@@ -285,9 +370,7 @@ class DatabaseManager:
             return
 
         try:
-            cursor = self.conn.cursor()
-
-            cursor.execute("""
+            self.writer.submit("""
                 INSERT OR REPLACE INTO bot_status (
                     bot_id, status, balance, equity, pnl_today, pnl_percent,
                     open_positions, max_positions, total_trades, win_rate, profit_factor,
@@ -298,9 +381,7 @@ class DatabaseManager:
                 status.pnl_today, status.pnl_percent, status.open_positions, status.max_positions,
                 status.total_trades, status.win_rate, status.profit_factor,
                 status.current_regime, status.last_signal_time, datetime.now(), status.error_message
-            ))
-
-            self.conn.commit()
+            ), 'status update')
         except sqlite3.ProgrammingError as e:
             print(f"⚠️  Warning: Database error during status update: {e}")
         except Exception as e:
@@ -308,7 +389,7 @@ class DatabaseManager:
 
     def get_status(self, bot_id: str) -> Optional[BotStatus]:
         """Get bot status"""
-        cursor = self.conn.cursor()
+        cursor = self._read()
         cursor.execute("SELECT * FROM bot_status WHERE bot_id = ?", (bot_id,))
         row = cursor.fetchone()
 
@@ -339,10 +420,8 @@ class DatabaseManager:
             print(f"⚠️  Warning: Database connection closed, skipping trade record for {trade.bot_id}")
             return
 
-        try:
-            cursor = self.conn.cursor()
-
-            cursor.execute("""
+        def write(stored: TradeRecord):
+            self.writer.submit("""
                 INSERT INTO trades (
                     bot_id, symbol, order_id, open_time, close_time, duration_hours,
                     trade_type, amount, entry_price, close_price,
@@ -355,88 +434,97 @@ class DatabaseManager:
                 trade.stop_loss, trade.take_profit, trade.profit, trade.profit_percent,
                 trade.status, trade.market_regime, trade.comment,
                 trade.position_group_id, trade.position_num
-            ))
+            ), 'trade add', on_commit=lambda rowid: committed(stored, rowid))
 
-            self.conn.commit()
+        def committed(stored: TradeRecord, rowid: Optional[int]):
+            if rowid is None:
+                self.positions.discard(stored)
+            else:
+                stored.trade_id = rowid
+
+        try:
+            self.positions.opened(trade, write)
         except sqlite3.ProgrammingError as e:
             print(f"⚠️  Warning: Database error during trade add: {e}")
         except Exception as e:
             print(f"⚠️  Warning: Unexpected error during trade add: {e}")
 
-    def get_trades(self, bot_id: str, limit: int = 100) -> List[TradeRecord]:
-        """Get recent trades for a bot"""
-        cursor = self.conn.cursor()
-        cursor.execute("""
+    def get_trades(self, bot_id: str, limit: int = 100, dry_run: Optional[bool] = None) -> List[TradeRecord]:
+        """Get recent trades for a bot (dry_run: only dry-run / only live trades)"""
+        mode = "" if dry_run is None else f"AND {trade_stats.dry_run_sql()} = {int(dry_run)}"
+        cursor = self._read()
+        cursor.execute(f"""
             SELECT * FROM trades
-            WHERE bot_id = ?
+            WHERE bot_id = ? {mode}
             ORDER BY open_time DESC
             LIMIT ?
         """, (bot_id, limit))
 
-        trades = []
-        for row in cursor.fetchall():
-            columns = row.keys()
-            trades.append(TradeRecord(
-                trade_id=row['id'],
-                bot_id=row['bot_id'],
-                symbol=row['symbol'] if 'symbol' in columns else None,
-                order_id=row['order_id'],
-                open_time=self._parse_datetime(row['open_time']),
-                close_time=self._parse_datetime(row['close_time']),
-                duration_hours=row['duration_hours'],
-                trade_type=row['trade_type'],
-                amount=row['amount'],
-                entry_price=row['entry_price'],
-                close_price=row['close_price'],
-                stop_loss=row['stop_loss'],
-                take_profit=row['take_profit'],
-                profit=row['profit'],
-                profit_percent=row['profit_percent'],
-                status=row['status'],
-                market_regime=row['market_regime'],
-                comment=row['comment'],
-                position_group_id=row['position_group_id'] if 'position_group_id' in columns else None,
-                position_num=row['position_num'] if 'position_num' in columns else 0
-            ))
+        return [self._row_to_trade(row) for row in cursor.fetchall()]
 
-        return trades
+    def iter_trades(self, bot_id: str, dry_run: Optional[bool] = None,
+                    batch_size: int = 1000) -> Iterator[TradeRecord]:
+        """All trades of a bot, newest first, fetched in batches"""
+        mode = "" if dry_run is None else f"AND {trade_stats.dry_run_sql()} = {int(dry_run)}"
+        self.writer.wait_own()
+        # Own cursor on a fresh connection: the caller may read in between batches
+        conn = connect(self.pool.db_path, self.pool.uri)
+        try:
+            cursor = conn.execute(f"SELECT * FROM trades WHERE bot_id = ? {mode} ORDER BY open_time DESC",
+                                  (bot_id,))
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield self._row_to_trade(row)
+        finally:
+            conn.close()
+
+    def trade_rows(self, bot_id: str, dry_run: Optional[bool] = None,
+                   since: Optional[date] = None) -> SqlRowSource:
+        """Paged, sortable trade history of a bot for LazyTableModel (newest first)"""
+        where, params = ["bot_id = ?"], [bot_id]
+        if dry_run is not None:
+            where.append(f"{trade_stats.dry_run_sql()} = {int(dry_run)}")
+        if since is not None:
+            where.append("open_time >= ?")
+            params.append(since.isoformat())
+        return SqlRowSource(self._read, 'trades', ' AND '.join(where), params,
+                            order_by='open_time', descending=True, convert=self._row_to_trade)
+
+    def get_trade_stats(self, bot_id: str, dry_run: Optional[bool] = None, since: Optional[date] = None,
+                        regime: Optional[str] = None) -> TradeStats:
+        """
+        Exact statistics over all trades of a bot, from the daily aggregates
 
-    def get_open_trades(self, bot_id: str) -> List[TradeRecord]:
-        """Get currently open trades for a bot"""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            SELECT * FROM trades
-            WHERE bot_id = ? AND status = 'OPEN'
-            ORDER BY open_time DESC
-        """, (bot_id,))
+        Args:
+            bot_id: Bot
+            dry_run: True / False for dry-run / live trades only, None for all
+            since: First day to include, None for all time
+            regime: Market regime ('TREND', 'RANGE', '' for none), None for all
+        """
+        return trade_stats.query_stats(self._read(), bot_id, dry_run, since, regime)
 
-        trades = []
-        for row in cursor.fetchall():
-            columns = row.keys()
-            trades.append(TradeRecord(
-                trade_id=row['id'],
-                bot_id=row['bot_id'],
-                symbol=row['symbol'] if 'symbol' in columns else None,
-                order_id=row['order_id'],
-                open_time=self._parse_datetime(row['open_time']),
-                close_time=self._parse_datetime(row['close_time']),
-                duration_hours=row['duration_hours'],
-                trade_type=row['trade_type'],
-                amount=row['amount'],
-                entry_price=row['entry_price'],
-                close_price=row['close_price'],
-                stop_loss=row['stop_loss'],
-                take_profit=row['take_profit'],
-                profit=row['profit'],
-                profit_percent=row['profit_percent'],
-                status=row['status'],
-                market_regime=row['market_regime'],
-                comment=row['comment'],
-                position_group_id=row['position_group_id'] if 'position_group_id' in columns else None,
-                position_num=row['position_num'] if 'position_num' in columns else 0
-            ))
+    def get_equity_curve(self, bot_id: str, dry_run: Optional[bool] = None,
+                         since: Optional[date] = None) -> List[Tuple[datetime, float, float]]:
+        """(close time, cumulative profit, drawdown) per closed trade"""
+        return trade_stats.equity_curve(self._read(), bot_id, dry_run, since)
 
-        return trades
+    def rebuild_trade_stats(self):
+        """Recompute the statistics aggregates from the trades table"""
+        self.flush()
+        conn = connect(self.pool.db_path, self.pool.uri)
+        try:
+            with conn:
+                trade_stats.rebuild(conn.cursor())
+        finally:
+            conn.close()
+
+    def get_open_trades(self, bot_id: str) -> List[TradeRecord]:
+        """Get currently open trades for a bot (from the position registry, no query)"""
+        self.writer.wait_own()  # A failed INSERT is dropped from the registry on commit
+        return self.positions.open_trades(bot_id)
 
     def update_trade(self, trade: TradeRecord):
         """Update an existing trade record"""
@@ -445,10 +533,8 @@ class DatabaseManager:
             print(f"⚠️  Warning: Database connection closed, skipping trade update for {trade.bot_id}")
             return
 
-        try:
-            cursor = self.conn.cursor()
-
-            cursor.execute("""
+        def write(trade: TradeRecord):
+            self.writer.submit("""
                 UPDATE trades SET
                     close_time = ?,
                     duration_hours = ?,
@@ -462,9 +548,10 @@ class DatabaseManager:
                 trade.close_time, trade.duration_hours, trade.close_price,
                 trade.profit, trade.profit_percent, trade.status, trade.comment,
                 trade.bot_id, trade.order_id
-            ))
+            ), 'trade update')
 
-            self.conn.commit()
+        try:
+            self.positions.updated(trade, write)
         except sqlite3.ProgrammingError as e:
             print(f"⚠️  Warning: Database error during trade update: {e}")
         except Exception as e:
@@ -477,21 +564,22 @@ class DatabaseManager:
             return
 
         try:
-            cursor = self.conn.cursor()
-            cursor.execute("""
+            self.writer.submit("""
                 INSERT INTO app_logs (level, bot_id, message)
                 VALUES (?, ?, ?)
-            """, (level, bot_id, message))
-            self.conn.commit()
+            """, (level, bot_id, message), 'log')
         except sqlite3.ProgrammingError:
             pass  # Silently skip if database is closed
         except Exception:
             pass  # Silently skip other errors during logging
 
     def close(self):
-        """Close database connection"""
+        """Commit queued writes and close all connections"""
         if self.conn:
             try:
+                self.positions.detach(self.writer)
+                self.writer.close()
+                self.pool.close_all()
                 self.conn.close()
             except Exception as e:
                 print(f"⚠️  Warning: Error closing database: {e}")
@@ -0,0 +1,251 @@
+"""
+Position Registry - open positions of all bots kept in memory
+"""
+import asyncio
+import os
+import threading
+from collections import deque
+from dataclasses import dataclass, replace
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from models import TradeRecord
+
+# Columns written by DatabaseManager.update_trade()
+UPDATED_FIELDS = ('close_time', 'duration_hours', 'close_price', 'profit', 'profit_percent', 'status', 'comment')
+
+
+@dataclass
+class PositionEvent:
+    """One change of the open-position set"""
+    kind: str  # 'opened', 'updated' or 'closed'
+    trade: TradeRecord
+
+
+class PositionRegistry:
+    """
+    Authoritative set of open trades, shared by every DatabaseManager of the process
+
+    The open trades are loaded from SQLite once. Afterwards add_trade() and
+    update_trade() write through to the registry in the same call that queues
+    the database write, so get_open_trades() is served from memory and the
+    GUI and bots no longer query the database while nothing happens.
+    Listeners receive PositionEvent deltas on the writing thread; see
+    subscribe_queue() for asyncio consumers. Changes made by other processes
+    (standalone bots) are picked up by reload().
+    """
+
+    def __init__(self, loader: Callable[[], List[TradeRecord]]):
+        """
+        Initialize registry
+
+        Args:
+            loader: Returns all trades with status OPEN from the database
+        """
+        self._loader = loader
+        self._open: Dict[str, Dict[str, List[TradeRecord]]] = {}  # bot_id -> order_id -> trades
+        self._lock = threading.RLock()
+        self._listeners: List[Callable[[PositionEvent], None]] = []
+        self._queues = {}
+        self._writers = []
+        self._failed = deque()
+        self.loaded = False
+        self.loads = 0
+
+    def attach(self, writer):
+        """Register a WriteQueue whose pending writes reload() must wait for"""
+        with self._lock:
+            self._writers.append(writer)
+
+    def detach(self, writer):
+        with self._lock:
+            if writer in self._writers:
+                self._writers.remove(writer)
+
+    def load(self):
+        """Load the open trades if not done yet"""
+        with self._lock:
+            if not self.loaded:
+                self._open = self._read()
+                self.loaded = True
+
+    def reload(self) -> List[PositionEvent]:
+        """Re-read open trades from the database and publish the differences"""
+        with self._lock:
+            fresh = self._read()
+            events = []
+            if self.loaded:
+                old = {(t.bot_id, t.order_id): t for t in self._all(self._open)}
+                new = {(t.bot_id, t.order_id): t for t in self._all(fresh)}
+                for key, trade in new.items():
+                    if key not in old:
+                        events.append(PositionEvent('opened', replace(trade)))
+                    elif any(getattr(trade, f) != getattr(old[key], f) for f in UPDATED_FIELDS):
+                        events.append(PositionEvent('updated', replace(trade)))
+                for key, trade in old.items():
+                    if key not in new:
+                        # Closed by another process; the exact outcome is in the trade history
+                        events.append(PositionEvent('closed', replace(trade, status='CLOSED')))
+            self._open = fresh
+            self.loaded = True
+            self._failed.clear()  # The snapshot has only committed rows
+        for event in events:
+            self._publish(event)
+        return events
+
+    def open_trades(self, bot_id: str) -> List[TradeRecord]:
+        """Open trades of a bot, newest first (copies)"""
+        with self._lock:
+            self.load()
+            events = self._drop_failed()
+            trades = [replace(t) for group in self._open.get(bot_id, {}).values() for t in group]
+        for event in events:
+            self._publish(event)
+        trades.sort(key=lambda t: t.open_time or datetime.min, reverse=True)
+        return trades
+
+    def count(self, bot_id: Optional[str] = None) -> int:
+        """Number of open trades of one bot or of all bots"""
+        with self._lock:
+            self.load()
+            events = self._drop_failed()
+            bots = [self._open.get(bot_id, {})] if bot_id is not None else self._open.values()
+            count = sum(len(group) for orders in bots for group in orders.values())
+        for event in events:
+            self._publish(event)
+        return count
+
+    def opened(self, trade: TradeRecord, write: Optional[Callable[[TradeRecord], None]] = None):
+        """
+        Record an inserted trade
+
+        Args:
+            trade: The new trade (ignored unless status is OPEN)
+            write: Queues the database write; called under the registry lock
+                with the stored copy, so reload() cannot run in between
+        """
+        stored = replace(trade)
+        with self._lock:
+            self.load()
+            if write:
+                write(stored)
+            events = self._drop_failed()
+            if trade.status == 'OPEN':
+                self._open.setdefault(trade.bot_id, {}).setdefault(trade.order_id, []).append(stored)
+                events.append(PositionEvent('opened', replace(stored)))
+        for event in events:
+            self._publish(event)
+
+    def updated(self, trade: TradeRecord, write: Optional[Callable[[TradeRecord], None]] = None):
+        """Apply an UPDATE of (bot_id, order_id): changed fields, or removal when no longer open"""
+        with self._lock:
+            self.load()
+            if write:
+                write(trade)
+            events = self._drop_failed()
+            orders = self._open.get(trade.bot_id, {})
+            group = orders.get(trade.order_id)
+            reopened = group is None and trade.status == 'OPEN'
+            for stored in group or []:
+                for field in UPDATED_FIELDS:
+                    setattr(stored, field, getattr(trade, field))
+                events.append(PositionEvent('updated' if trade.status == 'OPEN' else 'closed', replace(stored)))
+            if group is not None and trade.status != 'OPEN':
+                del orders[trade.order_id]
+                if not orders:
+                    del self._open[trade.bot_id]
+        for event in events:
+            self._publish(event)
+        if reopened:
+            # The row's other columns are only in the database
+            self.reload()
+
+    def discard(self, stored: TradeRecord):
+        """
+        Drop a trade recorded by opened() whose INSERT failed
+
+        Called on the writer thread, possibly while reload() holds the lock
+        and waits for that thread; the removal is applied on the next access.
+        """
+        self._failed.append(stored)
+
+    def _drop_failed(self) -> List[PositionEvent]:
+        events = []
+        while self._failed:
+            stored = self._failed.popleft()
+            group = self._open.get(stored.bot_id, {}).get(stored.order_id, [])
+            if not any(t is stored for t in group):
+                continue
+            group[:] = [t for t in group if t is not stored]
+            if not group:
+                del self._open[stored.bot_id][stored.order_id]
+                if not self._open[stored.bot_id]:
+                    del self._open[stored.bot_id]
+            events.append(PositionEvent('closed', replace(stored)))
+        return events
+
+    def subscribe(self, callback: Callable[[PositionEvent], None]):
+        """Call callback(event) for every change; runs on the thread that made it"""
+        with self._lock:
+            self._listeners.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+    def subscribe_queue(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> asyncio.Queue:
+        """asyncio.Queue receiving the events on the given (or running) event loop"""
+        loop = loop or asyncio.get_running_loop()
+        events = asyncio.Queue()
+        callback = lambda event: loop.call_soon_threadsafe(events.put_nowait, event)
+        self._queues[id(events)] = callback
+        self.subscribe(callback)
+        return events
+
+    def unsubscribe_queue(self, events: asyncio.Queue):
+        callback = self._queues.pop(id(events), None)
+        if callback:
+            self.unsubscribe(callback)
+
+    def _publish(self, event: PositionEvent):
+        with self._lock:
+            listeners = list(self._listeners)
+        for callback in listeners:
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"⚠️  Position listener error: {e}")
+
+    def _read(self) -> Dict[str, Dict[str, List[TradeRecord]]]:
+        # Queued writes first, so the snapshot includes every change already applied here
+        for writer in list(self._writers):
+            writer.flush(timeout=10)
+        self.loads += 1
+        return self._index(self._loader())
+
+    @staticmethod
+    def _index(trades: List[TradeRecord]) -> Dict[str, Dict[str, List[TradeRecord]]]:
+        index = {}
+        for trade in trades:
+            index.setdefault(trade.bot_id, {}).setdefault(trade.order_id, []).append(trade)
+        return index
+
+    @staticmethod
+    def _all(index):
+        return [t for orders in index.values() for group in orders.values() for t in group]
+
+
+_registries: Dict[str, PositionRegistry] = {}
+_registries_lock = threading.Lock()
+
+
+def position_registry(db_path: str, loader: Callable[[], List[TradeRecord]]) -> PositionRegistry:
+    """Process-wide registry of a database file (created with loader on first use)"""
+    key = db_path if db_path.startswith('file:') else os.path.abspath(db_path)
+    with _registries_lock:
+        registry = _registries.get(key)
+        if registry is None:
+            registry = _registries[key] = PositionRegistry(loader)
+        return registry
@@ -0,0 +1,168 @@
+"""
+SQLite connection pool and batched write queue
+"""
+import queue
+import sqlite3
+import threading
+from typing import Callable, List, Optional, Sequence, Tuple
+
+
+def connect(db_path: str, uri: bool = False) -> sqlite3.Connection:
+    """Open a connection with Row results and a generous busy timeout"""
+    conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False, uri=uri)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+class ConnectionPool:
+    """One read connection per thread (WAL readers never block each other or the writer)"""
+
+    def __init__(self, db_path: str, uri: bool = False):
+        self.db_path = db_path
+        self.uri = uri
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+    def get(self) -> sqlite3.Connection:
+        """Connection of the calling thread"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = connect(self.db_path, self.uri)
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def close_all(self):
+        """Close the connections of all threads"""
+        with self._lock:
+            for conn in self._connections:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            self._connections.clear()
+        self._local = threading.local()
+
+
+_STOP = object()
+
+
+class WriteQueue:
+    """
+    Background writer: statements from all threads are committed in batches
+
+    submit() returns immediately. The writer thread takes everything queued
+    at that moment and commits it as one transaction (group commit), so a
+    burst of writes costs one fsync instead of one per statement. A thread
+    that reads after writing sees its own writes: wait_own() blocks until the
+    calling thread's last statement is committed.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, max_batch: int = 500):
+        """
+        Initialize writer
+
+        Args:
+            conn: Connection used only by the writer thread
+            max_batch: Most statements per transaction
+        """
+        self.conn = conn
+        self.max_batch = max_batch
+        self.batches = 0
+        self.statements = 0
+        self._queue = queue.Queue()
+        self._local = threading.local()
+        self._submitted = 0
+        self._committed = 0
+        self._stopped = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, sql: str, params: Sequence = (), label: str = 'write',
+               on_commit: Optional[Callable[[int], None]] = None) -> int:
+        """Queue a statement; returns its sequence number
+
+        on_commit(lastrowid) is called on the writer thread once it is
+        committed, on_commit(None) if the statement failed.
+        """
+        with self._cond:
+            self._submitted += 1
+            seq = self._submitted
+            self._queue.put((seq, sql, params, label, on_commit))
+        self._local.last = seq
+        return seq
+
+    def wait(self, seq: int, timeout: Optional[float] = None) -> bool:
+        """Block until statement seq is committed"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._committed >= seq or self._stopped, timeout)
+
+    def wait_own(self, timeout: Optional[float] = None) -> bool:
+        """Block until the calling thread's writes are committed"""
+        return self.wait(getattr(self._local, 'last', 0), timeout)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything submitted so far is committed"""
+        with self._cond:
+            seq = self._submitted
+        return self.wait(seq, timeout)
+
+    def close(self, timeout: float = 10):
+        """Commit pending writes and stop the writer thread"""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+
+    def _take_batch(self) -> Tuple[List[tuple], bool]:
+        batch = [self._queue.get()]
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        stop = any(item is _STOP for item in batch)
+        return [item for item in batch if item is not _STOP], stop
+
+    def _run(self):
+        stop = False
+        while not stop:
+            batch, stop = self._take_batch()
+            if not batch:
+                continue
+            done = []
+            try:
+                with self.conn:  # One transaction for the whole batch
+                    for _, sql, params, _, on_commit in batch:
+                        cursor = self.conn.execute(sql, params)
+                        if on_commit:
+                            done.append((on_commit, cursor.lastrowid))
+            except Exception:
+                # Replay one by one so a bad statement does not drop the batch
+                done = []
+                for _, sql, params, label, on_commit in batch:
+                    try:
+                        with self.conn:
+                            cursor = self.conn.execute(sql, params)
+                        if on_commit:
+                            done.append((on_commit, cursor.lastrowid))
+                    except Exception as e:
+                        print(f"⚠️  Warning: Database error during {label}: {e}")
+                        if on_commit:
+                            done.append((on_commit, None))
+            for on_commit, rowid in done:
+                try:
+                    on_commit(rowid)
+                except Exception as e:
+                    print(f"⚠️  Warning: Commit callback error: {e}")
+            self.batches += 1
+            self.statements += len(batch)
+            with self._cond:
+                self._committed = batch[-1][0]
+                self._cond.notify_all()
+
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
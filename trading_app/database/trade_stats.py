@@ -0,0 +1,178 @@
+"""
+Trade statistics - daily aggregates maintained by SQLite triggers
+"""
+import sqlite3
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+
+from models import TradeStats
+
+
+def dry_run_sql(row: str = '') -> str:
+    """SQL test for a dry-run trade: 'DRY-' order id or 'DRY RUN' in the comment (never NULL)"""
+    return (f"(substr(coalesce({row}order_id, ''), 1, 4) = 'DRY-' "
+            f"OR instr(upper(coalesce({row}comment, '')), 'DRY RUN') > 0)")
+
+
+def closed_sql(row: str = '') -> str:
+    """SQL test for a closed trade that counts in the statistics"""
+    return f"({row}status IN ('TP', 'SL', 'CLOSED') AND {row}profit IS NOT NULL)"
+
+
+def _duration_sql(row: str) -> str:
+    return f"((julianday({row}close_time) - julianday({row}open_time)) * 24)"
+
+
+# One row per bot, day, mode and regime. 'opened' counts trades by open day,
+# the other columns count closed trades by close day.
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS trade_stats_daily (
+        bot_id TEXT NOT NULL,
+        day TEXT NOT NULL,
+        dry_run INTEGER NOT NULL,
+        regime TEXT NOT NULL,
+        opened INTEGER DEFAULT 0,
+        closed INTEGER DEFAULT 0,
+        wins INTEGER DEFAULT 0,
+        losses INTEGER DEFAULT 0,
+        gross_profit REAL DEFAULT 0.0,
+        gross_loss REAL DEFAULT 0.0,
+        duration_hours REAL DEFAULT 0.0,
+        durations INTEGER DEFAULT 0,
+        PRIMARY KEY (bot_id, day, dry_run, regime)
+    )
+"""
+
+_CLOSED_COLUMNS = ('closed', 'wins', 'losses', 'gross_profit', 'gross_loss', 'duration_hours', 'durations')
+
+
+def _closed_values(row: str, sign: str) -> str:
+    duration = _duration_sql(row)
+    return (f"{sign}, {sign} * ({row}profit > 0), {sign} * ({row}profit < 0), "
+            f"{sign} * max({row}profit, 0), {sign} * min({row}profit, 0), "
+            f"{sign} * coalesce({duration}, 0), {sign} * ({duration} IS NOT NULL)")
+
+
+def _upsert(columns) -> str:
+    updates = ', '.join(f"{c} = {c} + excluded.{c}" for c in columns)
+    return f"ON CONFLICT (bot_id, day, dry_run, regime) DO UPDATE SET {updates}"
+
+
+def _apply(row: str, sign: str) -> str:
+    """Statements adding (sign '1') or removing (sign '-1') the contribution of NEW. / OLD."""
+    key = f"{dry_run_sql(row)}, coalesce({row}market_regime, '')"
+    return f"""
+        INSERT INTO trade_stats_daily (bot_id, day, dry_run, regime, opened)
+        VALUES ({row}bot_id, date({row}open_time), {key}, {sign})
+        {_upsert(['opened'])};
+        INSERT INTO trade_stats_daily (bot_id, day, dry_run, regime, {', '.join(_CLOSED_COLUMNS)})
+        SELECT {row}bot_id, date(coalesce({row}close_time, {row}open_time)), {key}, {_closed_values(row, sign)}
+        WHERE {closed_sql(row)}
+        {_upsert(_CLOSED_COLUMNS)};
+    """
+
+
+TRIGGERS = {
+    'trades_stats_insert': f"AFTER INSERT ON trades BEGIN {_apply('NEW.', '1')} END",
+    'trades_stats_update': f"AFTER UPDATE ON trades BEGIN {_apply('OLD.', '-1')} {_apply('NEW.', '1')} END",
+    'trades_stats_delete': f"AFTER DELETE ON trades BEGIN {_apply('OLD.', '-1')} END",
+}
+
+
+def create(cursor: sqlite3.Cursor):
+    """Create the aggregate table and its triggers; refills it when new or the triggers changed"""
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'trade_stats_daily'")
+    current = cursor.fetchone() is not None
+    cursor.execute(SCHEMA)
+    for name, body in TRIGGERS.items():
+        sql = f"CREATE TRIGGER {name} {body}"
+        cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = ?", (name,))
+        row = cursor.fetchone()
+        if row is None or row[0] != sql:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+            cursor.execute(sql)
+            current = False
+    if not current:
+        rebuild(cursor)
+
+
+def rebuild(cursor: sqlite3.Cursor):
+    """Recompute the aggregates from the trades table"""
+    cursor.execute("DELETE FROM trade_stats_daily")
+    key = f"bot_id, {{day}}, {dry_run_sql()}, coalesce(market_regime, '')"
+    cursor.execute(f"""
+        INSERT INTO trade_stats_daily (bot_id, day, dry_run, regime, opened)
+        SELECT {key.format(day='date(open_time)')}, COUNT(*) FROM trades
+        GROUP BY 1, 2, 3, 4
+    """)
+    duration = _duration_sql('')
+    cursor.execute(f"""
+        INSERT INTO trade_stats_daily (bot_id, day, dry_run, regime, {', '.join(_CLOSED_COLUMNS)})
+        SELECT {key.format(day='date(coalesce(close_time, open_time))')},
+               COUNT(*), SUM(profit > 0), SUM(profit < 0), SUM(max(profit, 0)), SUM(min(profit, 0)),
+               SUM(coalesce({duration}, 0)), SUM({duration} IS NOT NULL)
+        FROM trades WHERE {closed_sql()}
+        GROUP BY 1, 2, 3, 4
+        {_upsert(_CLOSED_COLUMNS)}
+    """)
+
+
+def _filters(bot_id: str, dry_run: Optional[bool], since: Optional[date], regime: Optional[str],
+             dry_column: str, day_column: str, regime_column: str) -> Tuple[str, list]:
+    where, params = ["bot_id = ?"], [bot_id]
+    if dry_run is not None:
+        where.append(f"{dry_column} = ?")
+        params.append(1 if dry_run else 0)
+    if since is not None:
+        where.append(f"{day_column} >= ?")
+        params.append(since.isoformat())
+    if regime is not None:
+        where.append(f"{regime_column} = ?")
+        params.append(regime)
+    return ' AND '.join(where), params
+
+
+def query_stats(cursor: sqlite3.Cursor, bot_id: str, dry_run: Optional[bool] = None,
+                since: Optional[date] = None, regime: Optional[str] = None) -> TradeStats:
+    """All-time (or since a day) statistics of a bot from the aggregate table"""
+    where, params = _filters(bot_id, dry_run, since, regime, 'dry_run', 'day', 'regime')
+    columns = ('opened',) + _CLOSED_COLUMNS
+    row = cursor.execute(f"SELECT {', '.join(f'SUM({c})' for c in columns)} FROM trade_stats_daily "
+                         f"WHERE {where}", params).fetchone()
+    totals = [value or 0 for value in row]
+    stats = TradeStats(total_trades=int(totals[0]), closed_trades=int(totals[1]), wins=int(totals[2]),
+                       losses=int(totals[3]), gross_profit=totals[4], gross_loss=totals[5],
+                       duration_hours=totals[6], durations=int(totals[7]))
+    stats.max_drawdown = max_drawdown(cursor, bot_id, dry_run, since, regime)
+    return stats
+
+
+def _equity_sql(where: str) -> str:
+    # Running sum, then running peak over it; ROWS frames keep same-time closes in id order.
+    # Ordered by (bot_id, close_time) index, so no sort and a period filter is a range scan.
+    window = "OVER (ORDER BY close_time, id ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW)"
+    return f"""
+        SELECT close_time, equity, max(MAX(equity) {window}, 0) - equity AS drawdown FROM (
+            SELECT id, close_time, SUM(profit) {window} AS equity
+            FROM trades WHERE {where} AND {closed_sql()}
+        )
+    """
+
+
+def equity_curve(cursor: sqlite3.Cursor, bot_id: str, dry_run: Optional[bool] = None,
+                 since: Optional[date] = None, regime: Optional[str] = None) -> List[Tuple[datetime, float, float]]:
+    """(close time, cumulative profit, drawdown from the peak) for each closed trade"""
+    where, params = _filters(bot_id, dry_run, since, regime, dry_run_sql(),
+                             'close_time', "coalesce(market_regime, '')")
+    rows = cursor.execute(f"{_equity_sql(where)} ORDER BY close_time, id", params).fetchall()
+    return [(datetime.fromisoformat(row[0]) if isinstance(row[0], str) else row[0], row[1], row[2])
+            for row in rows]
+
+
+def max_drawdown(cursor: sqlite3.Cursor, bot_id: str, dry_run: Optional[bool] = None,
+                 since: Optional[date] = None, regime: Optional[str] = None) -> float:
+    """Largest drop of cumulative profit from its running peak"""
+    where, params = _filters(bot_id, dry_run, since, regime, dry_run_sql(),
+                             'close_time', "coalesce(market_regime, '')")
+    row = cursor.execute(f"SELECT MAX(drawdown) FROM ({_equity_sql(where)})", params).fetchone()
+    return row[0] or 0.0
@@ -0,0 +1,124 @@
+"""
+Lazy Table Model - table model that reads its rows from a source page by page
+"""
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PySide6.QtGui import QFont
+from utils.row_sources import PageCache
+
+
+@dataclass
+class Column:
+    """One table column: how to show a row object and which source key sorts it"""
+    title: str
+    text: Callable[[Any], str]
+    sort_key: Optional[str] = None
+    foreground: Optional[Callable[[Any], Any]] = None  # row -> QColor / Qt color or None
+    background: Optional[Callable[[Any], Any]] = None
+    bold: bool = False
+
+
+class LazyTableModel(QAbstractTableModel):
+    """
+    Model for a QTableView over an SqlRowSource / FrameRowSource
+
+    The view asks for more rows (canFetchMore/fetchMore) as it is scrolled;
+    cells are formatted only when painted and pages are kept in a bounded
+    cache, so a 100k-row history costs the same as a 100-row one. Sorting by
+    a header click is passed to the source (ORDER BY or pandas).
+    """
+
+    def __init__(self, source, columns: List[Column], page_size: int = 200, max_pages: int = 20, parent=None):
+        super().__init__(parent)
+        self.source = source
+        self.columns = columns
+        self.page_size = page_size
+        self.cache = PageCache(source, page_size, max_pages)
+        self._bold = QFont()
+        self._bold.setBold(True)
+        self._sort = None
+        self._total = source.count()
+        self._loaded = min(page_size, self._total)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._loaded
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal and section < len(self.columns):
+            return self.columns[section].title
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        column = self.columns[index.column()]
+        if role == Qt.DisplayRole:
+            row = self.cache.row(index.row())
+            return column.text(row) if row is not None else None
+        if role == Qt.ForegroundRole and column.foreground:
+            row = self.cache.row(index.row())
+            return column.foreground(row) if row is not None else None
+        if role == Qt.BackgroundRole and column.background:
+            row = self.cache.row(index.row())
+            return column.background(row) if row is not None else None
+        if role == Qt.FontRole and column.bold:
+            return self._bold
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._loaded < self._total
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        count = min(self.page_size, self._total - self._loaded)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + count - 1)
+        self._loaded += count
+        self.endInsertRows()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        key = self.columns[column].sort_key
+        if key is None:
+            return
+        try:
+            self.source.sort(key, order == Qt.DescendingOrder)
+        except ValueError:  # Column not in this data
+            return
+        self._sort = (key, order == Qt.DescendingOrder)
+        self.refresh()
+
+    def set_source(self, source, columns: Optional[List[Column]] = None):
+        """Show another source (e.g. a new filter), keeping the current sort order"""
+        if self._sort is not None:
+            try:
+                source.sort(*self._sort)
+            except ValueError:
+                self._sort = None
+        self.source = source
+        self.cache.source = source
+        self.refresh(columns)
+
+    def row_object(self, row: int):
+        """Source object shown in a row"""
+        return self.cache.row(row)
+
+    def refresh(self, columns: Optional[List[Column]] = None):
+        """Re-read after the source's data, filter or sort changed"""
+        self.beginResetModel()
+        if columns is not None:
+            self.columns = columns
+        self.cache.clear()
+        self._total = self.source.count()
+        self._loaded = min(self.page_size, self._total)
+        self.endResetModel()
+
+    @property
+    def total(self) -> int:
+        """Rows in the source (loaded or not)"""
+        return self._total
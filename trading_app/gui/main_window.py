@@ -1,12 +1,13 @@
 """
 Main Window - main GUI window for the trading app
 """
+import time
 from PySide6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QPushButton, QLabel, QPlainTextEdit, QListWidget, QListWidgetItem,
     QGroupBox, QMessageBox, QSplitter, QApplication, QFrame, QGridLayout
 )
-from PySide6.QtCore import Qt, QTimer, QThread, Signal
+from PySide6.QtCore import Qt, QTimer, QThread, QObject, Signal
 from PySide6.QtGui import QFont, QIcon, QColor
 from core import BotManager
 from database import DatabaseManager
@@ -15,6 +16,86 @@ from gui.settings_dialog import SettingsDialog
 from gui.positions_monitor import PositionsMonitor
 from gui.statistics_dialog import StatisticsDialog
 from gui.signal_analysis_dialog import SignalAnalysisDialog
+from shared.market_stream import shared_stream
+from shared.exchange_pool import exchange_client, mt5_terminal
+
+
+class PriceStreamBridge(QObject):
+    """Pushes WebSocket prices of Binance bots into the GUI thread (throttled)"""
+
+    price_updated = Signal(str, float)  # Signal(bot_id, price)
+
+    # Seconds between GUI updates per bot (the stream ticks many times per second)
+    MIN_INTERVAL = 1.0
+
+    def __init__(self):
+        super().__init__()
+        self.subscriptions = {}  # bot_id -> (stream, subscription)
+        self._last_emit = {}
+
+    def watch(self, bot_id, config) -> bool:
+        """Stream prices for a Binance bot; False if streaming is not available"""
+        if config.exchange != 'Binance':
+            self.unwatch(bot_id)
+            return False
+        if bot_id in self.subscriptions:
+            if self.subscriptions[bot_id][1].symbol == config.symbol:
+                return True
+            self.unwatch(bot_id)  # Symbol changed in the settings
+        # Public mainnet prices, as the REST ticker used before
+        stream = shared_stream()
+        if stream is None:
+            return False
+        subscription = stream.subscribe(config.symbol, on_tick=lambda tick: self._on_tick(bot_id, tick),
+                                        last_price=True)
+        self.subscriptions[bot_id] = (stream, subscription)
+        return True
+
+    def _on_tick(self, bot_id, tick):
+        """Called on the stream thread; the signal is queued to the GUI thread"""
+        if tick.last is None:  # No ticker update yet (about a second after subscribing)
+            return
+        now = time.monotonic()
+        if now - self._last_emit.get(bot_id, 0) >= self.MIN_INTERVAL:
+            self._last_emit[bot_id] = now
+            self.price_updated.emit(bot_id, tick.last)
+
+    def unwatch(self, bot_id):
+        """Stop streaming prices for a bot (no open positions, removed or changed)"""
+        entry = self.subscriptions.pop(bot_id, None)
+        self._last_emit.pop(bot_id, None)
+        if entry is not None:
+            stream, subscription = entry
+            stream.unsubscribe(subscription)
+
+    def retain(self, bot_ids):
+        """Drop the subscriptions of bots that no longer exist"""
+        for bot_id in [b for b in self.subscriptions if b not in bot_ids]:
+            self.unwatch(bot_id)
+
+    def stop(self):
+        """Remove all subscriptions"""
+        for stream, subscription in self.subscriptions.values():
+            stream.unsubscribe(subscription)
+        self.subscriptions.clear()
+
+
+class PositionEventBridge(QObject):
+    """Delivers position registry changes to the GUI thread"""
+
+    positions_changed = Signal(str)  # Signal(bot_id)
+
+    def __init__(self, registry):
+        super().__init__()
+        self.registry = registry
+        self._listener = registry.subscribe(self._on_event)
+
+    def _on_event(self, event):
+        """Called on the thread that changed the position; the signal is queued"""
+        self.positions_changed.emit(event.trade.bot_id)
+
+    def stop(self):
+        self.registry.unsubscribe(self._listener)
 
 
 class PriceFetcherWorker(QThread):
@@ -38,27 +119,20 @@ class PriceFetcherWorker(QThread):
             current_price = None
 
             if self.config.exchange == 'Binance':
-                import ccxt
                 # Use public data (no credentials needed for ticker)
-                exchange = ccxt.binance({
-                    'enableRateLimit': True,
-                    'options': {'defaultType': 'future'}
-                })
-                ticker = exchange.fetch_ticker(self.config.symbol)
+                with exchange_client('binance', 'future') as exchange:
+                    ticker = exchange.fetch_ticker(self.config.symbol)
                 current_price = ticker.get('last')
 
             elif self.config.exchange == 'MT5':
-                import MetaTrader5 as mt5
-                if mt5.initialize():
-                    try:
-                        tick = mt5.symbol_info_tick(self.config.symbol)
-                        if tick and tick.last > 0:
-                            current_price = tick.last
-                        elif tick:
-                            # Try bid/ask if last is not available
-                            current_price = (tick.bid + tick.ask) / 2 if tick.bid > 0 and tick.ask > 0 else None
-                    finally:
-                        mt5.shutdown()
+                # Shared terminal session, initialized once per process
+                with mt5_terminal() as mt5:
+                    tick = mt5.symbol_info_tick(self.config.symbol)
+                if tick and tick.last > 0:
+                    current_price = tick.last
+                elif tick:
+                    # Try bid/ask if last is not available
+                    current_price = (tick.bid + tick.ask) / 2 if tick.bid > 0 and tick.ask > 0 else None
 
             if current_price and self._is_running:
                 self.price_updated.emit(self.bot_id, current_price)
@@ -102,6 +176,14 @@ class MainWindow(QMainWindow):
         self.current_prices = {}  # {bot_id: price}
         self.price_fetcher = None
 
+        # Binance prices are pushed over WebSocket instead of polled
+        self.price_stream = PriceStreamBridge()
+        self.price_stream.price_updated.connect(self.on_price_updated)
+
+        # Open positions are pushed by the position registry instead of polled
+        self.position_events = PositionEventBridge(self.db.positions)
+        self.position_events.positions_changed.connect(self.on_positions_changed)
+
         # Initialize UI
         self.init_ui()
 
@@ -115,6 +197,11 @@ class MainWindow(QMainWindow):
         self.price_timer.timeout.connect(self.start_price_fetching)
         self.price_timer.start(10000)  # Fetch price every 10 seconds
 
+        # Positions opened/closed by standalone bot processes (in-process changes arrive as events)
+        self.positions_reload_timer = QTimer()
+        self.positions_reload_timer.timeout.connect(self.db.positions.reload)
+        self.positions_reload_timer.start(30000)
+
         # Select first bot
         if self.bot_manager.get_all_bot_ids():
             self.select_bot(self.bot_manager.get_all_bot_ids()[0])
@@ -684,6 +771,7 @@ class MainWindow(QMainWindow):
         try:
             open_trades = self.db.get_open_trades(self.current_bot_id)
             if not open_trades or len(open_trades) == 0:
+                self.price_stream.unwatch(self.current_bot_id)
                 return  # No positions, no need to fetch price
         except:
             return
@@ -691,6 +779,11 @@ class MainWindow(QMainWindow):
         # Get bot config
         config = self.db.load_config(self.current_bot_id)
         if not config:
+            self.price_stream.unwatch(self.current_bot_id)
+            return
+
+        # Streamed prices arrive on their own
+        if self.price_stream.watch(self.current_bot_id, config):
             return
 
         # Start background fetcher
@@ -708,6 +801,11 @@ class MainWindow(QMainWindow):
             if bot_id == self.current_bot_id:
                 self.update_live_positions_display()
 
+    def on_positions_changed(self, bot_id):
+        """Open positions of a bot changed"""
+        if not self.is_closing and bot_id == self.current_bot_id:
+            self.update_live_positions_display()
+
     def on_price_error(self, error):
         """Handle price fetch error"""
         # Silently fail - price will be fetched next time
@@ -1112,8 +1210,11 @@ class MainWindow(QMainWindow):
     def refresh_bot_list(self):
         """Refresh bot list"""
         self.bot_list.clear()
+        bot_ids = self.bot_manager.get_all_bot_ids()
+        if hasattr(self, 'price_stream'):
+            self.price_stream.retain(set(bot_ids))
 
-        for bot_id in self.bot_manager.get_all_bot_ids():
+        for bot_id in bot_ids:
             config = self.bot_manager.get_config(bot_id)
 
             # Check if bot is running
@@ -1231,6 +1332,12 @@ class MainWindow(QMainWindow):
             self.status_timer.stop()
         if hasattr(self, 'price_timer'):
             self.price_timer.stop()
+        if hasattr(self, 'positions_reload_timer'):
+            self.positions_reload_timer.stop()
+
+        # Stop streamed prices
+        if hasattr(self, 'price_stream'):
+            self.price_stream.stop()
 
         # Stop price fetcher thread if running
         if hasattr(self, 'price_fetcher') and self.price_fetcher:
@@ -1280,6 +1387,8 @@ class MainWindow(QMainWindow):
                     self.status_timer.start(5000)
                 if hasattr(self, 'price_timer'):
                     self.price_timer.start(10000)
+                if hasattr(self, 'positions_reload_timer'):
+                    self.positions_reload_timer.start(30000)
                 return
 
             # Stop all bots
@@ -1306,6 +1415,7 @@ class MainWindow(QMainWindow):
             self.bot_manager.bot_status_updated.disconnect()
         except:
             pass  # Ignore if already disconnected
+        self.position_events.stop()
 
         # Close database
         print("🗄️  Closing database...")
@@ -7,6 +7,26 @@ from PySide6.QtWidgets import (
 )
 from PySide6.QtCore import Qt, QTimer, QThread, Signal
 from models import BotConfig
+from shared.market_stream import shared_stream
+from shared.exchange_pool import exchange_client, mt5_terminal
+
+
+def binance_price(symbol: str):
+    """Last Binance futures trade price: WebSocket stream once it has one, REST ticker before"""
+    stream = shared_stream()
+    price = stream.price(symbol) if stream is not None else None
+    if price:
+        return price
+
+    # Use public data (no credentials needed for ticker)
+    with exchange_client('binance', 'future') as exchange:
+        return exchange.fetch_ticker(symbol).get('last')
+
+
+def account_client(config: BotConfig):
+    """Pooled Binance Futures client of the bot's account (testnet or mainnet)"""
+    return exchange_client('binance', 'future', testnet=config.testnet,
+                           api_key=config.api_key, api_secret=config.api_secret)
 
 
 class PositionFetcherThread(QThread):
@@ -50,39 +70,26 @@ class PositionFetcherThread(QThread):
                 current_price = None
                 try:
                     if self.config.exchange == 'Binance':
-                        import ccxt
-                        # Use public data (no credentials needed for ticker)
-                        exchange = ccxt.binance({
-                            'enableRateLimit': True,
-                            'options': {'defaultType': 'future'}
-                        })
-                        ticker = exchange.fetch_ticker(self.config.symbol)
-                        current_price = ticker.get('last')
+                        current_price = binance_price(self.config.symbol)
                         if current_price and current_price > 0:
                             print(f"💰 Current {self.config.symbol} price: ${current_price:.2f}")
                         else:
                             print(f"⚠️  Invalid price received: {current_price}")
                     elif self.config.exchange == 'MT5':
-                        import MetaTrader5 as mt5
-                        if mt5.initialize():
-                            try:
-                                tick = mt5.symbol_info_tick(self.config.symbol)
-                                if tick and tick.last > 0:
-                                    current_price = tick.last
-                                    print(f"💰 Current {self.config.symbol} price: ${current_price:.2f}")
-                                elif tick:
-                                    # Try bid/ask if last is not available
-                                    current_price = (tick.bid + tick.ask) / 2 if tick.bid > 0 and tick.ask > 0 else None
-                                    if current_price:
-                                        print(f"💰 Current {self.config.symbol} price: ${current_price:.2f} (from bid/ask)")
-                                    else:
-                                        print(f"⚠️  MT5 tick data invalid: last={tick.last}, bid={tick.bid}, ask={tick.ask}")
-                                else:
-                                    print(f"⚠️  MT5 symbol_info_tick returned None for {self.config.symbol}")
-                            finally:
-                                mt5.shutdown()
+                        with mt5_terminal() as mt5:
+                            tick = mt5.symbol_info_tick(self.config.symbol)
+                        if tick and tick.last > 0:
+                            current_price = tick.last
+                            print(f"💰 Current {self.config.symbol} price: ${current_price:.2f}")
+                        elif tick:
+                            # Try bid/ask if last is not available
+                            current_price = (tick.bid + tick.ask) / 2 if tick.bid > 0 and tick.ask > 0 else None
+                            if current_price:
+                                print(f"💰 Current {self.config.symbol} price: ${current_price:.2f} (from bid/ask)")
+                            else:
+                                print(f"⚠️  MT5 tick data invalid: last={tick.last}, bid={tick.bid}, ask={tick.ask}")
                         else:
-                            print(f"⚠️  MT5 initialization failed: {mt5.last_error()}")
+                            print(f"⚠️  MT5 symbol_info_tick returned None for {self.config.symbol}")
                 except Exception as e:
                     print(f"⚠️  Could not fetch current price for P&L: {e}")
                     import traceback
@@ -119,68 +126,33 @@ class PositionFetcherThread(QThread):
             
             # Not dry_run - fetch from exchange
             if self.config.exchange == 'MT5':
-                import MetaTrader5 as mt5
-
-                # Initialize MT5
-                if not mt5.initialize():
-                    print(f"⚠️  MT5 initialization failed: {mt5.last_error()}")
+                # Shared terminal session (kept open, also used by the bots)
+                terminal = mt5_terminal()
+                if not terminal.connect():
+                    print(f"⚠️  MT5 initialization failed: {terminal.last_error()}")
                     return positions
 
-                try:
+                with terminal as mt5:
                     mt5_positions = mt5.positions_get(symbol=self.config.symbol)
 
-                    if mt5_positions:
-                        for pos in mt5_positions:
-                            positions.append({
-                                'id': pos.ticket,
-                                'side': 'buy' if pos.type == 0 else 'sell',
-                                'contracts': pos.volume,
-                                'entryPrice': pos.price_open,
-                                'markPrice': pos.price_current,
-                                'stopLoss': pos.sl,
-                                'takeProfit': pos.tp,
-                                'unrealizedPnl': pos.profit
-                            })
-                finally:
-                    # Always shutdown MT5 to avoid resource leaks
-                    mt5.shutdown()
+                if mt5_positions:
+                    for pos in mt5_positions:
+                        positions.append({
+                            'id': pos.ticket,
+                            'side': 'buy' if pos.type == 0 else 'sell',
+                            'contracts': pos.volume,
+                            'entryPrice': pos.price_open,
+                            'markPrice': pos.price_current,
+                            'stopLoss': pos.sl,
+                            'takeProfit': pos.tp,
+                            'unrealizedPnl': pos.profit
+                        })
 
             elif self.config.exchange == 'Binance':
-                import ccxt
-
-                # Create exchange instance with proper testnet/mainnet configuration
-                if self.config.testnet:
-                    # Testnet configuration
-                    exchange = ccxt.binance({
-                        'apiKey': self.config.api_key,
-                        'secret': self.config.api_secret,
-                        'enableRateLimit': True,
-                        'options': {
-                            'defaultType': 'future',
-                            'adjustForTimeDifference': True,
-                        },
-                        'urls': {
-                            'api': {
-                                'public': 'https://testnet.binancefuture.com/fapi/v1',
-                                'private': 'https://testnet.binancefuture.com/fapi/v1',
-                            }
-                        }
-                    })
-                else:
-                    # Mainnet configuration
-                    exchange = ccxt.binance({
-                        'apiKey': self.config.api_key,
-                        'secret': self.config.api_secret,
-                        'enableRateLimit': True,
-                        'options': {
-                            'defaultType': 'future',
-                            'adjustForTimeDifference': True,
-                        }
-                    })
-
-                # Fetch positions
+                # Pooled client of this account: markets and connection are reused between refreshes
                 print(f"🔍 Fetching positions for {self.config.symbol}...")
-                binance_positions = exchange.fetch_positions([self.config.symbol])
+                with account_client(self.config) as exchange:
+                    binance_positions = exchange.fetch_positions([self.config.symbol])
 
                 print(f"📊 Raw positions data: {len(binance_positions)} positions returned")
 
@@ -470,22 +442,12 @@ class PositionsMonitor(QDialog):
                         current_price = None
                         try:
                             if self.config.exchange == 'Binance':
-                                import ccxt
-                                exchange = ccxt.binance({
-                                    'enableRateLimit': True,
-                                    'options': {'defaultType': 'future'}
-                                })
-                                ticker = exchange.fetch_ticker(self.config.symbol)
-                                current_price = ticker.get('last')
+                                current_price = binance_price(self.config.symbol)
                             elif self.config.exchange == 'MT5':
-                                import MetaTrader5 as mt5
-                                if mt5.initialize():
-                                    try:
-                                        tick = mt5.symbol_info_tick(self.config.symbol)
-                                        if tick:
-                                            current_price = tick.last if tick.last > 0 else (tick.bid + tick.ask) / 2
-                                    finally:
-                                        mt5.shutdown()
+                                with mt5_terminal() as mt5:
+                                    tick = mt5.symbol_info_tick(self.config.symbol)
+                                if tick:
+                                    current_price = tick.last if tick.last > 0 else (tick.bid + tick.ask) / 2
                         except:
                             current_price = matching_trade.entry_price  # Fallback to entry price
                         
@@ -531,13 +493,13 @@ class PositionsMonitor(QDialog):
                 # No exchange positions to close
                 pass
             elif self.config.exchange == 'MT5':
-                import MetaTrader5 as mt5
+                terminal = mt5_terminal()
                 
-                if not mt5.initialize():
+                if not terminal.connect():
                     msg = QMessageBox(self)
                     msg.setIcon(QMessageBox.Critical)
                     msg.setWindowTitle("Error")
-                    msg.setText(f"MT5 initialization failed: {mt5.last_error()}")
+                    msg.setText(f"MT5 initialization failed: {terminal.last_error()}")
                     msg.setStyleSheet("""
                         QMessageBox {
                             background-color: white;
@@ -562,7 +524,7 @@ class PositionsMonitor(QDialog):
                     msg.exec()
                     return
                 
-                try:
+                with terminal as mt5:
                     for pos in exchange_positions:
                         try:
                             ticket = int(pos['order_id'])
@@ -616,84 +578,53 @@ class PositionsMonitor(QDialog):
                         except Exception as e:
                             errors.append(f"Position {pos['order_id']}: {str(e)}")
                             error_count += 1
-                
-                finally:
-                    mt5.shutdown()
             
             elif self.config.exchange == 'Binance' and exchange_positions:
-                import ccxt
-                
-                # Create exchange instance
-                if self.config.testnet:
-                    exchange = ccxt.binance({
-                        'apiKey': self.config.api_key,
-                        'secret': self.config.api_secret,
-                        'enableRateLimit': True,
-                        'options': {
-                            'defaultType': 'future',
-                            'adjustForTimeDifference': True,
-                        },
-                        'urls': {
-                            'api': {
-                                'public': 'https://testnet.binancefuture.com/fapi/v1',
-                                'private': 'https://testnet.binancefuture.com/fapi/v1',
-                            }
-                        }
-                    })
-                else:
-                    exchange = ccxt.binance({
-                        'apiKey': self.config.api_key,
-                        'secret': self.config.api_secret,
-                        'enableRateLimit': True,
-                        'options': {
-                            'defaultType': 'future',
-                            'adjustForTimeDifference': True,
-                        }
-                    })
-                
-                for pos in exchange_positions:
-                    try:
-                        # Close position by placing opposite order
-                        # Binance requires us to fetch current position and close with market order
-                        positions = exchange.fetch_positions([self.config.symbol])
+                # Pooled client of this account (same one the positions refresh uses)
+                with account_client(self.config) as exchange:
+                    for pos in exchange_positions:
+                        try:
+                            # Close position by placing opposite order
+                            # Binance requires us to fetch current position and close with market order
+                            positions = exchange.fetch_positions([self.config.symbol])
                         
-                        # Find matching position
-                        matching_pos = None
-                        for p in positions:
-                            if str(p.get('id')) == pos['order_id']:
-                                matching_pos = p
-                                break
+                            # Find matching position
+                            matching_pos = None
+                            for p in positions:
+                                if str(p.get('id')) == pos['order_id']:
+                                    matching_pos = p
+                                    break
                         
-                        if not matching_pos:
-                            errors.append(f"Position {pos['order_id']} not found")
-                            error_count += 1
-                            continue
+                            if not matching_pos:
+                                errors.append(f"Position {pos['order_id']} not found")
+                                error_count += 1
+                                continue
                         
-                        contracts = float(matching_pos.get('contracts', 0))
-                        if contracts <= 0:
-                            errors.append(f"Position {pos['order_id']} has no contracts")
-                            error_count += 1
-                            continue
+                            contracts = float(matching_pos.get('contracts', 0))
+                            if contracts <= 0:
+                                errors.append(f"Position {pos['order_id']} has no contracts")
+                                error_count += 1
+                                continue
                         
-                        # Determine side for closing
-                        pos_side = matching_pos.get('side', '').lower()
-                        close_side = 'sell' if pos_side == 'long' else 'buy'
+                            # Determine side for closing
+                            pos_side = matching_pos.get('side', '').lower()
+                            close_side = 'sell' if pos_side == 'long' else 'buy'
                         
-                        # Place market order to close
-                        order = exchange.create_order(
-                            symbol=self.config.symbol,
-                            type='market',
-                            side=close_side,
-                            amount=contracts,
-                            params={'reduceOnly': True}
-                        )
+                            # Place market order to close
+                            order = exchange.create_order(
+                                symbol=self.config.symbol,
+                                type='market',
+                                side=close_side,
+                                amount=contracts,
+                                params={'reduceOnly': True}
+                            )
                         
-                        print(f"✅ Closed Binance position {pos['order_id']}")
-                        success_count += 1
+                            print(f"✅ Closed Binance position {pos['order_id']}")
+                            success_count += 1
                     
-                    except Exception as e:
-                        errors.append(f"Position {pos['order_id']}: {str(e)}")
-                        error_count += 1
+                        except Exception as e:
+                            errors.append(f"Position {pos['order_id']}: {str(e)}")
+                            error_count += 1
             
             elif exchange_positions:
                 msg = QMessageBox(self)
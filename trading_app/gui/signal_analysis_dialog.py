@@ -7,12 +7,14 @@ import uuid
 from pathlib import Path
 from datetime import datetime, timedelta
 from PySide6.QtWidgets import (
-    QDialog, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem,
+    QDialog, QVBoxLayout, QHBoxLayout, QTableView,
     QPushButton, QLabel, QGroupBox, QHeaderView, QDateEdit, QComboBox,
     QSpinBox, QProgressBar, QTextEdit, QMessageBox, QCheckBox
 )
 from PySide6.QtCore import Qt, QThread, Signal, QDate
 from models import BotConfig
+from gui.lazy_table_model import Column, LazyTableModel
+from utils.row_sources import FrameRowSource
 
 # Add trading_bots to path to access strategy
 sys.path.insert(0, str(Path(__file__).parent.parent.parent / 'trading_bots'))
@@ -22,6 +24,9 @@ try:
     import numpy as np
     import ccxt
     from shared.pattern_recognition_strategy import PatternRecognitionStrategy
+    from utils.signal_outcomes import calculate_single_tp_outcomes, calculate_3_position_outcomes
+    from shared.candle_repository import CandleRepository, MT5CandleSource, exchange_repository
+    from shared.exchange_pool import mt5_terminal
     DEPENDENCIES_AVAILABLE = True
 except ImportError as e:
     DEPENDENCIES_AVAILABLE = False
@@ -79,13 +84,7 @@ class SignalAnalysisWorker(QThread):
     def run(self):
         """Run signal analysis in background"""
         try:
-            self.progress.emit(f"📊 Downloading {self.symbol} data...")
-            
-            # Initialize Binance
-            exchange = ccxt.binance({
-                'enableRateLimit': True,
-                'options': {'defaultType': 'future'}
-            })
+            self.progress.emit(f"📊 Loading {self.symbol} data...")
             
             # Calculate time range
             if self.start_date and self.end_date:
@@ -97,34 +96,16 @@ class SignalAnalysisWorker(QThread):
             
             self.progress.emit(f"   Period: {start_time.strftime('%Y-%m-%d')} to {end_time.strftime('%Y-%m-%d')}")
             
-            # Download data
-            since = int(start_time.timestamp() * 1000)
-            all_candles = []
+            # Cached history (Binance Futures, same as live bot): only missing candles are downloaded
+            # (the range is local time; naive times would be read as UTC)
+            df = exchange_repository('binance', 'future').get(self.symbol, self.timeframe,
+                                                              start_time.astimezone(), end_time.astimezone())
             
-            while True:
-                candles = exchange.fetch_ohlcv(self.symbol, self.timeframe, since=since, limit=1000)
-                if not candles:
-                    break
-                
-                all_candles.extend(candles)
-                since = candles[-1][0] + 1
-                
-                if candles[-1][0] >= int(end_time.timestamp() * 1000):
-                    break
-            
-            if not all_candles:
+            if df.empty:
                 self.error.emit("No data downloaded")
                 return
             
-            self.progress.emit(f"✅ Downloaded {len(all_candles)} candles")
-            
-            # Convert to DataFrame
-            df = pd.DataFrame(all_candles, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-            df.set_index('timestamp', inplace=True)
-            
-            # Filter to exact date range
-            df = df[(df.index >= start_time) & (df.index <= end_time)]
+            self.progress.emit(f"✅ Loaded {len(df)} candles ({df.attrs['fetched']} downloaded)")
             
             self.progress.emit(f"🔍 Analyzing signals using PatternRecognitionStrategy...")
             
@@ -242,6 +223,9 @@ class SignalAnalysisWorker(QThread):
         # List to collect new position rows
         new_rows = []
         
+        # Signals waiting for outcome simulation
+        pending = []
+        
         for idx, signal_row in signals_df.iterrows():
             signal_type = signal_row['signal']
             entry_price = signal_row['close']
@@ -344,14 +328,14 @@ class SignalAnalysisWorker(QThread):
                     stop_loss = entry_price + (risk * self.sl_multiplier)
                     take_profit = entry_price - (risk * self.tp_multiplier)
             
-            # Get future candles after this signal
-            future_candles = full_df[full_df.index > idx]
+            # Signal candle position in full_df, outcomes are checked from the next candle
+            entry_pos = full_df.index.searchsorted(idx, side='right') - 1
             
-            if len(future_candles) == 0:
+            if entry_pos + 1 >= len(full_df):
                 signals_df.loc[idx, 'outcome'] = 'No Data'
                 continue
             
-            # Route to appropriate calculation method
+            # Route to appropriate calculation method (all signals are simulated at once below)
             if self.use_multi_tp:
                 # Store the calculated TP and SL levels for display/export
                 signals_df.loc[idx, 'tp1_used'] = tp1
@@ -359,10 +343,21 @@ class SignalAnalysisWorker(QThread):
                 signals_df.loc[idx, 'tp3_used'] = tp3
                 signals_df.loc[idx, 'sl_used'] = stop_loss
                 
-                # Calculate 3-position outcomes
-                position_results = self._calculate_3_position_outcome(
-                    signal_type, entry_price, stop_loss, tp1, tp2, tp3, future_candles, self.trailing_pct
-                )
+                pending.append((idx, signal_row, regime, (entry_pos, signal_type, entry_price, stop_loss, tp1, tp2, tp3)))
+                
+                # Mark original row for deletion (we'll replace with 3 position rows)
+                signals_df.loc[idx, 'outcome'] = '_DELETE_'
+            else:
+                pending.append((idx, (entry_pos, signal_type, entry_price, stop_loss, take_profit)))
+        
+        if self.use_multi_tp:
+            # Calculate 3-position outcomes
+            all_position_results = calculate_3_position_outcomes(
+                full_df, [entry for *_, entry in pending], self.trailing_pct
+            )
+            
+            for (idx, signal_row, regime, entry), position_results in zip(pending, all_position_results):
+                _, _, _, stop_loss, tp1, tp2, tp3 = entry
                 
                 # Generate unique group ID for these 3 positions
                 group_id = str(uuid.uuid4())
@@ -387,13 +382,12 @@ class SignalAnalysisWorker(QThread):
                     
                     # Add to new rows list
                     new_rows.append((idx, new_row))
-                
-                # Mark original row for deletion (we'll replace with 3 position rows)
-                signals_df.loc[idx, 'outcome'] = '_DELETE_'
-            else:
-                result = self._calculate_single_tp_outcome(
-                    signal_type, entry_price, stop_loss, take_profit, future_candles
-                )
+        else:
+            results = calculate_single_tp_outcomes(
+                full_df, [entry for _, entry in pending], self.use_trailing, self.trailing_pct
+            )
+            
+            for (idx, _), result in zip(pending, results):
                 signals_df.loc[idx, 'outcome'] = result['outcome']
                 signals_df.loc[idx, 'profit_pct'] = result['profit_pct']
                 signals_df.loc[idx, 'bars_held'] = result['bars']
@@ -420,181 +414,6 @@ class SignalAnalysisWorker(QThread):
         
         return signals_df
     
-    def _calculate_3_position_outcome(self, signal_type, entry_price, stop_loss, tp1, tp2, tp3, future_candles, trailing_pct):
-        """
-        Calculate outcomes for 3 separate positions with different TP targets and trailing stops.
-        
-        Position 1: Targets TP1 only, no trailing
-        Position 2: Targets TP2, trailing activates after TP1 hits
-        Position 3: Targets TP3, trailing activates after TP1 hits
-        
-        Returns list of 3 position dictionaries with outcomes
-        """
-        # Track TP1 hit for trailing activation
-        tp1_hit = False
-        
-        # Initialize positions
-        positions = [
-            {'position_num': 1, 'target_tp': tp1, 'use_trailing': False, 'active': True, 'outcome': 'Timeout', 'profit_pct': 0.0, 'bars': 0, 'tp_level_hit': 'None', 'close_reason': 'Timeout'},
-            {'position_num': 2, 'target_tp': tp2, 'use_trailing': True, 'active': True, 'outcome': 'Timeout', 'profit_pct': 0.0, 'bars': 0, 'tp_level_hit': 'None', 'close_reason': 'Timeout'},
-            {'position_num': 3, 'target_tp': tp3, 'use_trailing': True, 'active': True, 'outcome': 'Timeout', 'profit_pct': 0.0, 'bars': 0, 'tp_level_hit': 'None', 'close_reason': 'Timeout'}
-        ]
-        
-        # Tracking for trailing stops (positions 2 and 3)
-        max_price_since_tp1 = entry_price  # For BUY
-        min_price_since_tp1 = entry_price  # For SELL
-        
-        bars = 0
-        for future_idx, future_candle in future_candles.iterrows():
-            bars += 1
-            
-            # Check if any positions still active
-            if not any(p['active'] for p in positions):
-                break
-            
-            if signal_type == 1:  # BUY signal
-                # Check if TP1 hit (for trailing activation)
-                if not tp1_hit and future_candle['high'] >= tp1:
-                    tp1_hit = True
-                    max_price_since_tp1 = future_candle['high']
-                
-                # Update max price since TP1 for trailing calculation
-                if tp1_hit:
-                    max_price_since_tp1 = max(max_price_since_tp1, future_candle['high'])
-                
-                # Calculate trailing stop for positions 2 and 3 (after TP1 hit)
-                if tp1_hit:
-                    trailing_stop = max_price_since_tp1 - (max_price_since_tp1 - entry_price) * trailing_pct
-                else:
-                    trailing_stop = stop_loss
-                
-                # Check each position
-                for pos in positions:
-                    if not pos['active']:
-                        continue
-                    
-                    # Determine active stop for this position
-                    if pos['use_trailing'] and tp1_hit:
-                        active_stop = trailing_stop
-                    else:
-                        active_stop = stop_loss
-                    
-                    # Check SL/Trailing Stop hit
-                    if future_candle['low'] <= active_stop:
-                        pnl = ((active_stop - entry_price) / entry_price) * 100
-                        pos['profit_pct'] = pnl
-                        pos['bars'] = bars
-                        pos['active'] = False
-                        if pnl < 0:
-                            pos['outcome'] = 'Loss ❌'
-                            pos['tp_level_hit'] = 'SL'
-                            pos['close_reason'] = 'SL'
-                        else:
-                            pos['outcome'] = 'Win ✅'
-                            pos['tp_level_hit'] = 'Trailing'
-                            pos['close_reason'] = 'Trailing Stop'
-                        continue
-                    
-                    # Check TP hit
-                    if future_candle['high'] >= pos['target_tp']:
-                        pnl = ((pos['target_tp'] - entry_price) / entry_price) * 100
-                        pos['profit_pct'] = pnl
-                        pos['bars'] = bars
-                        pos['active'] = False
-                        pos['outcome'] = 'Win ✅'
-                        # Determine which TP level
-                        if pos['position_num'] == 1:
-                            pos['tp_level_hit'] = 'TP1'
-                            pos['close_reason'] = 'TP1'
-                        elif pos['position_num'] == 2:
-                            pos['tp_level_hit'] = 'TP2'
-                            pos['close_reason'] = 'TP2'
-                        else:
-                            pos['tp_level_hit'] = 'TP3'
-                            pos['close_reason'] = 'TP3'
-                        continue
-            
-            else:  # SELL signal
-                # Check if TP1 hit (for trailing activation)
-                if not tp1_hit and future_candle['low'] <= tp1:
-                    tp1_hit = True
-                    min_price_since_tp1 = future_candle['low']
-                
-                # Update min price since TP1 for trailing calculation
-                if tp1_hit:
-                    min_price_since_tp1 = min(min_price_since_tp1, future_candle['low'])
-                
-                # Calculate trailing stop for positions 2 and 3 (after TP1 hit)
-                if tp1_hit:
-                    trailing_stop = min_price_since_tp1 + (entry_price - min_price_since_tp1) * trailing_pct
-                else:
-                    trailing_stop = stop_loss
-                
-                # Check each position
-                for pos in positions:
-                    if not pos['active']:
-                        continue
-                    
-                    # Determine active stop for this position
-                    if pos['use_trailing'] and tp1_hit:
-                        active_stop = trailing_stop
-                    else:
-                        active_stop = stop_loss
-                    
-                    # Check SL/Trailing Stop hit
-                    if future_candle['high'] >= active_stop:
-                        pnl = ((entry_price - active_stop) / entry_price) * 100
-                        pos['profit_pct'] = pnl
-                        pos['bars'] = bars
-                        pos['active'] = False
-                        if pnl < 0:
-                            pos['outcome'] = 'Loss ❌'
-                            pos['tp_level_hit'] = 'SL'
-                            pos['close_reason'] = 'SL'
-                        else:
-                            pos['outcome'] = 'Win ✅'
-                            pos['tp_level_hit'] = 'Trailing'
-                            pos['close_reason'] = 'Trailing Stop'
-                        continue
-                    
-                    # Check TP hit
-                    if future_candle['low'] <= pos['target_tp']:
-                        pnl = ((entry_price - pos['target_tp']) / entry_price) * 100
-                        pos['profit_pct'] = pnl
-                        pos['bars'] = bars
-                        pos['active'] = False
-                        pos['outcome'] = 'Win ✅'
-                        # Determine which TP level
-                        if pos['position_num'] == 1:
-                            pos['tp_level_hit'] = 'TP1'
-                            pos['close_reason'] = 'TP1'
-                        elif pos['position_num'] == 2:
-                            pos['tp_level_hit'] = 'TP2'
-                            pos['close_reason'] = 'TP2'
-                        else:
-                            pos['tp_level_hit'] = 'TP3'
-                            pos['close_reason'] = 'TP3'
-                        continue
-            
-            # Limit check to 100 bars
-            if bars >= 100:
-                for pos in positions:
-                    if pos['active']:
-                        pos['bars'] = bars
-                        pos['active'] = False
-                        # Calculate P&L at timeout
-                        current_price = future_candle['close']
-                        if signal_type == 1:
-                            pnl = ((current_price - entry_price) / entry_price) * 100
-                        else:
-                            pnl = ((entry_price - current_price) / entry_price) * 100
-                        pos['profit_pct'] = pnl
-                        pos['outcome'] = 'Timeout'
-                        pos['close_reason'] = 'Timeout'
-                break
-        
-        return positions
-    
     def _calculate_multi_tp_outcome_live_style(self, signal_type, entry_price, stop_loss, tp1, tp2, tp3, future_candles):
         """
         Calculate outcome with multiple TP levels using live bot's specific TP prices
@@ -841,100 +660,6 @@ class SignalAnalysisWorker(QThread):
         }
     
     
-    def _calculate_single_tp_outcome(self, signal_type, entry_price, stop_loss, take_profit, future_candles):
-        """
-        Calculate outcome with single TP level (original behavior)
-        """
-        # Check each candle to see if TP or SL was hit
-        outcome = 'Open'
-        profit_pct = 0.0
-        bars = 0
-        trailing_active = False
-        trailing_stop = stop_loss
-        max_profit_price = entry_price
-        
-        for future_idx, future_candle in future_candles.iterrows():
-            bars += 1
-            
-            if signal_type == 1:  # BUY signal
-                # Update trailing stop if enabled and in profit
-                if self.use_trailing and future_candle['high'] >= take_profit:
-                    trailing_active = True
-                    # Track highest price
-                    if future_candle['high'] > max_profit_price:
-                        max_profit_price = future_candle['high']
-                        # Trail at configured % of profit
-                        profit_distance = max_profit_price - entry_price
-                        trailing_stop = entry_price + (profit_distance * self.trailing_pct)
-                
-                # Check if hit SL or trailing stop
-                active_stop = trailing_stop if trailing_active else stop_loss
-                if future_candle['low'] <= active_stop:
-                    outcome = 'Loss ❌' if not trailing_active else 'Trailing Win ✅'
-                    profit_pct = ((active_stop - entry_price) / entry_price) * 100
-                    break
-                # Check if hit TP (only if trailing not active)
-                elif not trailing_active and future_candle['high'] >= take_profit:
-                    if self.use_trailing:
-                        # TP hit, activate trailing
-                        trailing_active = True
-                        max_profit_price = future_candle['high']
-                        profit_distance = max_profit_price - entry_price
-                        trailing_stop = entry_price + (profit_distance * self.trailing_pct)
-                    else:
-                        # No trailing, close at TP
-                        outcome = 'Win ✅'
-                        profit_pct = ((take_profit - entry_price) / entry_price) * 100
-                        break
-                    
-            elif signal_type == -1:  # SELL signal
-                # Update trailing stop if enabled and in profit
-                if self.use_trailing and future_candle['low'] <= take_profit:
-                    trailing_active = True
-                    # Track lowest price
-                    if future_candle['low'] < max_profit_price or max_profit_price == entry_price:
-                        max_profit_price = future_candle['low']
-                        # Trail at configured % of profit
-                        profit_distance = entry_price - max_profit_price
-                        trailing_stop = entry_price - (profit_distance * self.trailing_pct)
-                
-                # Check if hit SL or trailing stop
-                active_stop = trailing_stop if trailing_active else stop_loss
-                if future_candle['high'] >= active_stop:
-                    outcome = 'Loss ❌' if not trailing_active else 'Trailing Win ✅'
-                    profit_pct = ((entry_price - active_stop) / entry_price) * 100
-                    break
-                # Check if hit TP (only if trailing not active)
-                elif not trailing_active and future_candle['low'] <= take_profit:
-                    if self.use_trailing:
-                        # TP hit, activate trailing
-                        trailing_active = True
-                        max_profit_price = future_candle['low']
-                        profit_distance = entry_price - max_profit_price
-                        trailing_stop = entry_price - (profit_distance * self.trailing_pct)
-                    else:
-                        # No trailing, close at TP
-                        outcome = 'Win ✅'
-                        profit_pct = ((entry_price - take_profit) / entry_price) * 100
-                        break
-            
-            # Limit check to 100 bars
-            if bars >= 100:
-                outcome = 'Timeout'
-                # Calculate current P&L at timeout
-                current_price = future_candle['close']
-                if signal_type == 1:
-                    profit_pct = ((current_price - entry_price) / entry_price) * 100
-                else:
-                    profit_pct = ((entry_price - current_price) / entry_price) * 100
-                break
-        
-        return {
-            'outcome': outcome,
-            'profit_pct': profit_pct,
-            'bars': bars
-        }
-
 
 
 class SignalAnalysisWorkerMT5(QThread):
@@ -977,8 +702,9 @@ class SignalAnalysisWorkerMT5(QThread):
             
             self.progress.emit(f"📊 Connecting to MetaTrader5 for {self.symbol}...")
             
-            # Initialize MT5
-            if not mt5.initialize():
+            # Shared terminal session (initialized once, kept for the bots and price polls)
+            terminal = mt5_terminal()
+            if not terminal.connect():
                 self.error.emit(
                     "Failed to initialize MetaTrader5.\n\n"
                     "Please ensure:\n"
@@ -988,86 +714,68 @@ class SignalAnalysisWorkerMT5(QThread):
                 )
                 return
             
-            try:
-                # Calculate time range
-                if self.start_date and self.end_date:
-                    start_time = datetime.combine(self.start_date, datetime.min.time())
-                    end_time = datetime.combine(self.end_date, datetime.max.time())
-                else:
-                    end_time = datetime.now()
-                    start_time = end_time - timedelta(days=self.days)
-                
-                self.progress.emit(f"   Period: {start_time.strftime('%Y-%m-%d')} to {end_time.strftime('%Y-%m-%d')}")
-                
-                # Convert timeframe to MT5 format
-                timeframe_map = {
-                    '1m': mt5.TIMEFRAME_M1,
-                    '5m': mt5.TIMEFRAME_M5,
-                    '15m': mt5.TIMEFRAME_M15,
-                    '30m': mt5.TIMEFRAME_M30,
-                    '1h': mt5.TIMEFRAME_H1,
-                    '4h': mt5.TIMEFRAME_H4,
-                    '1d': mt5.TIMEFRAME_D1,
-                    '1w': mt5.TIMEFRAME_W1,
-                }
-                mt5_timeframe = timeframe_map.get(self.timeframe, mt5.TIMEFRAME_H1)
-                
-                # Download data from MT5
-                rates = mt5.copy_rates_range(self.symbol, mt5_timeframe, start_time, end_time)
-                
-                if rates is None or len(rates) == 0:
-                    self.error.emit(
-                        f"No data received from MT5 for {self.symbol}.\n\n"
-                        f"Please ensure:\n"
-                        f"  • {self.symbol} is available in Market Watch\n"
-                        f"  • You have historical data for this period\n"
-                        f"  • The symbol name is correct"
-                    )
-                    return
-                
-                self.progress.emit(f"✅ Downloaded {len(rates)} candles from MT5")
-                
-                # Convert to DataFrame
-                df = pd.DataFrame(rates)
-                df['timestamp'] = pd.to_datetime(df['time'], unit='s')
-                df.set_index('timestamp', inplace=True)
-                
-                # Rename columns to match expected format
-                df.rename(columns={
-                    'open': 'open',
-                    'high': 'high',
-                    'low': 'low',
-                    'close': 'close',
-                    'tick_volume': 'volume'
-                }, inplace=True)
-                
-                # Select only needed columns
-                df = df[['open', 'high', 'low', 'close', 'volume']]
-                
-                self.progress.emit(f"🔍 Analyzing signals using PatternRecognitionStrategy...")
-                
-                # Initialize strategy (same as live bot)
-                strategy = PatternRecognitionStrategy(fib_mode='standard')
-                
-                # Run strategy
-                df_signals = strategy.run_strategy(df)
-                
-                # Find signals
-                signals_df = df_signals[df_signals['signal'] != 0].copy()
-                
-                self.progress.emit(f"📊 Calculating trade outcomes for {len(signals_df)} signals...")
-                
-                # Calculate outcomes for each signal (reuse the same logic)
-                signals_df = self._calculate_signal_outcomes(signals_df, df_signals)
-                
-                self.progress.emit(f"✅ Analysis complete! Found {len(signals_df)} {'positions' if self.use_multi_tp else 'signals'}")
-                
-                # Return results
-                self.finished.emit(signals_df)
-                
-            finally:
-                # Always shutdown MT5
-                mt5.shutdown()
+            # Calculate time range
+            if self.start_date and self.end_date:
+                start_time = datetime.combine(self.start_date, datetime.min.time())
+                end_time = datetime.combine(self.end_date, datetime.max.time())
+            else:
+                end_time = datetime.now()
+                start_time = end_time - timedelta(days=self.days)
+            
+            self.progress.emit(f"   Period: {start_time.strftime('%Y-%m-%d')} to {end_time.strftime('%Y-%m-%d')}")
+            
+            # Convert timeframe to MT5 format
+            timeframe_map = {
+                '1m': mt5.TIMEFRAME_M1,
+                '5m': mt5.TIMEFRAME_M5,
+                '15m': mt5.TIMEFRAME_M15,
+                '30m': mt5.TIMEFRAME_M30,
+                '1h': mt5.TIMEFRAME_H1,
+                '4h': mt5.TIMEFRAME_H4,
+                '1d': mt5.TIMEFRAME_D1,
+                '1w': mt5.TIMEFRAME_W1,
+            }
+            mt5_timeframe = timeframe_map.get(self.timeframe, mt5.TIMEFRAME_H1)
+            
+            # Cached history: only missing candles are requested from MT5
+            # (local range -> broker server time, in which MT5 bars are indexed)
+            repository = CandleRepository(MT5CandleSource(mt5))
+            with terminal:
+                df = repository.get(self.symbol, repository.source.timeframe_name(mt5_timeframe),
+                                    start_time.astimezone(), end_time.astimezone())
+            
+            if df.empty:
+                self.error.emit(
+                    f"No data received from MT5 for {self.symbol}.\n\n"
+                    f"Please ensure:\n"
+                    f"  • {self.symbol} is available in Market Watch\n"
+                    f"  • You have historical data for this period\n"
+                    f"  • The symbol name is correct"
+                )
+                return
+            
+            self.progress.emit(f"✅ Loaded {len(df)} candles ({df.attrs['fetched']} downloaded from MT5)")
+            
+            self.progress.emit(f"🔍 Analyzing signals using PatternRecognitionStrategy...")
+            
+            # Initialize strategy (same as live bot)
+            strategy = PatternRecognitionStrategy(fib_mode='standard')
+            
+            # Run strategy
+            df_signals = strategy.run_strategy(df)
+            
+            # Find signals
+            signals_df = df_signals[df_signals['signal'] != 0].copy()
+            
+            self.progress.emit(f"📊 Calculating trade outcomes for {len(signals_df)} signals...")
+            
+            # Calculate outcomes for each signal (reuse the same logic)
+            signals_df = self._calculate_signal_outcomes(signals_df, df_signals)
+            
+            self.progress.emit(f"✅ Analysis complete! Found {len(signals_df)} {'positions' if self.use_multi_tp else 'signals'}")
+            
+            # Return results
+            self.finished.emit(signals_df)
                 
         except Exception as e:
             self.error.emit(f"Error: {str(e)}")
@@ -1101,6 +809,9 @@ class SignalAnalysisWorkerMT5(QThread):
         # List to collect new position rows
         new_rows = []
         
+        # Signals waiting for outcome simulation
+        pending = []
+        
         for idx, signal_row in signals_df.iterrows():
             signal_type = signal_row['signal']
             entry_price = signal_row['close']
@@ -1203,14 +914,14 @@ class SignalAnalysisWorkerMT5(QThread):
                     stop_loss = entry_price + (risk * self.sl_multiplier)
                     take_profit = entry_price - (risk * self.tp_multiplier)
             
-            # Get future candles after this signal
-            future_candles = full_df[full_df.index > idx]
+            # Signal candle position in full_df, outcomes are checked from the next candle
+            entry_pos = full_df.index.searchsorted(idx, side='right') - 1
             
-            if len(future_candles) == 0:
+            if entry_pos + 1 >= len(full_df):
                 signals_df.loc[idx, 'outcome'] = 'No Data'
                 continue
             
-            # Route to appropriate calculation method
+            # Route to appropriate calculation method (all signals are simulated at once below)
             if self.use_multi_tp:
                 # Store the calculated TP and SL levels for display/export
                 signals_df.loc[idx, 'tp1_used'] = tp1
@@ -1218,10 +929,21 @@ class SignalAnalysisWorkerMT5(QThread):
                 signals_df.loc[idx, 'tp3_used'] = tp3
                 signals_df.loc[idx, 'sl_used'] = stop_loss
                 
-                # Calculate 3-position outcomes
-                position_results = self._calculate_3_position_outcome(
-                    signal_type, entry_price, stop_loss, tp1, tp2, tp3, future_candles, self.trailing_pct
-                )
+                pending.append((idx, signal_row, regime, (entry_pos, signal_type, entry_price, stop_loss, tp1, tp2, tp3)))
+                
+                # Mark original row for deletion (we'll replace with 3 position rows)
+                signals_df.loc[idx, 'outcome'] = '_DELETE_'
+            else:
+                pending.append((idx, (entry_pos, signal_type, entry_price, stop_loss, take_profit)))
+        
+        if self.use_multi_tp:
+            # Calculate 3-position outcomes
+            all_position_results = calculate_3_position_outcomes(
+                full_df, [entry for *_, entry in pending], self.trailing_pct
+            )
+            
+            for (idx, signal_row, regime, entry), position_results in zip(pending, all_position_results):
+                _, _, _, stop_loss, tp1, tp2, tp3 = entry
                 
                 # Generate unique group ID for these 3 positions
                 group_id = str(uuid.uuid4())
@@ -1246,13 +968,12 @@ class SignalAnalysisWorkerMT5(QThread):
                     
                     # Add to new rows list
                     new_rows.append((idx, new_row))
-                
-                # Mark original row for deletion (we'll replace with 3 position rows)
-                signals_df.loc[idx, 'outcome'] = '_DELETE_'
-            else:
-                result = self._calculate_single_tp_outcome(
-                    signal_type, entry_price, stop_loss, take_profit, future_candles
-                )
+        else:
+            results = calculate_single_tp_outcomes(
+                full_df, [entry for _, entry in pending], self.use_trailing, self.trailing_pct
+            )
+            
+            for (idx, _), result in zip(pending, results):
                 signals_df.loc[idx, 'outcome'] = result['outcome']
                 signals_df.loc[idx, 'profit_pct'] = result['profit_pct']
                 signals_df.loc[idx, 'bars_held'] = result['bars']
@@ -1341,181 +1062,6 @@ class SignalAnalysisWorkerMT5(QThread):
         # Need 3+ signals for TREND
         return 'TREND' if trend_signals >= REGIME_TREND_SIGNALS_REQUIRED else 'RANGE'
 
-    def _calculate_3_position_outcome(self, signal_type, entry_price, stop_loss, tp1, tp2, tp3, future_candles, trailing_pct):
-        """
-        Calculate outcomes for 3 separate positions with different TP targets and trailing stops.
-        
-        Position 1: Targets TP1 only, no trailing
-        Position 2: Targets TP2, trailing activates after TP1 hits
-        Position 3: Targets TP3, trailing activates after TP1 hits
-        
-        Returns list of 3 position dictionaries with outcomes
-        """
-        # Track TP1 hit for trailing activation
-        tp1_hit = False
-        
-        # Initialize positions
-        positions = [
-            {'position_num': 1, 'target_tp': tp1, 'use_trailing': False, 'active': True, 'outcome': 'Timeout', 'profit_pct': 0.0, 'bars': 0, 'tp_level_hit': 'None', 'close_reason': 'Timeout'},
-            {'position_num': 2, 'target_tp': tp2, 'use_trailing': True, 'active': True, 'outcome': 'Timeout', 'profit_pct': 0.0, 'bars': 0, 'tp_level_hit': 'None', 'close_reason': 'Timeout'},
-            {'position_num': 3, 'target_tp': tp3, 'use_trailing': True, 'active': True, 'outcome': 'Timeout', 'profit_pct': 0.0, 'bars': 0, 'tp_level_hit': 'None', 'close_reason': 'Timeout'}
-        ]
-        
-        # Tracking for trailing stops (positions 2 and 3)
-        max_price_since_tp1 = entry_price  # For BUY
-        min_price_since_tp1 = entry_price  # For SELL
-        
-        bars = 0
-        for future_idx, future_candle in future_candles.iterrows():
-            bars += 1
-            
-            # Check if any positions still active
-            if not any(p['active'] for p in positions):
-                break
-            
-            if signal_type == 1:  # BUY signal
-                # Check if TP1 hit (for trailing activation)
-                if not tp1_hit and future_candle['high'] >= tp1:
-                    tp1_hit = True
-                    max_price_since_tp1 = future_candle['high']
-                
-                # Update max price since TP1 for trailing calculation
-                if tp1_hit:
-                    max_price_since_tp1 = max(max_price_since_tp1, future_candle['high'])
-                
-                # Calculate trailing stop for positions 2 and 3 (after TP1 hit)
-                if tp1_hit:
-                    trailing_stop = max_price_since_tp1 - (max_price_since_tp1 - entry_price) * trailing_pct
-                else:
-                    trailing_stop = stop_loss
-                
-                # Check each position
-                for pos in positions:
-                    if not pos['active']:
-                        continue
-                    
-                    # Determine active stop for this position
-                    if pos['use_trailing'] and tp1_hit:
-                        active_stop = trailing_stop
-                    else:
-                        active_stop = stop_loss
-                    
-                    # Check SL/Trailing Stop hit
-                    if future_candle['low'] <= active_stop:
-                        pnl = ((active_stop - entry_price) / entry_price) * 100
-                        pos['profit_pct'] = pnl
-                        pos['bars'] = bars
-                        pos['active'] = False
-                        if pnl < 0:
-                            pos['outcome'] = 'Loss ❌'
-                            pos['tp_level_hit'] = 'SL'
-                            pos['close_reason'] = 'SL'
-                        else:
-                            pos['outcome'] = 'Win ✅'
-                            pos['tp_level_hit'] = 'Trailing'
-                            pos['close_reason'] = 'Trailing Stop'
-                        continue
-                    
-                    # Check TP hit
-                    if future_candle['high'] >= pos['target_tp']:
-                        pnl = ((pos['target_tp'] - entry_price) / entry_price) * 100
-                        pos['profit_pct'] = pnl
-                        pos['bars'] = bars
-                        pos['active'] = False
-                        pos['outcome'] = 'Win ✅'
-                        # Determine which TP level
-                        if pos['position_num'] == 1:
-                            pos['tp_level_hit'] = 'TP1'
-                            pos['close_reason'] = 'TP1'
-                        elif pos['position_num'] == 2:
-                            pos['tp_level_hit'] = 'TP2'
-                            pos['close_reason'] = 'TP2'
-                        else:
-                            pos['tp_level_hit'] = 'TP3'
-                            pos['close_reason'] = 'TP3'
-                        continue
-            
-            else:  # SELL signal
-                # Check if TP1 hit (for trailing activation)
-                if not tp1_hit and future_candle['low'] <= tp1:
-                    tp1_hit = True
-                    min_price_since_tp1 = future_candle['low']
-                
-                # Update min price since TP1 for trailing calculation
-                if tp1_hit:
-                    min_price_since_tp1 = min(min_price_since_tp1, future_candle['low'])
-                
-                # Calculate trailing stop for positions 2 and 3 (after TP1 hit)
-                if tp1_hit:
-                    trailing_stop = min_price_since_tp1 + (entry_price - min_price_since_tp1) * trailing_pct
-                else:
-                    trailing_stop = stop_loss
-                
-                # Check each position
-                for pos in positions:
-                    if not pos['active']:
-                        continue
-                    
-                    # Determine active stop for this position
-                    if pos['use_trailing'] and tp1_hit:
-                        active_stop = trailing_stop
-                    else:
-                        active_stop = stop_loss
-                    
-                    # Check SL/Trailing Stop hit
-                    if future_candle['high'] >= active_stop:
-                        pnl = ((entry_price - active_stop) / entry_price) * 100
-                        pos['profit_pct'] = pnl
-                        pos['bars'] = bars
-                        pos['active'] = False
-                        if pnl < 0:
-                            pos['outcome'] = 'Loss ❌'
-                            pos['tp_level_hit'] = 'SL'
-                            pos['close_reason'] = 'SL'
-                        else:
-                            pos['outcome'] = 'Win ✅'
-                            pos['tp_level_hit'] = 'Trailing'
-                            pos['close_reason'] = 'Trailing Stop'
-                        continue
-                    
-                    # Check TP hit
-                    if future_candle['low'] <= pos['target_tp']:
-                        pnl = ((entry_price - pos['target_tp']) / entry_price) * 100
-                        pos['profit_pct'] = pnl
-                        pos['bars'] = bars
-                        pos['active'] = False
-                        pos['outcome'] = 'Win ✅'
-                        # Determine which TP level
-                        if pos['position_num'] == 1:
-                            pos['tp_level_hit'] = 'TP1'
-                            pos['close_reason'] = 'TP1'
-                        elif pos['position_num'] == 2:
-                            pos['tp_level_hit'] = 'TP2'
-                            pos['close_reason'] = 'TP2'
-                        else:
-                            pos['tp_level_hit'] = 'TP3'
-                            pos['close_reason'] = 'TP3'
-                        continue
-            
-            # Limit check to 100 bars
-            if bars >= 100:
-                for pos in positions:
-                    if pos['active']:
-                        pos['bars'] = bars
-                        pos['active'] = False
-                        # Calculate P&L at timeout
-                        current_price = future_candle['close']
-                        if signal_type == 1:
-                            pnl = ((current_price - entry_price) / entry_price) * 100
-                        else:
-                            pnl = ((entry_price - current_price) / entry_price) * 100
-                        pos['profit_pct'] = pnl
-                        pos['outcome'] = 'Timeout'
-                        pos['close_reason'] = 'Timeout'
-                break
-        
-        return positions
-
     def _calculate_multi_tp_outcome_live_style(self, signal_type, entry_price, stop_loss, tp1, tp2, tp3, future_candles):
         """
         Calculate outcome with multiple TP levels using live bot's specific TP prices
@@ -1761,100 +1307,6 @@ class SignalAnalysisWorkerMT5(QThread):
             'tp_levels_hit': '+'.join(tps_hit) if tps_hit else 'None'
         }
     
-    def _calculate_single_tp_outcome(self, signal_type, entry_price, stop_loss, take_profit, future_candles):
-        """
-        Calculate outcome with single TP level (original behavior)
-        """
-        # Check each candle to see if TP or SL was hit
-        outcome = 'Open'
-        profit_pct = 0.0
-        bars = 0
-        trailing_active = False
-        trailing_stop = stop_loss
-        max_profit_price = entry_price
-        
-        for future_idx, future_candle in future_candles.iterrows():
-            bars += 1
-            
-            if signal_type == 1:  # BUY signal
-                # Update trailing stop if enabled and in profit
-                if self.use_trailing and future_candle['high'] >= take_profit:
-                    trailing_active = True
-                    # Track highest price
-                    if future_candle['high'] > max_profit_price:
-                        max_profit_price = future_candle['high']
-                        # Trail at configured % of profit
-                        profit_distance = max_profit_price - entry_price
-                        trailing_stop = entry_price + (profit_distance * self.trailing_pct)
-                
-                # Check if hit SL or trailing stop
-                active_stop = trailing_stop if trailing_active else stop_loss
-                if future_candle['low'] <= active_stop:
-                    outcome = 'Loss ❌' if not trailing_active else 'Trailing Win ✅'
-                    profit_pct = ((active_stop - entry_price) / entry_price) * 100
-                    break
-                # Check if hit TP (only if trailing not active)
-                elif not trailing_active and future_candle['high'] >= take_profit:
-                    if self.use_trailing:
-                        # TP hit, activate trailing
-                        trailing_active = True
-                        max_profit_price = future_candle['high']
-                        profit_distance = max_profit_price - entry_price
-                        trailing_stop = entry_price + (profit_distance * self.trailing_pct)
-                    else:
-                        # No trailing, close at TP
-                        outcome = 'Win ✅'
-                        profit_pct = ((take_profit - entry_price) / entry_price) * 100
-                        break
-                    
-            elif signal_type == -1:  # SELL signal
-                # Update trailing stop if enabled and in profit
-                if self.use_trailing and future_candle['low'] <= take_profit:
-                    trailing_active = True
-                    # Track lowest price
-                    if future_candle['low'] < max_profit_price or max_profit_price == entry_price:
-                        max_profit_price = future_candle['low']
-                        # Trail at configured % of profit
-                        profit_distance = entry_price - max_profit_price
-                        trailing_stop = entry_price - (profit_distance * self.trailing_pct)
-                
-                # Check if hit SL or trailing stop
-                active_stop = trailing_stop if trailing_active else stop_loss
-                if future_candle['high'] >= active_stop:
-                    outcome = 'Loss ❌' if not trailing_active else 'Trailing Win ✅'
-                    profit_pct = ((entry_price - active_stop) / entry_price) * 100
-                    break
-                # Check if hit TP (only if trailing not active)
-                elif not trailing_active and future_candle['low'] <= take_profit:
-                    if self.use_trailing:
-                        # TP hit, activate trailing
-                        trailing_active = True
-                        max_profit_price = future_candle['low']
-                        profit_distance = entry_price - max_profit_price
-                        trailing_stop = entry_price - (profit_distance * self.trailing_pct)
-                    else:
-                        # No trailing, close at TP
-                        outcome = 'Win ✅'
-                        profit_pct = ((entry_price - take_profit) / entry_price) * 100
-                        break
-            
-            # Limit check to 100 bars
-            if bars >= 100:
-                outcome = 'Timeout'
-                # Calculate current P&L at timeout
-                current_price = future_candle['close']
-                if signal_type == 1:
-                    profit_pct = ((current_price - entry_price) / entry_price) * 100
-                else:
-                    profit_pct = ((entry_price - current_price) / entry_price) * 100
-                break
-        
-        return {
-            'outcome': outcome,
-            'profit_pct': profit_pct,
-            'bars': bars
-        }
-
 
 
 class SignalAnalysisDialog(QDialog):
@@ -2492,22 +1944,12 @@ class SignalAnalysisDialog(QDialog):
         group = QGroupBox("Signals Found")
         layout = QVBoxLayout(group)
 
-        # Table
-        self.results_table = QTableWidget()
-        self.results_table.setColumnCount(10)
-        self.results_table.setHorizontalHeaderLabels([
-            'Date/Time', 'Type', 'Price', 'Stop Loss', 'Take Profit', 'Result', 'Profit %', 'Bars', 'Entry Reason', 'Regime'
-        ])
-
-        # Configure table
-        header = self.results_table.horizontalHeader()
-        header.setStretchLastSection(True)
-        # Resize all columns to contents for better visibility
-        for i in range(9):  # All columns except last
-            header.setSectionResizeMode(i, QHeaderView.ResizeToContents)
-
+        # Table (model is set when results arrive; rows are formatted only when shown)
+        self.results_table = QTableView()
+        self.results_table.horizontalHeader().setStretchLastSection(True)
         self.results_table.setAlternatingRowColors(True)
-        self.results_table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.results_table.setSelectionBehavior(QTableView.SelectRows)
+        self.results_table.setSortingEnabled(True)
 
         layout.addWidget(self.results_table)
 
@@ -2610,7 +2052,7 @@ class SignalAnalysisDialog(QDialog):
                 }
         
         # Clear previous results
-        self.results_table.setRowCount(0)
+        self.results_table.setModel(None)
         self.summary_label.setText("Analyzing...")
         
         # Show progress
@@ -2789,204 +2231,110 @@ class SignalAnalysisDialog(QDialog):
         )
         
     def populate_results_table(self, signals_df):
-        """Populate results table with signals"""
+        """Show signals in the results table (sorting is done by pandas on all rows)"""
         # Check if multi-TP mode was used and if it has position groups
         has_tp_levels = 'tp_levels_hit' in signals_df.columns
         has_position_groups = 'position_group_id' in signals_df.columns and signals_df['position_group_id'].notna().any()
-        
-        # Update table columns dynamically
+
+        frame = signals_df
         if has_position_groups:
-            # Show position column in 3-position mode
-            self.results_table.setColumnCount(12)
-            self.results_table.setHorizontalHeaderLabels([
-                'Date/Time', 'Pos', 'Type', 'Price', 'Stop Loss', 'Take Profit', 'Result', 'Profit %', 'TP Hit', 'Bars', 'Entry Reason', 'Regime'
-            ])
-        elif has_tp_levels:
-            self.results_table.setColumnCount(11)
-            self.results_table.setHorizontalHeaderLabels([
-                'Date/Time', 'Type', 'Price', 'Stop Loss', 'Take Profit', 'Result', 'Profit %', 'TP Levels Hit', 'Bars', 'Entry Reason', 'Regime'
-            ])
-        else:
-            self.results_table.setColumnCount(10)
-            self.results_table.setHorizontalHeaderLabels([
-                'Date/Time', 'Type', 'Price', 'Stop Loss', 'Take Profit', 'Result', 'Profit %', 'Bars', 'Entry Reason', 'Regime'
-            ])
-        
-        # Configure table header
+            # Alternate shading per position group, in signal order
+            frame = signals_df.copy()
+            groups = frame['position_group_id']
+            frame['_shaded'] = ((groups != groups.shift()).cumsum() % 2 == 1).to_numpy()
+
+        model = LazyTableModel(FrameRowSource(frame, index_name='timestamp'),
+                               self.results_columns(frame, has_tp_levels, has_position_groups), parent=self)
+        self.results_table.setModel(model)
+
+        # Resize all columns to contents for better visibility (loaded rows only)
         header = self.results_table.horizontalHeader()
-        header.setStretchLastSection(True)
-        # Resize all columns to contents for better visibility
-        for i in range(9):  # All columns except last
+        for i in range(model.columnCount() - 1):  # All columns except last
             header.setSectionResizeMode(i, QHeaderView.ResizeToContents)
-        
-        self.results_table.setRowCount(len(signals_df))
-        
-        # Track current group for alternating colors
-        current_group_id = None
-        group_color_toggle = False
-        
-        for row_idx, (timestamp, row) in enumerate(signals_df.iterrows()):
-            col_idx = 0
-            
-            # Track group changes for visual separation
-            if has_position_groups:
-                group_id = row.get('position_group_id', '')
-                if group_id != current_group_id:
-                    current_group_id = group_id
-                    group_color_toggle = not group_color_toggle
-            
-            # Date/Time
-            date_item = QTableWidgetItem(timestamp.strftime('%Y-%m-%d %H:%M'))
-            self.results_table.setItem(row_idx, col_idx, date_item)
-            col_idx += 1
-            
-            # Position number (only in 3-position mode)
-            if has_position_groups:
-                pos_num = row.get('position_num', 0)
-                pos_item = QTableWidgetItem(str(int(pos_num)) if pos_num else '-')
-                # Add visual indicator for position groups
-                if group_color_toggle:
-                    pos_item.setBackground(Qt.lightGray)
-                self.results_table.setItem(row_idx, col_idx, pos_item)
-                col_idx += 1
-            
-            # Type
-            signal_type = "BUY 📈" if row['signal'] == 1 else "SELL 📉"
-            type_item = QTableWidgetItem(signal_type)
-            if row['signal'] == 1:
-                type_item.setForeground(Qt.darkGreen)
-            else:
-                type_item.setForeground(Qt.darkRed)
-            if has_position_groups and group_color_toggle:
-                type_item.setBackground(Qt.lightGray)
-            self.results_table.setItem(row_idx, col_idx, type_item)
-            col_idx += 1
-            
-            # Price
-            price_item = QTableWidgetItem(f"${row['close']:.2f}")
-            if has_position_groups and group_color_toggle:
-                price_item.setBackground(Qt.lightGray)
-            self.results_table.setItem(row_idx, col_idx, price_item)
-            col_idx += 1
-            
-            # Stop Loss
+
+    def results_columns(self, frame, has_tp_levels, has_position_groups):
+        """Columns of the results table for the exit mode used (rows are dicts of the signal columns)"""
+        def key(name):
+            return name if name in frame.columns else None
+
+        def value(row, name, default=0):
+            item = row.get(name, default)
+            return default if item is None or (not isinstance(item, str) and pd.isna(item)) else item
+
+        def shade(row):
+            return Qt.lightGray if row.get('_shaded') else None
+
+        def stop_loss(row):
             # Use sl_used if available (multi-TP mode), otherwise use original stop_loss
-            if has_tp_levels and 'sl_used' in row and not pd.isna(row.get('sl_used', None)):
+            if has_tp_levels and not pd.isna(row.get('sl_used', float('nan'))):
                 sl_value = row['sl_used']
             else:
-                sl_value = row.get('stop_loss', 0)
-                if pd.isna(sl_value):
-                    sl_value = 0
-            sl_item = QTableWidgetItem(f"${sl_value:.2f}" if sl_value else "N/A")
-            if has_position_groups and group_color_toggle:
-                sl_item.setBackground(Qt.lightGray)
-            self.results_table.setItem(row_idx, col_idx, sl_item)
-            col_idx += 1
-            
-            # Take Profit
+                sl_value = value(row, 'stop_loss')
+            return f"${sl_value:.2f}" if sl_value else "N/A"
+
+        def take_profit(row):
             # For multi-TP mode, show TP1/TP2/TP3, otherwise show single TP
-            if has_tp_levels and 'tp1_used' in row and not pd.isna(row.get('tp1_used', None)):
-                tp1 = row['tp1_used']
-                tp2 = row['tp2_used']
-                tp3 = row['tp3_used']
-                tp_item = QTableWidgetItem(f"${tp1:.2f}/${tp2:.2f}/${tp3:.2f}")
-            else:
-                tp_value = row.get('take_profit', 0)
-                if pd.isna(tp_value):
-                    tp_value = 0
-                tp_item = QTableWidgetItem(f"${tp_value:.2f}" if tp_value else "N/A")
-            if has_position_groups and group_color_toggle:
-                tp_item.setBackground(Qt.lightGray)
-            self.results_table.setItem(row_idx, col_idx, tp_item)
-            col_idx += 1
-            
-            # Result (Win/Loss)
-            outcome = row.get('outcome', 'Unknown')
-            result_item = QTableWidgetItem(str(outcome))
-            if 'Win' in str(outcome):
-                result_item.setForeground(Qt.darkGreen)
-            elif 'Loss' in str(outcome):
-                result_item.setForeground(Qt.darkRed)
-            if has_position_groups and group_color_toggle:
-                result_item.setBackground(Qt.lightGray)
-            self.results_table.setItem(row_idx, col_idx, result_item)
-            col_idx += 1
-            
-            # Profit %
-            profit_pct = row.get('profit_pct', 0)
-            if pd.isna(profit_pct):
-                profit_pct = 0
-            profit_item = QTableWidgetItem(f"{profit_pct:+.2f}%" if profit_pct != 0 else "0.00%")
-            if profit_pct > 0:
-                profit_item.setForeground(Qt.darkGreen)
-            elif profit_pct < 0:
-                profit_item.setForeground(Qt.darkRed)
-            if has_position_groups and group_color_toggle:
-                profit_item.setBackground(Qt.lightGray)
-            self.results_table.setItem(row_idx, col_idx, profit_item)
-            col_idx += 1
-            
-            # TP Levels Hit (only in multi-TP mode)
-            if has_tp_levels and not has_position_groups:
-                tp_levels = row.get('tp_levels_hit', 'None')
-                if pd.isna(tp_levels) or not tp_levels:
-                    tp_levels = 'None'
-                tp_levels_item = QTableWidgetItem(str(tp_levels))
-                # Color code based on TPs hit
-                if tp_levels == 'TP1+TP2+TP3':
-                    tp_levels_item.setForeground(Qt.darkGreen)
-                elif 'TP' in str(tp_levels):
-                    # Use blue for better contrast than yellow
-                    tp_levels_item.setForeground(Qt.darkBlue)
-                self.results_table.setItem(row_idx, col_idx, tp_levels_item)
-                col_idx += 1
-            elif has_position_groups:
-                # In 3-position mode, show individual TP hit instead
-                tp_level = row.get('tp_levels_hit', 'None')
-                if pd.isna(tp_level) or not tp_level:
-                    tp_level = 'None'
-                tp_level_item = QTableWidgetItem(str(tp_level))
-                # Color code
-                if tp_level in ['TP1', 'TP2', 'TP3']:
-                    tp_level_item.setForeground(Qt.darkGreen)
-                elif tp_level == 'SL':
-                    tp_level_item.setForeground(Qt.darkRed)
-                elif tp_level == 'Trailing':
-                    tp_level_item.setForeground(Qt.darkBlue)
-                if group_color_toggle:
-                    tp_level_item.setBackground(Qt.lightGray)
-                self.results_table.setItem(row_idx, col_idx, tp_level_item)
-                col_idx += 1
-            
-            # Bars Held
-            bars = row.get('bars_held', 0)
-            if pd.isna(bars):
-                bars = 0
-            bars_item = QTableWidgetItem(f"{int(bars)}" if bars > 0 else "-")
-            if has_position_groups and group_color_toggle:
-                bars_item.setBackground(Qt.lightGray)
-            self.results_table.setItem(row_idx, col_idx, bars_item)
-            col_idx += 1
-            
-            # Entry Reason
-            reason = row.get('signal_reason', 'N/A')
-            if pd.isna(reason) or not reason:
-                reason = 'N/A'
-            reason_item = QTableWidgetItem(str(reason))
-            if has_position_groups and group_color_toggle:
-                reason_item.setBackground(Qt.lightGray)
-            self.results_table.setItem(row_idx, col_idx, reason_item)
-            col_idx += 1
-            
-            # Regime
-            regime = row.get('regime', 'N/A')
-            if pd.isna(regime) or not regime:
-                regime = 'N/A'
-            regime_item = QTableWidgetItem(str(regime))
-            if has_position_groups and group_color_toggle:
-                regime_item.setBackground(Qt.lightGray)
-            self.results_table.setItem(row_idx, col_idx, regime_item)
-            
+            if has_tp_levels and not pd.isna(row.get('tp1_used', float('nan'))):
+                return f"${row['tp1_used']:.2f}/${row['tp2_used']:.2f}/${row['tp3_used']:.2f}"
+            tp_value = value(row, 'take_profit')
+            return f"${tp_value:.2f}" if tp_value else "N/A"
+
+        def outcome_color(row):
+            outcome = str(row.get('outcome', 'Unknown'))
+            return Qt.darkGreen if 'Win' in outcome else Qt.darkRed if 'Loss' in outcome else None
+
+        def profit_text(row):
+            profit_pct = value(row, 'profit_pct')
+            return f"{profit_pct:+.2f}%" if profit_pct != 0 else "0.00%"
+
+        def profit_color(row):
+            profit_pct = value(row, 'profit_pct')
+            return Qt.darkGreen if profit_pct > 0 else Qt.darkRed if profit_pct < 0 else None
+
+        def tp_levels_color(row):
+            tp_levels = value(row, 'tp_levels_hit', None) or 'None'
+            if tp_levels == 'TP1+TP2+TP3':
+                return Qt.darkGreen
+            # Use blue for better contrast than yellow
+            return Qt.darkBlue if 'TP' in str(tp_levels) else None
+
+        def tp_hit_color(row):
+            tp_level = value(row, 'tp_levels_hit', None) or 'None'
+            return {'TP1': Qt.darkGreen, 'TP2': Qt.darkGreen, 'TP3': Qt.darkGreen,
+                    'SL': Qt.darkRed, 'Trailing': Qt.darkBlue}.get(tp_level)
+
+        group_shade = shade if has_position_groups else None
+        columns = [Column('Date/Time', lambda row: row['timestamp'].strftime('%Y-%m-%d %H:%M'), 'timestamp')]
+        if has_position_groups:
+            columns.append(Column('Pos', lambda row: str(int(value(row, 'position_num'))) if value(row, 'position_num') else '-',
+                                  key('position_num'), background=shade))
+        columns += [
+            Column('Type', lambda row: "BUY 📈" if row['signal'] == 1 else "SELL 📉", key('signal'),
+                   foreground=lambda row: Qt.darkGreen if row['signal'] == 1 else Qt.darkRed, background=group_shade),
+            Column('Price', lambda row: f"${row['close']:.2f}", key('close'), background=group_shade),
+            Column('Stop Loss', stop_loss, key('stop_loss'), background=group_shade),
+            Column('Take Profit', take_profit, key('take_profit'), background=group_shade),
+            Column('Result', lambda row: str(row.get('outcome', 'Unknown')), key('outcome'),
+                   foreground=outcome_color, background=group_shade),
+            Column('Profit %', profit_text, key('profit_pct'), foreground=profit_color, background=group_shade),
+        ]
+        if has_position_groups:
+            # In 3-position mode, show individual TP hit instead
+            columns.append(Column('TP Hit', lambda row: str(value(row, 'tp_levels_hit', None) or 'None'),
+                                  key('tp_levels_hit'), foreground=tp_hit_color, background=shade))
+        elif has_tp_levels:
+            columns.append(Column('TP Levels Hit', lambda row: str(value(row, 'tp_levels_hit', None) or 'None'),
+                                  key('tp_levels_hit'), foreground=tp_levels_color))
+        columns += [
+            Column('Bars', lambda row: f"{int(value(row, 'bars_held'))}" if value(row, 'bars_held') > 0 else "-",
+                   key('bars_held'), background=group_shade),
+            Column('Entry Reason', lambda row: str(value(row, 'signal_reason', None) or 'N/A'), key('signal_reason'),
+                   background=group_shade),
+            Column('Regime', lambda row: str(value(row, 'regime', None) or 'N/A'), key('regime'),
+                   background=group_shade),
+        ]
+        return columns
+
     def export_csv(self):
         """Export results to CSV"""
         if not hasattr(self, 'current_results') or self.current_results is None:
@@ -1,14 +1,16 @@
 """
 Statistics Dialog - show trading statistics
 """
+from datetime import date, timedelta
 from PySide6.QtWidgets import (
-    QDialog, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem,
+    QDialog, QVBoxLayout, QHBoxLayout, QTableView,
     QPushButton, QLabel, QGroupBox, QHeaderView, QComboBox, QFrame, QGridLayout
 )
 from PySide6.QtCore import Qt
 from PySide6.QtGui import QFont, QColor
 from models import BotConfig
 from database import DatabaseManager
+from gui.lazy_table_model import Column, LazyTableModel
 
 
 class StatisticsDialog(QDialog):
@@ -59,17 +61,17 @@ class StatisticsDialog(QDialog):
             QPushButton:hover {
                 background-color: #1976D2;
             }
-            QTableWidget {
+            QTableView {
                 border: 1px solid #E0E0E0;
                 border-radius: 6px;
                 background-color: white;
                 gridline-color: #F0F0F0;
                 alternate-background-color: #FAFAFA;
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 8px;
             }
-            QTableWidget::item:selected {
+            QTableView::item:selected {
                 background-color: #E3F2FD;
                 color: #333;
             }
@@ -109,6 +111,7 @@ class StatisticsDialog(QDialog):
             'Last 90 days',
             'All time'
         ])
+        self.period_combo.setCurrentIndex(3)  # Open with all-time statistics
         self.period_combo.currentIndexChanged.connect(self.load_statistics)
         filters_layout.addWidget(self.period_combo)
         
@@ -300,14 +303,13 @@ class StatisticsDialog(QDialog):
         group = QGroupBox("Trade History")
         layout = QVBoxLayout(group)
 
-        # Table
-        self.history_table = QTableWidget()
-        self.history_table.setColumnCount(12)
-        self.history_table.setHorizontalHeaderLabels([
-            'Date', 'Type', 'Amount', 'Entry', 'Exit', 'SL', 'TP', 
-            'Profit', 'Profit %', 'Duration', 'Regime', 'Status'
-        ])
-        
+        # Table (rows are read from the database page by page while scrolling)
+        self.history_model = LazyTableModel(self.db.trade_rows(self.config.bot_id), self.history_columns(), parent=self)
+        self.history_table = QTableView()
+        self.history_table.setModel(self.history_model)
+        self.history_table.setSortingEnabled(True)
+        self.history_table.sortByColumn(0, Qt.DescendingOrder)
+
         # Enable alternating row colors
         self.history_table.setAlternatingRowColors(True)
 
@@ -337,22 +339,12 @@ class StatisticsDialog(QDialog):
         return group
 
     def load_statistics(self):
-        """Load statistics from database"""
-        # Get trades
-        trades = self.db.get_trades(self.config.bot_id, limit=1000)
-
-        # Filter by mode (dry-run vs live)
-        mode_index = self.mode_combo.currentIndex()
-        if mode_index == 1:  # Live Only
-            trades = [t for t in trades if not self._is_dry_run_trade(t)]
-        elif mode_index == 2:  # Dry-Run Only
-            trades = [t for t in trades if self._is_dry_run_trade(t)]
-        # mode_index == 0 is "All Trades", no filtering needed
-
-        # Filter by period (TODO: implement date filtering)
-        # For now, just use all trades
-
-        if not trades:
+        """Load statistics from database (exact all-time aggregates, no per-trade scan)"""
+        dry_run = self._selected_mode()
+        since = self._selected_since()
+        stats = self.db.get_trade_stats(self.config.bot_id, dry_run=dry_run, since=since)
+
+        if stats.total_trades == 0 and stats.closed_trades == 0:
             # Update cards with zero values
             self.update_metric_card(self.total_trades_card, "0")
             self.update_metric_card(self.total_profit_card, "$0.00")
@@ -360,141 +352,69 @@ class StatisticsDialog(QDialog):
             self.update_metric_card(self.avg_trade_card, "$0.00")
             self.update_metric_card(self.avg_duration_card, "0h")
             self.update_metric_card(self.max_drawdown_card, "$0.00")
-            self.history_table.setRowCount(0)
+            self.show_history(dry_run, since)
             return
 
-        # Calculate statistics
-        total_trades = len(trades)
-        closed_trades = [t for t in trades if t.status in ['TP', 'SL', 'CLOSED'] and t.profit is not None]
-
-        if not closed_trades:
-            # Update with partial data
-            self.update_metric_card(self.total_trades_card, str(total_trades))
-            self.update_metric_card(self.total_profit_card, "$0.00")
-            self.update_metric_card(self.win_rate_card, "0%")
-            self.update_metric_card(self.avg_trade_card, "$0.00")
-            self.update_metric_card(self.avg_duration_card, "0h")
-            self.update_metric_card(self.max_drawdown_card, "$0.00")
-            self.populate_history_table(trades)
-            return
-
-        wins = [t for t in closed_trades if t.profit > 0]
-        losses = [t for t in closed_trades if t.profit < 0]
+        # Update metric cards
+        self.update_metric_card(self.total_trades_card, f"{stats.total_trades:,}")
 
-        total_profit = sum(t.profit for t in closed_trades)
-        win_rate = (len(wins) / len(closed_trades) * 100) if closed_trades else 0
+        # Update profit card with color
+        profit_color = "#4CAF50" if stats.total_profit >= 0 else "#F44336"
+        self.update_metric_card(self.total_profit_card, f"${stats.total_profit:+,.2f}", profit_color)
 
-        avg_win = sum(t.profit for t in wins) / len(wins) if wins else 0
-        avg_loss = sum(t.profit for t in losses) / len(losses) if losses else 0
-        avg_trade = total_profit / len(closed_trades) if closed_trades else 0
-        
-        # Calculate average duration
-        durations = []
-        for t in closed_trades:
-            if t.open_time and t.close_time:
-                duration = (t.close_time - t.open_time).total_seconds() / 3600  # hours
-                durations.append(duration)
-        avg_duration = sum(durations) / len(durations) if durations else 0
-        
-        # Calculate max drawdown
-        max_loss = min((t.profit for t in losses), default=0)
+        self.update_metric_card(self.win_rate_card, f"{stats.win_rate:.1f}%")
 
-        # Update metric cards
-        self.update_metric_card(self.total_trades_card, str(total_trades))
-        
-        # Update profit card with color
-        profit_color = "#4CAF50" if total_profit >= 0 else "#F44336"
-        self.update_metric_card(self.total_profit_card, f"${total_profit:+,.2f}", profit_color)
-        
-        self.update_metric_card(self.win_rate_card, f"{win_rate:.1f}%")
-        
         # Update average trade card with color
-        avg_color = "#4CAF50" if avg_trade >= 0 else "#F44336"
-        self.update_metric_card(self.avg_trade_card, f"${avg_trade:+,.2f}", avg_color)
-        
-        self.update_metric_card(self.avg_duration_card, f"{avg_duration:.1f}h")
-        self.update_metric_card(self.max_drawdown_card, f"${max_loss:+,.2f}")
-
-        # Populate history table
-        self.populate_history_table(trades[:100])  # Show last 100 trades
-
-    def populate_history_table(self, trades):
-        """Populate history table"""
-        self.history_table.setRowCount(0)
-
-        for i, trade in enumerate(trades):
-            self.history_table.insertRow(i)
-
-            # Date
-            date_str = trade.open_time.strftime('%Y-%m-%d %H:%M') if trade.open_time else 'N/A'
-            self.history_table.setItem(i, 0, QTableWidgetItem(date_str))
-
-            # Type
-            self.history_table.setItem(i, 1, QTableWidgetItem(trade.trade_type))
-
-            # Amount
-            amount_str = f"{trade.amount:.4f}" if trade.amount else '-'
-            self.history_table.setItem(i, 2, QTableWidgetItem(amount_str))
-
-            # Entry
-            self.history_table.setItem(i, 3, QTableWidgetItem(f"${trade.entry_price:.2f}"))
-
-            # Exit
-            exit_str = f"${trade.close_price:.2f}" if trade.close_price else '-'
-            self.history_table.setItem(i, 4, QTableWidgetItem(exit_str))
-
-            # SL
-            sl_str = f"${trade.stop_loss:.2f}" if trade.stop_loss else '-'
-            self.history_table.setItem(i, 5, QTableWidgetItem(sl_str))
-
-            # TP
-            tp_str = f"${trade.take_profit:.2f}" if trade.take_profit else '-'
-            self.history_table.setItem(i, 6, QTableWidgetItem(tp_str))
-
-            # Profit
-            if trade.profit is not None:
-                profit_item = QTableWidgetItem(f"${trade.profit:+.2f}")
-                # Bold and color code profits
-                font = QFont()
-                font.setBold(True)
-                profit_item.setFont(font)
-                if trade.profit > 0:
-                    profit_item.setForeground(QColor("#4CAF50"))  # Green
-                elif trade.profit < 0:
-                    profit_item.setForeground(QColor("#F44336"))  # Red
-                self.history_table.setItem(i, 7, profit_item)
-            else:
-                self.history_table.setItem(i, 7, QTableWidgetItem('-'))
-
-            # Profit %
-            if trade.profit_percent is not None:
-                pct_item = QTableWidgetItem(f"{trade.profit_percent:+.2f}%")
-                # Bold and color code percentage
-                font = QFont()
-                font.setBold(True)
-                pct_item.setFont(font)
-                if trade.profit_percent > 0:
-                    pct_item.setForeground(QColor("#4CAF50"))  # Green
-                elif trade.profit_percent < 0:
-                    pct_item.setForeground(QColor("#F44336"))  # Red
-                self.history_table.setItem(i, 8, pct_item)
-            else:
-                self.history_table.setItem(i, 8, QTableWidgetItem('-'))
-
-            # Duration
-            duration_str = f"{trade.duration_hours:.1f}h" if trade.duration_hours else '-'
-            self.history_table.setItem(i, 9, QTableWidgetItem(duration_str))
-
-            # Regime
-            regime = trade.market_regime or '-'
-            self.history_table.setItem(i, 10, QTableWidgetItem(regime))
-
-            # Status with badge styling
-            status = trade.status or 'OPEN'
-            status_item = QTableWidgetItem(f"{self.get_status_emoji(status)} {status}")
-            status_item.setFont(QFont("Arial", 10, QFont.Bold))
-            self.history_table.setItem(i, 11, status_item)
-    
+        avg_color = "#4CAF50" if stats.avg_trade >= 0 else "#F44336"
+        self.update_metric_card(self.avg_trade_card, f"${stats.avg_trade:+,.2f}", avg_color)
+
+        self.update_metric_card(self.avg_duration_card, f"{stats.avg_duration:.1f}h")
+        self.update_metric_card(self.max_drawdown_card, f"${-stats.max_drawdown:+,.2f}")
+
+        # Trade history of the same mode and period
+        self.show_history(dry_run, since)
+
+    def _selected_mode(self):
+        """None for all trades, False for live only, True for dry-run only"""
+        return {1: False, 2: True}.get(self.mode_combo.currentIndex())
+
+    def _selected_since(self):
+        """First day of the selected period (None for all time)"""
+        days = {0: 7, 1: 30, 2: 90}.get(self.period_combo.currentIndex())
+        return date.today() - timedelta(days=days) if days else None
+
+    def show_history(self, dry_run, since):
+        """Point the history table at the trades of the selected mode and period"""
+        self.history_model.set_source(self.db.trade_rows(self.config.bot_id, dry_run=dry_run, since=since))
+
+    def history_columns(self):
+        """Columns of the trade history table (row objects are TradeRecords)"""
+        def money(value):
+            return f"${value:.2f}" if value else '-'
+
+        def profit_color(value):
+            if value is None or value == 0:
+                return None
+            return QColor("#4CAF50") if value > 0 else QColor("#F44336")  # Green / Red
+
+        return [
+            Column('Date', lambda t: t.open_time.strftime('%Y-%m-%d %H:%M') if t.open_time else 'N/A', 'open_time'),
+            Column('Type', lambda t: t.trade_type, 'trade_type'),
+            Column('Amount', lambda t: f"{t.amount:.4f}" if t.amount else '-', 'amount'),
+            Column('Entry', lambda t: f"${t.entry_price:.2f}", 'entry_price'),
+            Column('Exit', lambda t: money(t.close_price), 'close_price'),
+            Column('SL', lambda t: money(t.stop_loss), 'stop_loss'),
+            Column('TP', lambda t: money(t.take_profit), 'take_profit'),
+            Column('Profit', lambda t: f"${t.profit:+.2f}" if t.profit is not None else '-', 'profit',
+                   foreground=lambda t: profit_color(t.profit), bold=True),
+            Column('Profit %', lambda t: f"{t.profit_percent:+.2f}%" if t.profit_percent is not None else '-',
+                   'profit_percent', foreground=lambda t: profit_color(t.profit_percent), bold=True),
+            Column('Duration', lambda t: f"{t.duration_hours:.1f}h" if t.duration_hours else '-', 'duration_hours'),
+            Column('Regime', lambda t: t.market_regime or '-', 'market_regime'),
+            Column('Status', lambda t: f"{self.get_status_emoji(t.status or 'OPEN')} {t.status or 'OPEN'}",
+                   'status', bold=True),
+        ]
+
     def get_status_emoji(self, status):
         """Get emoji for status"""
         status_map = {
@@ -523,7 +443,7 @@ class StatisticsDialog(QDialog):
         if not filename:
             return
 
-        trades = self.db.get_trades(self.config.bot_id, limit=10000)
+        trades = self.db.iter_trades(self.config.bot_id)
 
         try:
             with open(filename, 'w', newline='') as f:
@@ -608,13 +528,3 @@ class StatisticsDialog(QDialog):
                 }
             """)
             msg.exec()
-
-    def _is_dry_run_trade(self, trade):
-        """Check if a trade is a dry-run trade"""
-        # Check order_id prefix
-        if trade.order_id and trade.order_id.startswith('DRY-'):
-            return True
-        # Check comment field
-        if trade.comment and 'DRY RUN' in trade.comment.upper():
-            return True
-        return False
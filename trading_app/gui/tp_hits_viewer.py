@@ -2,17 +2,41 @@
 TP Hits Viewer - view history of Take Profit hits
 """
 from PySide6.QtWidgets import (
-    QDialog, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem,
+    QDialog, QVBoxLayout, QHBoxLayout, QTableView,
     QPushButton, QLabel, QHeaderView, QComboBox
 )
 from PySide6.QtCore import Qt, QTimer
 from PySide6.QtGui import QColor
 from models import BotConfig
-import csv
+from gui.lazy_table_model import Column, LazyTableModel
+from utils.row_sources import FrameRowSource
 import os
-from datetime import datetime
+import pandas as pd
+from datetime import datetime, timedelta
 from pathlib import Path
 
+# Background of the TP level cell
+TP_COLORS = {'TP1': QColor(220, 255, 220), 'TP2': QColor(200, 240, 200), 'TP3': QColor(180, 220, 180)}
+
+
+def _number(hit, key):
+    """Numeric CSV value, 0 when missing"""
+    value = hit.get(key, 0)
+    return 0.0 if pd.isna(value) else float(value)
+
+
+def _text(hit, key):
+    value = hit.get(key, '')
+    return '' if pd.isna(value) else str(value)
+
+
+def _sign_color(value):
+    if value > 0:
+        return Qt.darkGreen
+    if value < 0:
+        return Qt.red
+    return None
+
 
 class TPHitsViewer(QDialog):
     """View TP hits history"""
@@ -21,6 +45,7 @@ class TPHitsViewer(QDialog):
         super().__init__(parent)
         self.config = config
         self.tp_hits_file = self._get_tp_hits_file()
+        self._file_mtime = None
 
         self.setWindowTitle(f"TP Hits History - {config.name}")
         self.setMinimumSize(1200, 700)
@@ -78,13 +103,11 @@ class TPHitsViewer(QDialog):
 
         layout.addLayout(top_layout)
 
-        # TP hits table
-        self.table = QTableWidget()
-        self.table.setColumnCount(11)
-        self.table.setHorizontalHeaderLabels([
-            'Timestamp', 'Order ID', 'TP Level', 'Type', 'Amount',
-            'Entry', 'TP Target', 'Close Price', 'SL', 'Profit $', 'Profit %'
-        ])
+        # TP hits table (cells are formatted only when shown)
+        self.source = FrameRowSource(pd.DataFrame(columns=['Timestamp']))
+        self.model = LazyTableModel(self.source, self._columns(), parent=self)
+        self.table = QTableView()
+        self.table.setModel(self.model)
 
         # Configure column widths
         header = self.table.horizontalHeader()
@@ -104,7 +127,7 @@ class TPHitsViewer(QDialog):
 
         header.setSectionResizeMode(QHeaderView.Interactive)
 
-        # Enable sorting
+        # Enable sorting (done by pandas on the whole file, not on the loaded rows)
         self.table.setSortingEnabled(True)
 
         layout.addWidget(self.table)
@@ -159,103 +182,58 @@ class TPHitsViewer(QDialog):
 
         layout.addLayout(btn_layout)
 
+    def _columns(self):
+        """Table columns (rows are dicts of the CSV columns)"""
+        return [
+            Column('Timestamp', lambda h: _text(h, 'Timestamp'), 'Timestamp'),
+            Column('Order ID', lambda h: _text(h, 'Order_ID'), 'Order_ID'),
+            Column('TP Level', lambda h: _text(h, 'TP_Level'), 'TP_Level',
+                   background=lambda h: TP_COLORS.get(h.get('TP_Level'))),
+            Column('Type', lambda h: _text(h, 'Type'), 'Type'),
+            Column('Amount', lambda h: _text(h, 'Amount'), 'Amount'),
+            Column('Entry', lambda h: f"${_number(h, 'Entry_Price'):.2f}", 'Entry_Price'),
+            Column('TP Target', lambda h: f"${_number(h, 'TP_Target'):.2f}", 'TP_Target'),
+            Column('Close Price', lambda h: f"${_number(h, 'Current_Price'):.2f}", 'Current_Price'),
+            Column('SL', lambda h: f"${_number(h, 'SL'):.2f}", 'SL'),
+            Column('Profit $', lambda h: f"${_number(h, 'Profit'):+.2f}", 'Profit',
+                   foreground=lambda h: _sign_color(_number(h, 'Profit'))),
+            Column('Profit %', lambda h: f"{_number(h, 'Profit_Pct'):+.2f}%", 'Profit_Pct',
+                   foreground=lambda h: _sign_color(_number(h, 'Profit_Pct'))),
+        ]
+
     def refresh_data(self):
-        """Refresh TP hits data from CSV"""
+        """Refresh TP hits data from CSV (re-read only when the file changed)"""
         try:
             # Check if file exists
             if not os.path.exists(self.tp_hits_file):
                 self.summary_label.setText(f"No TP hits file found: {self.tp_hits_file}")
-                self.table.setRowCount(0)
+                self._file_mtime = None
+                self.source.set_frame(pd.DataFrame(columns=['Timestamp']))
+                self.model.refresh()
                 return
 
-            # Read CSV
-            tp_hits = []
-            with open(self.tp_hits_file, 'r', newline='') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    tp_hits.append(row)
+            mtime = os.path.getmtime(self.tp_hits_file)
+            if mtime != self._file_mtime:
+                self._file_mtime = mtime
+                tp_hits = pd.read_csv(self.tp_hits_file)
+                tp_hits['_time'] = pd.to_datetime(tp_hits.get('Timestamp'), format='%Y-%m-%d %H:%M:%S',
+                                                  errors='coerce')
+                self.source.set_frame(tp_hits)
 
             # Apply filter
             filter_text = self.filter_combo.currentText()
-            filtered_hits = self._apply_filter(tp_hits, filter_text)
-
-            # Clear table
-            self.table.setRowCount(0)
-            self.table.setSortingEnabled(False)  # Disable while populating
+            self.source.set_filter(lambda frame: self._apply_filter(frame, filter_text))
+            self.model.refresh()
 
-            if not filtered_hits:
+            filtered_hits = self.source.view
+            if filtered_hits.empty:
                 self.summary_label.setText(f"No TP hits found ({filter_text})")
                 return
 
-            # Add data to table
-            total_profit = 0.0
-            tp_counts = {'TP1': 0, 'TP2': 0, 'TP3': 0}
-
-            for i, hit in enumerate(filtered_hits):
-                self.table.insertRow(i)
-
-                # Timestamp
-                self.table.setItem(i, 0, QTableWidgetItem(hit.get('Timestamp', '')))
-
-                # Order ID
-                self.table.setItem(i, 1, QTableWidgetItem(str(hit.get('Order_ID', ''))))
-
-                # TP Level
-                tp_level = hit.get('TP_Level', '')
-                tp_item = QTableWidgetItem(tp_level)
-                if tp_level == 'TP1':
-                    tp_item.setBackground(QColor(220, 255, 220))  # Light green
-                    tp_counts['TP1'] += 1
-                elif tp_level == 'TP2':
-                    tp_item.setBackground(QColor(200, 240, 200))  # Green
-                    tp_counts['TP2'] += 1
-                elif tp_level == 'TP3':
-                    tp_item.setBackground(QColor(180, 220, 180))  # Dark green
-                    tp_counts['TP3'] += 1
-                self.table.setItem(i, 2, tp_item)
-
-                # Type
-                self.table.setItem(i, 3, QTableWidgetItem(hit.get('Type', '')))
-
-                # Amount
-                self.table.setItem(i, 4, QTableWidgetItem(hit.get('Amount', '')))
-
-                # Entry Price
-                self.table.setItem(i, 5, QTableWidgetItem(f"${float(hit.get('Entry_Price', 0)):.2f}"))
-
-                # TP Target
-                self.table.setItem(i, 6, QTableWidgetItem(f"${float(hit.get('TP_Target', 0)):.2f}"))
-
-                # Current/Close Price
-                self.table.setItem(i, 7, QTableWidgetItem(f"${float(hit.get('Current_Price', 0)):.2f}"))
-
-                # SL
-                self.table.setItem(i, 8, QTableWidgetItem(f"${float(hit.get('SL', 0)):.2f}"))
-
-                # Profit $
-                profit = float(hit.get('Profit', 0))
-                profit_item = QTableWidgetItem(f"${profit:+.2f}")
-                if profit > 0:
-                    profit_item.setForeground(Qt.darkGreen)
-                elif profit < 0:
-                    profit_item.setForeground(Qt.red)
-                self.table.setItem(i, 9, profit_item)
-
-                # Profit %
-                profit_pct = float(hit.get('Profit_Pct', 0))
-                profit_pct_item = QTableWidgetItem(f"{profit_pct:+.2f}%")
-                if profit_pct > 0:
-                    profit_pct_item.setForeground(Qt.darkGreen)
-                elif profit_pct < 0:
-                    profit_pct_item.setForeground(Qt.red)
-                self.table.setItem(i, 10, profit_pct_item)
-
-                total_profit += profit
-
-            # Re-enable sorting
-            self.table.setSortingEnabled(True)
-
             # Update summary
+            total_profit = pd.to_numeric(filtered_hits.get('Profit'), errors='coerce').fillna(0).sum()
+            levels = filtered_hits['TP_Level'].value_counts() if 'TP_Level' in filtered_hits else {}
+            tp_counts = {level: int(levels.get(level, 0)) for level in ('TP1', 'TP2', 'TP3')}
             summary_color = "green" if total_profit >= 0 else "red"
             tp_breakdown = f"TP1: {tp_counts['TP1']} | TP2: {tp_counts['TP2']} | TP3: {tp_counts['TP3']}"
             self.summary_label.setText(
@@ -268,39 +246,17 @@ class TPHitsViewer(QDialog):
             print(f"Error in TPHitsViewer: {e}")
 
     def _apply_filter(self, tp_hits, filter_text):
-        """Apply filter to TP hits data"""
-        if filter_text == "All":
-            return tp_hits
-
+        """Rows of the TP hits frame matching the filter (boolean mask)"""
         if filter_text in ["TP1", "TP2", "TP3"]:
-            return [hit for hit in tp_hits if hit.get('TP_Level') == filter_text]
+            return tp_hits['TP_Level'] == filter_text
 
         if filter_text == "Today":
-            today = datetime.now().date()
-            filtered = []
-            for hit in tp_hits:
-                try:
-                    hit_date = datetime.strptime(hit.get('Timestamp', ''), '%Y-%m-%d %H:%M:%S').date()
-                    if hit_date == today:
-                        filtered.append(hit)
-                except:
-                    pass
-            return filtered
+            return tp_hits['_time'].dt.date == datetime.now().date()
 
         if filter_text == "This Week":
-            from datetime import timedelta
-            week_ago = datetime.now() - timedelta(days=7)
-            filtered = []
-            for hit in tp_hits:
-                try:
-                    hit_date = datetime.strptime(hit.get('Timestamp', ''), '%Y-%m-%d %H:%M:%S')
-                    if hit_date >= week_ago:
-                        filtered.append(hit)
-                except:
-                    pass
-            return filtered
-
-        return tp_hits
+            return tp_hits['_time'] >= datetime.now() - timedelta(days=7)
+
+        return pd.Series(True, index=tp_hits.index)
 
     def closeEvent(self, event):
         """Handle close event"""
@@ -4,5 +4,6 @@ Models package
 from .bot_config import BotConfig
 from .bot_status import BotStatus
 from .trade_record import TradeRecord
+from .trade_stats import TradeStats
 
-__all__ = ['BotConfig', 'BotStatus', 'TradeRecord']
+__all__ = ['BotConfig', 'BotStatus', 'TradeRecord', 'TradeStats']
@@ -0,0 +1,39 @@
+"""
+Trade Statistics Model
+"""
+from dataclasses import dataclass
+
+
+@dataclass
+class TradeStats:
+    """Aggregated results of a bot's trades"""
+
+    total_trades: int = 0  # Opened in the period, including still open ones
+    closed_trades: int = 0  # TP / SL / CLOSED with a profit
+    wins: int = 0
+    losses: int = 0
+    gross_profit: float = 0.0  # Sum of winning trades
+    gross_loss: float = 0.0  # Sum of losing trades (negative)
+    duration_hours: float = 0.0  # Sum over closed trades with open and close time
+    durations: int = 0
+    max_drawdown: float = 0.0  # Largest drop of cumulative profit from its peak (positive)
+
+    @property
+    def total_profit(self) -> float:
+        return self.gross_profit + self.gross_loss
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.closed_trades * 100 if self.closed_trades else 0.0
+
+    @property
+    def avg_trade(self) -> float:
+        return self.total_profit / self.closed_trades if self.closed_trades else 0.0
+
+    @property
+    def avg_duration(self) -> float:
+        return self.duration_hours / self.durations if self.durations else 0.0
+
+    @property
+    def profit_factor(self) -> float:
+        return self.gross_profit / -self.gross_loss if self.gross_loss else 0.0
@@ -0,0 +1,194 @@
+"""
+Row Sources - paged, sortable, filterable data behind the lazy table models
+"""
+import sqlite3
+from collections import OrderedDict
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+
+class SqlRowSource:
+    """
+    Rows of one SQLite table, read a page at a time
+
+    Sorting and filtering become ORDER BY / WHERE, so only the rows on
+    screen are ever read into Python. The page after a read one continues from
+    the (sort key, id) of its last row (keyset pagination), so scrolling deep
+    does not make SQLite step over every earlier row as LIMIT/OFFSET would.
+    """
+
+    def __init__(self, read: Callable[[], sqlite3.Cursor], table: str, where: str = '', params: Sequence = (),
+                 order_by: str = 'id', descending: bool = True, convert: Optional[Callable[[sqlite3.Row], Any]] = None):
+        """
+        Initialize source
+
+        Args:
+            read: Returns a cursor for the calling thread
+            table: Table name
+            where: SQL condition (with ? placeholders), '' for all rows
+            params: Values of the placeholders
+            order_by: Column to sort by
+            descending: Sort direction
+            convert: Turns a sqlite3.Row into the object the columns display
+        """
+        self.read = read
+        self.table = table
+        self.columns = [row[1] for row in read().execute(f"PRAGMA table_info({table})").fetchall()]
+        self.convert = convert
+        self.where = where
+        self.params = tuple(params)
+        self.order_by = 'id'
+        self.descending = descending
+        self._id_index = self.columns.index('id')
+        self._anchors = {}  # offset -> (sort value, id) of the row just before it
+        self.sort(order_by, descending)
+
+    def set_filter(self, where: str = '', params: Sequence = ()):
+        self.where = where
+        self.params = tuple(params)
+        self._anchors.clear()
+
+    def sort(self, key: str, descending: bool = False):
+        if key not in self.columns:
+            raise ValueError(f"Unknown column: {key}")
+        self.order_by = key
+        self.descending = descending
+        self._anchors.clear()
+
+    def count(self) -> int:
+        # Counting starts a new snapshot: rows may have been added since the anchors were taken
+        self._anchors.clear()
+        return self.read().execute(f"SELECT COUNT(*) FROM {self.table} {self._where()}",
+                                   self.params).fetchone()[0]
+
+    def rows(self, offset: int, limit: int) -> List[Any]:
+        if offset in self._anchors:
+            rows = []
+            for condition, params in self._after(*self._anchors[offset]):
+                rows += self._select(condition, params, limit - len(rows), 0)
+                if len(rows) == limit:
+                    break
+        else:
+            # Jump without a known previous row (first page, or scrollbar dragged far ahead)
+            rows = self._select('', (), limit, offset)
+        if rows:
+            last = rows[-1]
+            self._anchors[offset + len(rows)] = (last[self.columns.index(self.order_by)], last[self._id_index])
+        return [self.convert(row) for row in rows] if self.convert else rows
+
+    def _select(self, condition: str, params: tuple, limit: int, offset: int) -> list:
+        direction = 'DESC' if self.descending else 'ASC'
+        conditions = [f"({part})" for part in (self.where, condition) if part]
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        # id breaks ties so pages never overlap
+        return self.read().execute(
+            f"SELECT * FROM {self.table} {where} "
+            f"ORDER BY {self.order_by} {direction}, id {direction} LIMIT ? OFFSET ?",
+            self.params + params + (limit, offset)).fetchall()
+
+    def _after(self, value, row_id) -> List[Tuple[str, tuple]]:
+        """
+        Conditions for the rows sorted after (value, row_id), read in this order
+
+        NULL keys sort first ascending and last descending. They are a separate
+        segment because an OR around the row-value comparison stops SQLite from
+        seeking the index.
+        """
+        key, op = self.order_by, '<' if self.descending else '>'
+        if value is None:
+            segments = [(f"{key} IS NULL AND id {op} ?", (row_id,))]
+            return segments if self.descending else segments + [(f"{key} IS NOT NULL", ())]
+        segments = [(f"({key}, id) {op} (?, ?)", (value, row_id))]
+        return segments + [(f"{key} IS NULL", ())] if self.descending else segments
+
+    def _where(self) -> str:
+        return f"WHERE {self.where}" if self.where else ''
+
+
+class FrameRowSource:
+    """
+    Rows of a DataFrame; sorting and filtering are done by pandas
+
+    Rows are returned as dicts; the index is stored under index_name.
+    """
+
+    def __init__(self, frame, index_name: str = 'index'):
+        if pd is None:
+            raise ImportError("pandas is required for FrameRowSource")
+        self.frame = frame
+        self.index_name = index_name
+        self._mask = None
+        self._sort = None
+        self.view = frame
+
+    def set_frame(self, frame):
+        self.frame = frame
+        self._update()
+
+    def set_filter(self, mask: Optional[Callable[[Any], Any]] = None):
+        """mask(frame) -> boolean Series of rows to keep; None keeps all"""
+        self._mask = mask
+        self._update()
+
+    def sort(self, key: str, descending: bool = False):
+        if key != self.index_name and key not in self.frame.columns:
+            raise ValueError(f"Unknown column: {key}")
+        self._sort = (key, descending)
+        self._update()
+
+    def count(self) -> int:
+        return len(self.view)
+
+    def rows(self, offset: int, limit: int) -> List[dict]:
+        part = self.view.iloc[offset:offset + limit]
+        records = part.to_dict('records')
+        for record, index in zip(records, part.index):
+            record[self.index_name] = index
+        return records
+
+    def _update(self):
+        view = self.frame
+        if self._mask is not None:
+            view = view[self._mask(view)]
+        if self._sort is not None:
+            key, descending = self._sort
+            if key == self.index_name:
+                view = view.sort_index(ascending=not descending, kind='stable')
+            else:
+                view = view.sort_values(key, ascending=not descending, kind='stable', na_position='last')
+        self.view = view
+
+
+class PageCache:
+    """Keeps the most recently used pages of a source (memory stays bounded while scrolling)"""
+
+    def __init__(self, source, page_size: int = 200, max_pages: int = 20):
+        self.source = source
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.fetches = 0
+        self._pages = OrderedDict()
+
+    def row(self, index: int):
+        number = index // self.page_size
+        page = self._pages.get(number)
+        if page is None:
+            page = self.source.rows(number * self.page_size, self.page_size)
+            self.fetches += 1
+            self._pages[number] = page
+            if len(self._pages) > self.max_pages:
+                self._pages.popitem(last=False)
+        else:
+            self._pages.move_to_end(number)
+        offset = index - number * self.page_size
+        return page[offset] if offset < len(page) else None
+
+    def clear(self):
+        self._pages.clear()
+
+    def __len__(self):
+        return sum(len(page) for page in self._pages.values())
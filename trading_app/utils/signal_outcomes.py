@@ -0,0 +1,124 @@
+"""
+Signal Outcomes - SL/TP/trailing results of backtested signals
+Signal Analysis dialog simulates all signals at once through the shared exit simulator
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add trading_bots to path to access the exit simulator
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / 'trading_bots'))
+
+from shared.exit_simulator import (
+    simulate_exits, EXIT_OPEN, EXIT_SL, EXIT_TRAILING, EXIT_TP, EXIT_TIMEOUT
+)
+
+# Outcome Simulation Constants
+OUTCOME_MAX_BARS = 100                   # Signals still open after this many candles close as Timeout
+
+
+def calculate_single_tp_outcomes(full_df, entries, use_trailing, trailing_pct):
+    """
+    Calculate single-TP outcomes for all signals at once
+
+    Without trailing the position closes at SL or TP. With trailing, reaching TP
+    starts a stop that locks trailing_pct of the best profit instead.
+
+    Args:
+        full_df: Candles the signals were found on
+        entries: (entry_pos, signal_type, entry_price, stop_loss, take_profit) per signal
+        use_trailing: Trail the stop after TP instead of closing at TP
+        trailing_pct: Share of the best profit kept by the trailing stop
+
+    Returns:
+        List of dicts with outcome, profit_pct and bars (one per entry)
+    """
+    if not entries:
+        return []
+
+    entry_pos, signal_type, entry_price, stop_loss, take_profit = (np.array(col) for col in zip(*entries))
+
+    if use_trailing:
+        exits = simulate_exits(
+            full_df, entry_pos, signal_type, entry_price, stop_loss,
+            trail_trigger=take_profit, trail_giveback=1 - trailing_pct, trail_same_bar=True,
+            max_bars=OUTCOME_MAX_BARS
+        )
+    else:
+        exits = simulate_exits(
+            full_df, entry_pos, signal_type, entry_price, stop_loss,
+            take_profits=take_profit, max_bars=OUTCOME_MAX_BARS
+        )
+
+    reason = exits['exit_reason']
+    outcomes = np.select(
+        [reason == EXIT_SL, reason == EXIT_TRAILING, reason == EXIT_TP, reason == EXIT_TIMEOUT],
+        ['Loss ❌', 'Trailing Win ✅', 'Win ✅', 'Timeout'],
+        'Open'
+    )
+
+    return [
+        {'outcome': str(outcome), 'profit_pct': profit_pct, 'bars': int(bars)}
+        for outcome, profit_pct, bars in zip(outcomes, exits['pnl_pct'], exits['bars_held'])
+    ]
+
+
+def calculate_3_position_outcomes(full_df, entries, trailing_pct):
+    """
+    Calculate outcomes for 3 separate positions per signal with different TP targets
+
+    Position 1: Targets TP1 only, no trailing
+    Position 2: Targets TP2, trailing activates after TP1 hits
+    Position 3: Targets TP3, trailing activates after TP1 hits
+
+    The trailing stop gives back trailing_pct of the best profit since entry.
+
+    Args:
+        full_df: Candles the signals were found on
+        entries: (entry_pos, signal_type, entry_price, stop_loss, tp1, tp2, tp3) per signal
+        trailing_pct: Share of the best profit given back by the trailing stop
+
+    Returns:
+        List (one per entry) of 3 position dictionaries with outcomes
+    """
+    if not entries:
+        return []
+
+    entry_pos, signal_type, entry_price, stop_loss, tp1, tp2, tp3 = (np.array(col) for col in zip(*entries))
+
+    results = [[] for _ in entries]
+    for position_num, target_tp in ((1, tp1), (2, tp2), (3, tp3)):
+        use_trailing = position_num > 1
+        exits = simulate_exits(
+            full_df, entry_pos, signal_type, entry_price, stop_loss,
+            take_profits=target_tp,
+            trail_trigger=tp1 if use_trailing else None,
+            trail_giveback=trailing_pct,
+            trail_same_bar=True,
+            max_bars=OUTCOME_MAX_BARS
+        )
+
+        for k in range(len(entries)):
+            pos = {'position_num': position_num, 'target_tp': target_tp[k], 'use_trailing': use_trailing,
+                   'outcome': 'Timeout', 'profit_pct': 0.0, 'bars': 0, 'tp_level_hit': 'None',
+                   'close_reason': 'Timeout'}
+            reason = exits['exit_reason'][k]
+            pnl = exits['pnl_pct'][k]
+
+            if reason in (EXIT_SL, EXIT_TRAILING):
+                if pnl < 0:
+                    pos.update(outcome='Loss ❌', tp_level_hit='SL', close_reason='SL')
+                else:
+                    pos.update(outcome='Win ✅', tp_level_hit='Trailing', close_reason='Trailing Stop')
+            elif reason == EXIT_TP:
+                pos.update(outcome='Win ✅', tp_level_hit=f'TP{position_num}', close_reason=f'TP{position_num}')
+
+            # Positions still open when the data ends keep the Timeout defaults
+            if reason != EXIT_OPEN:
+                pos['profit_pct'] = pnl
+                pos['bars'] = int(exits['bars_held'][k])
+
+            results[k].append(pos)
+
+    return results
@@ -16,12 +16,16 @@ from pathlib import Path
 import csv
 import os
 import asyncio
+import threading
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 
 # Add parent directory to path to access shared modules
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from shared.pattern_recognition_strategy import PatternRecognitionStrategy
+from shared.streaming_strategy import StreamingSignalEngine
+from shared.market_stream import shared_stream
 from shared.telegram_helper import check_telegram_bot_import
 
 
@@ -39,13 +43,17 @@ class LiveBotBinanceFullAuto:
     - Multi-symbol support (BTC, ETH)
     """
 
+    # Seconds before a tick may trigger another TP/SL check of the same position
+    TICK_RECHECK_SECONDS = 2.0
+
     def __init__(self, telegram_token=None, telegram_chat_id=None,
                  symbol='BTC/USDT', timeframe='1h',
                  check_interval=3600, risk_percent=2.0, max_positions=3,
                  dry_run=False, testnet=True, api_key=None, api_secret=None,
                  trailing_stop_enabled=True, trailing_stop_percent=1.5,
                  bot_id=None, use_database=True, use_3_position_mode=False,
-                 total_position_size=None, min_order_size=None, trailing_stop_pct=0.5):
+                 total_position_size=None, min_order_size=None, trailing_stop_pct=0.5,
+                 use_websocket=True):
         """
         Initialize bot
 
@@ -65,6 +73,7 @@ class LiveBotBinanceFullAuto:
             trailing_stop_percent: Trailing stop activation threshold (%)
             bot_id: Unique bot identifier for database tracking
             use_database: If True, use database for position tracking
+            use_websocket: Stream prices/candles over WebSocket (REST polling if unavailable)
         """
         self.telegram_token = telegram_token
         self.telegram_chat_id = telegram_chat_id
@@ -95,6 +104,8 @@ class LiveBotBinanceFullAuto:
 
         # Initialize strategy
         self.strategy = PatternRecognitionStrategy(fib_mode='standard')
+        # Streaming engine: history is loaded once, then only new closed candles are scored
+        self.signal_engine = StreamingSignalEngine(self.strategy, window=500)
 
         # TREND MODE parameters (strong trend) - в процентах от цены
         self.trend_tp1_pct = 1.5   # 1.5%
@@ -156,6 +167,17 @@ class LiveBotBinanceFullAuto:
         self.exchange = None
         self.exchange_connected = False
 
+        # WebSocket market data: TP/SL is checked on every tick that crosses a level
+        self.use_websocket = use_websocket
+        self.stream = None
+        self._stream_subscription = None
+        self._tp_sl_lock = threading.Lock()
+        self._tp_sl_worker = ThreadPoolExecutor(1, thread_name_prefix='tp_sl')
+        self._position_listener = None
+        self._tp_sl_pending = False
+        self._tick_checks = {}  # order_id -> monotonic time of the last tick-triggered check
+        self._bar_closed = threading.Event()
+
     def _initialize_trades_log(self):
         """Initialize CSV file for trade logging"""
         if not os.path.exists(self.trades_file):
@@ -456,6 +478,8 @@ class LiveBotBinanceFullAuto:
                 print(f"⚠️  Could not check/set position mode: {e}")
 
             self.exchange_connected = True
+            self._start_stream()
+            self._watch_positions()
 
             usdt_free = balance.get('USDT', {}).get('free', 0) or 0
             print(f"✅ Connected to Binance {'Testnet' if self.testnet else 'Mainnet'}")
@@ -534,8 +558,94 @@ class LiveBotBinanceFullAuto:
             
             return False
 
+    def _start_stream(self):
+        """Subscribe to the shared WebSocket stream of this symbol"""
+        if not self.use_websocket or self._stream_subscription is not None:
+            return
+        try:
+            self.stream = shared_stream(testnet=self.testnet)
+        except Exception as e:
+            print(f"⚠️  WebSocket stream unavailable: {e}")
+            self.stream = None
+        if self.stream is None:
+            print("⚠️  WebSocket streaming disabled (pip install websockets) - polling REST every 10s")
+            return
+        self._stream_subscription = self.stream.subscribe(self.symbol, self.timeframe,
+                                                          on_tick=self._on_tick, on_bar=self._on_bar_closed)
+        print(f"📡 Streaming {self.symbol} prices and {self.timeframe} candles over WebSocket")
+
+    def _watch_positions(self):
+        """Follow position changes made elsewhere (GUI, other managers) via the registry"""
+        if self.db is None or self._position_listener is not None:
+            return
+        self._position_listener = self.db.positions.subscribe(self._on_position_event)
+
+    def _on_position_event(self, event):
+        """A position of this bot was closed outside the bot: stop watching its levels"""
+        trade = event.trade
+        if trade.bot_id != self.bot_id or event.kind != 'closed':
+            return
+        pos = self.positions_tracker.get(trade.order_id)
+        if pos is not None and pos.get('status') == 'OPEN':
+            pos['status'] = trade.status
+
+    def _stream_live(self):
+        """True when the stream has a price for the symbol"""
+        return self.stream is not None and self.stream.connected and self.stream.tick(self.symbol) is not None
+
+    def _on_tick(self, tick):
+        """
+        Price update from the stream (stream thread)
+
+        Only compares the price with tracked TP/SL levels; a crossing hands
+        the full check (database, orders) to the TP/SL worker thread. A
+        position is re-checked at most every TICK_RECHECK_SECONDS while the
+        price stays beyond a level the check did not confirm (a live check
+        is a REST positions request).
+        """
+        if self._tp_sl_pending:
+            return
+        try:
+            positions = list(self.positions_tracker.items())
+        except RuntimeError:  # tracker changed while copying - next tick
+            return
+        now = time.monotonic()
+        for order_id, pos in positions:
+            if pos.get('status') != 'OPEN':
+                continue
+            if now - self._tick_checks.get(order_id, float('-inf')) < self.TICK_RECHECK_SECONDS:
+                continue
+            if pos['type'] == 'BUY':
+                crossed = tick.bid >= pos['tp'] or tick.bid <= pos['sl']
+            else:
+                crossed = tick.ask <= pos['tp'] or tick.ask >= pos['sl']
+            if crossed:
+                self._tick_checks[order_id] = now
+                self._tp_sl_pending = True
+                self._tp_sl_worker.submit(self._check_tp_sl_from_stream)
+                return
+
+    def _check_tp_sl_from_stream(self):
+        try:
+            self._check_tp_sl_realtime()
+        finally:
+            # Forget positions that are no longer open
+            self._tick_checks = {order_id: checked for order_id, checked in self._tick_checks.items()
+                                 if self.positions_tracker.get(order_id, {}).get('status') == 'OPEN'}
+            self._tp_sl_pending = False
+
+    def _on_bar_closed(self, bar):
+        """Closed candle from the stream (stream thread) - wake the hourly loop"""
+        self._bar_closed.set()
+
     def disconnect_exchange(self):
         """Disconnect from Binance"""
+        if self._stream_subscription is not None:
+            self.stream.unsubscribe(self._stream_subscription)
+            self._stream_subscription = None
+        if self._position_listener is not None:
+            self.db.positions.unsubscribe(self._position_listener)
+            self._position_listener = None
         if self.exchange_connected:
             self.exchange.close()
             self.exchange_connected = False
@@ -773,6 +883,16 @@ class LiveBotBinanceFullAuto:
                                     self.positions_tracker[order_id]['sl'] = new_sl
 
     def _check_tp_sl_realtime(self):
+        """
+        Check TP/SL of tracked positions (called by the loop and by the stream)
+
+        Serialized so a tick-triggered check and the periodic check never
+        close the same position twice.
+        """
+        with self._tp_sl_lock:
+            self._check_tp_sl_levels()
+
+    def _check_tp_sl_levels(self):
         """Monitor open positions in real-time and check if TP/SL levels are hit
         
         Checks:
@@ -837,9 +957,11 @@ class LiveBotBinanceFullAuto:
                 # In dry_run mode, all database positions are "valid"
                 exchange_position_ids = set(positions_to_check.keys())
             
-            # Get current bar data to check high/low
+            # Get current bar data to check high/low (streamed candle if available)
             try:
-                ohlcv = self.exchange.fetch_ohlcv(self.symbol, self.timeframe, limit=1)
+                bar = self.stream.bar(self.symbol, self.timeframe) if self._stream_live() else None
+                ohlcv = [[None, bar.open, bar.high, bar.low, bar.close, bar.volume]] if bar else \
+                    self.exchange.fetch_ohlcv(self.symbol, self.timeframe, limit=1)
                 if ohlcv and len(ohlcv) > 0:
                     current_bar = ohlcv[0]
                     bar_high = current_bar[2]  # high price
@@ -887,10 +1009,12 @@ class LiveBotBinanceFullAuto:
                     if not current_price:
                         continue
                 else:
-                    # In dry_run mode, get current price from ticker
+                    # In dry_run mode, get current price from the stream or ticker
                     try:
-                        ticker = self.exchange.fetch_ticker(self.symbol)
-                        current_price = ticker.get('last', 0)
+                        if self._stream_live():
+                            current_price = self.stream.tick(self.symbol).mid
+                        else:
+                            current_price = self.exchange.fetch_ticker(self.symbol).get('last', 0)
                         if not current_price:
                             print(f"⚠️  Could not get current price for dry_run position {order_id}")
                             continue
@@ -1059,18 +1183,50 @@ class LiveBotBinanceFullAuto:
             df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
             df['datetime'] = pd.to_datetime(df['timestamp'], unit='ms')
             df = df.set_index('datetime')
-            df = df[['open', 'high', 'low', 'close', 'volume']].copy()
-
-            # Add market hours (UTC based)
-            df['hour'] = df.index.hour
-            df['is_active'] = df['hour'].isin(range(0, 24))  # Crypto trades 24/7
-            df['is_best_hours'] = df['hour'].isin([8, 9, 10, 13, 14, 15, 16, 17])  # Active trading hours
-
-            return df
+            return self._prepare_market_data(df)
         except Exception as e:
             print(f"❌ Failed to get market data: {e}")
             return None
 
+    def _prepare_market_data(self, df):
+        """OHLCV DataFrame -> strategy input with market hours columns"""
+        df = df[['open', 'high', 'low', 'close', 'volume']].copy()
+
+        # Add market hours (UTC based)
+        df['hour'] = df.index.hour
+        df['is_active'] = df['hour'].isin(range(0, 24))  # Crypto trades 24/7
+        df['is_best_hours'] = df['hour'].isin([8, 9, 10, 13, 14, 15, 16, 17])  # Active trading hours
+
+        return df
+
+    def _get_closed_candles(self, candles=None):
+        """
+        Get closed candles for the streaming signal engine
+
+        Full history is fetched only on the first call (or after a gap),
+        afterwards only the last few candles are requested.
+
+        Args:
+            candles: OHLCV already fetched by a shared feed (AsyncBotRunner),
+                ending with the forming candle - nothing is requested then
+        """
+        if candles is not None:
+            df = self._prepare_market_data(candles)
+            return df.iloc[:-1] if len(df) >= 2 else None
+
+        bars = 10 if self.signal_engine.is_seeded else self.signal_engine.window + 1
+        df = self.get_market_data(bars=bars)
+
+        # Gap since last analysis (reconnect / downtime) - refetch full history
+        if df is not None and self.signal_engine.is_seeded and df.index[0] > self.signal_engine.last_timestamp:
+            df = self.get_market_data(bars=self.signal_engine.window + 1)
+
+        if df is None or len(df) < 2:
+            return None
+
+        # Last candle from fetch_ohlcv is still forming
+        return df.iloc[:-1]
+
     def detect_market_regime(self, df, lookback=100):
         """
         Detect market regime: TREND or RANGE
@@ -1138,15 +1294,28 @@ class LiveBotBinanceFullAuto:
 
         return 'TREND' if is_trend else 'RANGE'
 
-    def analyze_market(self):
-        """Analyze market and get signals with adaptive TP levels"""
+    def analyze_market(self, candles=None):
+        """
+        Analyze market and get signals with adaptive TP levels
+
+        Args:
+            candles: Pre-fetched OHLCV including the forming candle (default: fetch)
+        """
         try:
             print(f"   📥 Fetching market data...")
-            df = self.get_market_data()
+            df = self._get_closed_candles(candles)
             if df is None:
                 print(f"   ❌ Failed to get market data")
                 return None
 
+            # Run strategy on new closed candles only (streaming engine keeps the window)
+            print(f"   🧠 Running V3 Adaptive Strategy...")
+            result = self.signal_engine.sync(df)
+            df = self.signal_engine.frame
+            if len(result) == 0:
+                print(f"   ℹ️  No new closed candles since last check")
+                return None
+
             last_close = df['close'].iloc[-1]
             last_time = df.index[-1]
             print(f"   📊 Got {len(df)} candles, last close: ${last_close:.2f} at {last_time.strftime('%Y-%m-%d %H:%M')}")
@@ -1156,10 +1325,6 @@ class LiveBotBinanceFullAuto:
             self.current_regime = self.detect_market_regime(df)
             print(f"   📊 Market Regime: {self.current_regime}")
 
-            # Run strategy
-            print(f"   🧠 Running V3 Adaptive Strategy...")
-            result = self.strategy.run_strategy(df)
-
             signals = result[result['signal'] != 0]
 
             if len(signals) == 0:
@@ -1601,7 +1766,12 @@ class LiveBotBinanceFullAuto:
                 print(f"⚠️  Error checking closed position {order_id}: {e}")
 
     def _wait_until_next_hour(self):
-        """Wait until the next full hour while monitoring positions"""
+        """
+        Wait until the next full hour while monitoring positions
+
+        With the WebSocket stream the wait ends as soon as the exchange
+        reports the candle closed, and TP/SL is checked on every tick.
+        """
         now = datetime.now()
         next_hour = (now + timedelta(hours=1)).replace(minute=0, second=0, microsecond=0)
         wait_seconds = (next_hour - now).total_seconds()
@@ -1610,14 +1780,19 @@ class LiveBotBinanceFullAuto:
             print(f"\n⏰ Waiting until next hour: {next_hour.strftime('%H:%M:%S')}")
             print(f"   Time now: {now.strftime('%H:%M:%S')}")
             print(f"   Wait time: {int(wait_seconds/60)} min {int(wait_seconds%60)} sec")
-            print(f"   🎯 Real-time TP/SL monitoring: Active (checking every 10s)")
+            if self._stream_subscription is not None:
+                print(f"   🎯 Real-time TP/SL monitoring: Active (every WebSocket tick)")
+            else:
+                print(f"   🎯 Real-time TP/SL monitoring: Active (checking every 10s)")
 
             monitoring_interval = 10  # Check every 10 seconds
             elapsed = 0
+            self._bar_closed.clear()
 
             while elapsed < wait_seconds:
                 sleep_time = min(monitoring_interval, wait_seconds - elapsed)
-                time.sleep(sleep_time)
+                if self._bar_closed.wait(sleep_time):
+                    break  # Candle closed (stream)
                 elapsed += sleep_time
 
                 # Sync positions with exchange first
@@ -11,6 +11,15 @@ Strategy Modules:
 - VolumeAnalyzer: Volume analysis and profiling
 - GoldSpecificFilters: Gold market filters and volatility analysis
 - TelegramNotifier: Telegram notification system
+- StreamingSignalEngine: Candle-by-candle signal engine for live bots
+- IndicatorCache: Shared LRU cache of indicator columns
+- simulate_exits: Shared SL/TP/trailing exit simulator for backtests and signal analysis
+- MarketDataStore: Local memory-mapped OHLCV store
+- CandleRepository: Cached candle history that only downloads missing bars
+- ResamplingEngine: H4/D1 bars built incrementally from the base timeframe stream
+- AsyncBotRunner: Many live bots in one event loop with shared candle feeds
+- BinanceMarketStream: WebSocket kline/bookTicker/miniTicker stream with reconnect and backfill
+- exchange_client / mt5_terminal: Process-wide pooled ccxt clients and MT5 terminal session
 """
 
 __version__ = "1.0.0"
@@ -0,0 +1,429 @@
+"""
+Async Bot Runner
+Все боты в одном event loop: общая подписка на свечи для одинаковых
+символов и анализ, выровненный по закрытию свечи
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # trading_bots
+
+from candle_repository import CcxtCandleSource
+from shared.exchange_pool import mt5_terminal
+from market_data_store import normalize_timeframe, timeframe_ns
+
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+# Seconds after a bar close before the new bar is requested (exchange needs a moment)
+ANALYSIS_DELAY = 5
+
+
+@dataclass(frozen=True)
+class FeedKey:
+    """One market data subscription: source ('binance', 'binance-testnet', 'mt5'), symbol, timeframe"""
+    source: str
+    symbol: str
+    timeframe: str
+
+
+def ohlcv_frame(candles) -> pd.DataFrame:
+    """ccxt [[ms, o, h, l, c, v], ...] -> OHLCV DataFrame indexed by datetime"""
+    df = pd.DataFrame(candles, columns=['timestamp'] + OHLCV_COLUMNS)
+    df.index = pd.DatetimeIndex(pd.to_datetime(df['timestamp'], unit='ms'), name='datetime')
+    return df[OHLCV_COLUMNS]
+
+
+def mt5_frame(rates) -> pd.DataFrame:
+    """MT5 rates array -> OHLCV DataFrame indexed by datetime"""
+    df = pd.DataFrame(rates)
+    df.index = pd.DatetimeIndex(pd.to_datetime(df['time'], unit='s'), name='datetime')
+    return df.rename(columns={'tick_volume': 'volume'})[OHLCV_COLUMNS]
+
+
+class CcxtAsyncSource:
+    """
+    Candles from ccxt's asyncio client
+
+    One async client per exchange/market type serves every feed of that
+    source; only public market data is requested, so no API keys are needed.
+    """
+
+    def __init__(self, exchange_id: str = 'binance', market_type: str = 'future', testnet: bool = False):
+        self.exchange_id = exchange_id
+        self.market_type = market_type
+        self.testnet = testnet
+        self._exchange = None
+
+    @property
+    def exchange(self):
+        if self._exchange is None:
+            import ccxt.async_support as ccxt_async
+            self._exchange = getattr(ccxt_async, self.exchange_id)({
+                'enableRateLimit': True,
+                'options': {'defaultType': self.market_type}
+            })
+            if self.testnet:
+                self._exchange.set_sandbox_mode(True)
+        return self._exchange
+
+    def fetcher(self, symbol: str, timeframe: str):
+        """async fetch(limit) -> last `limit` candles (the newest is still forming)"""
+        exchange_timeframe = CcxtCandleSource.exchange_timeframe(timeframe)
+
+        async def fetch(limit: int) -> pd.DataFrame:
+            return ohlcv_frame(await self.exchange.fetch_ohlcv(symbol, exchange_timeframe, limit=limit))
+        return fetch
+
+    async def close(self):
+        if self._exchange is not None:
+            await self._exchange.close()
+            self._exchange = None
+
+
+class MT5Source:
+    """Candles from the MetaTrader 5 terminal (blocking API, run on the runner's MT5 thread)"""
+
+    def fetcher(self, symbol: str, timeframe: str):
+        """fetch(limit) -> last `limit` candles (the newest is still forming)"""
+        def fetch(limit: int) -> pd.DataFrame:
+            mt5 = mt5_terminal().api
+            mt5_timeframe = getattr(mt5, f'TIMEFRAME_{normalize_timeframe(timeframe)}')
+            rates = mt5.copy_rates_from_pos(symbol, mt5_timeframe, 0, limit)
+            if rates is None or len(rates) == 0:
+                raise RuntimeError(f"No MT5 data for {symbol}: {mt5.last_error()}")
+            return mt5_frame(rates)
+        return fetch
+
+    async def close(self):
+        pass
+
+
+def default_sources() -> Dict[str, object]:
+    """Market data sources the GUI bots use"""
+    return {
+        'binance': CcxtAsyncSource('binance', 'future'),
+        'binance-testnet': CcxtAsyncSource('binance', 'future', testnet=True),
+        'mt5': MT5Source(),
+    }
+
+
+class CandleFeed:
+    """
+    Recent candles of one FeedKey, shared by every bot subscribed to it
+
+    The first refresh loads the full history; later refreshes request only
+    the last few candles and merge them in (full reload after a gap).
+    """
+
+    # Candles requested by an incremental refresh
+    TAIL = 10
+
+    def __init__(self, key: FeedKey, fetch, bars: int):
+        """
+        Initialize feed
+
+        Args:
+            key: Subscription key
+            fetch: fetch(limit) -> DataFrame, async or blocking (blocking runs on executor)
+            bars: Candles kept (largest history any subscriber needs)
+        """
+        self.key = key
+        self.fetch = fetch
+        self.bars = bars
+        self.frame: Optional[pd.DataFrame] = None
+        self.step = timeframe_ns(key.timeframe) / 1e9
+        self.next_run = 0.0
+        self.refreshed_bar = None
+        self.fetches = 0
+        self.lock = asyncio.Lock()
+
+    def due_after(self, now: float, delay: float = ANALYSIS_DELAY) -> float:
+        """Time of the next bar close (+ delay) after now"""
+        return (now // self.step + 1) * self.step + delay
+
+    async def _fetch(self, limit: int, executor) -> pd.DataFrame:
+        self.fetches += 1
+        if asyncio.iscoroutinefunction(self.fetch):
+            return await self.fetch(limit)
+        return await asyncio.get_running_loop().run_in_executor(executor, self.fetch, limit)
+
+    async def refresh(self, now: float, executor=None) -> pd.DataFrame:
+        """
+        Bring the frame up to date and return it (the last candle is still forming)
+
+        Already refreshed during the current bar -> no request, so bots joining
+        a running feed reuse its candles.
+        """
+        async with self.lock:
+            bar = now // self.step
+            if self.frame is not None and self.refreshed_bar == bar and len(self.frame) >= self.bars:
+                return self.frame
+
+            if self.frame is None or len(self.frame) < self.bars:
+                df = await self._fetch(self.bars, executor)
+            else:
+                tail = await self._fetch(self.TAIL, executor)
+                if tail.index[0] > self.frame.index[-1]:  # missed candles - reload
+                    df = await self._fetch(self.bars, executor)
+                else:
+                    df = pd.concat([self.frame[self.frame.index < tail.index[0]], tail])
+            self.frame = df.iloc[-self.bars:]
+            self.refreshed_bar = bar
+            return self.frame
+
+
+@dataclass
+class _Bot:
+    bot_id: str
+    handle: object
+    feed: FeedKey
+    executor: str
+    busy: bool = False
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)  # One blocking call per bot at a time
+
+
+class AsyncBotRunner:
+    """
+    Runs any number of bots in one asyncio event loop
+
+    Bots trading the same symbol/timeframe share one CandleFeed, so a refresh
+    costs one request per feed, not per bot. All feeds are refreshed together
+    right after each bar close and the bots' (blocking) analysis runs on a
+    thread pool, so 50 symbols take about as long as the slowest one. A bot's
+    own calls never overlap: monitor() waits for a running analyze() and
+    vice versa. MetaTrader 5 calls go through a single dedicated thread, because the MT5
+    API is not thread-safe.
+
+    A bot is any object with:
+        connect() -> bool          blocking, called once when added
+        analyze(candles)           blocking, after each bar close; candles end with the forming bar
+        monitor()                  blocking, every monitor_interval seconds
+        disconnect()               blocking, when removed
+        history_bars (optional)    candles the bot needs (default 501)
+        on_error(message) (opt.)   errors raised by the calls above
+
+    Usage:
+        runner = AsyncBotRunner()
+        runner.start()                                        # background thread
+        runner.add_bot('btc', handle, FeedKey('binance', 'BTC/USDT', '1h'))
+        runner.remove_bot('btc')
+        runner.shutdown()
+    """
+
+    def __init__(self, sources: Optional[Dict[str, object]] = None, max_workers: int = 8,
+                 monitor_interval: float = 10, analysis_delay: float = ANALYSIS_DELAY,
+                 clock: Callable[[], float] = time.time):
+        """
+        Initialize runner
+
+        Args:
+            sources: Source name -> object with fetcher(symbol, timeframe) (default: default_sources())
+            max_workers: Threads for blocking bot calls
+            monitor_interval: Seconds between monitor() calls
+            analysis_delay: Seconds after a bar close before analysis
+            clock: Current time in seconds (tests)
+        """
+        self.sources = sources if sources is not None else default_sources()
+        self.monitor_interval = monitor_interval
+        self.analysis_delay = analysis_delay
+        self.clock = clock
+        self.executors = {
+            'default': ThreadPoolExecutor(max_workers, thread_name_prefix='bot'),
+            'mt5': ThreadPoolExecutor(1, thread_name_prefix='mt5'),
+        }
+        self.bots: Dict[str, _Bot] = {}
+        self.feeds: Dict[FeedKey, CandleFeed] = {}
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+
+    # ------------------------------------------------------------------
+    # Thread-safe API (GUI thread)
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """Start the event loop in a background thread"""
+        if self._thread is not None:
+            return
+        self.loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(self.loop)
+            self.loop.run_until_complete(self._startup())
+            ready.set()
+            self.loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name='bot-runner', daemon=True)
+        self._thread.start()
+        ready.wait()
+
+    def add_bot(self, bot_id: str, handle, feed: FeedKey) -> Future:
+        """Connect and schedule a bot; the future resolves to True once it runs"""
+        return asyncio.run_coroutine_threadsafe(self.add(bot_id, handle, feed), self.loop)
+
+    def remove_bot(self, bot_id: str) -> Future:
+        """Unschedule and disconnect a bot"""
+        return asyncio.run_coroutine_threadsafe(self.remove(bot_id), self.loop)
+
+    def shutdown(self, timeout: float = 30):
+        """Remove all bots and stop the loop"""
+        if self._thread is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result(timeout)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
+        self._thread = None
+        for executor in self.executors.values():
+            executor.shutdown(wait=False)
+
+    # ------------------------------------------------------------------
+    # Coroutines (event loop)
+    # ------------------------------------------------------------------
+
+    async def _startup(self):
+        self._wake = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._schedule()), asyncio.create_task(self._monitor())]
+
+    async def _shutdown(self):
+        for bot_id in list(self.bots):
+            await self.remove(bot_id)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        for source in self.sources.values():
+            await source.close()
+
+    async def _call(self, bot: _Bot, method: str, *args):
+        """Run a blocking bot method on its executor (after the bot's previous call), reporting errors to the bot"""
+        loop = asyncio.get_running_loop()
+        async with bot.lock:
+            try:
+                return await loop.run_in_executor(self.executors[bot.executor], getattr(bot.handle, method), *args)
+            except Exception as e:
+                self._report(bot, f"{method} failed: {e}\n{traceback.format_exc()}")
+                return None
+
+    @staticmethod
+    def _executor(feed: FeedKey) -> str:
+        return 'mt5' if feed.source == 'mt5' else 'default'
+
+    def _reschedule(self):
+        """Wake the scheduler so it recomputes its sleep after feeds changed"""
+        if self._wake is not None:
+            self._wake.set()
+
+    @staticmethod
+    def _report(bot: _Bot, message: str):
+        on_error = getattr(bot.handle, 'on_error', None)
+        if on_error is not None:
+            on_error(message)
+        else:
+            print(f"❌ [{bot.bot_id}] {message}")
+
+    async def add(self, bot_id: str, handle, feed: FeedKey) -> bool:
+        """Connect a bot, subscribe it to its feed and run its first analysis"""
+        if bot_id in self.bots:
+            return False
+        bot = _Bot(bot_id, handle, feed, self._executor(feed))
+        if not await self._call(bot, 'connect'):
+            return False
+
+        bars = getattr(handle, 'history_bars', 501)
+        if feed not in self.feeds:
+            self.feeds[feed] = CandleFeed(feed, self.sources[feed.source].fetcher(feed.symbol, feed.timeframe), bars)
+            self.feeds[feed].next_run = self.feeds[feed].due_after(self.clock(), self.analysis_delay)
+            self._reschedule()
+        elif bars > self.feeds[feed].bars:
+            self.feeds[feed].bars = bars
+        self.bots[bot_id] = bot
+
+        await self.run_feeds([self.feeds[feed]], only=[bot])
+        return True
+
+    async def remove(self, bot_id: str) -> bool:
+        """Unsubscribe and disconnect a bot"""
+        bot = self.bots.pop(bot_id, None)
+        if bot is None:
+            return False
+        if not any(other.feed == bot.feed for other in self.bots.values()):
+            self.feeds.pop(bot.feed, None)
+            self._reschedule()
+        await self._call(bot, 'disconnect')
+        return True
+
+    async def run_feeds(self, feeds: List[CandleFeed], only: Optional[List[_Bot]] = None):
+        """
+        Refresh feeds concurrently, then run analysis of their bots concurrently
+
+        Args:
+            feeds: Feeds to refresh
+            only: Bots to analyze (default: every subscriber of the feeds)
+        """
+        now = self.clock()
+        frames = await asyncio.gather(*(feed.refresh(now, self.executors[self._executor(feed.key)])
+                                        for feed in feeds), return_exceptions=True)
+        by_key = dict(zip((feed.key for feed in feeds), frames))
+
+        jobs = []
+        for bot in (only if only is not None else list(self.bots.values())):
+            if bot.feed not in by_key:
+                continue
+            frame = by_key[bot.feed]
+            if isinstance(frame, Exception):
+                self._report(bot, f"market data for {bot.feed.symbol} failed: {frame}")
+            else:
+                jobs.append(self._call(bot, 'analyze', frame))
+        await asyncio.gather(*jobs)
+
+    async def _schedule(self):
+        """Refresh each feed right after its bar closes"""
+        while True:
+            now = self.clock()
+            due = [feed for feed in self.feeds.values() if feed.next_run <= now]
+            if due:
+                for feed in due:
+                    feed.next_run = feed.due_after(now, self.analysis_delay)
+                await self.run_feeds(due)
+                continue
+
+            wait = min((feed.next_run for feed in self.feeds.values()), default=now + 60) - now
+            self._wake.clear()
+            # asyncio.wait, not wait_for: wait_for can swallow a cancel that races a wake-up
+            woken = asyncio.ensure_future(self._wake.wait())
+            try:
+                await asyncio.wait([woken], timeout=max(wait, 0))
+            finally:
+                woken.cancel()
+
+    async def _monitor(self):
+        """monitor() of every bot every monitor_interval seconds (skipped while the last call runs)"""
+        while True:
+            await asyncio.sleep(self.monitor_interval)
+            for bot in list(self.bots.values()):
+                if not bot.busy:
+                    asyncio.create_task(self._monitor_bot(bot))
+
+    async def _monitor_bot(self, bot: _Bot):
+        bot.busy = True
+        try:
+            await self._call(bot, 'monitor')
+        finally:
+            bot.busy = False
+
+    def feed_stats(self) -> List[Tuple[FeedKey, int, int]]:
+        """(feed, subscribers, fetches) for every active feed"""
+        return [(key, sum(bot.feed == key for bot in self.bots.values()), feed.fetches)
+                for key, feed in self.feeds.items()]
@@ -0,0 +1,390 @@
+"""
+Candle Repository
+Кэш исторических свечей поверх MarketDataStore: из сети загружаются только
+недостающие диапазоны, пропуски в данных находятся и дозагружаются
+"""
+
+import contextlib
+import os
+import sys
+import threading
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # trading_bots
+
+from shared.exchange_pool import exchange_client
+from market_data_store import MarketDataStore, normalize_timeframe, timeframe_ns, timeframe_origin
+
+try:
+    import ccxt
+    CCXT_AVAILABLE = True
+except ImportError:
+    CCXT_AVAILABLE = False
+
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+
+def _utc_naive(value) -> pd.Timestamp:
+    ts = pd.Timestamp(value)
+    if ts.tz is not None:
+        ts = ts.tz_convert('UTC').tz_localize(None)
+    return ts.as_unit('ns')
+
+
+def _utc_now() -> pd.Timestamp:
+    return pd.Timestamp(datetime.now(timezone.utc).replace(tzinfo=None)).as_unit('ns')
+
+
+def _runs(times: np.ndarray, step: int) -> List[Tuple[int, int]]:
+    """Contiguous runs [(first, last), ...] of a sorted grid with spacing step"""
+    if len(times) == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(times) != step)
+    starts = np.concatenate(([0], breaks + 1))
+    ends = np.concatenate((breaks, [len(times) - 1]))
+    return [(int(times[s]), int(times[e])) for s, e in zip(starts, ends)]
+
+
+def _merge_intervals(intervals: List[List[int]], step: int) -> List[List[int]]:
+    """Union of closed intervals, joining ones that touch on the bar grid"""
+    merged = []
+    for first, last in sorted(intervals):
+        if merged and first <= merged[-1][1] + step:
+            merged[-1][1] = max(merged[-1][1], last)
+        else:
+            merged.append([first, last])
+    return merged
+
+
+class CcxtCandleSource:
+    """Candles from a ccxt exchange (fetch_ohlcv paged by `limit`)"""
+
+    def __init__(self, exchange, limit: int = 1000, lock=None):
+        """
+        Initialize source
+
+        Args:
+            exchange: ccxt exchange instance (or anything with fetch_ohlcv)
+            limit: Candles per request
+            lock: Held around each request when the client is shared with other threads
+        """
+        self.exchange = exchange
+        self.limit = limit
+        self.lock = lock or contextlib.nullcontext()
+        self.page_size = limit
+        self.name = str(getattr(exchange, 'id', 'exchange'))
+
+    @staticmethod
+    def exchange_timeframe(timeframe: str) -> str:
+        """'H1' -> '1h', 'M15' -> '15m', 'D1' -> '1d'"""
+        tf = normalize_timeframe(timeframe)
+        return f"{tf[1:]}{tf[0].lower()}"
+
+    def fetch(self, symbol: str, timeframe: str, start_ns: int, end_ns: int) -> pd.DataFrame:
+        """Candles opening in [start_ns, end_ns]"""
+        since = start_ns // 1_000_000
+        end_ms = end_ns // 1_000_000
+        candles = []
+        requests = 0
+        while since <= end_ms:
+            with self.lock:
+                page = self.exchange.fetch_ohlcv(symbol, self.exchange_timeframe(timeframe),
+                                                 since=since, limit=self.limit)
+            requests += 1
+            if not page:
+                break
+            candles.extend(page)
+            if page[-1][0] < since:  # exchange ignored `since`
+                break
+            since = page[-1][0] + 1
+            if len(page) < self.limit:
+                break
+
+        df = pd.DataFrame(candles, columns=['timestamp'] + OHLCV_COLUMNS)
+        df.index = pd.DatetimeIndex(pd.to_datetime(df['timestamp'], unit='ms'), name='datetime').as_unit('ns')
+        df = df[OHLCV_COLUMNS].astype(np.float64)
+        df.attrs['requests'] = requests
+        return df
+
+
+class MT5CandleSource:
+    """
+    Candles from the MetaTrader 5 terminal (copy_rates_range)
+
+    Stored without a source prefix, so MT5 history shares the datasets
+    created by `python market_data_store.py import` from MT5 CSV exports.
+    Like those exports, bars are indexed in the broker's server time.
+    """
+
+    def __init__(self, mt5, server_offset: Optional[pd.Timedelta] = None):
+        """
+        Initialize source
+
+        Args:
+            mt5: Initialized MetaTrader5 module
+            server_offset: Broker server time minus UTC (default: estimated from the last tick)
+        """
+        self.mt5 = mt5
+        self.page_size = 100000
+        self.name = ''
+        self._server_offset = None if server_offset is None else pd.Timedelta(server_offset)
+
+    def timeframe_name(self, value) -> str:
+        """MT5 timeframe constant (mt5.TIMEFRAME_H1) or name ('1h') -> 'H1'"""
+        if isinstance(value, str):
+            return normalize_timeframe(value)
+        for name in ('M1', 'M5', 'M15', 'M30', 'H1', 'H4', 'D1', 'W1'):
+            if getattr(self.mt5, f'TIMEFRAME_{name}', None) == value:
+                return name
+        raise ValueError(f"Unsupported MT5 timeframe {value}")
+
+    def server_offset(self, symbol: str, now: Optional[pd.Timestamp] = None) -> pd.Timedelta:
+        """
+        Broker server time minus UTC
+
+        Estimated once from a fresh tick: its server time is then within a
+        minute of UTC plus a whole number of half hours. A stale tick (market
+        closed) rarely is, and gives 0 until a fresh one arrives.
+
+        Args:
+            symbol: Symbol whose last tick is used
+            now: Current UTC time (default: system clock)
+        """
+        if self._server_offset is None:
+            tick = self.mt5.symbol_info_tick(symbol)
+            if tick is None:
+                return pd.Timedelta(0)
+            diff = int(tick.time) - (now if now is not None else _utc_now()).value // 1_000_000_000
+            offset = round(diff / 1800) * 1800
+            if abs(diff - offset) > 60 or abs(offset) > 14 * 3600:
+                return pd.Timedelta(0)
+            self._server_offset = pd.Timedelta(seconds=offset)
+        return self._server_offset
+
+    def fetch(self, symbol: str, timeframe: str, start_ns: int, end_ns: int) -> pd.DataFrame:
+        """Candles opening in [start_ns, end_ns]"""
+        mt5_timeframe = getattr(self.mt5, f'TIMEFRAME_{normalize_timeframe(timeframe)}')
+        utc_from = pd.Timestamp(start_ns, tz='UTC').to_pydatetime()
+        utc_to = pd.Timestamp(end_ns, tz='UTC').to_pydatetime()
+        rates = self.mt5.copy_rates_range(symbol, mt5_timeframe, utc_from, utc_to)
+        if rates is None:
+            raise ConnectionError(f"MT5 copy_rates_range failed for {symbol}: {self.mt5.last_error()}")
+
+        df = pd.DataFrame(rates)
+        if df.empty:
+            df = pd.DataFrame(columns=['time'] + OHLCV_COLUMNS)
+        df = df.rename(columns={'tick_volume': 'volume'})
+        df.index = pd.DatetimeIndex(pd.to_datetime(df['time'], unit='s'), name='datetime').as_unit('ns')
+        df = df[OHLCV_COLUMNS].astype(np.float64)
+        df.attrs['requests'] = 1
+        return df
+
+
+class CandleRepository:
+    """
+    Cached candle history
+
+    get() returns candles for a time range from the local MarketDataStore and
+    asks the source only for bars that are not stored yet: a repeated
+    analysis of the same year downloads just the candles that closed since
+    the last call. Holes inside the stored history (interrupted downloads,
+    partial CSV imports) are found on the bar grid and fetched too. Bars the
+    source skips between bars it returns (market closed, exchange
+    maintenance) are remembered, so they are not requested again; the edges
+    of a response may just not be available yet and are asked for again.
+
+    The still-forming last candle is returned but never stored. Sources with
+    server_offset(symbol) (MT5) index bars in server time; range arguments
+    and the clock are UTC and are shifted to it.
+    """
+
+    def __init__(self, source, store: Optional[MarketDataStore] = None,
+                 clock: Optional[Callable[[], pd.Timestamp]] = None):
+        """
+        Initialize repository
+
+        Args:
+            source: Candle source (CcxtCandleSource, MT5CandleSource or any object
+                    with fetch(symbol, timeframe, start_ns, end_ns), name and page_size)
+            store: Local store (default: MarketDataStore())
+            clock: Returns the current UTC time (tests)
+        """
+        self.source = source
+        self.store = store or MarketDataStore()
+        self.clock = clock or _utc_now
+        self._lock = threading.Lock()
+
+    def dataset(self, symbol: str) -> str:
+        """Store symbol of a source symbol ('BTC/USDT' on binance -> 'BINANCE_BTCUSDT')"""
+        name = ''.join(ch for ch in symbol if ch.isalnum())
+        return f"{self.source.name}_{name}".upper() if self.source.name else name.upper()
+
+    def _offset(self, symbol: str) -> pd.Timedelta:
+        """Source time minus UTC (0 unless the source indexes bars in server time)"""
+        server_offset = getattr(self.source, 'server_offset', None)
+        return pd.Timedelta(0) if server_offset is None else server_offset(symbol, self.clock())
+
+    def _grid(self, timeframe: str, start: pd.Timestamp, end: pd.Timestamp,
+              now: pd.Timestamp) -> Tuple[int, int, int]:
+        """First and last bar opening in [start, end] (clipped to now) and bar length, in source time"""
+        step = timeframe_ns(timeframe)
+        origin = timeframe_origin(timeframe)
+        end = min(end, now).value
+        first = origin + -(-(start.value - origin) // step) * step
+        last = origin + ((end - origin) // step) * step
+        return first, last, step
+
+    def _empty(self, symbol: str, timeframe: str) -> List[List[int]]:
+        meta = self.store.info(self.dataset(symbol), timeframe)
+        return ((meta or {}).get('source') or {}).get('empty', [])
+
+    def _missing(self, symbol: str, timeframe: str, start: pd.Timestamp, end: pd.Timestamp,
+                 now: pd.Timestamp) -> List[Tuple[int, int]]:
+        """Runs of bars in [start, end] (source time) that are neither stored nor known to be absent"""
+        first, last, step = self._grid(timeframe, start, end, now)
+        if last < first:
+            return []
+
+        grid = np.arange(first, last + step, step, dtype=np.int64)
+        dataset = self.dataset(symbol)
+        if self.store.info(dataset, timeframe) is not None:
+            stored = self.store.load(dataset, timeframe, pd.Timestamp(first), pd.Timestamp(last), columns=[])
+            grid = grid[~np.isin(grid, stored.index.asi8)]
+
+        empty = np.array(self._empty(symbol, timeframe), dtype=np.int64).reshape(-1, 2)
+        if len(empty):
+            k = np.searchsorted(empty[:, 0], grid, side='right') - 1
+            grid = grid[(k < 0) | (grid > empty[np.maximum(k, 0), 1])]
+        return _runs(grid, step)
+
+    def find_gaps(self, symbol: str, timeframe: str, start, end=None) -> pd.DataFrame:
+        """
+        Bars missing from the store
+
+        Args:
+            symbol: Source symbol ('BTC/USDT', 'XAUUSD')
+            timeframe: Timeframe
+            start: Range start (naive = UTC)
+            end: Range end (default: now)
+
+        Returns:
+            DataFrame with start, end (source time) and bars of every missing run
+            (bars known to be absent at the source are not gaps)
+        """
+        step = timeframe_ns(timeframe)
+        offset = self._offset(symbol)
+        now = self.clock() + offset
+        end = now if end is None else _utc_naive(end) + offset
+        runs = self._missing(symbol, timeframe, _utc_naive(start) + offset, end, now)
+        return pd.DataFrame({
+            'start': pd.to_datetime([first for first, _ in runs]),
+            'end': pd.to_datetime([last for _, last in runs]),
+            'bars': [(last - first) // step + 1 for first, last in runs],
+        })
+
+    def _windows(self, runs: List[Tuple[int, int]], step: int) -> List[Tuple[int, int]]:
+        """Missing runs coalesced into request windows of at most page_size bars"""
+        windows = []
+        for first, last in runs:
+            if windows and (last - windows[-1][0]) // step < self.source.page_size:
+                windows[-1] = (windows[-1][0], last)
+            else:
+                windows.append((first, last))
+        return windows
+
+    def get(self, symbol: str, timeframe: str, start, end=None) -> pd.DataFrame:
+        """
+        Candles opening in [start, end]
+
+        Args:
+            symbol: Source symbol ('BTC/USDT', 'XAUUSD')
+            timeframe: Timeframe ('1h', 'H1', ...)
+            start: Range start (naive = UTC)
+            end: Range end (default: now)
+
+        Returns:
+            OHLCV DataFrame indexed by time (source time); df.attrs['fetched'] /
+            ['requests'] tell how many candles / requests went to the source
+
+        Raises:
+            Whatever the source raises for a failed request; nothing is recorded then
+        """
+        timeframe = normalize_timeframe(timeframe)
+        dataset = self.dataset(symbol)
+
+        with self._lock:
+            offset = self._offset(symbol)
+            clock = self.clock() + offset
+            start = _utc_naive(start) + offset
+            end = clock if end is None else _utc_naive(end) + offset
+            now = clock.value
+            runs = self._missing(symbol, timeframe, start, end, clock)
+            step = timeframe_ns(timeframe)
+
+            frames, forming, empty = [], [], []
+            fetched = requests = 0
+            for first, last in self._windows(runs, step):
+                bars = self.source.fetch(symbol, timeframe, first, last)
+                requests += bars.attrs.get('requests', 1)
+                bars = bars[(bars.index.asi8 >= first) & (bars.index.asi8 <= last)]
+                fetched += len(bars)
+
+                closed = bars.index.asi8 + step <= now
+                frames.append(bars[closed])
+                forming.append(bars[~closed])
+
+                # Only bars skipped between two returned bars are known to be absent
+                if len(bars) > 1:
+                    times = bars.index.asi8
+                    grid = np.arange(times[0], times[-1] + step, step, dtype=np.int64)
+                    empty += [list(run) for run in _runs(grid[~np.isin(grid, times)], step)]
+
+            if frames and sum(len(f) for f in frames):
+                source_meta = {'empty': _merge_intervals(self._empty(symbol, timeframe) + empty, step)}
+                self.store.write(dataset, timeframe, pd.concat(frames), source=source_meta)
+            elif empty and self.store.info(dataset, timeframe) is not None:
+                self.store.update_source(dataset, timeframe,
+                                         {'empty': _merge_intervals(self._empty(symbol, timeframe) + empty, step)})
+
+            if self.store.info(dataset, timeframe) is not None:
+                df = self.store.load(dataset, timeframe, start, end, columns=OHLCV_COLUMNS)
+            else:
+                df = pd.DataFrame(columns=OHLCV_COLUMNS, index=pd.DatetimeIndex([], name='datetime'), dtype=np.float64)
+            forming = [f for f in forming if len(f)]
+            if forming:
+                df = pd.concat([df] + forming).sort_index()
+                df = df[~df.index.duplicated(keep='last')]
+
+        df.attrs['fetched'] = fetched
+        df.attrs['requests'] = requests
+        return df
+
+
+_REPOSITORIES: Dict[Tuple[str, str], CandleRepository] = {}
+_REPOSITORIES_LOCK = threading.Lock()
+
+
+def exchange_repository(exchange_id: str = 'binance', market_type: str = 'future') -> CandleRepository:
+    """
+    Process-wide repository for a ccxt exchange
+
+    All callers share one store and the pooled exchange client (and its rate
+    limiter) that the GUI also uses for tickers.
+
+    Args:
+        exchange_id: ccxt exchange id
+        market_type: ccxt defaultType ('future' as in the live bot, or 'spot')
+    """
+    if not CCXT_AVAILABLE:
+        raise ImportError("ccxt is required for exchange data: pip install ccxt")
+    key = (exchange_id, market_type)
+    with _REPOSITORIES_LOCK:
+        if key not in _REPOSITORIES:
+            client = exchange_client(exchange_id, market_type)
+            _REPOSITORIES[key] = CandleRepository(CcxtCandleSource(client.exchange, lock=client.lock))
+        return _REPOSITORIES[key]
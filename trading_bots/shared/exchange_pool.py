@@ -0,0 +1,216 @@
+"""
+Exchange Pool
+Один клиент ccxt на биржу/аккаунт и одна сессия терминала MT5 на процесс:
+рынки загружаются один раз, HTTP-соединение и лимиты запросов сохраняются между опросами
+
+Import it only as `shared.exchange_pool` (trading_bots on sys.path): under any other
+module name the process would get a second pool and a second terminal lock.
+"""
+
+import atexit
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+# Binance Futures testnet REST endpoints (as used by the live bot)
+BINANCE_TESTNET_URLS = {
+    'api': {
+        'public': 'https://testnet.binancefuture.com/fapi/v1',
+        'private': 'https://testnet.binancefuture.com/fapi/v1',
+    }
+}
+
+
+def exchange_config(market_type: str = 'future', testnet: bool = False,
+                    api_key: Optional[str] = None, api_secret: Optional[str] = None) -> dict:
+    """ccxt constructor options for a public (no keys) or account client"""
+    config = {
+        'enableRateLimit': True,
+        'options': {'defaultType': market_type},
+    }
+    if api_key:
+        config['apiKey'] = api_key
+        config['secret'] = api_secret
+        config['options']['adjustForTimeDifference'] = True
+    if testnet:
+        config['urls'] = BINANCE_TESTNET_URLS
+    return config
+
+
+def ccxt_exchange(exchange_id: str, market_type: str, testnet: bool,
+                  api_key: Optional[str], api_secret: Optional[str]):
+    """Default pool factory: a new ccxt client"""
+    import ccxt
+    return getattr(ccxt, exchange_id)(exchange_config(market_type, testnet, api_key, api_secret))
+
+
+class PooledExchange:
+    """
+    A ccxt client shared by every thread of the process
+
+    Use it as `with client as exchange:`; the lock serializes requests
+    (ccxt clients are not thread-safe) and markets are loaded on first use.
+    """
+
+    def __init__(self, exchange):
+        self.exchange = exchange
+        self.lock = threading.RLock()
+        self.markets_loaded = False
+
+    def __enter__(self):
+        self.lock.acquire()
+        try:
+            if not self.markets_loaded:
+                self.exchange.load_markets()
+                self.markets_loaded = True
+        except BaseException:
+            self.lock.release()
+            raise
+        return self.exchange
+
+    def __exit__(self, *exc):
+        self.lock.release()
+
+    def close(self):
+        with self.lock:
+            session = getattr(self.exchange, 'session', None)
+            if session is not None:
+                session.close()
+
+
+class ExchangePool:
+    """One PooledExchange per exchange, market type, network and account"""
+
+    def __init__(self, factory: Optional[Callable] = None):
+        """
+        Initialize pool
+
+        Args:
+            factory: factory(exchange_id, market_type, testnet, api_key, api_secret) -> client
+        """
+        self.factory = factory or ccxt_exchange
+        self._clients: Dict[Tuple, PooledExchange] = {}
+        self._lock = threading.Lock()
+
+    def get(self, exchange_id: str = 'binance', market_type: str = 'future', testnet: bool = False,
+            api_key: Optional[str] = None, api_secret: Optional[str] = None) -> PooledExchange:
+        key = (exchange_id, market_type, testnet, api_key or None, api_secret if api_key else None)
+        with self._lock:
+            if key not in self._clients:
+                self._clients[key] = PooledExchange(self.factory(*key))
+            return self._clients[key]
+
+    def close(self):
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            client.close()
+
+
+class MT5Terminal:
+    """
+    The process's MetaTrader 5 terminal session
+
+    initialize() is called once and the session is kept; entering the
+    context re-initializes only if the terminal connection was lost, and
+    holds a lock so GUI threads do not interleave calls. Bots use `api`,
+    whose functions take the same lock per call.
+    """
+
+    def __init__(self, mt5=None):
+        self._mt5 = mt5
+        self.lock = threading.RLock()
+        self.connected = False
+        self.initializations = 0
+
+    @property
+    def mt5(self):
+        if self._mt5 is None:
+            import MetaTrader5
+            self._mt5 = MetaTrader5
+        return self._mt5
+
+    @property
+    def api(self) -> 'LockedMT5':
+        """The MetaTrader5 module with each function call made under the lock"""
+        return LockedMT5(self)
+
+    def connect(self) -> bool:
+        """Initialize the terminal unless already connected"""
+        with self.lock:
+            if self.connected and self.mt5.terminal_info() is not None:
+                return True
+            self.connected = bool(self.mt5.initialize())
+            if self.connected:
+                self.initializations += 1
+            return self.connected
+
+    def last_error(self):
+        return self.mt5.last_error()
+
+    def __enter__(self):
+        self.lock.acquire()
+        if not self.connect():
+            error = self.last_error()
+            self.lock.release()
+            raise ConnectionError(f"MT5 initialization failed: {error}")
+        return self.mt5
+
+    def __exit__(self, *exc):
+        self.lock.release()
+
+    def shutdown(self):
+        with self.lock:
+            if self.connected:
+                self.mt5.shutdown()
+                self.connected = False
+
+
+class LockedMT5:
+    """MetaTrader5 module proxy: constants pass through, calls hold the terminal lock"""
+
+    def __init__(self, terminal: MT5Terminal):
+        self._terminal = terminal
+
+    def __getattr__(self, name):
+        value = getattr(self._terminal.mt5, name)
+        if not callable(value):
+            return value
+
+        def call(*args, **kwargs):
+            with self._terminal.lock:
+                return value(*args, **kwargs)
+        return call
+
+
+_POOL = ExchangePool()
+_TERMINAL = MT5Terminal()
+
+
+def exchange_client(exchange_id: str = 'binance', market_type: str = 'future', testnet: bool = False,
+                    api_key: Optional[str] = None, api_secret: Optional[str] = None) -> PooledExchange:
+    """
+    Process-wide ccxt client for an exchange/account
+
+    Args:
+        exchange_id: ccxt exchange id
+        market_type: ccxt defaultType ('future' as in the live bot, or 'spot')
+        testnet: Binance Futures testnet endpoints
+        api_key: Account key, None for public market data
+        api_secret: Account secret
+    """
+    return _POOL.get(exchange_id, market_type, testnet, api_key, api_secret)
+
+
+def mt5_terminal() -> MT5Terminal:
+    """Process-wide MT5 terminal session"""
+    return _TERMINAL
+
+
+def close_all():
+    """Close pooled HTTP sessions and the MT5 session (called at exit)"""
+    _POOL.close()
+    _TERMINAL.shutdown()
+
+
+atexit.register(close_all)
@@ -54,12 +54,12 @@ class Fibonacci1618Strategy(IntradayGoldStrategy):
         print(f"   Fib Level: {fib_extension}")
         print(f"   Aggressive TP (2.618): {use_aggressive_tp}")
 
-    def run_strategy(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _run_pipeline(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Run strategy with Fibonacci TP calculation
         """
         # Run parent strategy first
-        df = super().run_strategy(df)
+        df = super()._run_pipeline(df)
 
         # Recalculate TP using Fibonacci extensions
         df = self._apply_fibonacci_tp(df)
@@ -70,11 +70,9 @@ class Fibonacci1618Strategy(IntradayGoldStrategy):
         """
         Apply Fibonacci 1.618 extension for take profit levels
         """
-        df = df.copy()
-
         signals_modified = 0
 
-        for i in range(len(df)):
+        for i in range(self._signal_start(df), len(df)):
             if df['signal'].iloc[i] == 0:
                 continue
 
@@ -146,11 +144,11 @@ class MultiSignalGoldStrategy(Fibonacci1618Strategy):
 
         print(f"   Mode: MULTI-SIGNAL (OB+FVG+Liquidity+BOS)")
 
-    def run_strategy(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _run_pipeline(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Multi-signal approach: Combine multiple SMC signals
         """
-        df = super().run_strategy(df)
+        df = super()._run_pipeline(df)
 
         # Add BOS (Break of Structure) signals
         df = self._add_bos_signals(df)
@@ -162,8 +160,6 @@ class MultiSignalGoldStrategy(Fibonacci1618Strategy):
         Add BOS signals - breaks of swing high/low
         WITH QUALITY FILTERS (same as main strategy)
         """
-        df = df.copy()
-
         bos_signals = 0
         lookback_window = 20  # Prevent too frequent signals
 
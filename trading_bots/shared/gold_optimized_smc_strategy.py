@@ -12,6 +12,7 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from simplified_smc_strategy import SimplifiedSMCStrategy
 from gold_specific_filters import GoldSpecificFilters, GoldVolatilityAnalyzer
+from indicator_cache import params_key, run_cached
 
 
 class GoldOptimizedSMCStrategy(SimplifiedSMCStrategy):
@@ -65,7 +66,7 @@ class GoldOptimizedSMCStrategy(SimplifiedSMCStrategy):
         print(f"   Min Candle Quality: {min_candle_quality}")
         print(f"   Swing Length: {swing_length}")
 
-    def run_strategy(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _run_pipeline(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Run gold-optimized strategy
 
@@ -80,12 +81,16 @@ class GoldOptimizedSMCStrategy(SimplifiedSMCStrategy):
 
         # Step 1: Apply gold-specific filters first
         print(f"\n1️⃣  Applying gold-specific filters...")
-        df = self.gold_filters.apply_all_gold_filters(df)
-        df = self.gold_volatility.calculate_gold_atr(df, period=14)
+        df = run_cached(self.indicator_cache, df, 'gold_filters', params_key(self.gold_filters),
+                        lambda data: self.gold_filters.apply_all_gold_filters(data, copy=False),
+                        copy=False)
+        df = run_cached(self.indicator_cache, df, 'gold_atr', params_key(self.gold_volatility, 14),
+                        lambda data: self.gold_volatility.calculate_gold_atr(data, period=14, copy=False),
+                        copy=False)
 
         # Step 2: Run base Simplified SMC strategy
         print(f"\n2️⃣  Running Simplified SMC core logic...")
-        df = super().run_strategy(df)
+        df = super()._run_pipeline(df)
 
         # Step 3: Apply gold-specific entry filters
         print(f"\n3️⃣  Applying gold entry filters...")
@@ -115,11 +120,9 @@ class GoldOptimizedSMCStrategy(SimplifiedSMCStrategy):
         3. Range quality (avoid choppy markets)
         4. S/R proximity (bonus for entries near S/R)
         """
-        df = df.copy()
-
         initial_signals = len(df[df['signal'] != 0])
 
-        for i in range(len(df)):
+        for i in range(self._signal_start(df), len(df)):
             if df['signal'].iloc[i] == 0:
                 continue
 
@@ -165,9 +168,7 @@ class GoldOptimizedSMCStrategy(SimplifiedSMCStrategy):
         2. ATR-based stop loss (tighter for gold)
         3. Support/Resistance aware exits
         """
-        df = df.copy()
-
-        for i in range(len(df)):
+        for i in range(self._signal_start(df), len(df)):
             if df['signal'].iloc[i] == 0:
                 continue
 
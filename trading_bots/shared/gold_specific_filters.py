@@ -5,6 +5,7 @@ Gold-Specific Filters and Analysis
 
 import pandas as pd
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 from datetime import time
 from typing import Tuple, Dict
 
@@ -12,10 +13,16 @@ from typing import Tuple, Dict
 class GoldSpecificFilters:
     """Фильтры специфичные для золота"""
 
-    def __init__(self):
+    def __init__(self, causal_sr_levels: bool = False):
+        """
+        Args:
+            causal_sr_levels: S/R уровни видны только после подтверждения
+                (window баров после формирования), как в live боте
+        """
         # Психологические уровни для золота
         self.round_numbers = [1700, 1750, 1800, 1850, 1900, 1950, 2000, 2050, 2100, 2150, 2200]
         self.major_levels = [1800, 1900, 2000, 2100]  # Особо важные
+        self.causal_sr_levels = causal_sr_levels
 
     def detect_session(self, timestamp) -> str:
         """
@@ -54,17 +61,19 @@ class GoldSpecificFilters:
         session = self.detect_session(timestamp)
         return session in ['london', 'overlap', 'ny']
 
-    def add_session_filters(self, df: pd.DataFrame) -> pd.DataFrame:
+    def add_session_filters(self, df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
         """
         Добавить фильтры по торговым сессиям
 
         Args:
             df: DataFrame с timestamp index
+            copy: Копировать df (False = писать колонки прямо в df)
 
         Returns:
             DataFrame с session columns
         """
-        df = df.copy()
+        if copy:
+            df = df.copy()
 
         df['session'] = df.index.map(self.detect_session)
         df['is_active_session'] = df['session'].isin(['london', 'overlap', 'ny'])
@@ -108,34 +117,35 @@ class GoldSpecificFilters:
 
         return details
 
-    def add_round_number_zones(self, df: pd.DataFrame, threshold: float = 10.0) -> pd.DataFrame:
+    def add_round_number_zones(self, df: pd.DataFrame, threshold: float = 10.0,
+                               copy: bool = True) -> pd.DataFrame:
         """
         Добавить зоны круглых чисел
 
         Args:
             df: DataFrame с ценами
             threshold: Порог близости
+            copy: Копировать df (False = писать колонки прямо в df)
 
         Returns:
             DataFrame с зонами
         """
-        df = df.copy()
-
-        df['near_round_number'] = False
-        df['near_major_level'] = False
-        df['closest_round'] = np.nan
-        df['round_distance'] = np.nan
-
-        for i in range(len(df)):
-            price = df['close'].iloc[i]
-            proximity = self.detect_round_number_proximity(price, threshold)
-
-            df.loc[df.index[i], 'near_round_number'] = proximity['near_round']
-            df.loc[df.index[i], 'near_major_level'] = proximity['near_major']
-
-            if proximity['near_round']:
-                df.loc[df.index[i], 'closest_round'] = proximity['closest_level']
-                df.loc[df.index[i], 'round_distance'] = proximity['distance']
+        if copy:
+            df = df.copy()
+
+        # Nearest round level for every close at once (first level wins ties, like min())
+        close = df['close'].to_numpy(dtype=float)
+        levels = np.asarray(self.round_numbers, dtype=float)
+        distances = np.abs(close[:, None] - levels[None, :])
+        closest_idx = np.argmin(distances, axis=1)
+        closest_level = levels[closest_idx]
+        min_distance = distances[np.arange(len(close)), closest_idx]
+
+        near_round = min_distance <= threshold
+        df['near_round_number'] = near_round
+        df['near_major_level'] = near_round & np.isin(closest_level, self.major_levels)
+        df['closest_round'] = np.where(near_round, closest_level, np.nan)
+        df['round_distance'] = np.where(near_round, min_distance, np.nan)
 
         return df
 
@@ -207,71 +217,114 @@ class GoldSpecificFilters:
             'range_bottom': low_low
         }
 
-    def add_range_detection(self, df: pd.DataFrame, lookback: int = 20) -> pd.DataFrame:
+    def add_range_detection(self, df: pd.DataFrame, lookback: int = 20,
+                            copy: bool = True) -> pd.DataFrame:
         """
         Добавить определение range/trend
 
         Args:
             df: DataFrame
             lookback: Период анализа
+            copy: Копировать df (False = писать колонки прямо в df)
 
         Returns:
             DataFrame с range detection
         """
-        df = df.copy()
-
-        df['market_type'] = 'unknown'
-        df['in_range'] = False
-        df['range_quality'] = 0.0
-        df['position_in_range'] = 0.5
-
-        for i in range(lookback, len(df)):
-            analysis = self.detect_range_market(df, i, lookback)
-
-            df.loc[df.index[i], 'market_type'] = analysis['market_type']
-            df.loc[df.index[i], 'in_range'] = analysis['market_type'] in ['range', 'tight_range']
-            df.loc[df.index[i], 'range_quality'] = analysis['range_quality']
-            df.loc[df.index[i], 'position_in_range'] = analysis['position_in_range']
+        if copy:
+            df = df.copy()
+        n = len(df)
+        window = lookback + 1  # detect_range_market uses bars idx-lookback .. idx
+
+        market_type = np.full(n, 'unknown', dtype=object)
+        range_quality = np.zeros(n)
+        position_in_range = np.full(n, 0.5)
+
+        if n > lookback:
+            high = df['high'].to_numpy(dtype=float)
+            low = df['low'].to_numpy(dtype=float)
+            close = df['close'].to_numpy(dtype=float)
+
+            # Rolling range metrics for every full window at once
+            high_high = sliding_window_view(high, window).max(axis=1)
+            low_low = sliding_window_view(low, window).min(axis=1)
+            close_windows = sliding_window_view(close, window)
+            avg_price = close_windows.mean(axis=1)
+            range_size = high_high - low_low
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                range_pct = (range_size / avg_price) * 100
+                position = np.where(range_size > 0, (close[lookback:] - low_low) / range_size, 0.5)
+
+                # Closed-form OLS slope: sum((x - x_mean) * y) / sum((x - x_mean)^2)
+                x_centered = np.arange(window) - (window - 1) / 2
+                slope = close_windows @ (x_centered / np.dot(x_centered, x_centered))
+                trend_strength = np.abs(slope) / avg_price * 100  # % per bar
+
+            # Same classification thresholds as detect_range_market
+            conditions = [
+                (range_pct < 2.0) & (trend_strength < 0.5),
+                (range_pct < 3.5) & (trend_strength < 0.8),
+                trend_strength > 1.5,
+                trend_strength > 0.8,
+            ]
+            market_type[lookback:] = np.select(
+                conditions, ['tight_range', 'range', 'strong_trend', 'weak_trend'], 'unclear'
+            )
+            range_quality[lookback:] = np.select(conditions, [0.8, 0.6, 0.2, 0.4], 0.5)
+            position_in_range[lookback:] = position
+
+        df['market_type'] = market_type
+        df['in_range'] = np.isin(market_type, ['range', 'tight_range'])
+        df['range_quality'] = range_quality
+        df['position_in_range'] = position_in_range
 
         return df
 
-    def detect_support_resistance(self, df: pd.DataFrame, window: int = 50) -> pd.DataFrame:
+    def detect_support_resistance(self, df: pd.DataFrame, window: int = 50,
+                                  causal: bool = False, copy: bool = True) -> pd.DataFrame:
         """
         Определить Support/Resistance зоны
 
         Золото хорошо уважает S/R уровни
 
+        Уровень - это high/low, равный экстремуму окна ±window баров. Экстремумы
+        считаются через rolling max/min (O(n)). Уровень на баре i подтверждается
+        только на баре i + window, поэтому при causal=True recent_resistance /
+        recent_support обновляются с этой задержкой и не смотрят в будущее.
+        is_resistance / is_support всегда отмечают бар формирования.
+
         Args:
             df: DataFrame с ценами
             window: Окно для поиска
+            causal: Показывать уровни только после подтверждения
+            copy: Копировать df (False = писать колонки прямо в df)
 
         Returns:
             DataFrame с S/R зонами
         """
-        df = df.copy()
+        if copy:
+            df = df.copy()
+        n = len(df)
+        span = 2 * window + 1
 
         # Find swing highs and lows for S/R
-        df['is_resistance'] = False
-        df['is_support'] = False
-        df['resistance_level'] = np.nan
-        df['support_level'] = np.nan
-
-        for i in range(window, len(df) - window):
-            # Resistance: local high
-            local_window = df['high'].iloc[i-window:i+window+1]
-            if df['high'].iloc[i] == local_window.max():
-                df.loc[df.index[i], 'is_resistance'] = True
-                df.loc[df.index[i], 'resistance_level'] = df['high'].iloc[i]
-
-            # Support: local low
-            local_window = df['low'].iloc[i-window:i+window+1]
-            if df['low'].iloc[i] == local_window.min():
-                df.loc[df.index[i], 'is_support'] = True
-                df.loc[df.index[i], 'support_level'] = df['low'].iloc[i]
+        high = df['high']
+        low = df['low']
+        valid = np.zeros(n, dtype=bool)
+        valid[window:max(n - window, window)] = True
+
+        is_resistance = valid & (high == high.rolling(span, center=True, min_periods=1).max()).to_numpy()
+        is_support = valid & (low == low.rolling(span, center=True, min_periods=1).min()).to_numpy()
+
+        df['is_resistance'] = is_resistance
+        df['is_support'] = is_support
+        df['resistance_level'] = high.where(is_resistance).astype(float)
+        df['support_level'] = low.where(is_support).astype(float)
 
         # Forward fill recent levels
-        df['recent_resistance'] = df['resistance_level'].ffill()
-        df['recent_support'] = df['support_level'].ffill()
+        delay = window if causal else 0
+        df['recent_resistance'] = df['resistance_level'].shift(delay).ffill()
+        df['recent_support'] = df['support_level'].shift(delay).ffill()
 
         return df
 
@@ -314,27 +367,28 @@ class GoldSpecificFilters:
 
         return details
 
-    def apply_all_gold_filters(self, df: pd.DataFrame) -> pd.DataFrame:
+    def apply_all_gold_filters(self, df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
         """
         Применить все фильтры для золота
 
         Args:
             df: DataFrame с OHLCV
+            copy: Копировать df (False = писать колонки прямо в df)
 
         Returns:
             DataFrame со всеми фильтрами
         """
-        # Session filters
-        df = self.add_session_filters(df)
+        # One copy for the whole chain, every filter writes into it
+        df = self.add_session_filters(df, copy=copy)
 
         # Round numbers
-        df = self.add_round_number_zones(df, threshold=10.0)
+        df = self.add_round_number_zones(df, threshold=10.0, copy=False)
 
         # Range detection
-        df = self.add_range_detection(df, lookback=20)
+        df = self.add_range_detection(df, lookback=20, copy=False)
 
         # Support/Resistance
-        df = self.detect_support_resistance(df, window=30)
+        df = self.detect_support_resistance(df, window=30, causal=self.causal_sr_levels, copy=False)
 
         return df
 
@@ -345,18 +399,21 @@ class GoldVolatilityAnalyzer:
     def __init__(self):
         pass
 
-    def calculate_gold_atr(self, df: pd.DataFrame, period: int = 14) -> pd.DataFrame:
+    def calculate_gold_atr(self, df: pd.DataFrame, period: int = 14,
+                           copy: bool = True) -> pd.DataFrame:
         """
         ATR оптимизированный для золота
 
         Args:
             df: DataFrame
             period: Период ATR
+            copy: Копировать df (False = писать колонки прямо в df)
 
         Returns:
             DataFrame с ATR
         """
-        df = df.copy()
+        if copy:
+            df = df.copy()
 
         # True Range
         df['h_l'] = df['high'] - df['low']
@@ -0,0 +1,429 @@
+"""
+Market Data Store
+Локальное колоночное хранилище OHLCV (memory-mapped NumPy) по символу/таймфрейму
+с импортом CSV из MT5 и быстрым чтением диапазонов без копирования
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Store location (override with SMC_DATA_STORE)
+DEFAULT_ROOT = os.environ.get(
+    'SMC_DATA_STORE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'market_data')
+)
+
+# Dataset holding cached copies of individual CSV files (see load_csv_cached)
+CSV_CACHE_SYMBOL = '_csv'
+
+# Canonical timeframe names by bar length in minutes
+TIMEFRAMES = {1: 'M1', 5: 'M5', 15: 'M15', 30: 'M30', 60: 'H1', 240: 'H4', 1440: 'D1', 10080: 'W1'}
+
+# Weekly bars open on Monday
+WEEK_ORIGIN_NS = pd.Timestamp('1970-01-05').value
+
+# Column names of MT5 exports without a header, by number of fields
+HEADERLESS_COLUMNS = {
+    5: ['datetime', 'open', 'high', 'low', 'close'],
+    6: ['datetime', 'open', 'high', 'low', 'close', 'volume'],
+    7: ['datetime', 'open', 'high', 'low', 'close', 'volume', 'real_volume'],
+    8: ['datetime', 'open', 'high', 'low', 'close', 'volume', 'real_volume', 'spread'],
+}
+
+# Header aliases (MT5 terminal export, MT5 API, other tools)
+COLUMN_ALIASES = {
+    'timestamp': 'datetime', 'time': 'datetime', 'date': 'datetime',
+    'tickvol': 'volume', 'tick_volume': 'volume',
+    'vol': 'real_volume',
+}
+
+
+def normalize_timeframe(timeframe: str) -> str:
+    """'1h' / '60' / 'H1' / 'h1' -> 'H1'"""
+    tf = str(timeframe).strip().upper()
+    if tf in TIMEFRAMES.values():
+        return tf
+    match = re.fullmatch(r'(\d+)\s*(M|MIN|H|D|W)?', tf) or re.fullmatch(r'(M|H|D|W)(\d+)', tf)
+    if not match:
+        raise ValueError(f"Unknown timeframe '{timeframe}'")
+    if match.group(1).isdigit():
+        count, unit = int(match.group(1)), match.group(2) or 'M'
+    else:
+        unit, count = match.group(1), int(match.group(2))
+    minutes = count * {'M': 1, 'MIN': 1, 'H': 60, 'D': 1440, 'W': 10080}[unit]
+    return TIMEFRAMES.get(minutes, f'M{minutes}')
+
+
+def timeframe_ns(timeframe: str) -> int:
+    """Bar length of a timeframe ('H1', '1h', ...) in nanoseconds"""
+    tf = normalize_timeframe(timeframe)
+    minutes = {'M': 1, 'H': 60, 'D': 1440, 'W': 10080}[tf[0]] * int(tf[1:])
+    return minutes * 60_000_000_000
+
+
+def timeframe_origin(timeframe: str) -> int:
+    """Bar grid origin in ns: weekly bars open on Monday (1970-01-05), the rest at the epoch"""
+    return WEEK_ORIGIN_NS if normalize_timeframe(timeframe).startswith('W') else 0
+
+
+def infer_timeframe(index: pd.DatetimeIndex) -> str:
+    """Timeframe from the most common bar spacing"""
+    if len(index) < 2:
+        raise ValueError("Cannot infer the timeframe of fewer than 2 bars")
+    minutes = int(pd.Series(np.diff(index.asi8)).mode().iloc[0] // 60_000_000_000)
+    return TIMEFRAMES.get(minutes, f'M{minutes}')
+
+
+def _sniff_encoding(path: str) -> str:
+    with open(path, 'rb') as f:
+        head = f.read(4)
+    if head[:2] in (b'\xff\xfe', b'\xfe\xff'):
+        return 'utf-16'
+    if head[:3] == b'\xef\xbb\xbf':
+        return 'utf-8-sig'
+    return 'utf-8'
+
+
+def _parse_times(values: pd.Series) -> pd.DatetimeIndex:
+    """MT5 'YYYY.MM.DD HH:MM[:SS]' or ISO timestamps (timezone-aware -> naive UTC)"""
+    sample = str(values.iloc[0]).strip()
+    if re.match(r'^\d{4}\.\d{2}\.\d{2}', sample):
+        fmt = '%Y.%m.%d %H:%M:%S' if sample.count(':') == 2 else '%Y.%m.%d %H:%M'
+        if ' ' not in sample:
+            fmt = '%Y.%m.%d'
+        times = pd.to_datetime(values, format=fmt)
+    else:
+        times = pd.to_datetime(values)
+    if times.dt.tz is not None:
+        times = times.dt.tz_convert('UTC').dt.tz_localize(None)
+    return pd.DatetimeIndex(times).as_unit('ns')
+
+
+def read_mt5_csv(path: str) -> pd.DataFrame:
+    """
+    Parse the CSV formats used for historical data in this repo
+
+    Handles UTF-8 / UTF-16 files, MT5 'YYYY.MM.DD HH:MM' and ISO stamps,
+    files with and without a header, headers with fewer names than fields
+    (MT5 exports with an extra volume column) and the tab separated
+    <DATE> <TIME> <OPEN> ... terminal export.
+
+    Args:
+        path: CSV file
+
+    Returns:
+        DataFrame indexed by 'datetime' with open/high/low/close and volume
+        columns (float64 prices), sorted, without duplicate bars
+    """
+    encoding = _sniff_encoding(path)
+    with open(path, encoding=encoding) as f:
+        first = f.readline().strip()
+        second = f.readline().strip()
+    sep = '\t' if '\t' in first else ','
+    fields = len(second.split(sep)) if second else len(first.split(sep))
+
+    if re.match(r'^\d', first):  # no header
+        if fields not in HEADERLESS_COLUMNS:
+            raise ValueError(f"{path}: unknown headerless format with {fields} fields")
+        names = HEADERLESS_COLUMNS[fields]
+        df = pd.read_csv(path, encoding=encoding, sep=sep, header=None, names=names)
+    else:
+        names = [n.strip().strip('<>').lower() for n in first.split(sep)]
+        names = [COLUMN_ALIASES.get(n, n) for n in names]
+        if len(names) < fields:
+            extra = HEADERLESS_COLUMNS.get(fields, [])[len(names):]
+            names += extra or [f'extra_{k}' for k in range(fields - len(names))]
+        df = pd.read_csv(path, encoding=encoding, sep=sep, header=0, names=names, index_col=False)
+
+    if 'datetime' not in df.columns:
+        raise ValueError(f"{path}: no date/time column in {list(df.columns)}")
+    stamps = df['datetime'].astype(str)
+    if 'time' in df.columns:  # <DATE> and <TIME> in separate columns
+        stamps = stamps + ' ' + df['time'].astype(str)
+        df = df.drop(columns='time')
+
+    df.index = _parse_times(stamps).rename('datetime')
+    df = df.drop(columns='datetime')
+    for col in ('open', 'high', 'low', 'close'):
+        df[col] = df[col].astype(np.float64)
+
+    df = df[~df.index.duplicated(keep='last')].sort_index()
+    return df
+
+
+class MarketDataStore:
+    """
+    Columnar OHLCV store on disk
+
+    Layout: <root>/<SYMBOL>/<TF>/meta.json plus one .npy file per column in a
+    version directory (<root>/<SYMBOL>/<TF>/v<N>/datetime.npy, open.npy, ...).
+    Each column is one contiguous array sorted by time, so a range read is a
+    binary search on the time column and a slice of memory-mapped arrays:
+    no parsing and no copy. meta.json also keeps the rows per month.
+
+    Writes merge the new bars with the stored ones into a new version
+    directory and then switch meta.json to it. Frames that are still mapped
+    keep reading the old version, which is removed once nothing holds it.
+    """
+
+    def __init__(self, root: str = DEFAULT_ROOT):
+        """
+        Initialize store
+
+        Args:
+            root: Store directory (created on first write)
+        """
+        self.root = root
+
+    @staticmethod
+    def _key(symbol: str, timeframe: str):
+        """Canonical (SYMBOL, TF); cached CSV datasets keep their own names"""
+        symbol = symbol.upper()
+        if symbol == CSV_CACHE_SYMBOL.upper():
+            return symbol, timeframe
+        return symbol, normalize_timeframe(timeframe)
+
+    def _dir(self, symbol: str, timeframe: str) -> str:
+        return os.path.join(self.root, *self._key(symbol, timeframe))
+
+    def _meta(self, symbol: str, timeframe: str) -> Optional[Dict]:
+        path = os.path.join(self._dir(symbol, timeframe), 'meta.json')
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def datasets(self) -> List[Dict]:
+        """Summary (symbol, timeframe, rows, first, last) of every stored dataset"""
+        result = []
+        if not os.path.isdir(self.root):
+            return result
+        for symbol in sorted(os.listdir(self.root)):
+            symbol_dir = os.path.join(self.root, symbol)
+            if not os.path.isdir(symbol_dir):
+                continue
+            for timeframe in sorted(os.listdir(symbol_dir)):
+                meta = self._meta(symbol, timeframe)
+                if meta:
+                    result.append({k: meta[k] for k in ('symbol', 'timeframe', 'rows', 'first', 'last')})
+        return result
+
+    def info(self, symbol: str, timeframe: str) -> Optional[Dict]:
+        """Metadata of one dataset (None if not stored)"""
+        return self._meta(symbol, timeframe)
+
+    def _write_meta(self, meta: Dict):
+        dataset_dir = self._dir(meta['symbol'], meta['timeframe'])
+        tmp = os.path.join(dataset_dir, 'meta.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp, os.path.join(dataset_dir, 'meta.json'))
+
+    def update_source(self, symbol: str, timeframe: str, source: Dict) -> Dict:
+        """Replace the extra metadata of a stored dataset without rewriting its bars"""
+        meta = self._meta(symbol, timeframe)
+        if meta is None:
+            raise FileNotFoundError(f"No {timeframe} data for {symbol} in {self.root}")
+        meta['source'] = source
+        self._write_meta(meta)
+        return meta
+
+    def write(self, symbol: str, timeframe: str, df: pd.DataFrame, replace: bool = False,
+              source: Optional[Dict] = None) -> Dict:
+        """
+        Store bars
+
+        Args:
+            symbol: Symbol name (e.g. 'XAUUSD')
+            timeframe: Timeframe ('H1', '1h', ...)
+            df: DataFrame with DatetimeIndex and numeric columns
+            replace: Replace the dataset instead of merging (new bars win on overlap)
+            source: Extra metadata stored with the dataset
+
+        Returns:
+            Updated metadata
+        """
+        symbol, timeframe = self._key(symbol, timeframe)
+        dataset_dir = self._dir(symbol, timeframe)
+        meta = self._meta(symbol, timeframe)
+
+        df = df[[c for c in df.columns if df[c].dtype.kind in 'biuf']]
+        df = df.set_axis(pd.DatetimeIndex(df.index).as_unit('ns').rename('datetime'), axis=0)
+        if meta is not None and not replace:
+            stored = self.load(symbol, timeframe, copy=True)
+            df = pd.concat([stored, df])
+        df = df[~df.index.duplicated(keep='last')].sort_index()
+
+        version = (meta['version'] + 1) if meta else 1
+        version_dir = os.path.join(dataset_dir, f'v{version}')
+        os.makedirs(version_dir, exist_ok=True)
+        np.save(os.path.join(version_dir, 'datetime.npy'), df.index.asi8)
+        columns = {}
+        for col in df.columns:
+            values = df[col].to_numpy()
+            if values.dtype.kind == 'i' or (values.dtype.kind == 'f' and col not in ('open', 'high', 'low', 'close')
+                                            and np.isfinite(values).all() and (values == np.round(values)).all()):
+                values = values.astype(np.int64)
+            np.save(os.path.join(version_dir, f'{col}.npy'), values)
+            columns[col] = values.dtype.str
+
+        months = df.index.to_period('M').value_counts().sort_index()
+        new_meta = {
+            'symbol': symbol,
+            'timeframe': timeframe,
+            'version': version,
+            'rows': len(df),
+            'first': str(df.index[0]) if len(df) else None,
+            'last': str(df.index[-1]) if len(df) else None,
+            'columns': columns,
+            'months': {str(m): int(n) for m, n in months.items()},
+            'source': source if source is not None else (meta or {}).get('source'),
+        }
+        self._write_meta(new_meta)
+
+        self._remove_old_versions(dataset_dir, version)
+        return new_meta
+
+    @staticmethod
+    def _remove_old_versions(dataset_dir: str, current: int):
+        for name in os.listdir(dataset_dir):
+            if name.startswith('v') and name[1:].isdigit() and int(name[1:]) < current:
+                # Still mapped somewhere (Windows) - removed by a later write
+                shutil.rmtree(os.path.join(dataset_dir, name), ignore_errors=True)
+
+    def load(self, symbol: str, timeframe: str, start=None, end=None,
+             columns: Optional[Sequence[str]] = None, copy: bool = False) -> pd.DataFrame:
+        """
+        Read a time range
+
+        Args:
+            symbol: Symbol name
+            timeframe: Timeframe
+            start: First bar time (inclusive, default: first stored)
+            end: Last bar time (inclusive, default: last stored)
+            columns: Columns to read (default: all)
+            copy: Read the range into memory instead of mapping it
+
+        Returns:
+            DataFrame indexed by 'datetime'
+        """
+        meta = self._meta(symbol, timeframe)
+        if meta is None:
+            symbol, timeframe = self._key(symbol, timeframe)
+            raise FileNotFoundError(f"No {timeframe} data for {symbol} in {self.root}")
+        version_dir = os.path.join(self._dir(symbol, timeframe), f"v{meta['version']}")
+
+        times = np.load(os.path.join(version_dir, 'datetime.npy'), mmap_mode='r')
+        lo = 0 if start is None else int(np.searchsorted(times, pd.Timestamp(start).as_unit('ns').value, 'left'))
+        hi = len(times) if end is None else int(np.searchsorted(times, pd.Timestamp(end).as_unit('ns').value, 'right'))
+
+        data = {}
+        for col in (list(meta['columns']) if columns is None else columns):
+            # 'c': private copy-on-write pages, edits never reach the file
+            values = np.load(os.path.join(version_dir, f'{col}.npy'), mmap_mode='c')[lo:hi]
+            data[col] = np.array(values) if copy else values.view(np.ndarray)
+
+        index_values = np.array(times[lo:hi]) if copy else times[lo:hi].view(np.ndarray)
+        index = pd.DatetimeIndex(index_values.view('datetime64[ns]'), copy=False, name='datetime')
+        return pd.DataFrame(data, index=index, copy=False)
+
+    def import_csv(self, path: str, symbol: Optional[str] = None, timeframe: Optional[str] = None) -> Dict:
+        """
+        Merge a CSV file into the store
+
+        Args:
+            path: CSV file (any format read_mt5_csv understands)
+            symbol: Symbol (default: file name up to the first '_', e.g. XAUUSD_1H_MT5.csv -> XAUUSD)
+            timeframe: Timeframe (default: inferred from the bar spacing)
+
+        Returns:
+            Updated metadata
+        """
+        df = read_mt5_csv(path)
+        symbol = symbol or os.path.basename(path).split('_')[0].split('.')[0]
+        timeframe = timeframe or infer_timeframe(df.index)
+        return self.write(symbol, timeframe, df)
+
+
+def _csv_dataset(path: str) -> str:
+    """Dataset name of a cached CSV file (file name + hash of the absolute path)"""
+    path = os.path.abspath(path)
+    stem = re.sub(r'[^A-Za-z0-9]+', '_', os.path.splitext(os.path.basename(path))[0]).upper()
+    return f"{stem}_{hashlib.sha1(path.encode()).hexdigest()[:8].upper()}"
+
+
+def load_csv_cached(path: str, store: Optional[MarketDataStore] = None) -> pd.DataFrame:
+    """
+    Read a CSV through the store
+
+    The first call parses the file (read_mt5_csv) and stores it; later calls
+    memory-map the stored columns as long as the file's size and
+    modification time are unchanged.
+
+    Args:
+        path: CSV file
+        store: Store to use (default: DEFAULT_ROOT)
+
+    Returns:
+        DataFrame indexed by 'datetime'
+    """
+    store = store or MarketDataStore()
+    dataset = _csv_dataset(path)
+    stat = os.stat(path)
+    source = {'path': os.path.abspath(path), 'size': stat.st_size, 'mtime': stat.st_mtime}
+
+    meta = store.info(CSV_CACHE_SYMBOL, dataset)
+    if meta is None or meta.get('source') != source:
+        store.write(CSV_CACHE_SYMBOL, dataset, read_mt5_csv(path), replace=True, source=source)
+    return store.load(CSV_CACHE_SYMBOL, dataset)
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description='Local OHLCV store')
+    parser.add_argument('--root', type=str, default=DEFAULT_ROOT, help='Store directory')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    import_cmd = commands.add_parser('import', help='Import CSV files')
+    import_cmd.add_argument('files', nargs='+', help='CSV files')
+    import_cmd.add_argument('--symbol', type=str, help='Symbol (default: from the file name)')
+    import_cmd.add_argument('--timeframe', type=str, help='Timeframe (default: from the bar spacing)')
+
+    commands.add_parser('list', help='List stored datasets')
+
+    show_cmd = commands.add_parser('show', help='Show a dataset')
+    show_cmd.add_argument('symbol')
+    show_cmd.add_argument('timeframe')
+    args = parser.parse_args()
+
+    store = MarketDataStore(args.root)
+    if args.command == 'import':
+        for path in args.files:
+            meta = store.import_csv(path, args.symbol, args.timeframe)
+            print(f"✅ {path} -> {meta['symbol']} {meta['timeframe']}: {meta['rows']} bars "
+                  f"({meta['first']} → {meta['last']})")
+    elif args.command == 'list':
+        datasets = [d for d in store.datasets() if d['symbol'] != CSV_CACHE_SYMBOL.upper()]
+        if not datasets:
+            print(f"No datasets in {store.root}")
+        for d in datasets:
+            print(f"  {d['symbol']:<10} {d['timeframe']:<4} {d['rows']:>9} bars  {d['first']} → {d['last']}")
+    else:
+        meta = store.info(args.symbol, args.timeframe)
+        if meta is None:
+            print(f"No {args.timeframe} data for {args.symbol}")
+            return
+        print(f"{meta['symbol']} {meta['timeframe']}: {meta['rows']} bars, columns {list(meta['columns'])}")
+        for month, rows in meta['months'].items():
+            print(f"  {month}: {rows}")
+
+
+if __name__ == "__main__":
+    main()
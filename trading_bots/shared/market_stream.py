@@ -0,0 +1,421 @@
+"""
+Market Stream
+Цены и свечи Binance через WebSocket (kline + bookTicker) вместо опроса REST:
+обновления приходят сразу, после переподключения пропущенные свечи дозагружаются
+"""
+
+import asyncio
+import dataclasses
+import json
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from candle_repository import CcxtCandleSource, exchange_repository
+from market_data_store import timeframe_ns
+
+try:
+    import websockets
+    WEBSOCKETS_AVAILABLE = True
+except ImportError:
+    WEBSOCKETS_AVAILABLE = False
+
+# Combined stream endpoints by (market type, testnet)
+STREAM_URLS = {
+    ('future', False): 'wss://fstream.binance.com/stream',
+    ('future', True): 'wss://stream.binancefuture.com/stream',
+    ('spot', False): 'wss://stream.binance.com:9443/stream',
+    ('spot', True): 'wss://testnet.binance.vision/stream',
+}
+
+
+@dataclass
+class Tick:
+    """Best bid/ask update"""
+    symbol: str
+    bid: float
+    ask: float
+    time: float  # seconds since epoch
+    last: Optional[float] = None  # last trade price (symbols streamed with last_price)
+
+    @property
+    def mid(self) -> float:
+        return (self.bid + self.ask) / 2
+
+
+@dataclass
+class Bar:
+    """Kline update; closed=False while the candle is still forming"""
+    symbol: str
+    timeframe: str
+    time: pd.Timestamp  # open time
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+    closed: bool
+
+
+def stream_symbol(symbol: str) -> str:
+    """'BTC/USDT' / 'BTC/USDT:USDT' -> 'btcusdt'"""
+    return symbol.split(':')[0].replace('/', '').lower()
+
+
+@dataclass(eq=False)
+class Subscription:
+    symbol: str
+    timeframe: Optional[str]
+    on_tick: Optional[Callable[[Tick], None]]
+    on_bar: Optional[Callable[[Bar], None]]
+    last_price: bool = False
+
+    @property
+    def streams(self) -> List[str]:
+        name = stream_symbol(self.symbol)
+        streams = [f'{name}@bookTicker']
+        if self.timeframe:
+            streams.append(f'{name}@kline_{CcxtCandleSource.exchange_timeframe(self.timeframe)}')
+        if self.last_price:
+            streams.append(f'{name}@miniTicker')
+        return streams
+
+
+class BinanceMarketStream:
+    """
+    Binance bookTicker + kline streams over one combined WebSocket connection
+
+    Last trade prices (the ticker 'last' of the REST API) come from the
+    miniTicker stream, opened only for subscriptions that ask for them.
+
+    Callbacks run on the stream's event loop thread and must return quickly
+    (hand heavy work such as order placement to another thread). Closed bars
+    missed while disconnected are fetched over REST after reconnecting and
+    delivered in order before live updates resume.
+
+    Usage:
+        stream = BinanceMarketStream()
+        stream.start()                                            # background thread
+        sub = stream.subscribe('BTC/USDT', '1h', on_tick=..., on_bar=...)
+        stream.tick('BTC/USDT').mid                               # latest bid/ask mid
+        stream.price('ETH/USDT')                                  # last trade price
+        stream.bar('BTC/USDT', '1h').high                         # forming candle
+        stream.unsubscribe(sub)
+        stream.stop()
+    """
+
+    def __init__(self, market_type: str = 'future', testnet: bool = False, url: Optional[str] = None,
+                 connect=None, backfill: Optional[Callable] = None, reconnect_delay: float = 1.0,
+                 max_reconnect_delay: float = 60.0, stale_after: float = 60.0,
+                 clock: Callable[[], float] = time.time):
+        """
+        Initialize stream
+
+        Args:
+            market_type: 'future' or 'spot'
+            testnet: Use the testnet endpoint
+            url: Combined stream endpoint (default: STREAM_URLS)
+            connect: async connect(url) -> connection with send/recv/close (default: websockets.connect)
+            backfill: backfill(symbol, timeframe, start) -> OHLCV DataFrame, blocking (None: no backfill)
+            reconnect_delay: First reconnect delay in seconds (doubles up to max_reconnect_delay)
+            max_reconnect_delay: Longest reconnect delay
+            stale_after: Reconnect if no message arrives for this many seconds
+            clock: Current time in seconds (tests)
+        """
+        self.url = url or STREAM_URLS[(market_type, testnet)]
+        self._connect = connect or (websockets.connect if WEBSOCKETS_AVAILABLE else None)
+        if self._connect is None:
+            raise ImportError("websockets is required for streaming: pip install websockets")
+        self.backfill = backfill
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.stale_after = stale_after
+        self.clock = clock
+
+        self.subscriptions: List[Subscription] = []
+        self.ticks: Dict[str, Tick] = {}
+        self.last_prices: Dict[str, float] = {}
+        self.bars: Dict[Tuple[str, str], Bar] = {}
+        self.last_closed: Dict[Tuple[str, str], pd.Timestamp] = {}
+        self._symbols: Dict[str, str] = {}  # 'btcusdt' -> 'BTC/USDT'
+        self.connects = 0
+        self.messages = 0
+        self.backfilled = 0
+
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._ws = None
+        self._changed: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._request_id = 0
+
+    # ------------------------------------------------------------------
+    # Thread-safe API
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """Run the stream in a background thread"""
+        if self._thread is not None:
+            return
+        self.loop = asyncio.new_event_loop()
+        self._stopping = False
+        self._thread = threading.Thread(target=self.loop.run_until_complete, args=(self.run(),),
+                                        name='market-stream', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5):
+        """Close the connection and stop the thread"""
+        if self._thread is None:
+            return
+        self._stopping = True
+        self.loop.call_soon_threadsafe(self._wake)
+        if self._ws is not None:
+            asyncio.run_coroutine_threadsafe(self._ws.close(), self.loop)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def subscribe(self, symbol: str, timeframe: Optional[str] = None,
+                  on_tick: Optional[Callable[[Tick], None]] = None,
+                  on_bar: Optional[Callable[[Bar], None]] = None, last_price: bool = False) -> Subscription:
+        """
+        Subscribe to bid/ask updates (and klines if timeframe is given)
+
+        Args:
+            symbol: ccxt symbol ('BTC/USDT')
+            timeframe: Kline timeframe ('1h'), None for prices only
+            on_tick: Called with every Tick of the symbol
+            on_bar: Called with every closed Bar (including backfilled ones)
+            last_price: Also stream the last trade price (Tick.last, price())
+        """
+        subscription = Subscription(symbol, timeframe, on_tick, on_bar, last_price)
+        with self._lock:
+            new = [s for s in subscription.streams if s not in self.streams()]
+            self.subscriptions.append(subscription)
+            self._symbols.setdefault(stream_symbol(symbol), symbol)
+        if new and self.loop is not None:
+            self.loop.call_soon_threadsafe(self._send_subscribe, new)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """Remove callbacks (the streams stay open until the next reconnect)"""
+        with self._lock:
+            if subscription in self.subscriptions:
+                self.subscriptions.remove(subscription)
+
+    def streams(self) -> List[str]:
+        """Stream names of all subscriptions"""
+        names = []
+        for subscription in self.subscriptions:
+            names.extend(s for s in subscription.streams if s not in names)
+        return names
+
+    def tick(self, symbol: str) -> Optional[Tick]:
+        """Latest bid/ask of a symbol"""
+        return self.ticks.get(stream_symbol(symbol))
+
+    def price(self, symbol: str) -> Optional[float]:
+        """Last trade price; starts streaming it on first use (None until its first update)"""
+        name = stream_symbol(symbol)
+        last = self.last_prices.get(name)
+        if last is None:
+            with self._lock:
+                streamed = f'{name}@miniTicker' in self.streams()
+            if not streamed:
+                self.subscribe(symbol, last_price=True)
+        return last
+
+    def bar(self, symbol: str, timeframe: str) -> Optional[Bar]:
+        """Latest kline (usually the forming candle)"""
+        return self.bars.get((stream_symbol(symbol), CcxtCandleSource.exchange_timeframe(timeframe)))
+
+    @property
+    def connected(self) -> bool:
+        return self._ws is not None
+
+    # ------------------------------------------------------------------
+    # Event loop
+    # ------------------------------------------------------------------
+
+    def _wake(self):
+        if self._changed is not None:
+            self._changed.set()
+
+    def _send_subscribe(self, streams: List[str]):
+        self._wake()
+        if self._ws is not None:
+            self._request_id += 1
+            message = json.dumps({'method': 'SUBSCRIBE', 'params': streams, 'id': self._request_id})
+            asyncio.ensure_future(self._ws.send(message))
+
+    async def run(self):
+        """Connect, dispatch messages, reconnect with backoff until stop()"""
+        self._changed = asyncio.Event()
+        delay = self.reconnect_delay
+        while not self._stopping:
+            with self._lock:
+                streams = self.streams()
+            if not streams:
+                self._changed.clear()
+                await self._changed.wait()
+                continue
+
+            try:
+                ws = await self._connect(f"{self.url}?streams={'/'.join(streams)}")
+            except Exception as e:
+                print(f"⚠️  Market stream connect failed: {e} - retrying in {delay:.0f}s")
+                await self._pause(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+                continue
+
+            self._ws = ws
+            self.connects += 1
+            try:
+                with self._lock:
+                    added = [name for name in self.streams() if name not in streams]
+                if added:  # subscribed while connecting
+                    self._send_subscribe(added)
+                if self.connects > 1:
+                    await self._backfill()
+                while not self._stopping:
+                    message = await asyncio.wait_for(ws.recv(), timeout=self.stale_after)
+                    self._dispatch(message)
+                    delay = self.reconnect_delay
+            except Exception as e:
+                if not self._stopping:
+                    print(f"⚠️  Market stream disconnected: {e!r} - reconnecting in {delay:.0f}s")
+            finally:
+                self._ws = None
+                try:
+                    await ws.close()
+                except Exception:
+                    pass
+            if not self._stopping:
+                await self._pause(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def _pause(self, seconds: float):
+        """Reconnect delay, cut short by stop() or a new subscription"""
+        self._changed.clear()
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    def _subscribers(self, name: str) -> List[Subscription]:
+        with self._lock:
+            return [s for s in self.subscriptions if stream_symbol(s.symbol) == name]
+
+    def _dispatch(self, raw):
+        message = json.loads(raw)
+        data = message.get('data')
+        if data is None:  # SUBSCRIBE acknowledgement
+            return
+        self.messages += 1
+        name, _, kind = message['stream'].partition('@')
+
+        if kind == 'bookTicker':
+            event_time = data.get('T') or data.get('E')
+            tick = Tick(self._symbols.get(name, name), float(data['b']), float(data['a']),
+                        event_time / 1000 if event_time else self.clock(), self.last_prices.get(name))
+            self.ticks[name] = tick
+            for subscription in self._subscribers(name):
+                if subscription.on_tick is not None:
+                    self._call(subscription.on_tick, tick)
+
+        elif kind.startswith('kline_'):
+            k = data['k']
+            timeframe = kind[len('kline_'):]
+            bar = Bar(self._symbols.get(name, name), timeframe, pd.Timestamp(k['t'], unit='ms'), float(k['o']), float(k['h']),
+                      float(k['l']), float(k['c']), float(k['v']), bool(k['x']))
+            self.bars[(name, timeframe)] = bar
+            if bar.closed:
+                self._closed(name, timeframe, bar)
+
+        elif kind == 'miniTicker':
+            # Close of the rolling 24h ticker = last trade price; reaches on_tick with the next bid/ask
+            self.last_prices[name] = float(data['c'])
+            if name in self.ticks:
+                self.ticks[name] = dataclasses.replace(self.ticks[name], last=self.last_prices[name])
+
+    def _closed(self, name: str, timeframe: str, bar: Bar):
+        """Deliver a closed bar once"""
+        last = self.last_closed.get((name, timeframe))
+        if last is not None and bar.time <= last:
+            return
+        self.last_closed[(name, timeframe)] = bar.time
+        for subscription in self._subscribers(name):
+            if subscription.on_bar is not None and subscription.timeframe \
+                    and CcxtCandleSource.exchange_timeframe(subscription.timeframe) == timeframe:
+                self._call(subscription.on_bar, bar)
+
+    @staticmethod
+    def _call(callback, value):
+        try:
+            callback(value)
+        except Exception as e:
+            print(f"⚠️  Market stream callback failed: {e}")
+
+    async def _backfill(self):
+        """Fetch bars that closed while disconnected"""
+        if self.backfill is None:
+            return
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            targets = {(stream_symbol(s.symbol), CcxtCandleSource.exchange_timeframe(s.timeframe)): s
+                       for s in self.subscriptions if s.timeframe}
+
+        for (name, timeframe), subscription in targets.items():
+            last = self.last_closed.get((name, timeframe))
+            if last is None:
+                continue
+            step = pd.Timedelta(timeframe_ns(timeframe))
+            try:
+                df = await loop.run_in_executor(None, self.backfill, subscription.symbol, timeframe, last + step)
+            except Exception as e:
+                print(f"⚠️  Backfill of {subscription.symbol} failed: {e}")
+                continue
+            now = pd.Timestamp(self.clock(), unit='s')
+            for ts, row in df[df.index + step <= now].iterrows():
+                self.backfilled += 1
+                self._closed(name, timeframe, Bar(subscription.symbol, timeframe, ts, float(row['open']), float(row['high']),
+                                                  float(row['low']), float(row['close']), float(row['volume']),
+                                                  True))
+
+
+def repository_backfill(market_type: str = 'future') -> Callable:
+    """Backfill through the process-wide candle repository (missed bars are cached too)"""
+    def backfill(symbol: str, timeframe: str, start: pd.Timestamp) -> pd.DataFrame:
+        return exchange_repository('binance', market_type).get(symbol, timeframe, start)
+    return backfill
+
+
+_STREAMS: Dict[Tuple[str, bool], BinanceMarketStream] = {}
+_STREAMS_LOCK = threading.Lock()
+
+
+def shared_stream(market_type: str = 'future', testnet: bool = False) -> Optional[BinanceMarketStream]:
+    """
+    Process-wide started stream shared by the bots and the GUI
+
+    Returns None when websockets is not installed (callers fall back to REST).
+    Testnet streams are not backfilled: testnet prices differ from the
+    mainnet candles the repository caches.
+    """
+    if not WEBSOCKETS_AVAILABLE:
+        return None
+    key = (market_type, testnet)
+    with _STREAMS_LOCK:
+        if key not in _STREAMS:
+            stream = BinanceMarketStream(market_type, testnet,
+                                         backfill=None if testnet else repository_backfill(market_type))
+            stream.start()
+            _STREAMS[key] = stream
+        return _STREAMS[key]
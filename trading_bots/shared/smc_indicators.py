@@ -3,243 +3,402 @@ SMC (Smart Money Concepts) Indicators
 Includes: Order Blocks, Fair Value Gaps, Break of Structure, Change of Character, Liquidity Zones
 """
 
+import bisect
 import pandas as pd
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 from typing import Tuple, List, Dict
 
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+def _centered_extreme_mask(values: np.ndarray, half_window: int, reducer: np.ufunc) -> np.ndarray:
+    """
+    Flag bars that equal the extreme of their centered window
+
+    Bar i is compared with values[i-half_window:i+half_window+1]. The first and
+    last half_window bars are never flagged because their window is incomplete.
+
+    Args:
+        values: 1-D float array (high or low prices)
+        half_window: Candles on each side of the bar
+        reducer: np.fmax or np.fmin (NaN candles are skipped like pandas max/min)
+
+    Returns:
+        Boolean array with the same length as values
+    """
+    n = len(values)
+    mask = np.zeros(n, dtype=bool)
+    window = 2 * half_window + 1
+    if n < window:
+        return mask
+
+    extreme = reducer.reduce(sliding_window_view(values, window), axis=1)
+    mask[half_window:n - half_window] = values[half_window:n - half_window] == extreme
+    return mask
+
+
+def _market_structure_kernel(event_high: np.ndarray, event_low: np.ndarray,
+                             event_is_sh: np.ndarray, event_is_sl: np.ndarray):
+    """
+    Walk swing events once and track trend / BOS / ChoCh
+
+    Only bars with a swing high or swing low can change state, so the loop runs
+    over those events instead of every candle. Compiled with numba when available.
+
+    Args:
+        event_high: High price at each swing event
+        event_low: Low price at each swing event
+        event_is_sh: True if the event bar is a swing high
+        event_is_sl: True if the event bar is a swing low
+
+    Returns:
+        (trend, bos, choch) arrays aligned with the events
+    """
+    m = len(event_high)
+    trend = np.zeros(m, dtype=np.int64)
+    bos = np.zeros(m, dtype=np.bool_)
+    choch = np.zeros(m, dtype=np.bool_)
+
+    current_trend = 0
+    last_high = 0.0
+    last_low = 0.0
+    has_high = False
+    has_low = False
+
+    for k in range(m):
+        if event_is_sh[k]:
+            current_high = event_high[k]
+            if has_high:
+                if current_high > last_high:
+                    # Higher High
+                    if current_trend == 1:
+                        bos[k] = True  # BOS in uptrend
+                    else:
+                        choch[k] = True  # ChoCh to uptrend
+                        current_trend = 1
+                else:
+                    # Lower High
+                    if current_trend == 1:
+                        choch[k] = True  # ChoCh to downtrend
+                        current_trend = -1
+            last_high = current_high
+            has_high = True
+
+        if event_is_sl[k]:
+            current_low = event_low[k]
+            if has_low:
+                if current_low < last_low:
+                    # Lower Low
+                    if current_trend == -1:
+                        bos[k] = True  # BOS in downtrend
+                    else:
+                        choch[k] = True  # ChoCh to downtrend
+                        current_trend = -1
+                else:
+                    # Higher Low
+                    if current_trend == -1:
+                        choch[k] = True  # ChoCh to uptrend
+                        current_trend = 1
+            last_low = current_low
+            has_low = True
+
+        trend[k] = current_trend
+
+    return trend, bos, choch
+
+
+if NUMBA_AVAILABLE:
+    _market_structure_kernel = njit(cache=True)(_market_structure_kernel)
+
+
+def _equal_level_mask(levels: np.ndarray, tolerance: float, causal: bool = False) -> np.ndarray:
+    """
+    Flag swing levels that have at least one other swing within tolerance
+
+    A level v matches another level h when |h - v| / v < tolerance. For positive
+    prices the closest candidates are the neighbours of v in sorted order, so only
+    those two are checked: O(n log n) instead of comparing every pair.
+
+    Args:
+        levels: Swing prices in bar order (positive prices)
+        tolerance: Relative tolerance for "equal" levels
+        causal: If True, only swings that came earlier are counted (no look-ahead)
+
+    Returns:
+        Boolean array aligned with levels
+    """
+    m = len(levels)
+    mask = np.zeros(m, dtype=bool)
+    if m < 2:
+        return mask
+
+    if causal:
+        seen = []
+        for k, level in enumerate(levels.tolist()):
+            if not level > 0:
+                continue
+            pos = bisect.bisect_left(seen, level)
+            if pos > 0 and abs(seen[pos - 1] - level) / level < tolerance:
+                mask[k] = True
+            elif pos < len(seen) and abs(seen[pos] - level) / level < tolerance:
+                mask[k] = True
+            bisect.insort(seen, level)
+        return mask
+
+    order = np.argsort(levels, kind='stable')
+    sorted_levels = levels[order]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        gap = np.abs(sorted_levels[1:] - sorted_levels[:-1])
+        match_prev = np.zeros(m, dtype=bool)
+        match_next = np.zeros(m, dtype=bool)
+        match_prev[1:] = gap / sorted_levels[1:] < tolerance
+        match_next[:-1] = gap / sorted_levels[:-1] < tolerance
+
+    mask[order] = (match_prev | match_next) & (sorted_levels > 0)
+    return mask
+
 
 class SMCIndicators:
     """Class for calculating Smart Money Concepts indicators"""
 
-    def __init__(self, swing_length: int = 10):
+    def __init__(self, swing_length: int = 10, ob_threshold: float = 0.002, fvg_threshold: float = 0.0,
+                 liquidity_tolerance: float = 0.001, causal_liquidity: bool = False):
         """
         Initialize SMC Indicators
 
         Args:
             swing_length: Number of candles to identify swing highs/lows
+            ob_threshold: Minimum body move of the next candle (fraction of open) for an Order Block
+            fvg_threshold: Minimum gap size (fraction of close) for a Fair Value Gap
+            liquidity_tolerance: Relative tolerance for equal highs/lows
+            causal_liquidity: If True, liquidity zones only count swings seen so far
         """
         self.swing_length = swing_length
+        self.ob_threshold = ob_threshold
+        self.fvg_threshold = fvg_threshold
+        self.liquidity_tolerance = liquidity_tolerance
+        self.causal_liquidity = causal_liquidity
 
-    def detect_swing_points(self, df: pd.DataFrame) -> pd.DataFrame:
+    def detect_swing_points(self, df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
         """
         Detect swing highs and swing lows
 
         Args:
             df: DataFrame with OHLC data
+            copy: Copy df first (False = write columns into df in place)
 
         Returns:
             DataFrame with swing_high and swing_low columns
         """
-        df = df.copy()
-        df['swing_high'] = False
-        df['swing_low'] = False
-
-        for i in range(self.swing_length, len(df) - self.swing_length):
-            # Swing High: highest high in the window
-            if df['high'].iloc[i] == df['high'].iloc[i-self.swing_length:i+self.swing_length+1].max():
-                df.loc[df.index[i], 'swing_high'] = True
+        if copy:
+            df = df.copy()
 
-            # Swing Low: lowest low in the window
-            if df['low'].iloc[i] == df['low'].iloc[i-self.swing_length:i+self.swing_length+1].min():
-                df.loc[df.index[i], 'swing_low'] = True
+        # Centered rolling max/min over all bars at once instead of a per-bar .iloc scan
+        high = df['high'].to_numpy(dtype=float)
+        low = df['low'].to_numpy(dtype=float)
+        df['swing_high'] = _centered_extreme_mask(high, self.swing_length, np.fmax)
+        df['swing_low'] = _centered_extreme_mask(low, self.swing_length, np.fmin)
 
         return df
 
-    def detect_market_structure(self, df: pd.DataFrame) -> pd.DataFrame:
+    def detect_market_structure(self, df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
         """
         Detect market structure (Higher Highs, Higher Lows, Lower Highs, Lower Lows)
 
         Args:
             df: DataFrame with swing points
+            copy: Copy df first (False = write columns into df in place)
 
         Returns:
             DataFrame with market structure
         """
-        df = df.copy()
-        df['trend'] = 0  # 1 = bullish, -1 = bearish, 0 = neutral
-        df['bos'] = False  # Break of Structure
-        df['choch'] = False  # Change of Character
-
-        swing_highs = df[df['swing_high']].copy()
-        swing_lows = df[df['swing_low']].copy()
-
-        if len(swing_highs) < 2 or len(swing_lows) < 2:
-            return df
-
-        current_trend = 0
-        last_high = None
-        last_low = None
-
-        for i in range(len(df)):
-            current_high = df['high'].iloc[i]
-            current_low = df['low'].iloc[i]
-
-            # Update last swing points
-            if df['swing_high'].iloc[i]:
-                if last_high is not None:
-                    if current_high > last_high:
-                        # Higher High
-                        if current_trend == 1:
-                            df.loc[df.index[i], 'bos'] = True  # BOS in uptrend
-                        else:
-                            df.loc[df.index[i], 'choch'] = True  # ChoCh to uptrend
-                            current_trend = 1
-                    else:
-                        # Lower High
-                        if current_trend == 1:
-                            df.loc[df.index[i], 'choch'] = True  # ChoCh to downtrend
-                            current_trend = -1
-                last_high = current_high
-
-            if df['swing_low'].iloc[i]:
-                if last_low is not None:
-                    if current_low < last_low:
-                        # Lower Low
-                        if current_trend == -1:
-                            df.loc[df.index[i], 'bos'] = True  # BOS in downtrend
-                        else:
-                            df.loc[df.index[i], 'choch'] = True  # ChoCh to downtrend
-                            current_trend = -1
-                    else:
-                        # Higher Low
-                        if current_trend == -1:
-                            df.loc[df.index[i], 'choch'] = True  # ChoCh to uptrend
-                            current_trend = 1
-                last_low = current_low
-
-            df.loc[df.index[i], 'trend'] = current_trend
+        if copy:
+            df = df.copy()
+        n = len(df)
+
+        swing_high = df['swing_high'].to_numpy(dtype=bool)
+        swing_low = df['swing_low'].to_numpy(dtype=bool)
+
+        trend = np.zeros(n, dtype=np.int64)  # 1 = bullish, -1 = bearish, 0 = neutral
+        bos = np.zeros(n, dtype=bool)  # Break of Structure
+        choch = np.zeros(n, dtype=bool)  # Change of Character
+
+        if swing_high.sum() >= 2 and swing_low.sum() >= 2:
+            # Single pass over swing events, then forward-fill trend to every bar
+            event_idx = np.flatnonzero(swing_high | swing_low)
+            event_trend, event_bos, event_choch = _market_structure_kernel(
+                df['high'].to_numpy(dtype=float)[event_idx],
+                df['low'].to_numpy(dtype=float)[event_idx],
+                swing_high[event_idx],
+                swing_low[event_idx]
+            )
+
+            bos[event_idx] = event_bos
+            choch[event_idx] = event_choch
+            last_event = np.searchsorted(event_idx, np.arange(n), side='right') - 1
+            has_event = last_event >= 0
+            trend[has_event] = event_trend[last_event[has_event]]
+
+        df['trend'] = trend
+        df['bos'] = bos
+        df['choch'] = choch
 
         return df
 
-    def detect_order_blocks(self, df: pd.DataFrame) -> pd.DataFrame:
+    def detect_order_blocks(self, df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
         """
         Detect Order Blocks (OB)
         Order Block = Last bullish/bearish candle before strong move
 
         Args:
             df: DataFrame with OHLC data
+            copy: Copy df first (False = write columns into df in place)
 
         Returns:
             DataFrame with order block zones
         """
-        df = df.copy()
-        df['bullish_ob'] = False
-        df['bearish_ob'] = False
-        df['ob_top'] = np.nan
-        df['ob_bottom'] = np.nan
-
-        threshold = 0.002  # 0.2% move threshold
-
-        for i in range(1, len(df) - 1):
-            # Bullish Order Block: bearish candle before bullish move
-            if df['close'].iloc[i] < df['open'].iloc[i]:  # Bearish candle
-                # Check if next candle makes strong bullish move
-                next_move = (df['close'].iloc[i+1] - df['open'].iloc[i+1]) / df['open'].iloc[i+1]
-                if next_move > threshold:
-                    df.loc[df.index[i], 'bullish_ob'] = True
-                    df.loc[df.index[i], 'ob_top'] = df['high'].iloc[i]
-                    df.loc[df.index[i], 'ob_bottom'] = df['low'].iloc[i]
-
-            # Bearish Order Block: bullish candle before bearish move
-            if df['close'].iloc[i] > df['open'].iloc[i]:  # Bullish candle
-                # Check if next candle makes strong bearish move
-                next_move = (df['close'].iloc[i+1] - df['open'].iloc[i+1]) / df['open'].iloc[i+1]
-                if next_move < -threshold:
-                    df.loc[df.index[i], 'bearish_ob'] = True
-                    df.loc[df.index[i], 'ob_top'] = df['high'].iloc[i]
-                    df.loc[df.index[i], 'ob_bottom'] = df['low'].iloc[i]
+        if copy:
+            df = df.copy()
+        n = len(df)
+
+        open_ = df['open'].to_numpy(dtype=float)
+        high = df['high'].to_numpy(dtype=float)
+        low = df['low'].to_numpy(dtype=float)
+        close = df['close'].to_numpy(dtype=float)
+
+        bullish_ob = np.zeros(n, dtype=bool)
+        bearish_ob = np.zeros(n, dtype=bool)
+
+        if n > 2:
+            # Body move of the next candle, aligned with candle i (i = 1 .. n-2)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                next_move = (close[2:] - open_[2:]) / open_[2:]
+            body = slice(1, n - 1)
+
+            # Bullish Order Block: bearish candle before strong bullish move
+            bullish_ob[body] = (close[body] < open_[body]) & (next_move > self.ob_threshold)
+            # Bearish Order Block: bullish candle before strong bearish move
+            bearish_ob[body] = (close[body] > open_[body]) & (next_move < -self.ob_threshold)
+
+        is_ob = bullish_ob | bearish_ob
+        df['bullish_ob'] = bullish_ob
+        df['bearish_ob'] = bearish_ob
+        df['ob_top'] = np.where(is_ob, high, np.nan)
+        df['ob_bottom'] = np.where(is_ob, low, np.nan)
 
         return df
 
-    def detect_fair_value_gaps(self, df: pd.DataFrame) -> pd.DataFrame:
+    def detect_fair_value_gaps(self, df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
         """
         Detect Fair Value Gaps (FVG)
         FVG = Gap between candle 1 high and candle 3 low (or vice versa)
 
         Args:
             df: DataFrame with OHLC data
+            copy: Copy df first (False = write columns into df in place)
 
         Returns:
             DataFrame with FVG zones
         """
-        df = df.copy()
-        df['bullish_fvg'] = False
-        df['bearish_fvg'] = False
-        df['fvg_top'] = np.nan
-        df['fvg_bottom'] = np.nan
+        if copy:
+            df = df.copy()
+        n = len(df)
 
-        for i in range(2, len(df)):
-            # Bullish FVG: gap up
-            if df['low'].iloc[i] > df['high'].iloc[i-2]:
-                gap_size = df['low'].iloc[i] - df['high'].iloc[i-2]
-                if gap_size > 0:
-                    df.loc[df.index[i], 'bullish_fvg'] = True
-                    df.loc[df.index[i], 'fvg_top'] = df['low'].iloc[i]
-                    df.loc[df.index[i], 'fvg_bottom'] = df['high'].iloc[i-2]
+        high = df['high'].to_numpy(dtype=float)
+        low = df['low'].to_numpy(dtype=float)
+        close = df['close'].to_numpy(dtype=float)
 
+        bullish_fvg = np.zeros(n, dtype=bool)
+        bearish_fvg = np.zeros(n, dtype=bool)
+        fvg_top = np.full(n, np.nan)
+        fvg_bottom = np.full(n, np.nan)
+
+        if n > 2:
+            # Candle i against candle i-2 (i = 2 .. n-1)
+            high_2 = high[:-2]
+            low_2 = low[:-2]
+            min_gap = self.fvg_threshold * close[2:] if self.fvg_threshold else 0.0
+
+            # Bullish FVG: gap up
+            bull = (low[2:] > high_2) & (low[2:] - high_2 > min_gap)
             # Bearish FVG: gap down
-            if df['high'].iloc[i] < df['low'].iloc[i-2]:
-                gap_size = df['low'].iloc[i-2] - df['high'].iloc[i]
-                if gap_size > 0:
-                    df.loc[df.index[i], 'bearish_fvg'] = True
-                    df.loc[df.index[i], 'fvg_top'] = df['low'].iloc[i-2]
-                    df.loc[df.index[i], 'fvg_bottom'] = df['high'].iloc[i]
+            bear = (high[2:] < low_2) & (low_2 - high[2:] > min_gap)
+
+            bullish_fvg[2:] = bull
+            bearish_fvg[2:] = bear
+            # Bearish assignment goes last, same precedence as the original per-bar loop
+            fvg_top[2:] = np.where(bear, low_2, np.where(bull, low[2:], np.nan))
+            fvg_bottom[2:] = np.where(bear, high[2:], np.where(bull, high_2, np.nan))
+
+        df['bullish_fvg'] = bullish_fvg
+        df['bearish_fvg'] = bearish_fvg
+        df['fvg_top'] = fvg_top
+        df['fvg_bottom'] = fvg_bottom
 
         return df
 
-    def detect_liquidity_zones(self, df: pd.DataFrame) -> pd.DataFrame:
+    def detect_liquidity_zones(self, df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
         """
         Detect liquidity zones (equal highs/lows where stop losses accumulate)
 
+        By default every swing in the frame is compared (including later ones).
+        With causal_liquidity=True a swing is only flagged when an earlier swing
+        sits at the same level, which is what a live bot can see.
+
         Args:
             df: DataFrame with swing points
+            copy: Copy df first (False = write columns into df in place)
 
         Returns:
             DataFrame with liquidity zones
         """
-        df = df.copy()
-        df['buy_side_liquidity'] = False
-        df['sell_side_liquidity'] = False
+        if copy:
+            df = df.copy()
+        n = len(df)
 
-        tolerance = 0.001  # 0.1% tolerance for "equal" levels
+        swing_high = df['swing_high'].to_numpy(dtype=bool)
+        swing_low = df['swing_low'].to_numpy(dtype=bool)
+        high_idx = np.flatnonzero(swing_high)
+        low_idx = np.flatnonzero(swing_low)
 
-        swing_highs = df[df['swing_high']]['high'].values
-        swing_lows = df[df['swing_low']]['low'].values
+        buy_side = np.zeros(n, dtype=bool)
+        sell_side = np.zeros(n, dtype=bool)
 
         # Buy-side liquidity: equal highs
-        for i in range(len(df)):
-            if df['swing_high'].iloc[i]:
-                current_high = df['high'].iloc[i]
-                # Check for equal highs within tolerance
-                equal_highs = np.abs(swing_highs - current_high) / current_high < tolerance
-                if np.sum(equal_highs) >= 2:  # At least 2 equal highs
-                    df.loc[df.index[i], 'buy_side_liquidity'] = True
-
+        buy_side[high_idx] = _equal_level_mask(
+            df['high'].to_numpy(dtype=float)[high_idx], self.liquidity_tolerance, self.causal_liquidity
+        )
         # Sell-side liquidity: equal lows
-        for i in range(len(df)):
-            if df['swing_low'].iloc[i]:
-                current_low = df['low'].iloc[i]
-                # Check for equal lows within tolerance
-                equal_lows = np.abs(swing_lows - current_low) / current_low < tolerance
-                if np.sum(equal_lows) >= 2:  # At least 2 equal lows
-                    df.loc[df.index[i], 'sell_side_liquidity'] = True
+        sell_side[low_idx] = _equal_level_mask(
+            df['low'].to_numpy(dtype=float)[low_idx], self.liquidity_tolerance, self.causal_liquidity
+        )
+
+        df['buy_side_liquidity'] = buy_side
+        df['sell_side_liquidity'] = sell_side
 
         return df
 
-    def apply_all_indicators(self, df: pd.DataFrame) -> pd.DataFrame:
+    def apply_all_indicators(self, df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
         """
         Apply all SMC indicators to the dataframe
 
         Args:
             df: DataFrame with OHLC data
+            copy: Copy df first (False = write columns into df in place)
 
         Returns:
             DataFrame with all SMC indicators
         """
-        df = self.detect_swing_points(df)
-        df = self.detect_market_structure(df)
-        df = self.detect_order_blocks(df)
-        df = self.detect_fair_value_gaps(df)
-        df = self.detect_liquidity_zones(df)
+        # At most one copy, the detectors then add their columns to the same frame
+        df = self.detect_swing_points(df, copy=copy)
+        df = self.detect_market_structure(df, copy=False)
+        df = self.detect_order_blocks(df, copy=False)
+        df = self.detect_fair_value_gaps(df, copy=False)
+        df = self.detect_liquidity_zones(df, copy=False)
 
         return df
@@ -0,0 +1,129 @@
+"""
+Streaming Signal Engine for live bots
+Seeds once with history, then receives one closed candle at a time
+"""
+
+import pandas as pd
+from typing import Optional
+
+
+class StreamingSignalEngine:
+    """
+    Incremental wrapper around a strategy's run_strategy()
+
+    Keeps a bounded window of closed candles. Each update() appends one candle,
+    recomputes the (vectorized) indicators over the window and scores only the
+    new candle through the strategy's eval_last_n hook. Per-candle cost is
+    O(window) and the result equals run_strategy() on the same window.
+
+    Usage:
+        engine = StreamingSignalEngine(PatternRecognitionStrategy(), window=500)
+        engine.seed(history_df)
+        row = engine.update(new_bar)      # pd.Series for the new candle
+        if row['signal'] != 0: ...
+    """
+
+    def __init__(self, strategy, window: int = 500):
+        """
+        Initialize streaming engine
+
+        Args:
+            strategy: Strategy with run_strategy() and eval_last_n (SimplifiedSMCStrategy and subclasses)
+            window: Number of closed candles kept for indicator warm-up
+        """
+        self.strategy = strategy
+        self.window = window
+        self._bars = None
+        self.last_result = None
+
+    @property
+    def is_seeded(self) -> bool:
+        """True once history has been loaded"""
+        return self._bars is not None and len(self._bars) > 0
+
+    @property
+    def last_timestamp(self) -> Optional[pd.Timestamp]:
+        """Timestamp of the newest candle in the window"""
+        if not self.is_seeded:
+            return None
+        return self._bars.index[-1]
+
+    @property
+    def frame(self) -> Optional[pd.DataFrame]:
+        """Current window of raw candles (oldest → newest)"""
+        return self._bars
+
+    def seed(self, df: pd.DataFrame) -> None:
+        """
+        Load history of closed candles (only the last `window` are kept)
+
+        Args:
+            df: DataFrame with OHLCV data and DatetimeIndex
+        """
+        self._bars = df.iloc[-self.window:].copy()
+        self.last_result = None
+
+    def update(self, bar: pd.Series) -> pd.Series:
+        """
+        Append one closed candle and score it
+
+        A candle with the same timestamp as the newest one replaces it.
+
+        Args:
+            bar: Series with OHLCV fields, name = candle timestamp
+
+        Returns:
+            Strategy output row for the new candle
+        """
+        if not self.is_seeded:
+            raise RuntimeError("StreamingSignalEngine.update() called before seed()")
+
+        if bar.name < self._bars.index[-1]:
+            raise ValueError(f"Candle {bar.name} is older than the last candle {self._bars.index[-1]}")
+
+        new_row = pd.DataFrame([bar.to_dict()], index=pd.DatetimeIndex([bar.name], name=self._bars.index.name))
+        new_row = new_row.astype({col: dtype for col, dtype in self._bars.dtypes.items() if col in new_row.columns})
+        if bar.name == self._bars.index[-1]:
+            bars = pd.concat([self._bars.iloc[:-1], new_row])
+        else:
+            bars = pd.concat([self._bars, new_row])
+        self._bars = bars.iloc[-self.window:]
+
+        return self._score_last(1).iloc[-1]
+
+    def sync(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Feed every candle from df that is newer than the window
+
+        Candles are fed one by one through update(). If df does not overlap the window (bot was offline), the engine is
+        re-seeded from df and only its last candle is scored.
+
+        Args:
+            df: Recent closed candles (oldest → newest)
+
+        Returns:
+            Strategy output rows for the new candles (empty if nothing new)
+        """
+        if not self.is_seeded or df.index[0] > self._bars.index[-1]:
+            self.seed(df)
+            return self._score_last(1)
+
+        new_bars = df[df.index > self._bars.index[-1]]
+        if len(new_bars) == 0:
+            return self._bars.iloc[0:0]
+
+        # One update per candle so each is scored as the newest bar (no look-ahead)
+        rows = [self.update(bar) for _, bar in new_bars.iterrows()]
+        return pd.DataFrame(rows)
+
+    def _score_last(self, n: int) -> pd.DataFrame:
+        """Run the strategy on the window, scoring only the last n candles"""
+        previous = self.strategy.eval_last_n
+        self.strategy.eval_last_n = n
+        try:
+            result = self.strategy.run_strategy(self._bars)
+        finally:
+            self.strategy.eval_last_n = previous
+
+        self.last_result = result.iloc[-n:]
+        return self.last_result
@@ -20,17 +20,19 @@ class VolumeAnalyzer:
         """
         self.volume_ma_period = volume_ma_period
 
-    def calculate_volume_metrics(self, df: pd.DataFrame) -> pd.DataFrame:
+    def calculate_volume_metrics(self, df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
         """
         Calculate volume metrics for the dataframe
 
         Args:
             df: DataFrame with OHLCV data
+            copy: Copy df first (False = write columns into df in place)
 
         Returns:
             DataFrame with volume metrics
         """
-        df = df.copy()
+        if copy:
+            df = df.copy()
 
         # Volume moving average
         df['volume_ma'] = df['volume'].rolling(window=self.volume_ma_period).mean()
@@ -5,7 +5,6 @@ Uses V3 Adaptive Strategy with TREND/RANGE detection
 ⚠️ DANGEROUS: Trades automatically without confirmation!
 """
 
-import MetaTrader5 as mt5
 import pandas as pd
 import numpy as np
 import time
@@ -21,7 +20,12 @@ import uuid
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from shared.pattern_recognition_strategy import PatternRecognitionStrategy
+from shared.streaming_strategy import StreamingSignalEngine
 from shared.telegram_helper import check_telegram_bot_import
+from shared.exchange_pool import mt5_terminal
+
+# MT5 calls take the process-wide terminal lock, so they do not interleave with the GUI's
+mt5 = mt5_terminal().api
 
 
 class LiveBotMT5FullAuto:
@@ -79,6 +83,8 @@ class LiveBotMT5FullAuto:
 
         # Initialize strategy
         self.strategy = PatternRecognitionStrategy(fib_mode='standard')
+        # Streaming engine: history is loaded once, then only new closed candles are scored
+        self.signal_engine = StreamingSignalEngine(self.strategy, window=500)
         
         # TREND MODE parameters (strong trend)
         self.trend_tp1 = 30
@@ -812,8 +818,8 @@ class LiveBotMT5FullAuto:
                         print(f"⚠️  Failed to send Telegram notification: {e}")
         
     def connect_mt5(self):
-        """Connect to MT5"""
-        if not mt5.initialize():
+        """Connect to MT5 (process-wide terminal session shared with the GUI)"""
+        if not mt5_terminal().connect():
             error_msg = "❌ Failed to initialize MT5"
             print(error_msg)
             
@@ -830,7 +836,6 @@ class LiveBotMT5FullAuto:
         if account_info is None:
             error_msg = "❌ Failed to get account info"
             print(error_msg)
-            mt5.shutdown()
             
             # Send to Telegram
             if self.telegram_bot:
@@ -857,7 +862,7 @@ class LiveBotMT5FullAuto:
     def disconnect_mt5(self):
         """Disconnect from MT5"""
         if self.mt5_connected:
-            mt5.shutdown()
+            # The terminal session stays open for other bots and the GUI; it is closed at exit
             self.mt5_connected = False
     
     def _check_closed_positions(self):
@@ -933,7 +938,12 @@ class LiveBotMT5FullAuto:
         df = df.set_index('datetime')
         df = df[['open', 'high', 'low', 'close', 'tick_volume']].copy()
         df.rename(columns={'tick_volume': 'volume'}, inplace=True)
-        
+        return self._prepare_market_data(df)
+
+    def _prepare_market_data(self, df):
+        """OHLCV DataFrame -> strategy input with session columns"""
+        df = df[['open', 'high', 'low', 'close', 'volume']].copy()
+
         # Add market hours
         df['is_london'] = df.index.hour.isin(range(7, 12))
         df['is_ny'] = df.index.hour.isin(range(13, 20))
@@ -943,6 +953,34 @@ class LiveBotMT5FullAuto:
         
         return df
         
+    def _get_closed_candles(self, candles=None):
+        """
+        Get closed candles for the streaming signal engine
+
+        Full history is fetched only on the first call (or after a gap),
+        afterwards only the last few candles are requested.
+
+        Args:
+            candles: OHLCV already fetched by a shared feed (AsyncBotRunner),
+                ending with the forming candle - nothing is requested then
+        """
+        if candles is not None:
+            df = self._prepare_market_data(candles)
+            return df.iloc[:-1] if len(df) >= 2 else None
+
+        bars = 10 if self.signal_engine.is_seeded else self.signal_engine.window + 1
+        df = self.get_market_data(bars=bars)
+
+        # Gap since last analysis (reconnect / downtime) - refetch full history
+        if df is not None and self.signal_engine.is_seeded and df.index[0] > self.signal_engine.last_timestamp:
+            df = self.get_market_data(bars=self.signal_engine.window + 1)
+
+        if df is None or len(df) < 2:
+            return None
+
+        # Last row (position 0 in MT5) is the candle that is still forming
+        return df.iloc[:-1]
+
     def detect_market_regime(self, df, lookback=100):
         """
         Detect market regime: TREND or RANGE
@@ -1020,15 +1058,28 @@ class LiveBotMT5FullAuto:
         
         return 'TREND' if is_trend else 'RANGE'
     
-    def analyze_market(self):
-        """Analyze market and get signals with adaptive TP levels"""
+    def analyze_market(self, candles=None):
+        """
+        Analyze market and get signals with adaptive TP levels
+
+        Args:
+            candles: Pre-fetched OHLCV including the forming candle (default: fetch)
+        """
         try:
             # Get data
             print(f"   📥 Fetching market data...")
-            df = self.get_market_data()
+            df = self._get_closed_candles(candles)
             if df is None:
                 print(f"   ❌ Failed to get market data")
                 return None
+
+            # Run strategy on new closed candles only (streaming engine keeps the window)
+            print(f"   🧠 Running V3 Adaptive Strategy...")
+            result = self.signal_engine.sync(df)
+            df = self.signal_engine.frame
+            if len(result) == 0:
+                print(f"   ℹ️  No new closed candles since last check")
+                return None
                 
             last_close = df['close'].iloc[-1]
             last_time = df.index[-1]
@@ -1039,10 +1090,6 @@ class LiveBotMT5FullAuto:
             self.current_regime = self.detect_market_regime(df)
             print(f"   📊 Market Regime: {self.current_regime}")
             
-            # Run strategy
-            print(f"   🧠 Running V3 Adaptive Strategy...")
-            result = self.strategy.run_strategy(df)
-            
             # Get last signal (most recent)
             signals = result[result['signal'] != 0]
             